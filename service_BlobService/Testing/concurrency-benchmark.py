@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for the Blob Service: latency of small retrieve-image calls
+while idle and while a multi-GB blend file upload is in flight.
+
+Before the storage layer moved to a thread pool, the upload's put_object call ran
+on the event loop and every retrieve-image waited for it to finish.
+
+Needs the Blob Service running against MinIO or any S3-compatible stand-in, e.g.:
+
+    moto_server -p 9100
+    BLOB_STORAGE_ENDPOINT=http://127.0.0.1:9100 python service_BlobService/blob-service.py
+    python service_BlobService/Testing/concurrency-benchmark.py --upload-gib 2
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+BLOB_SERVICE_URL = os.getenv("BLOB_SERVICE", "http://127.0.0.1:13000")
+BUCKET = "rendered-frames"
+IMAGE_KEY = "benchmark/concurrency-probe"
+
+
+class ZeroFile:
+    """File-like object of `size` zero bytes, so a multi-GB upload needs no disk or memory."""
+
+    def __init__(self, size):
+        self.size = size
+        self.position = 0
+
+    def read(self, n=-1):
+        remaining = self.size - self.position
+        n = remaining if n is None or n < 0 else min(n, remaining)
+        self.position += n
+        return bytes(n)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def probe_latencies(client, duration, concurrency, stop_event=None):
+    """retrieve-image latencies (ms) for `duration` seconds, or until stop_event is set."""
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline and not (stop_event and stop_event.is_set()):
+            started = time.perf_counter()
+            response = await client.get(
+                f"{BLOB_SERVICE_URL}/api/blob-service/retrieve-image",
+                params={"bucket": BUCKET, "key": IMAGE_KEY, "type": "png"}
+            )
+            assert response.status_code == 200, response.text
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def report(label, latencies):
+    print(
+        f"{label:<22} n={len(latencies):>6} "
+        f"p50={statistics.median(latencies):>8.1f} ms "
+        f"p99={percentile(latencies, 0.99):>8.1f} ms "
+        f"max={max(latencies):>8.1f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Blob Service small-request latency under a large upload")
+    parser.add_argument("--upload-gib", type=float, default=2.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--idle-seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    upload_bytes = int(args.upload_gib * 1024 ** 3)
+
+    async with httpx.AsyncClient(timeout=None) as client:
+        stored = await client.post(
+            f"{BLOB_SERVICE_URL}/api/blob-service/store-image",
+            files={"image": ("probe.png", os.urandom(64 * 1024), "image/png")},
+            data={"bucket": BUCKET, "key": IMAGE_KEY, "type": "png"}
+        )
+        assert stored.status_code == 200, stored.text
+
+        report("idle", await probe_latencies(client, args.idle_seconds, args.concurrency))
+
+        upload_done = asyncio.Event()
+
+        async def upload():
+            started = time.perf_counter()
+            # The sync client streams the zero file; run it off the loop so the probes keep going
+            def post():
+                with httpx.Client(timeout=None) as upload_client:
+                    return upload_client.post(
+                        f"{BLOB_SERVICE_URL}/api/blob-service/store-blend",
+                        files={"blend_file": ("benchmark.blend", ZeroFile(upload_bytes), "application/octet-stream")},
+                        data={"bucket": "blend-files", "key": "benchmark/concurrency-upload"}
+                    )
+            response = await asyncio.to_thread(post)
+            upload_done.set()
+            assert response.status_code == 200, response.text
+            print(f"upload of {args.upload_gib} GiB took {time.perf_counter() - started:.1f}s")
+
+        upload_task = asyncio.create_task(upload())
+        latencies = await probe_latencies(client, float("inf"), args.concurrency, upload_done)
+        await upload_task
+        report("during upload", latencies)
+
+        await client.delete(f"{BLOB_SERVICE_URL}/api/blob-service/delete-key", params={"bucket": "blend-files", "key": "benchmark/concurrency-upload.blend"})
+        await client.delete(f"{BLOB_SERVICE_URL}/api/blob-service/delete-key", params={"bucket": BUCKET, "key": f"{IMAGE_KEY}.png"})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Throughput of the Blob Service storage backends through AsyncStorage, the way the
+routes use them: concurrent frame-sized puts and gets, a listing of every frame,
+in-storage copies and one large streamed upload.
+
+    python service_BlobService/Testing/storage-backend-benchmark.py --frames 2000
+    moto_server -p 9100
+    python service_BlobService/Testing/storage-backend-benchmark.py --s3-endpoint http://127.0.0.1:9100
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from async_storage import AsyncStorage
+from storage_backends import create_storage_backend
+
+
+async def timed(label, count, unit_bytes, coroutine):
+    started = time.perf_counter()
+    await coroutine
+    elapsed = time.perf_counter() - started
+    rate = f"{count / elapsed:9.0f} ops/s" if count else ""
+    throughput = f"{count * unit_bytes / elapsed / 1e6:8.1f} MB/s" if unit_bytes else ""
+    print(f"  {label:<18} {elapsed:7.2f}s {rate} {throughput}")
+
+
+async def bounded(concurrency, coroutines):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run(coroutine):
+        async with slots:
+            return await coroutine
+
+    return await asyncio.gather(*(run(coroutine) for coroutine in coroutines))
+
+
+async def stream(size, chunk_size=1024 * 1024):
+    chunk = os.urandom(chunk_size)
+    sent = 0
+    while sent < size:
+        yield chunk[:min(chunk_size, size - sent)]
+        sent += chunk_size
+
+
+async def benchmark(name, backend, frames, frame_size, large_size, concurrency):
+    storage = AsyncStorage(backend, max_workers=concurrency)
+    bucket = f"benchmark-{uuid.uuid4().hex[:8]}"
+    await storage.create_bucket(bucket)
+    frame = os.urandom(frame_size)
+    keys = [f"customer/object/{index:05d}.png" for index in range(frames)]
+    print(f"[{name}] {frames} frames of {frame_size // 1024} KiB, {concurrency} concurrent calls")
+
+    await timed("put frames", frames, frame_size, bounded(concurrency, (storage.put_object(bucket, key, frame) for key in keys)))
+    await timed("get frames", frames, frame_size, bounded(concurrency, (storage.get_object_bytes(bucket, key) for key in keys)))
+    await timed("ranged gets", frames, 4096, bounded(concurrency, (storage.get_object_bytes(bucket, key, Range="bytes=0-4095") for key in keys)))
+    await timed("list frames", 1, 0, storage.list_objects(bucket, "customer/"))
+    await timed("copy frames", frames, frame_size, bounded(concurrency, (storage.copy_object(bucket, f"copy/{key}", bucket, key) for key in keys)))
+    await timed("stream upload", 1, large_size, storage.upload_stream(bucket, "large.bin", stream(large_size)))
+    await timed("stream download", 1, large_size, drain(storage, bucket, "large.bin"))
+    storage.shutdown()
+
+
+async def drain(storage, bucket, key):
+    response = await storage.get_object(bucket, key)
+    async for _ in storage.iter_body(response["Body"]):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare storage backend throughput")
+    parser.add_argument("--frames", type=int, default=1000)
+    parser.add_argument("--frame-kib", type=int, default=512)
+    parser.add_argument("--large-mib", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--s3-endpoint", default=os.getenv("BLOB_STORAGE_ENDPOINT"), help="Also benchmark this S3-compatible endpoint")
+    parser.add_argument("--access-key", default=os.getenv("BLOB_STORAGE_ACCESS_KEY", "admin"))
+    parser.add_argument("--secret-key", default=os.getenv("BLOB_STORAGE_SECRET_KEY", "password"))
+    args = parser.parse_args()
+    sizes = (args.frames, args.frame_kib * 1024, args.large_mib * 1024 * 1024, args.concurrency)
+
+    with tempfile.TemporaryDirectory() as root:
+        asyncio.run(benchmark("local", create_storage_backend("local", root=root), *sizes))
+    if args.s3_endpoint:
+        backend = create_storage_backend("s3", endpoint=args.s3_endpoint, access_key=args.access_key,
+                                         secret_key=args.secret_key, max_pool_connections=args.concurrency)
+        asyncio.run(benchmark("s3", backend, *sizes))
+
+
+if __name__ == "__main__":
+    main()
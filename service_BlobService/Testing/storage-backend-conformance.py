@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Conformance checks for the Blob Service storage backends: the same operations,
+responses and errors against the local filesystem backend and an S3 endpoint, so
+the Blob Service behaves the same whichever one BLOB_STORAGE_BACKEND selects.
+
+    python service_BlobService/Testing/storage-backend-conformance.py
+    moto_server -p 9100
+    python service_BlobService/Testing/storage-backend-conformance.py --s3-endpoint http://127.0.0.1:9100
+"""
+
+import argparse
+import datetime
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import time
+import traceback
+import urllib.request
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from botocore.exceptions import ClientError
+
+from storage_backends import MIN_PART_SIZE, StorageBackend, create_storage_backend
+
+
+def error_of(call, *args, **kwargs):
+    """(error code, HTTP status) raised by a call, None if it succeeded."""
+    try:
+        response = call(*args, **kwargs)
+        if isinstance(response, dict) and "Body" in response:
+            response["Body"].close()
+    except ClientError as e:
+        return e.response["Error"]["Code"], e.response["ResponseMetadata"]["HTTPStatusCode"]
+    return None
+
+
+def read(backend, bucket, key, **kwargs):
+    response = backend.get_object(Bucket=bucket, Key=key, **kwargs)
+    try:
+        return response, response["Body"].read()
+    finally:
+        response["Body"].close()
+
+
+# =============================================================================
+# CHECKS
+# =============================================================================
+
+def check_buckets(backend, bucket):
+    assert error_of(backend.head_bucket, Bucket=f"missing-{uuid.uuid4().hex[:8]}") == ("404", 404)
+    assert error_of(backend.head_bucket, Bucket=bucket) is None
+    assert bucket in [entry["Name"] for entry in backend.list_buckets()["Buckets"]]
+
+
+def check_put_get_head(backend, bucket):
+    data = os.urandom(100_000)
+    put = backend.put_object(Bucket=bucket, Key="objects/a.bin", Body=data, ContentType="application/x-test")
+    assert put["ETag"] == f'"{hashlib.md5(data).hexdigest()}"'
+
+    response, body = read(backend, bucket, "objects/a.bin")
+    assert body == data
+    assert response["ContentLength"] == len(data) and response["ETag"] == put["ETag"]
+    assert response["ContentType"] == "application/x-test"
+
+    head = backend.head_object(Bucket=bucket, Key="objects/a.bin")
+    assert head["ContentLength"] == len(data) and head["ETag"] == put["ETag"]
+    assert isinstance(head["LastModified"], datetime.datetime)
+
+    # Overwrite replaces the whole object
+    backend.put_object(Bucket=bucket, Key="objects/a.bin", Body=b"short")
+    assert read(backend, bucket, "objects/a.bin")[1] == b"short"
+
+    # File-like bodies and the transfer manager
+    backend.put_object(Bucket=bucket, Key="objects/file.bin", Body=io.BytesIO(data))
+    assert read(backend, bucket, "objects/file.bin")[1] == data
+    backend.upload_fileobj(io.BytesIO(data), bucket, "objects/fileobj.bin", ExtraArgs={"ContentType": "image/png"})
+    assert backend.head_object(Bucket=bucket, Key="objects/fileobj.bin")["ContentType"] == "image/png"
+
+    assert error_of(backend.get_object, Bucket=bucket, Key="objects/missing") == ("NoSuchKey", 404)
+    assert error_of(backend.head_object, Bucket=bucket, Key="objects/missing") == ("404", 404)
+
+
+def check_ranges(backend, bucket):
+    data = bytes(range(256)) * 40
+    backend.put_object(Bucket=bucket, Key="ranges/r.bin", Body=data)
+    response, body = read(backend, bucket, "ranges/r.bin", Range="bytes=100-199")
+    assert body == data[100:200] and response["ContentRange"] == f"bytes 100-199/{len(data)}"
+    assert read(backend, bucket, "ranges/r.bin", Range="bytes=10000-")[1] == data[10000:]
+    assert read(backend, bucket, "ranges/r.bin", Range="bytes=-10")[1] == data[-10:]
+    # Past the end is clipped, starting past the end is not satisfiable
+    assert read(backend, bucket, "ranges/r.bin", Range=f"bytes=10200-{len(data) + 500}")[1] == data[10200:]
+    assert error_of(backend.get_object, Bucket=bucket, Key="ranges/r.bin", Range=f"bytes={len(data)}-")[1] == 416
+
+
+def check_conditions(backend, bucket):
+    put = backend.put_object(Bucket=bucket, Key="conditions/c.bin", Body=b"conditional")
+    etag = put["ETag"]
+    last_modified = backend.head_object(Bucket=bucket, Key="conditions/c.bin")["LastModified"]
+
+    assert read(backend, bucket, "conditions/c.bin", IfMatch=etag)[1] == b"conditional"
+    assert error_of(backend.get_object, Bucket=bucket, Key="conditions/c.bin", IfMatch='"0000"') == ("PreconditionFailed", 412)
+    assert error_of(backend.get_object, Bucket=bucket, Key="conditions/c.bin", IfNoneMatch=etag)[1] == 304
+    assert read(backend, bucket, "conditions/c.bin", IfNoneMatch='"0000"')[1] == b"conditional"
+    assert error_of(backend.get_object, Bucket=bucket, Key="conditions/c.bin", IfModifiedSince=last_modified)[1] == 304
+    earlier = last_modified - datetime.timedelta(hours=1)
+    assert read(backend, bucket, "conditions/c.bin", IfModifiedSince=earlier)[1] == b"conditional"
+    assert error_of(backend.get_object, Bucket=bucket, Key="conditions/c.bin", IfUnmodifiedSince=earlier)[1] == 412
+
+    # If-Range as the Blob Service sends it: Range with IfMatch
+    response, body = read(backend, bucket, "conditions/c.bin", Range="bytes=0-3", IfMatch=etag)
+    assert body == b"cond"
+
+
+def check_list(backend, bucket):
+    keys = [f"list/{index:04d}.png" for index in range(1205)]
+    for key in keys:
+        backend.put_object(Bucket=bucket, Key=key, Body=key.encode())
+    backend.put_object(Bucket=bucket, Key="listing/other.png", Body=b"x")
+
+    listed = []
+    pages = 0
+    for page in backend.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix="list/"):
+        pages += 1
+        listed.extend(obj["Key"] for obj in page.get("Contents", []))
+    assert listed == keys and pages == 2
+
+    first = backend.list_objects_v2(Bucket=bucket, Prefix="list/", MaxKeys=10)
+    assert first["IsTruncated"] and [obj["Key"] for obj in first["Contents"]] == keys[:10]
+    second = backend.list_objects_v2(Bucket=bucket, Prefix="list/", MaxKeys=10, ContinuationToken=first["NextContinuationToken"])
+    assert [obj["Key"] for obj in second["Contents"]] == keys[10:20]
+    assert "Contents" not in backend.list_objects_v2(Bucket=bucket, Prefix="nothing/")
+
+
+def check_list_order(backend, bucket):
+    # Keys whose order depends on "/" sorting between its neighbours, empty and long components
+    keys = ["tree/a", "tree/a-b", "tree/a/b", "tree/a/b/c", "tree/a//c", "tree/a/", "tree/a0", "tree/ab",
+            "tree/b c/%2F", "tree/.hidden", "tree/\u00e9t\u00e9/x", "tree/" + "l" * 300 + "/x", "tree/" + "m" * 300]
+    for key in keys:
+        backend.put_object(Bucket=bucket, Key=key, Body=b"x")
+
+    def listed(**kwargs):
+        return [obj["Key"] for obj in backend.list_objects_v2(Bucket=bucket, **kwargs).get("Contents", [])]
+
+    assert listed(Prefix="tree/") == sorted(keys)
+    assert listed(Prefix="tree/a/") == sorted(key for key in keys if key.startswith("tree/a/"))
+    assert listed(Prefix="tree/a") == sorted(key for key in keys if key.startswith("tree/a"))
+    assert listed(Prefix="tree/l") == ["tree/" + "l" * 300 + "/x"]
+    for after in ("tree/a", "tree/a-", "tree/a/b", "tree/a0", "tree/zz"):
+        assert listed(Prefix="tree/", StartAfter=after) == [key for key in sorted(keys) if key > after], after
+
+    backend.delete_object(Bucket=bucket, Key="tree/a/b/c")
+    backend.delete_object(Bucket=bucket, Key="tree/" + "l" * 300 + "/x")
+    assert listed(Prefix="tree/a/b") == ["tree/a/b"] and listed(Prefix="tree/l") == []
+
+
+def check_copy_delete(backend, bucket):
+    data = os.urandom(50_000)
+    put = backend.put_object(Bucket=bucket, Key="copy/source.bin", Body=data, ContentType="image/png")
+    copied = backend.copy_object(Bucket=bucket, Key="copy/target.bin", CopySource={"Bucket": bucket, "Key": "copy/source.bin"})
+    assert copied["CopyObjectResult"]["ETag"] == put["ETag"]
+    response, body = read(backend, bucket, "copy/target.bin")
+    assert body == data and response["ContentType"] == "image/png"
+
+    backend.copy_object(Bucket=bucket, Key="copy/replaced.bin", CopySource={"Bucket": bucket, "Key": "copy/source.bin"},
+                        MetadataDirective="REPLACE", ContentType="image/webp")
+    assert backend.head_object(Bucket=bucket, Key="copy/replaced.bin")["ContentType"] == "image/webp"
+
+    backend.delete_object(Bucket=bucket, Key="copy/target.bin")
+    assert error_of(backend.head_object, Bucket=bucket, Key="copy/target.bin")[1] == 404
+    # Deleting a missing key succeeds, like S3
+    assert error_of(backend.delete_object, Bucket=bucket, Key="copy/target.bin") is None
+
+    response = backend.delete_objects(Bucket=bucket, Delete={"Objects": [{"Key": "copy/source.bin"}, {"Key": "copy/replaced.bin"}]})
+    assert not response.get("Errors")
+    assert "Contents" not in backend.list_objects_v2(Bucket=bucket, Prefix="copy/")
+
+
+def check_multipart(backend, bucket):
+    parts_data = [os.urandom(MIN_PART_SIZE), os.urandom(MIN_PART_SIZE), os.urandom(1000)]
+    upload_id = backend.create_multipart_upload(Bucket=bucket, Key="multipart/m.bin", ContentType="video/mp4")["UploadId"]
+    assert upload_id in [upload["UploadId"] for upload in backend.list_multipart_uploads(Bucket=bucket).get("Uploads", [])]
+
+    # Parts uploaded out of order
+    etags = {}
+    for number in (3, 1, 2):
+        etags[number] = backend.upload_part(Bucket=bucket, Key="multipart/m.bin", UploadId=upload_id,
+                                            PartNumber=number, Body=parts_data[number - 1])["ETag"]
+    parts = [{"PartNumber": number, "ETag": etags[number]} for number in (1, 2, 3)]
+    assert error_of(backend.complete_multipart_upload, Bucket=bucket, Key="multipart/m.bin", UploadId=upload_id,
+                    MultipartUpload={"Parts": [parts[0], {"PartNumber": 2, "ETag": '"0000"'}, parts[2]]})[0] == "InvalidPart"
+
+    completed = backend.complete_multipart_upload(Bucket=bucket, Key="multipart/m.bin", UploadId=upload_id,
+                                                  MultipartUpload={"Parts": parts})
+    digest = hashlib.md5(b"".join(bytes.fromhex(etags[number].strip('"')) for number in (1, 2, 3))).hexdigest()
+    assert completed["ETag"] == f'"{digest}-3"'
+    response, body = read(backend, bucket, "multipart/m.bin")
+    assert body == b"".join(parts_data) and response["ContentType"] == "video/mp4"
+
+    # Parts other than the last must be at least MIN_PART_SIZE
+    upload_id = backend.create_multipart_upload(Bucket=bucket, Key="multipart/small.bin")["UploadId"]
+    small = [backend.upload_part(Bucket=bucket, Key="multipart/small.bin", UploadId=upload_id, PartNumber=number, Body=b"x")["ETag"]
+             for number in (1, 2)]
+    assert error_of(backend.complete_multipart_upload, Bucket=bucket, Key="multipart/small.bin", UploadId=upload_id,
+                    MultipartUpload={"Parts": [{"PartNumber": 1, "ETag": small[0]}, {"PartNumber": 2, "ETag": small[1]}]})[0] == "EntityTooSmall"
+    backend.abort_multipart_upload(Bucket=bucket, Key="multipart/small.bin", UploadId=upload_id)
+    assert upload_id not in [upload["UploadId"] for upload in backend.list_multipart_uploads(Bucket=bucket).get("Uploads", [])]
+
+    # Part copied from an existing object, then appended to
+    upload_id = backend.create_multipart_upload(Bucket=bucket, Key="multipart/appended.bin")["UploadId"]
+    copied = backend.upload_part_copy(Bucket=bucket, Key="multipart/appended.bin", UploadId=upload_id, PartNumber=1,
+                                      CopySource={"Bucket": bucket, "Key": "multipart/m.bin"},
+                                      CopySourceRange=f"bytes=0-{MIN_PART_SIZE - 1}")["CopyPartResult"]["ETag"]
+    tail = backend.upload_part(Bucket=bucket, Key="multipart/appended.bin", UploadId=upload_id, PartNumber=2, Body=b"tail")["ETag"]
+    backend.complete_multipart_upload(Bucket=bucket, Key="multipart/appended.bin", UploadId=upload_id,
+                                      MultipartUpload={"Parts": [{"PartNumber": 1, "ETag": copied}, {"PartNumber": 2, "ETag": tail}]})
+    assert read(backend, bucket, "multipart/appended.bin")[1] == parts_data[0] + b"tail"
+
+
+def check_presign(backend, bucket):
+    backend.put_object(Bucket=bucket, Key="presign/p.bin", Body=b"presigned")
+    url = backend.generate_presigned_url("get_object", Params={"Bucket": bucket, "Key": "presign/p.bin"}, ExpiresIn=60)
+    assert url.startswith("http") and "presign/p.bin" in url
+    upload_url = backend.generate_presigned_url("put_object", Params={"Bucket": bucket, "Key": "presign/u.bin"},
+                                                ExpiresIn=60, HttpMethod="PUT")
+    assert upload_url != url
+
+    if hasattr(backend, "verify_presigned_url"):
+        # Served by the Blob Service: checked here without it
+        query = dict(part.split("=", 1) for part in url.split("?", 1)[1].split("&"))
+        assert backend.verify_presigned_url("GET", bucket, "presign/p.bin", query["expires"], query["signature"])
+        assert not backend.verify_presigned_url("PUT", bucket, "presign/p.bin", query["expires"], query["signature"])
+        assert not backend.verify_presigned_url("GET", bucket, "presign/other.bin", query["expires"], query["signature"])
+        assert not backend.verify_presigned_url("GET", bucket, "presign/p.bin", str(int(time.time()) - 1), query["signature"])
+    else:
+        with urllib.request.urlopen(url) as response:
+            assert response.read() == b"presigned"
+
+
+CHECKS = [check_buckets, check_put_get_head, check_ranges, check_conditions, check_list, check_list_order,
+          check_copy_delete, check_multipart, check_presign]
+
+
+def run_checks(name, backend):
+    assert StorageBackend.implemented_by(backend), f"{name} does not implement every storage operation"
+    bucket = f"conformance-{uuid.uuid4().hex[:8]}"
+    backend.create_bucket(Bucket=bucket)
+    failures = 0
+    for check in CHECKS:
+        started = time.perf_counter()
+        try:
+            check(backend, bucket)
+            print(f"  [{name}] {check.__name__:<22} ok    {time.perf_counter() - started:6.2f}s")
+        except Exception:
+            failures += 1
+            print(f"  [{name}] {check.__name__:<22} FAILED")
+            traceback.print_exc()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the storage backend conformance checks")
+    parser.add_argument("--s3-endpoint", default=os.getenv("BLOB_STORAGE_ENDPOINT"), help="Also check this S3-compatible endpoint")
+    parser.add_argument("--access-key", default=os.getenv("BLOB_STORAGE_ACCESS_KEY", "admin"))
+    parser.add_argument("--secret-key", default=os.getenv("BLOB_STORAGE_SECRET_KEY", "password"))
+    args = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as root:
+        backend = create_storage_backend("local", root=root, secret_key="conformance", public_url="http://127.0.0.1:13000")
+        failures += run_checks("local", backend)
+    if args.s3_endpoint:
+        backend = create_storage_backend("s3", endpoint=args.s3_endpoint, access_key=args.access_key, secret_key=args.secret_key)
+        failures += run_checks("s3", backend)
+
+    print("All checks passed" if not failures else f"{failures} check(s) failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
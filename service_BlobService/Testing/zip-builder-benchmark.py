@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the rendered frames zip builder of the Blob Service: time to build and
+store frames.zip for prefixes of 1k and 10k frames, and a check of the result.
+
+The builder fetches BLOB_ZIP_PREFETCH frames ahead, STOREs already compressed
+formats instead of DEFLATE-ing them and sends the archive as a parallel multipart
+upload. Run the same script against an older checkout to compare.
+
+Needs the Blob Service running against MinIO or any S3-compatible stand-in, e.g.:
+
+    moto_server -p 9100
+    BLOB_STORAGE_ENDPOINT=http://127.0.0.1:9100 python service_BlobService/blob-service.py
+    python service_BlobService/Testing/zip-builder-benchmark.py --frames 1000 10000
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import time
+import zipfile
+
+import httpx
+
+BLOB_SERVICE_URL = os.getenv("BLOB_SERVICE", "http://127.0.0.1:13000")
+BUCKET = "rendered-frames"
+
+
+async def seed_frames(client, prefix, count, frame_bytes, concurrency):
+    """Store `count` random PNG frames under prefix, skipping the ones already there."""
+    slots = asyncio.Semaphore(concurrency)
+    frame = os.urandom(frame_bytes)
+
+    async def store(index):
+        key = f"{prefix}frame_{index:06d}"
+        async with slots:
+            exists = await client.get(
+                f"{BLOB_SERVICE_URL}/api/blob-service/object-exists", params={"bucket": BUCKET, "key": f"{key}.png"}
+            )
+            if exists.status_code == 200 and exists.json().get("exists"):
+                return
+            response = await client.post(
+                f"{BLOB_SERVICE_URL}/api/blob-service/store-image",
+                files={"image": (f"frame_{index:06d}.png", frame, "image/png")},
+                data={"bucket": BUCKET, "key": key, "type": "png"}
+            )
+            assert response.status_code == 200, response.text
+
+    started = time.perf_counter()
+    await asyncio.gather(*(store(index) for index in range(count)))
+    print(f"seeded {count} frames of {frame_bytes // 1024} KiB under {prefix} in {time.perf_counter() - started:.1f}s")
+
+
+async def build_zip(client, prefix, frame_count, frame_bytes):
+    started = time.perf_counter()
+    response = await client.post(
+        f"{BLOB_SERVICE_URL}/api/blob-service/store-rendered-images-as-zip",
+        data={"bucket": BUCKET, "prefix": prefix, "is_paid": "true"}
+    )
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 200, response.text
+    result = response.json()
+
+    archive = await client.get(f"{BLOB_SERVICE_URL}/api/blob-service/retrieve-frames-zip", params={"key": result["key"]})
+    assert archive.status_code == 200, archive.text
+    with zipfile.ZipFile(io.BytesIO(archive.content)) as frames_zip:
+        entries = frames_zip.infolist()
+        assert len(entries) == frame_count, f"{len(entries)} entries, expected {frame_count}"
+        assert frames_zip.testzip() is None
+
+    total_mib = frame_count * frame_bytes / 1024 ** 2
+    print(
+        f"{frame_count:>7} frames  {total_mib:>9.1f} MiB  build {elapsed:>7.2f}s  "
+        f"{total_mib / elapsed:>8.1f} MiB/s  zip {len(archive.content) / 1024 ** 2:>9.1f} MiB"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Blob Service frames zip build benchmark")
+    parser.add_argument("--frames", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--frame-kib", type=int, default=256)
+    parser.add_argument("--seed-concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    frame_bytes = args.frame_kib * 1024
+    async with httpx.AsyncClient(timeout=None) as client:
+        for frame_count in args.frames:
+            prefix = f"benchmark/zip-{frame_count}/"
+            await seed_frames(client, prefix, frame_count, frame_bytes, args.seed_concurrency)
+            await build_zip(client, prefix, frame_count, frame_bytes)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
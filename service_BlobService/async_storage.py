@@ -0,0 +1,391 @@
+import asyncio
+import collections
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterable, AsyncIterator, List
+
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
+# S3 rejects multipart parts smaller than this, except the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+# Largest part upload_part_copy accepts
+MAX_COPY_PART_SIZE = 5 * 1024 * 1024 * 1024
+# Most keys one delete_objects request accepts
+MAX_DELETE_BATCH = 1000
+# Operations that change the object at (Bucket, Key)
+WRITE_OPERATIONS = frozenset({"put_object", "copy_object", "complete_multipart_upload", "delete_object"})
+
+
+# =============================================================================
+# ASYNC STORAGE - NON-BLOCKING ACCESS TO THE S3/MINIO CLIENT
+# =============================================================================
+
+class AsyncStorage:
+    """
+    Runs the blocking boto3 client on a dedicated, bounded thread pool so a large
+    upload or zip build never stalls the event loop serving other requests.
+
+    The pool is sized together with the client's connection pool
+    (max_pool_connections) so every worker thread gets its own connection.
+    Bodies are streamed chunk by chunk, never read whole into memory here.
+
+    Every storage request made through it is counted by operation (call_counts;
+    a page of a listing is one request, an upload_fileobj transfer counts once),
+    and the buckets seen to exist are remembered (known_buckets) until a call
+    reports NoSuchBucket, so callers can skip checking them again.
+
+    Functions added to object_listeners are called with (bucket, key) whenever
+    an object is written or deleted through it, so caches of object state can
+    drop what they know about it.
+    """
+
+    def __init__(self, client, max_workers: int = 32, upload_part_concurrency: int = 4, part_size: int = 16 * 1024 * 1024):
+        """
+        Args:
+            client: Storage backend, the boto3 S3 client or another StorageBackend (thread safe)
+            max_workers (int): Number of storage calls that can run at the same time
+            upload_part_concurrency (int): Parts of one multipart upload sent at the same time
+            part_size (int): Size of multipart upload parts (at least 5 MiB)
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="blob-storage")
+        self.upload_part_concurrency = max(upload_part_concurrency, 1)
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=self.part_size,
+            multipart_chunksize=self.part_size,
+            max_concurrency=self.upload_part_concurrency
+        )
+        self.call_counts = collections.Counter()
+        self.known_buckets = set()
+        self.object_listeners = []
+
+    def _notify_object_changed(self, bucket: str, key: str):
+        for listener in self.object_listeners:
+            listener(bucket, key)
+
+    async def run(self, function, *args, **kwargs):
+        """Run any blocking function on the storage thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: function(*args, **kwargs))
+
+    async def call(self, operation: str, **kwargs):
+        """Call a boto3 client operation, e.g. await storage.call("head_object", Bucket=..., Key=...)."""
+        self.call_counts[operation] += 1
+        try:
+            return await self.run(getattr(self.client, operation), **kwargs)
+        except ClientError as e:
+            self._forget_missing_bucket(e, kwargs.get("Bucket"))
+            raise
+        finally:
+            # Also after a failure, the object may have changed anyway
+            if operation in WRITE_OPERATIONS:
+                self._notify_object_changed(kwargs["Bucket"], kwargs["Key"])
+            elif operation == "delete_objects":
+                for item in kwargs["Delete"]["Objects"]:
+                    self._notify_object_changed(kwargs["Bucket"], item["Key"])
+
+    def _forget_missing_bucket(self, error: Exception, bucket: str):
+        # The transfer manager reports a ClientError as the cause of its own error
+        for cause in (error, error.__context__):
+            if isinstance(cause, ClientError) and cause.response.get("Error", {}).get("Code") == "NoSuchBucket":
+                self.known_buckets.discard(bucket)
+
+    async def _paginate(self, operation: str, field: str, **kwargs) -> list:
+        """Every item of a paginated listing, all pages fetched on the pool (one counted request per page)."""
+        def fetch():
+            items = []
+            pages = 0
+            for page in self.client.get_paginator(operation).paginate(**kwargs):
+                pages += 1
+                items.extend(page.get(field, []))
+            return items, pages
+
+        try:
+            items, pages = await self.run(fetch)
+        except ClientError as e:
+            self.call_counts[operation] += 1
+            self._forget_missing_bucket(e, kwargs.get("Bucket"))
+            raise
+        self.call_counts[operation] += pages
+        return items
+
+    # -------- Objects -------- #
+
+    async def put_object(self, bucket: str, key: str, body, **kwargs):
+        return await self.call("put_object", Bucket=bucket, Key=key, Body=body, **kwargs)
+
+    async def upload_fileobj(self, fileobj, bucket: str, key: str, extra_args: dict = None):
+        """Multipart upload from a file-like object, read in parts instead of all at once."""
+        self.call_counts["upload_fileobj"] += 1
+        try:
+            return await self.run(
+                self.client.upload_fileobj,
+                Fileobj=fileobj, Bucket=bucket, Key=key, ExtraArgs=extra_args, Config=self.transfer_config
+            )
+        except Exception as e:
+            self._forget_missing_bucket(e, bucket)
+            raise
+        finally:
+            self._notify_object_changed(bucket, key)
+
+    async def upload_stream(self, bucket: str, key: str, chunks: AsyncIterable[bytes], content_type: str = None,
+                            copy_source: dict = None, copy_length: int = 0, copy_source_etag: str = None) -> dict:
+        """
+        Multipart upload fed straight from an async stream of chunks (e.g. a request
+        body), hashing the content with SHA-256 in the same pass. Chunks must not be
+        modified after they are yielded, they are buffered without copying.
+
+        At most `upload_part_concurrency` parts are in flight while the next one is
+        filled, so memory per upload stays around part_size x (upload_part_concurrency + 1)
+        whatever the object size. Content smaller than one part is sent with a
+        single put_object. A failed upload is aborted so no orphaned parts remain.
+
+        With copy_source ({"Bucket", "Key"}), the first copy_length bytes (at least
+        MIN_PART_SIZE) of that object are copied inside storage, without being read
+        here, and the chunks are appended after them. sha256 is None then, as the
+        copied bytes are never seen. With copy_source_etag, the copy only succeeds
+        while the source still has that ETag (a PreconditionFailed ClientError otherwise).
+
+        Returns:
+            dict: {"size_bytes", "sha256", "parts", "etag"}
+        """
+        extra_args = {"ContentType": content_type} if content_type else {}
+        hasher = hashlib.sha256()
+        # Pieces of the part being filled: memoryview slices of the incoming chunks,
+        # joined once per part instead of growing and shifting one buffer
+        pending = []
+        pending_size = 0
+        size = 0
+        upload_id = None
+        part_number = 0
+        completed_parts = []
+        in_flight = set()
+        slots = asyncio.Semaphore(self.upload_part_concurrency)
+
+        async def send_part(number: int, data: bytes):
+            try:
+                response = await self.call(
+                    "upload_part", Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=data
+                )
+                completed_parts.append({"PartNumber": number, "ETag": response["ETag"]})
+            finally:
+                slots.release()
+
+        async def start_part(data: bytes):
+            nonlocal upload_id, part_number
+            if upload_id is None:
+                response = await self.call("create_multipart_upload", Bucket=bucket, Key=key, **extra_args)
+                upload_id = response["UploadId"]
+
+            # Waits while the maximum number of parts is in flight, which bounds memory
+            await slots.acquire()
+            for task in [task for task in in_flight if task.done()]:
+                in_flight.discard(task)
+                task.result()  # Raises the error of a failed part
+
+            part_number += 1
+            in_flight.add(asyncio.create_task(send_part(part_number, data)))
+
+        try:
+            if copy_source is not None:
+                if copy_length < MIN_PART_SIZE:
+                    raise ValueError(f"At least {MIN_PART_SIZE} bytes must be copied")
+                response = await self.call("create_multipart_upload", Bucket=bucket, Key=key, **extra_args)
+                upload_id = response["UploadId"]
+                # Copied parts may be up to 5 GiB, split evenly so none is below the minimum
+                copy_parts = -(-copy_length // MAX_COPY_PART_SIZE)
+                copy_part_size = -(-copy_length // copy_parts)
+                conditions = {"CopySourceIfMatch": copy_source_etag} if copy_source_etag else {}
+                for start in range(0, copy_length, copy_part_size):
+                    end = min(copy_length, start + copy_part_size) - 1
+                    part_number += 1
+                    response = await self.call(
+                        "upload_part_copy", Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number,
+                        CopySource=copy_source, CopySourceRange=f"bytes={start}-{end}", **conditions
+                    )
+                    completed_parts.append({"PartNumber": part_number, "ETag": response["CopyPartResult"]["ETag"]})
+                size = copy_length
+
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                view = memoryview(chunk)
+                while pending_size + len(view) >= self.part_size:
+                    take = self.part_size - pending_size
+                    pending.append(view[:take])
+                    view = view[take:]
+                    part = b"".join(pending)
+                    pending = []
+                    pending_size = 0
+                    # hashlib releases the GIL on large buffers, so hashing runs off the loop
+                    await self.run(hasher.update, part)
+                    await start_part(part)
+                if view:
+                    pending.append(view)
+                    pending_size += len(view)
+
+            remainder = b"".join(pending)
+            pending = []
+            await self.run(hasher.update, remainder)
+
+            if upload_id is None:
+                response = await self.put_object(bucket, key, remainder, **extra_args)
+                return {"size_bytes": size, "sha256": hasher.hexdigest(), "parts": 1, "etag": response.get("ETag")}
+
+            if remainder:
+                await start_part(remainder)
+            await asyncio.gather(*in_flight)
+
+            completed_parts.sort(key=lambda part: part["PartNumber"])
+            response = await self.call(
+                "complete_multipart_upload",
+                Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": completed_parts}
+            )
+            return {
+                "size_bytes": size,
+                "sha256": hasher.hexdigest() if copy_source is None else None,
+                "parts": len(completed_parts),
+                "etag": (response or {}).get("ETag")
+            }
+        except BaseException:
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+            if upload_id is not None:
+                try:
+                    await self.call("abort_multipart_upload", Bucket=bucket, Key=key, UploadId=upload_id)
+                except Exception as e:
+                    print(f"Warning: Could not abort multipart upload of '{key}': {str(e)}")
+            raise
+
+    # -------- Multipart uploads driven by the caller (resumable upload sessions) -------- #
+
+    async def create_multipart_upload(self, bucket: str, key: str, content_type: str = None) -> str:
+        extra_args = {"ContentType": content_type} if content_type else {}
+        response = await self.call("create_multipart_upload", Bucket=bucket, Key=key, **extra_args)
+        return response["UploadId"]
+
+    async def upload_part(self, bucket: str, key: str, upload_id: str, part_number: int, body) -> str:
+        """Upload one part (bytes, a bytearray or a file-like object) and return its ETag."""
+        response = await self.call(
+            "upload_part", Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=body
+        )
+        return response["ETag"]
+
+    async def complete_multipart_upload(self, bucket: str, key: str, upload_id: str, parts: List[dict]):
+        """parts: [{"PartNumber", "ETag"}] in ascending part number order."""
+        return await self.call(
+            "complete_multipart_upload",
+            Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+
+    async def abort_multipart_upload(self, bucket: str, key: str, upload_id: str):
+        return await self.call("abort_multipart_upload", Bucket=bucket, Key=key, UploadId=upload_id)
+
+    async def list_multipart_uploads(self, bucket: str) -> List[dict]:
+        """Every unfinished multipart upload of a bucket ({"Key", "UploadId", "Initiated"}), all pages fetched on the pool."""
+        return await self._paginate("list_multipart_uploads", "Uploads", Bucket=bucket)
+
+    async def get_object(self, bucket: str, key: str, **kwargs):
+        """get_object response; its Body must be read through read_body / iter_body."""
+        return await self.call("get_object", Bucket=bucket, Key=key, **kwargs)
+
+    async def get_object_bytes(self, bucket: str, key: str, **kwargs) -> bytes:
+        """Whole object content, for small objects like frames and images."""
+        response = await self.get_object(bucket, key, **kwargs)
+        return await self.read_body(response["Body"])
+
+    async def read_body(self, body) -> bytes:
+        try:
+            return await self.run(body.read)
+        finally:
+            body.close()
+
+    async def iter_body(self, body, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        """Stream a get_object Body, one pool call per chunk."""
+        try:
+            while True:
+                chunk = await self.run(body.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def head_object(self, bucket: str, key: str):
+        return await self.call("head_object", Bucket=bucket, Key=key)
+
+    async def copy_object(self, bucket: str, key: str, source_bucket: str, source_key: str, **kwargs):
+        """Copy an object inside storage, without reading it here (up to 5 GiB)."""
+        return await self.call(
+            "copy_object", Bucket=bucket, Key=key, CopySource={"Bucket": source_bucket, "Key": source_key}, **kwargs
+        )
+
+    async def delete_object(self, bucket: str, key: str):
+        return await self.call("delete_object", Bucket=bucket, Key=key)
+
+    async def delete_objects(self, bucket: str, keys: List[str]) -> dict:
+        """
+        Delete many keys with multi-object deletes of up to MAX_DELETE_BATCH keys each,
+        sent at the same time. Missing keys count as deleted, like with delete_object.
+
+        Returns:
+            dict: {"deleted": [key], "errors": [{"Key", "Code", "Message"}]}
+        """
+        async def delete_batch(batch):
+            response = await self.call(
+                "delete_objects", Bucket=bucket, Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+            )
+            errors = response.get("Errors", [])
+            failed = {error["Key"] for error in errors}
+            return [key for key in batch if key not in failed], errors
+
+        keys = list(dict.fromkeys(keys))
+        results = await asyncio.gather(*(
+            delete_batch(keys[start:start + MAX_DELETE_BATCH]) for start in range(0, len(keys), MAX_DELETE_BATCH)
+        ))
+        return {
+            "deleted": [key for deleted, _ in results for key in deleted],
+            "errors": [error for _, errors in results for error in errors],
+        }
+
+    async def list_objects(self, bucket: str, prefix: str) -> List[dict]:
+        """Every object under a prefix ({"Key", "Size", "ETag", "LastModified"}), all pages fetched on the pool."""
+        return await self._paginate("list_objects_v2", "Contents", Bucket=bucket, Prefix=prefix)
+
+    async def list_object_keys(self, bucket: str, prefix: str) -> List[str]:
+        """Keys of every object under a prefix, all pages fetched on the pool."""
+        return [obj["Key"] for obj in await self.list_objects(bucket, prefix)]
+
+    # -------- Buckets -------- #
+
+    async def head_bucket(self, bucket: str):
+        try:
+            response = await self.call("head_bucket", Bucket=bucket)
+        except ClientError:
+            # HEAD errors carry no code beyond the status
+            self.known_buckets.discard(bucket)
+            raise
+        self.known_buckets.add(bucket)
+        return response
+
+    async def create_bucket(self, bucket: str):
+        try:
+            response = await self.call("create_bucket", Bucket=bucket)
+        except ClientError as e:
+            # Created by a concurrent request or another instance in the meantime
+            if e.response.get("Error", {}).get("Code") == "BucketAlreadyOwnedByYou":
+                self.known_buckets.add(bucket)
+            raise
+        self.known_buckets.add(bucket)
+        return response
+
+    async def list_buckets(self):
+        return await self.call("list_buckets")
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -16,20 +16,34 @@ import sys
 import os
 import collections
 import collections.abc
+import datetime
+import hashlib
+import json
+import time
+import uuid
+import zlib
+from email.utils import format_datetime, parsedate_to_datetime
 
 # FastAPI and web framework imports
-from fastapi import FastAPI, Response, Request, Form, UploadFile
+from fastapi import FastAPI, Response, Request, Form, UploadFile, File
+from typing import List
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import uvicorn
 
-# AWS S3/MinIO client imports
-import boto3
-from botocore.client import Config
+# Every storage backend reports errors as botocore ClientError
+from botocore.exceptions import ClientError
+
+from async_storage import MIN_PART_SIZE, AsyncStorage
+from content_chunks import MAX_CHUNK_SIZE, BlendChunkStore, dedup_stats
+from zip_builder import StoredArchiveLayout, ZipEntry, ZipWriter, central_directory, data_descriptor, is_precompressed, local_header
+from frame_derivatives import ORIGINAL, VARIANTS, FrameDerivatives, derivatives_available
+from upload_sessions import UploadSession, UploadSessionTable, choose_part_size
+from signed_url_cache import SignedUrlCache, expiration_class
+from storage_backends import create_storage_backend
 
 from io import BytesIO
 import io
-import zipstream
 
 # Message queue imports (for future use)
 import aio_pika
@@ -77,48 +91,141 @@ class HTTP_SERVER():
         # Data class reference
         self.data_class = data_class_instance
         
-        # S3/MinIO client initialization
-        self.client = boto3.client(
-            "s3",
-            endpoint_url="http://localhost:9000",
-            aws_access_key_id="admin",
-            aws_secret_access_key="password",
-            config=Config(signature_version="s3v4"),
-            region_name="us-east-1"
+        # Storage backend: BLOB_STORAGE_BACKEND=s3 (default) talks to MinIO or any S3-compatible
+        # endpoint at BLOB_STORAGE_ENDPOINT, =local keeps objects on disk under BLOB_STORAGE_ROOT
+        self.storage_backend = os.getenv("BLOB_STORAGE_BACKEND", "s3").strip().lower()
+        self.storage_endpoint = os.getenv("BLOB_STORAGE_ENDPOINT", "http://localhost:9000").strip()
+        self.storage_access_key = os.getenv("BLOB_STORAGE_ACCESS_KEY", "admin").strip()
+        self.storage_secret_key = os.getenv("BLOB_STORAGE_SECRET_KEY", "password").strip()
+        # Every storage call runs on a bounded thread pool (BLOB_STORAGE_THREADS), with one
+        # pooled connection per thread, so no route ever blocks the event loop on boto3
+        self.storage_threads = int(os.getenv("BLOB_STORAGE_THREADS", "32"))
+        # Presigned URLs handed to volunteers must be signed for the host they will reach
+        # storage through, which is usually not the internal endpoint (for the local
+        # backend: the public URL of this service)
+        self.public_storage_endpoint = os.getenv("BLOB_STORAGE_PUBLIC_ENDPOINT", "").strip() or (
+            self.storage_endpoint if self.storage_backend == "s3" else f"http://{self.host}:{self.port}"
+        )
+        self.client = create_storage_backend(
+            self.storage_backend,
+            endpoint=self.storage_endpoint,
+            access_key=self.storage_access_key,
+            secret_key=self.storage_secret_key,
+            max_pool_connections=self.storage_threads,
+            root=os.getenv("BLOB_STORAGE_ROOT", "blob-storage-data").strip(),
+            public_url=self.public_storage_endpoint
         )
+        print(f"Blob storage backend: {self.storage_backend}")
+        # Large uploads go to storage as multipart uploads of BLOB_UPLOAD_PART_SIZE parts,
+        # BLOB_UPLOAD_PARALLEL_PARTS of them in flight per upload
+        self.storage = AsyncStorage(
+            self.client,
+            max_workers=self.storage_threads,
+            upload_part_concurrency=int(os.getenv("BLOB_UPLOAD_PARALLEL_PARTS", "4")),
+            part_size=int(os.getenv("BLOB_UPLOAD_PART_SIZE", str(16 * 1024 * 1024)))
+        )
+
+        # Resumable upload sessions idle for BLOB_UPLOAD_SESSION_TTL seconds are aborted, and
+        # so are multipart uploads nobody tracks anymore, checked every BLOB_UPLOAD_SESSION_SWEEP_INTERVAL
+        self.upload_session_part_size = int(os.getenv("BLOB_UPLOAD_SESSION_PART_SIZE", str(8 * 1024 * 1024)))
+        self.upload_session_ttl = int(os.getenv("BLOB_UPLOAD_SESSION_TTL", str(24 * 3600)))
+        self.upload_session_sweep_interval = int(os.getenv("BLOB_UPLOAD_SESSION_SWEEP_INTERVAL", "600"))
+        self.upload_session_buckets = {"blend-files"}
+
+        # Objects left in the temp bucket (frames never collected by a supervisor, duplicate
+        # uploads) are deleted once older than BLOB_TEMP_MAX_AGE seconds, checked every
+        # BLOB_TEMP_SWEEP_INTERVAL; every sweep also records the bucket size and object
+        # count, the last BLOB_TEMP_METRICS_SAMPLES of them are kept
+        self.temp_max_age = int(os.getenv("BLOB_TEMP_MAX_AGE", str(6 * 3600)))
+        self.temp_sweep_interval = int(os.getenv("BLOB_TEMP_SWEEP_INTERVAL", "600"))
+        self.temp_metrics = collections.deque(maxlen=int(os.getenv("BLOB_TEMP_METRICS_SAMPLES", "288")))
+        self.temp_deleted = collections.Counter()  # objects deleted from temp, by "single" / "batch" / "janitor"
+
+        # Blend files are also kept as content-defined chunks with a manifest per blend file,
+        # so a re-uploaded version only sends and stores the chunks that changed
+        # (BLOB_BLEND_DEDUP=false stops indexing blend files uploaded whole)
+        self.blend_chunks = BlendChunkStore(self.storage)
+
+        # Thumbnails and previews of rendered frames, made on BLOB_DERIVATIVE_WORKERS
+        # threads when a frame is stored and on first request otherwise
+        derivative_workers = int(os.getenv("BLOB_DERIVATIVE_WORKERS", "0")) or None
+        self.frame_derivatives = FrameDerivatives(self.storage, workers=derivative_workers)
+        if not derivatives_available():
+            print("Warning: Pillow is not installed, rendered frames are served without thumbnails or previews")
+
+        # Batch metadata and image requests take at most BLOB_BATCH_MAX_KEYS keys, and batch image
+        # responses fetch BLOB_BATCH_PREFETCH images ahead of the one being sent
+        self.batch_max_keys = int(os.getenv("BLOB_BATCH_MAX_KEYS", "1000"))
+        self.batch_prefetch = int(os.getenv("BLOB_BATCH_PREFETCH", "16"))
+
+        # Zips of rendered frames fetch BLOB_ZIP_PREFETCH frames ahead of the one being written
+        self.zip_prefetch = int(os.getenv("BLOB_ZIP_PREFETCH", "16"))
+        # Zip builds in progress, by zip key: (manifest hash, build task)
+        self.zip_builds = {}
+        # CRC-32 of frames by (bucket, key, ETag), so a resumed zip download does not
+        # read the frames before the range again just for the central directory
+        self.zip_crc_cache = collections.OrderedDict()
+        self.zip_crc_cache_size = int(os.getenv("BLOB_ZIP_CRC_CACHE", "200000"))
+        self.blend_dedup_enabled = os.getenv("BLOB_BLEND_DEDUP", "true").strip().lower() == "true"
+
+        if self.storage_backend != "s3" or self.public_storage_endpoint == self.storage_endpoint:
+            self.presign_client = self.client
+        else:
+            self.presign_client = create_storage_backend(
+                "s3",
+                endpoint=self.public_storage_endpoint,
+                access_key=self.storage_access_key,
+                secret_key=self.storage_secret_key
+            )
         
-        # Initialize default buckets
-        self.initialize_default_buckets()
+        # Every bucket ensure_bucket_exists skipped checking because it was known to exist
+        self.bucket_checks_skipped = 0
+
+        # Signed download URLs are handed out again while at least BLOB_SIGNED_URL_REUSE_FRACTION
+        # of their lifetime is left (up to BLOB_SIGNED_URL_CACHE_SIZE of them), until the object is
+        # written through this service or its ETag, looked up again after BLOB_SIGNED_URL_ETAG_TTL
+        # seconds, has changed
+        self.signed_urls = SignedUrlCache(
+            max_entries=int(os.getenv("BLOB_SIGNED_URL_CACHE_SIZE", "10000")),
+            reuse_fraction=float(os.getenv("BLOB_SIGNED_URL_REUSE_FRACTION", "0.5")),
+            etag_ttl=float(os.getenv("BLOB_SIGNED_URL_ETAG_TTL", "30"))
+        )
+        self.storage.object_listeners.append(self.signed_urls.invalidate)
 
     # =============================================================================
     # BUCKET MANAGEMENT METHODS
     # =============================================================================
     
-    def initialize_default_buckets(self):
+    async def initialize_default_buckets(self):
         """
-        Initialize default buckets if they don't exist.
-        Creates standard buckets for different file types.
+        Initialize default buckets if they don't exist, once at startup.
+        Creates standard buckets for different file types, all at the same time;
+        from then on they are known to exist and no request checks them again.
         """
-        try:
-            # List of default buckets to create
-            default_buckets = ["blend-files", "rendered-videos", "rendered-frames", "frames-zip", "temp"]
-            
-            for bucket_name in default_buckets:
+        # List of default buckets to create
+        default_buckets = ["blend-files", "blend-chunks", "rendered-videos", "rendered-frames", "frame-previews", "frames-zip", "temp"]
+
+        async def provision(bucket_name):
+            try:
+                # Check if bucket exists
+                await self.storage.head_bucket(bucket_name)
+                print(f"Bucket '{bucket_name}' already exists")
+            except Exception:
                 try:
-                    # Check if bucket exists
-                    self.client.head_bucket(Bucket=bucket_name)
-                    print(f"Bucket '{bucket_name}' already exists")
-                except Exception:
                     # Bucket doesn't exist, create it
-                    self.client.create_bucket(Bucket=bucket_name)
+                    await self.storage.create_bucket(bucket_name)
                     print(f"Created bucket '{bucket_name}' successfully")
-                    
-        except Exception as e:
-            print(f"Warning: Could not initialize default buckets: {str(e)}")
+                except Exception as e:
+                    print(f"Warning: Could not initialize bucket '{bucket_name}': {str(e)}")
+
+        await asyncio.gather(*(provision(bucket_name) for bucket_name in default_buckets))
 
     async def ensure_bucket_exists(self, bucket: str):
         """
         Ensure a bucket exists, create it if it doesn't.
+
+        Buckets already seen to exist (the default ones after startup) are not
+        checked again until a storage call reports them missing.
         
         Args:
             bucket (str): Name of the bucket to check/create
@@ -126,17 +233,23 @@ class HTTP_SERVER():
         Returns:
             bool: True if bucket exists or was created successfully, False otherwise
         """
+        if bucket in self.storage.known_buckets:
+            self.bucket_checks_skipped += 1
+            return True
         try:
             # Check if bucket exists
-            self.client.head_bucket(Bucket=bucket)
+            await self.storage.head_bucket(bucket)
             return True
         except Exception:
             try:
                 # Bucket doesn't exist, create it
-                self.client.create_bucket(Bucket=bucket)
+                await self.storage.create_bucket(bucket)
                 print(f"Created bucket '{bucket}' on demand")
                 return True
             except Exception as e:
+                if bucket in self.storage.known_buckets:
+                    # Created by a concurrent request
+                    return True
                 print(f"Error creating bucket '{bucket}': {str(e)}")
                 return False
 
@@ -160,6 +273,24 @@ class HTTP_SERVER():
             """Health check endpoint to verify service is running"""
             return JSONResponse(content={"message": "Blob Service is active"}, status_code=200)
 
+        @self.app.get("/api/blob-service/storage-stats")
+        async def storageStats():
+            """
+            Storage requests made since startup, by operation, how many bucket
+            checks the bucket existence cache saved and how the signed URL cache is used.
+
+            Returns:
+                JSON response with the request counts, the total and the known buckets
+            """
+            return JSONResponse(content={
+                "backend": self.storage_backend,
+                "calls": dict(sorted(self.storage.call_counts.items())),
+                "total_calls": sum(self.storage.call_counts.values()),
+                "bucket_checks_skipped": self.bucket_checks_skipped,
+                "known_buckets": sorted(self.storage.known_buckets),
+                "signed_url_cache": self.signed_urls.summary()
+            }, status_code=200)
+
         # =============================================================================
         # IMAGE OPERATIONS ROUTES
         # =============================================================================
@@ -197,6 +328,9 @@ class HTTP_SERVER():
             
             if "error" in result:
                 return JSONResponse(content={"error": result["error"]}, status_code=500)
+
+            if bucket == "rendered-frames":
+                self.frame_derivatives.schedule(bucket, key)
         
             return JSONResponse(content={
                 "message": "Image stored successfully",
@@ -208,9 +342,11 @@ class HTTP_SERVER():
 
         @self.app.get("/api/blob-service/retrieve-image")
         async def retrieveImage(
+            request: Request,
             bucket: str,
             key: str,
-            type: str = "png"
+            type: str = "png",
+            variant: str = ORIGINAL
         ):
             """
             Retrieve an image file from the specified bucket and key.
@@ -219,27 +355,36 @@ class HTTP_SERVER():
                 bucket: Source bucket name
                 key: File key/name
                 type: Image type/extension (default: png)
+                variant: "original" (default), or a downscaled "thumbnail" / "preview"
+                         (WebP), made now and kept if it does not exist yet
             
             Returns:
-                Image file with appropriate media type or error response
+                Image file with appropriate media type or error response. The
+                X-Image-Variant header tells which variant was sent: the original
+                when no derivative can be made of the image
             """
             print(f"Retrieving image from bucket: {bucket}")
             print(f"Key: {key}")
             print(f"Type: {type}")
             
+            if variant != ORIGINAL and variant not in VARIANTS:
+                return JSONResponse(content={"error": f"Unknown variant '{variant}', expected one of {[ORIGINAL, *VARIANTS]}"}, status_code=400)
+
             # Add file extension if not present in key
             if not key.endswith(f".{type}"):
                 key = f"{key}.{type}"
+
+            if variant != ORIGINAL:
+                derived_key = await self.frame_derivatives.ensure(bucket, key, variant)
+                if derived_key is not None:
+                    return await self.streamObjectFromBlobStorage(
+                        request, self.frame_derivatives.bucket, derived_key, self.frame_derivatives.content_type(),
+                        headers={"X-Image-Variant": variant}
+                    )
             
-            # Retrieve from blob storage
-            data = await self.retrieveImageFromBlobStorage(bucket, key)
-            
-            if isinstance(data, dict) and "error" in data:
-                return JSONResponse(content={"error": data["error"]}, status_code=404)
-            
-            # Return image with appropriate media type
+            # Stream from blob storage with appropriate media type
             media_type = f"image/{type}"
-            return Response(content=data, media_type=media_type)
+            return await self.streamObjectFromBlobStorage(request, bucket, key, media_type, headers={"X-Image-Variant": ORIGINAL})
         
     
         # =============================================================================
@@ -266,7 +411,7 @@ class HTTP_SERVER():
                 await self.ensure_bucket_exists(bucket)
                 import botocore
                 try:
-                    head = self.client.head_object(Bucket=bucket, Key=key)
+                    head = await self.storage.head_object(bucket, key)
                     return JSONResponse(content={
                         "bucket": bucket,
                         "key": key,
@@ -289,6 +434,76 @@ class HTTP_SERVER():
             except Exception as e:
                 return JSONResponse(content={"error": str(e)}, status_code=500)
 
+        # =============================================================================
+        # BATCH OBJECT ROUTES
+        # =============================================================================
+
+        @self.app.post("/api/blob-service/objects-metadata")
+        async def objectsMetadata(
+            bucket: str = Form(...),
+            keys: List[str] = Form(...),
+            variant: str = Form(ORIGINAL)
+        ):
+            """
+            Metadata of several objects with one request, looked up concurrently.
+            
+            Args:
+                bucket: Bucket of the objects
+                keys: Full object keys (repeated form field)
+                variant: "original" (default), or "thumbnail" / "preview" for the
+                         derivatives of rendered frames
+            
+            Returns:
+                JSON response with {"key", "exists", "size_bytes", "etag", "content_type",
+                "last_modified", "variant"} for every key, in request order. For a
+                derivative not made yet, size_bytes etc. are null while exists tells
+                whether the original exists
+            """
+            if variant != ORIGINAL and variant not in VARIANTS:
+                return JSONResponse(content={"error": f"Unknown variant '{variant}', expected one of {[ORIGINAL, *VARIANTS]}"}, status_code=400)
+            if len(keys) > self.batch_max_keys:
+                return JSONResponse(content={"error": f"At most {self.batch_max_keys} keys per request"}, status_code=400)
+
+            try:
+                objects = await self.headObjectsFromBlobStorage(bucket, keys, variant)
+            except Exception as e:
+                return JSONResponse(content={"error": str(e)}, status_code=500)
+            return JSONResponse(content={"bucket": bucket, "variant": variant, "objects": objects}, status_code=200)
+
+        @self.app.post("/api/blob-service/retrieve-images-batch")
+        async def retrieveImagesBatch(
+            bucket: str = Form(...),
+            keys: List[str] = Form(...),
+            variant: str = Form(ORIGINAL)
+        ):
+            """
+            Several images in one length-prefixed response, fetched concurrently and
+            sent in request order. For every key the body holds one JSON header line
+            ({"index", "key", "status", "size", "content_type", "etag", "variant"},
+            ending with a newline) followed by exactly `size` bytes of content;
+            status is 404 with size 0 for a missing object.
+            
+            Args:
+                bucket: Bucket of the images
+                keys: Full object keys (repeated form field)
+                variant: "original" (default), or a downscaled "thumbnail" / "preview",
+                         made now if it does not exist yet (the original otherwise)
+            
+            Returns:
+                Streaming response (X-Batch-Format: length-prefixed) or error response
+            """
+            if variant != ORIGINAL and variant not in VARIANTS:
+                return JSONResponse(content={"error": f"Unknown variant '{variant}', expected one of {[ORIGINAL, *VARIANTS]}"}, status_code=400)
+            if len(keys) > self.batch_max_keys:
+                return JSONResponse(content={"error": f"At most {self.batch_max_keys} keys per request"}, status_code=400)
+
+            print(f"Retrieving {len(keys)} images from bucket: {bucket}, variant: {variant}")
+            return StreamingResponse(
+                self.streamObjectsBatch(bucket, keys, variant),
+                media_type="application/octet-stream",
+                headers={"X-Batch-Format": "length-prefixed", "X-Batch-Count": str(len(keys))}
+            )
+
         # =============================================================================
         # BLEND FILE OPERATIONS ROUTES
         # =============================================================================
@@ -328,11 +543,324 @@ class HTTP_SERVER():
                 "message": "Blend file stored successfully",
                 "filename": blend_file.filename,
                 "bucket": bucket,
-                "key": key
+                "key": key,
+                "size_bytes": result["size_bytes"],
+                "sha256": result["sha256"]
+            }, status_code=200)
+
+        @self.app.post("/api/blob-service/store-blend-stream")
+        async def storeBlendStream(
+            request: Request,
+            bucket: str,
+            key: str
+        ):
+            """
+            Store a Blender (.blend) file sent as the raw request body (not a form).
+            
+            The body is fed straight into a multipart upload while it arrives, so
+            neither memory nor local disk ever holds the whole file.
+            
+            Args:
+                request: Request whose body is the blend file content
+                bucket: Target bucket name (query parameter)
+                key: File key/name (query parameter)
+            
+            Returns:
+                JSON response with size and SHA-256 of the stored content, or error
+            """
+            print(f"Streaming blend file into bucket: {bucket}, key: {key}")
+            
+            # Add .blend extension if not present in key
+            if not key.endswith(".blend"):
+                key = f"{key}.blend"
+            
+            result = await self.uploadBlendStreamToBlobStorage(request.stream(), bucket, key)
+            
+            if "error" in result:
+                return JSONResponse(content={"error": result["error"]}, status_code=500)
+            
+            return JSONResponse(content={
+                "message": "Blend file stored successfully",
+                "bucket": bucket,
+                "key": key,
+                "size_bytes": result["size_bytes"],
+                "sha256": result["sha256"]
             }, status_code=200)
 
+        # =============================================================================
+        # RESUMABLE UPLOAD SESSION ROUTES
+        # =============================================================================
+
+        @self.app.post("/api/blob-service/upload-sessions")
+        async def createUploadSession(
+            bucket: str = Form(...),
+            key: str = Form(...),
+            total_size: int = Form(...),
+            part_size: int = Form(None),
+            owner: str = Form(None),
+            content_type: str = Form("application/octet-stream"),
+            metadata: str = Form(None)
+        ):
+            """
+            Open a resumable upload session backed by a storage multipart upload.
+
+            The client then PUTs the parts at offsets that are multiples of the
+            returned part_size, in any order and in parallel, re-sends the parts the
+            session status lists as missing after a failure, and finally completes
+            the session.
+
+            Args:
+                bucket: Target bucket name
+                key: File key/name
+                total_size: Size of the whole file in bytes
+                part_size: Requested part size (raised to at least 5 MiB, at most MAX_SESSION_PART_SIZE)
+                owner: Optional owner every later call of the session must present
+                content_type: Content type of the stored object
+                metadata: Optional JSON object handed back with the session status
+
+            Returns:
+                JSON response with the session status or error
+            """
+            if total_size < 0:
+                return JSONResponse(content={"error": "total_size must not be negative"}, status_code=400)
+            try:
+                session_metadata = json.loads(metadata) if metadata else {}
+            except ValueError:
+                return JSONResponse(content={"error": "metadata must be a JSON object"}, status_code=400)
+
+            result = await self.createUploadSession(
+                bucket, key, total_size, part_size, owner, content_type, session_metadata
+            )
+            if "error" in result:
+                return JSONResponse(content={"error": result["error"]}, status_code=result.get("status_code", 500))
+            return JSONResponse(content=result, status_code=201)
+
+        @self.app.get("/api/blob-service/upload-sessions/{session_id}")
+        async def getUploadSession(session_id: str, owner: str = None):
+            """
+            Status of an upload session: received and missing part offsets.
+
+            Args:
+                session_id: Upload session id
+                owner: Owner the session was created for
+
+            Returns:
+                JSON response with the session status or error
+            """
+            session = self.data_class.upload_sessions.get(session_id)
+            if session is None or session.owner != owner:
+                return JSONResponse(content={"error": "Upload session not found"}, status_code=404)
+            return JSONResponse(content=session.to_dict(), status_code=200)
+
+        @self.app.put("/api/blob-service/upload-sessions/{session_id}/parts")
+        async def uploadSessionPart(request: Request, session_id: str, offset: int, owner: str = None):
+            """
+            Store one part of an upload session, sent as the raw request body.
+
+            The part must start at a multiple of the session part size and be exactly
+            part_size bytes long, except the last one. Sending a part again replaces
+            it, so a part that failed halfway is simply retried. An X-Content-SHA256
+            header, when present, is checked against the received bytes.
+
+            Args:
+                request: Request whose body is the part content
+                session_id: Upload session id
+                offset: Byte offset of the part in the file (query parameter)
+                owner: Owner the session was created for
+
+            Returns:
+                JSON response with the stored part or error
+            """
+            session = self.data_class.upload_sessions.get(session_id)
+            if session is None or session.owner != owner:
+                return JSONResponse(content={"error": "Upload session not found"}, status_code=404)
+
+            part = session.part_for_offset(offset)
+            if part is None:
+                return JSONResponse(content={
+                    "error": f"offset must be a multiple of {session.part_size} below {session.total_size}"
+                }, status_code=400)
+            part_number, expected_size = part
+
+            declared_size = request.headers.get("content-length")
+            if declared_size is not None and declared_size != str(expected_size):
+                return JSONResponse(content={
+                    "error": f"Part at offset {offset} must be {expected_size} bytes, got {declared_size}"
+                }, status_code=413 if declared_size.isdigit() and int(declared_size) > expected_size else 400)
+
+            # Collected once (at most MAX_SESSION_PART_SIZE bytes) and handed to storage as is:
+            # the request signature covers the SHA-256 of the whole part, so it cannot be
+            # sent on before it has fully arrived
+            body = bytearray()
+            async for chunk in request.stream():
+                body += chunk
+                if len(body) > expected_size:
+                    return JSONResponse(content={
+                        "error": f"Part at offset {offset} must be {expected_size} bytes"
+                    }, status_code=413)
+            if len(body) != expected_size:
+                return JSONResponse(content={
+                    "error": f"Part at offset {offset} must be {expected_size} bytes, got {len(body)}"
+                }, status_code=400)
+
+            result = await self.uploadSessionPart(session, part_number, body, request.headers.get("x-content-sha256"))
+            if "error" in result:
+                return JSONResponse(content={"error": result["error"]}, status_code=result.get("status_code", 500))
+            return JSONResponse(content=result, status_code=200)
+
+        @self.app.post("/api/blob-service/upload-sessions/{session_id}/complete")
+        async def completeUploadSession(session_id: str, owner: str = Form(None)):
+            """
+            Assemble the parts of an upload session into the final object.
+
+            Args:
+                session_id: Upload session id
+                owner: Owner the session was created for
+
+            Returns:
+                JSON response with bucket, key, size and session metadata, or error
+                (409 with the missing offsets while parts are still missing)
+            """
+            session = self.data_class.upload_sessions.get(session_id)
+            if session is None or session.owner != owner:
+                return JSONResponse(content={"error": "Upload session not found"}, status_code=404)
+
+            result = await self.completeUploadSession(session)
+            if "error" in result:
+                return JSONResponse(content=result, status_code=result.pop("status_code", 500))
+            return JSONResponse(content=result, status_code=200)
+
+        @self.app.delete("/api/blob-service/upload-sessions/{session_id}")
+        async def abortUploadSession(session_id: str, owner: str = None):
+            """
+            Abort an upload session and drop the parts stored so far.
+
+            Args:
+                session_id: Upload session id
+                owner: Owner the session was created for
+
+            Returns:
+                JSON response with the session metadata or error
+            """
+            session = self.data_class.upload_sessions.get(session_id)
+            if session is None or session.owner != owner:
+                return JSONResponse(content={"error": "Upload session not found"}, status_code=404)
+
+            result = await self.abortUploadSession(session)
+            if "error" in result:
+                return JSONResponse(content={"error": result["error"]}, status_code=500)
+            return JSONResponse(content=result, status_code=200)
+
+        # =============================================================================
+        # DEDUPLICATED (CONTENT-DEFINED CHUNK) BLEND UPLOAD ROUTES
+        # =============================================================================
+
+        @self.app.post("/api/blob-service/blend-chunk-uploads")
+        async def createChunkedBlendUpload(request: Request):
+            """
+            Start a deduplicated blend file upload from its list of content-defined chunks.
+
+            Body (JSON): {"bucket", "key", "chunks": [{"hash", "size"}], "owner", "metadata"}
+            where the chunks are cut as in content_chunks.py. Only the chunks listed as
+            missing in the response have to be PUT before the upload is completed.
+
+            Returns:
+                JSON response with upload_id, missing chunk hashes and the dedup stats
+                of the upload, or error
+            """
+            try:
+                body = await request.json()
+                chunks = [{"hash": str(chunk["hash"]), "size": int(chunk["size"])} for chunk in body["chunks"]]
+                bucket, key = body["bucket"], body["key"]
+            except Exception:
+                return JSONResponse(content={"error": "bucket, key and chunks [{hash, size}] are required"}, status_code=400)
+            if not chunks or any(not 0 < chunk["size"] <= MAX_CHUNK_SIZE for chunk in chunks):
+                return JSONResponse(content={"error": f"Every chunk must be 1 to {MAX_CHUNK_SIZE} bytes"}, status_code=400)
+
+            result = await self.createChunkedBlendUpload(bucket, key, chunks, body.get("owner"), body.get("metadata"))
+            if "error" in result:
+                return JSONResponse(content={"error": result["error"]}, status_code=500)
+            return JSONResponse(content=result, status_code=201)
+
+        @self.app.put("/api/blob-service/blend-chunks/{chunk_hash}")
+        async def storeBlendChunk(request: Request, chunk_hash: str):
+            """
+            Store one content-defined chunk, sent as the raw request body. The content
+            must hash to chunk_hash; a chunk stored before is accepted without a write.
+
+            Returns:
+                JSON response with whether the chunk was new, or error
+            """
+            body = bytearray()
+            async for part in request.stream():
+                body += part
+                if len(body) > MAX_CHUNK_SIZE:
+                    return JSONResponse(content={"error": f"Chunks are at most {MAX_CHUNK_SIZE} bytes"}, status_code=413)
+
+            try:
+                stored = await self.blend_chunks.put_chunk(chunk_hash, bytes(body))
+            except ValueError as e:
+                return JSONResponse(content={"error": str(e)}, status_code=422)
+            except Exception as e:
+                return JSONResponse(content={"error": str(e)}, status_code=500)
+            return JSONResponse(content={"hash": chunk_hash, "size": len(body), "stored": stored}, status_code=200)
+
+        @self.app.get("/api/blob-service/blend-chunks/{chunk_hash}")
+        async def retrieveBlendChunk(request: Request, chunk_hash: str):
+            """
+            Stream one content-defined chunk (chunks never change, so it can be cached forever).
+            """
+            return await self.streamObjectFromBlobStorage(
+                request, self.blend_chunks.bucket, self.blend_chunks.chunk_key(chunk_hash),
+                "application/octet-stream", headers={"Cache-Control": "public, max-age=31536000, immutable"}
+            )
+
+        @self.app.post("/api/blob-service/blend-chunk-uploads/{upload_id}/complete")
+        async def completeChunkedBlendUpload(upload_id: str, owner: str = Form(None)):
+            """
+            Assemble the blend file of a deduplicated upload from its chunks, store it
+            under its bucket and key and save its chunk manifest.
+
+            Returns:
+                JSON response with bucket, key, size_bytes, sha256, dedup stats and
+                metadata, or error (409 with the chunks still missing, 422 if a chunk
+                size does not match the stored chunk)
+            """
+            upload = self.data_class.chunked_uploads.get(upload_id)
+            if upload is None or upload["owner"] != owner:
+                return JSONResponse(content={"error": "Upload not found"}, status_code=404)
+
+            result = await self.completeChunkedBlendUpload(upload_id, upload)
+            if "error" in result:
+                return JSONResponse(content=result, status_code=result.pop("status_code", 500))
+            return JSONResponse(content=result, status_code=200)
+
+        @self.app.get("/api/blob-service/blend-manifests/{blend_file_hash}")
+        async def retrieveBlendManifest(blend_file_hash: str):
+            """
+            Chunk manifest of a blend file: {"blend_file_hash", "bucket", "key", "size",
+            "sha256", "chunks": [{"hash", "size"}], "stats"}.
+            """
+            manifest = await self.blend_chunks.load_manifest(blend_file_hash)
+            if manifest is None:
+                return JSONResponse(content={"error": "No chunk manifest for this blend file"}, status_code=404)
+            return JSONResponse(content=manifest, status_code=200)
+
+        @self.app.post("/api/blob-service/blend-manifests/index")
+        async def indexBlendFile(bucket: str = Form(...), key: str = Form(...)):
+            """
+            Chunk an already stored blend file in the background and save its manifest,
+            e.g. for blend files stored before deduplication existed.
+            """
+            self.scheduleBlendIndex(bucket, key)
+            return JSONResponse(content={
+                "message": "Indexing started",
+                "blend_file_hash": self.blend_chunks.blend_file_hash(key)
+            }, status_code=202)
+
         @self.app.get("/api/blob-service/retrieve-blend")
         async def retrieveBlend(
+            request: Request,
             bucket: str,
             key: str
         ):
@@ -355,16 +883,10 @@ class HTTP_SERVER():
                     key = f"{key}.blend"
                     print(f"[DEBUG] Appended .blend extension to key. New key: {key}")
                 
-                # Retrieve from blob storage
-                data = await self.retrieveBlendFileFromBlobStorage(bucket, key)
-                
-                if isinstance(data, dict) and "error" in data:
-                    print(f"[ERROR] Error retrieving blend file: {data['error']}")
-                    return JSONResponse(content={"error": data["error"]}, status_code=404)
-                
-                # Return blend file with appropriate media type
-                print(f"[INFO] Successfully retrieved blend file: {key} from bucket: {bucket}")
-                return Response(content=data, media_type="application/octet-stream")
+                # Stream the blend file instead of holding multi-GB scenes in memory,
+                # a client can resume an interrupted download with Range / If-Range
+                print(f"[INFO] Streaming blend file: {key} from bucket: {bucket}")
+                return await self.streamObjectFromBlobStorage(request, bucket, key, "application/octet-stream")
             except Exception as e:
                 import traceback
                 print(f"[ERROR] Exception occurred while retrieving blend file: {traceback.format_exc()}")
@@ -428,7 +950,7 @@ class HTTP_SERVER():
                 JSON response with list of bucket names and count
             """
             try:
-                response = self.client.list_buckets()
+                response = await self.storage.list_buckets()
                 buckets = [bucket['Name'] for bucket in response['Buckets']]
                 return JSONResponse(content={
                     "buckets": buckets,
@@ -502,8 +1024,37 @@ class HTTP_SERVER():
                 "bucket": "temp"
             }, status_code=200)
 
+        @self.app.post("/api/blob-service/store-temp-batch")
+        async def storeTempBatch(
+            files: List[UploadFile] = File(...),
+            keys: List[str] = Form(...)
+        ):
+            """
+            Store several files in the temp bucket with one request, concurrently.
+            
+            Args:
+                files: Uploaded files
+                keys: File key/name for every file, in the same order
+            
+            Returns:
+                JSON response with the result of every file
+            """
+            if len(files) != len(keys):
+                return JSONResponse(content={"error": "files and keys must have the same length"}, status_code=400)
+
+            print(f"Storing {len(files)} files in temp bucket")
+
+            results = await self.uploadFilesToTempBucket(files, keys)
+            stored = [result for result in results if "error" not in result]
+
+            return JSONResponse(content={
+                "message": f"Stored {len(stored)} of {len(results)} files in temp bucket",
+                "bucket": "temp",
+                "results": results
+            }, status_code=200)
+
         @self.app.get("/api/blob-service/retrieve-temp")
-        async def retrieveTemp(key: str):
+        async def retrieveTemp(request: Request, key: str):
             """
             Retrieve file from temp bucket using the key.
             
@@ -516,12 +1067,6 @@ class HTTP_SERVER():
             print(f"Retrieving file from temp bucket")
             print(f"Key: {key}")
             
-            # Retrieve from temp bucket
-            data = await self.retrieveFileFromTempBucket(key)
-            
-            if isinstance(data, dict) and "error" in data:
-                return JSONResponse(content={"error": data["error"]}, status_code=404)
-            
             # Determine media type based on file extension
             media_type = "application/octet-stream"  # Default
             if key.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp')):
@@ -535,7 +1080,8 @@ class HTTP_SERVER():
             elif key.lower().endswith(('.json')):
                 media_type = "application/json"
             
-            return Response(content=data, media_type=media_type)
+            # Stream from temp bucket
+            return await self.streamObjectFromBlobStorage(request, "temp", key, media_type)
 
         @self.app.delete("/api/blob-service/delete-temp")
         async def deleteTemp(key: str):
@@ -557,12 +1103,58 @@ class HTTP_SERVER():
             if "error" in result:
                 return JSONResponse(content={"error": result["error"]}, status_code=500)
             
+            self.temp_deleted["single"] += 1
             return JSONResponse(content={
                 "message": "File deleted successfully from temp bucket",
                 "key": key,
                 "bucket": "temp"
             }, status_code=200)
 
+        @self.app.post("/api/blob-service/delete-temp-batch")
+        async def deleteTempBatch(keys: List[str] = Form(...)):
+            """
+            Delete several files from the temp bucket with one request, using
+            multi-object deletes (1000 keys per storage call).
+            
+            Args:
+                keys: File keys/names to delete (repeated form field)
+            
+            Returns:
+                JSON response with the deleted keys and the keys that could not be deleted
+            """
+            print(f"Deleting {len(keys)} files from temp bucket")
+
+            result = await self.deleteKeysFromBlobStorage("temp", keys)
+
+            if "error" in result:
+                return JSONResponse(content={"error": result["error"]}, status_code=500)
+
+            self.temp_deleted["batch"] += len(result["deleted"])
+            return JSONResponse(content={
+                "message": f"Deleted {len(result['deleted'])} of {len(set(keys))} files from temp bucket",
+                "bucket": "temp",
+                "deleted": result["deleted"],
+                "errors": result["errors"]
+            }, status_code=200)
+
+        @self.app.get("/api/blob-service/temp-stats")
+        async def tempStats():
+            """
+            Size and object count of the temp bucket over time, one sample per janitor
+            sweep, and the objects deleted from it since startup.
+            
+            Returns:
+                JSON response with the latest sample, the sample history and deletion totals
+            """
+            return JSONResponse(content={
+                "bucket": "temp",
+                "max_age_seconds": self.temp_max_age,
+                "sweep_interval_seconds": self.temp_sweep_interval,
+                "latest": self.temp_metrics[-1] if self.temp_metrics else None,
+                "history": list(self.temp_metrics),
+                "deleted": dict(self.temp_deleted)
+            }, status_code=200)
+
         # =============================================================================
         # SIGNED URL OPERATIONS ROUTES
         # =============================================================================
@@ -582,25 +1174,31 @@ class HTTP_SERVER():
                 expiration: URL expiration time in seconds (default: 3600 = 1 hour)
             
             Returns:
-                JSON response with signed URL or error response
+                JSON response with signed URL, the lifetime it was issued with
+                (expiration_seconds, the requested expiration rounded up to its
+                expiration class), when it expires (expires_at, unix time), the seconds
+                it is still valid (expires_in) and whether it was reused, or error response
             """
             try:
                 print(f"[INFO] Generating signed URL for bucket: {bucket}, key: {key}")
                 print(f"[INFO] Expiration: {expiration} seconds")
                 
-                # Generate signed URL
-                signed_url = await self.generateSignedUrlForBlobStorage(bucket, key, expiration)
+                # Generate signed URL (or reuse a cached one with enough lifetime left)
+                result = await self.generateSignedUrlForBlobStorage(bucket, key, expiration)
                 
-                if isinstance(signed_url, dict) and "error" in signed_url:
-                    print(f"[ERROR] Error generating signed URL: {signed_url['error']}")
-                    return JSONResponse(content={"error": signed_url["error"]}, status_code=500)
+                if "error" in result:
+                    print(f"[ERROR] Error generating signed URL: {result['error']}")
+                    return JSONResponse(content={"error": result["error"]}, status_code=500)
                 
                 print(f"[INFO] Successfully generated signed URL for: {key} in bucket: {bucket}")
                 return JSONResponse(content={
-                    "signed_url": signed_url,
+                    "signed_url": result["signed_url"],
                     "bucket": bucket,
                     "key": key,
-                    "expiration_seconds": expiration,
+                    "expiration_seconds": result["expiration_seconds"],
+                    "expires_at": int(result["expires_at"]),
+                    "expires_in": result["expires_in"],
+                    "cached": result["cached"],
                     "message": "Signed URL generated successfully"
                 }, status_code=200)
             except Exception as e:
@@ -611,6 +1209,45 @@ class HTTP_SERVER():
                     status_code=500
                 )
 
+        @self.app.post("/api/blob-service/generate-upload-url")
+        async def generateUploadUrl(
+            bucket: str = Form(...),
+            key: str = Form(...),
+            expiration: int = Form(900),
+            content_type: str = Form(None)
+        ):
+            """
+            Generate a presigned PUT URL so a client can upload a file straight to blob
+            storage without the bytes passing through any service.
+
+            Args:
+                bucket: Target bucket name
+                key: File key/name
+                expiration: URL expiration time in seconds (default: 900 = 15 minutes)
+                content_type: Content-Type the client must send with the PUT (optional)
+
+            Returns:
+                JSON response with the upload URL or error response
+            """
+            print(f"[INFO] Generating upload URL for bucket: {bucket}, key: {key}")
+
+            upload_url = await self.generateUploadUrlForBlobStorage(bucket, key, expiration, content_type)
+
+            if isinstance(upload_url, dict) and "error" in upload_url:
+                print(f"[ERROR] Error generating upload URL: {upload_url['error']}")
+                return JSONResponse(content={"error": upload_url["error"]}, status_code=500)
+
+            headers = {"Content-Type": content_type} if content_type else {}
+            return JSONResponse(content={
+                "upload_url": upload_url,
+                "method": "PUT",
+                "headers": headers,
+                "bucket": bucket,
+                "key": key,
+                "expiration_seconds": expiration,
+                "message": "Upload URL generated successfully"
+            }, status_code=200)
+
         # =============================================================================
         # FRAMES ZIP OPERATIONS ROUTES
         # =============================================================================
@@ -673,24 +1310,53 @@ class HTTP_SERVER():
                 "bucket": "frames-zip"
             }, status_code=200)
 
-        @self.app.get("/api/blob-service/retrieve-frames-zip")
-        async def retrieveFramesZip(key: str):
+        @self.app.post("/api/blob-service/store-video")
+        async def storeVideo(
+            video: UploadFile = Form(...),
+            key: str = Form(...),
+            bucket: str = Form("rendered-videos")
+        ):
             """
-            Retrieve a ZIP archive of frames by key from the frames-zip bucket.
+            Store a rendered video (mp4), streamed to storage in parts.
 
             Args:
-                key: Storage key (with or without .zip extension)
+                video: Uploaded video file
+                key: Storage key, e.g. customer_id/object_id/rendered_video.mp4
+                bucket: Target bucket (default: rendered-videos)
 
             Returns:
-                Streaming response / file bytes
+                JSON response with success or error status.
             """
-            print(f"Retrieving frames zip with supplied key/prefix: {key}")
+            print(f"Storing video: {video.filename} in bucket: {bucket}, key: {key}")
 
-            supplied = key.strip()
-            if supplied in ('', '.', '/'):  # default
-                final_key = 'frames.zip'
-            else:
-                if supplied.endswith('/'):
+            result = await self.uploadVideoToBlobStorage(video, bucket, key)
+            if "error" in result:
+                return JSONResponse(content={"error": result["error"]}, status_code=500)
+
+            return JSONResponse(content={
+                "message": "Video stored successfully",
+                "bucket": bucket,
+                "key": key
+            }, status_code=200)
+
+        @self.app.get("/api/blob-service/retrieve-frames-zip")
+        async def retrieveFramesZip(request: Request, key: str):
+            """
+            Retrieve a ZIP archive of frames by key from the frames-zip bucket.
+
+            Args:
+                key: Storage key (with or without .zip extension)
+
+            Returns:
+                Streaming response / file bytes
+            """
+            print(f"Retrieving frames zip with supplied key/prefix: {key}")
+
+            supplied = key.strip()
+            if supplied in ('', '.', '/'):  # default
+                final_key = 'frames.zip'
+            else:
+                if supplied.endswith('/'):
                     final_key = f"{supplied}frames.zip"
                 else:
                     # If last segment has a dot and isn't frames.zip, replace with frames.zip
@@ -708,14 +1374,10 @@ class HTTP_SERVER():
 
             print(f"Resolved retrieval key: {final_key}")
 
-            data = await self.retrieveFramesZipFromBlobStorage(final_key)
-            if isinstance(data, dict) and "error" in data:
-                return JSONResponse(content={"error": data["error"]}, status_code=404)
-
             headers = {
                 "Content-Disposition": f"attachment; filename=\"frames.zip\""
             }
-            return Response(content=data, media_type="application/zip", headers=headers)
+            return await self.streamObjectFromBlobStorage(request, "frames-zip", final_key, "application/zip", headers)
 
         @self.app.post("/api/blob-service/store-rendered-images-as-zip")
         async def api_store_rendered_images_zip(
@@ -736,6 +1398,93 @@ class HTTP_SERVER():
                 return JSONResponse(content={"error": str(e)}, status_code=500)
         
 
+        @self.app.get("/api/blob-service/stream-frames-zip")
+        async def streamFramesZip(request: Request, bucket: str, prefix: str, is_paid: bool = True):
+            """
+            Download a ZIP archive of the frames under a prefix, assembled from the
+            frame objects while the client reads it, without storing frames.zip.
+
+            Entries are STORED, so the archive layout and its Content-Length are known
+            before any frame is read. The ETag identifies the selected frames, a
+            Range request with a matching If-Range resumes an interrupted download.
+
+            Args:
+                bucket: Bucket of the frames
+                prefix: Prefix the frames are stored under
+                is_paid: Whether the blender object is paid for (unpaid: 1/3rd of the frames)
+
+            Returns:
+                Streaming response (200 or 206), 304 Not Modified or 416 Range Not Satisfiable
+            """
+            print(f"Streaming frames zip for bucket={bucket} prefix={prefix} is_paid={is_paid}")
+            headers = {
+                "Content-Disposition": f"attachment; filename=\"frames.zip\""
+            }
+            return await self.streamFramesZipFromBlobStorage(request, bucket, prefix, is_paid, headers)
+        
+
+        # =============================================================================
+        # PRESIGNED URL ROUTES (LOCAL STORAGE BACKEND)
+        # =============================================================================
+
+        @self.app.get("/api/blob-service/storage/{bucket}/{key:path}")
+        async def getPresignedObject(request: Request, bucket: str, key: str, expires: str = None, signature: str = None):
+            """
+            Download through a presigned GET URL of the local storage backend (with
+            the S3 backend, presigned URLs point at storage itself).
+
+            Args:
+                bucket: Bucket of the object
+                key: Key of the object
+                expires: Expiry timestamp the URL was signed with
+                signature: Signature of the URL
+
+            Returns:
+                Streaming response (200 or 206), 304, 403 if the URL is invalid or expired, 404 if not found
+            """
+            if not hasattr(self.client, "verify_presigned_url"):
+                return JSONResponse(content={"error": "Presigned URLs are served by blob storage"}, status_code=404)
+            if not self.client.verify_presigned_url("GET", bucket, key, expires, signature):
+                return JSONResponse(content={"error": "Invalid or expired signature"}, status_code=403)
+
+            try:
+                head = await self.storage.head_object(bucket, key)
+            except ClientError:
+                return JSONResponse(content={"error": f"Key '{key}' not found in bucket '{bucket}'"}, status_code=404)
+            return await self.streamObjectFromBlobStorage(request, bucket, key, head.get("ContentType", "application/octet-stream"))
+
+        @self.app.put("/api/blob-service/storage/{bucket}/{key:path}")
+        async def putPresignedObject(request: Request, bucket: str, key: str, expires: str = None, signature: str = None):
+            """
+            Upload the request body through a presigned PUT URL of the local storage
+            backend. A URL signed with a content type only accepts that Content-Type.
+
+            Args:
+                request: Request whose body is the object content
+                bucket: Target bucket name
+                key: Target key
+
+            Returns:
+                Empty 200 response with the ETag of the stored object, 403 if the URL is invalid or expired
+            """
+            if not hasattr(self.client, "verify_presigned_url"):
+                return JSONResponse(content={"error": "Presigned URLs are served by blob storage"}, status_code=404)
+            content_type = request.query_params.get("content-type", "")
+            if content_type and request.headers.get("content-type", "") != content_type:
+                return JSONResponse(content={"error": "Content-Type does not match the signed one"}, status_code=403)
+            if not self.client.verify_presigned_url("PUT", bucket, key, expires, signature, content_type):
+                return JSONResponse(content={"error": "Invalid or expired signature"}, status_code=403)
+
+            try:
+                result = await self.storage.upload_stream(
+                    bucket, key, request.stream(), content_type=content_type or request.headers.get("content-type")
+                )
+            except Exception as e:
+                print(f"[ERROR] Presigned upload to bucket '{bucket}', key '{key}' failed: {str(e)}")
+                return JSONResponse(content={"error": str(e)}, status_code=500)
+            return Response(status_code=200, headers={"ETag": result["etag"]} if result.get("etag") else None)
+        
+
         # =============================================================================
         # DELETE OPERATIONS ROUTES
         # =============================================================================
@@ -811,93 +1560,366 @@ class HTTP_SERVER():
             if not bucket_created:
                 return {"error": f"Failed to create bucket '{bucket}'"}
             
-            contents = await image.read()
-            self.client.put_object(Bucket=bucket, Key=key, Body=contents)
+            await image.seek(0)
+            await self.storage.upload_fileobj(image.file, bucket, key)
             return {"filename": image.filename}
         except Exception as e:
             return {"error": str(e)}
         
-    async def retrieveImageFromBlobStorage(self, bucket: str, key: str):
+    # =============================================================================
+    # BLEND FILE STORAGE OPERATIONS
+    # =============================================================================
+    
+    async def uploadBlendFileToBlobStorage(self, blend_file: UploadFile, bucket: str, key: str):
         """
-        Retrieve an image file from blob storage.
-
+        Upload a Blender (.blend) file to blob storage.
+        
         Args:
-            bucket: Source bucket name
+            blend_file: Uploaded blend file
+            bucket: Target bucket name
             key: File key/name
+            
+        Returns:
+            dict: Success response with filename, size and SHA-256 or error response
+        """
+        print(blend_file)
+
+        async def read_upload():
+            await blend_file.seek(0)
+            while True:
+                chunk = await blend_file.read(1024 * 1024)
+                if not chunk:
+                    break
+                yield chunk
 
+        result = await self.uploadBlendStreamToBlobStorage(read_upload(), bucket, key)
+        if "error" not in result:
+            result["filename"] = blend_file.filename
+        return result
+
+    async def uploadBlendStreamToBlobStorage(self, chunks, bucket: str, key: str):
+        """
+        Upload a Blender (.blend) file to blob storage from a stream of chunks, as a
+        multipart upload hashed with SHA-256 in the same pass.
+        
+        Args:
+            chunks: Async iterable of content chunks
+            bucket: Target bucket name
+            key: File key/name
+            
         Returns:
-            bytes: Image data or dict with error
+            dict: {"size_bytes", "sha256", "parts"} or error response
         """
         try:
-            # Ensure bucket exists before retrieving
+            # Ensure bucket exists before uploading
             bucket_created = await self.ensure_bucket_exists(bucket)
             if not bucket_created:
                 return {"error": f"Failed to create bucket '{bucket}'"}
             
-            response = self.client.get_object(Bucket=bucket, Key=key)
-            data = response['Body'].read()
-            print(type(data))
-            return data
+            result = await self.storage.upload_stream(bucket, key, chunks, content_type="application/octet-stream")
+            print(f"Stored blend file '{key}': {result['size_bytes']} bytes in {result['parts']} part(s), sha256 {result['sha256']}")
+            if self.blend_dedup_enabled and bucket == "blend-files":
+                self.scheduleBlendIndex(bucket, key)
+            return result
         except Exception as e:
             return {"error": str(e)}
 
     # =============================================================================
-    # BLEND FILE STORAGE OPERATIONS
+    # RESUMABLE UPLOAD SESSION OPERATIONS
     # =============================================================================
-    
-    async def uploadBlendFileToBlobStorage(self, blend_file: UploadFile, bucket: str, key: str):
+
+    async def createUploadSession(self, bucket: str, key: str, total_size: int, part_size: int = None,
+                                  owner: str = None, content_type: str = None, metadata: dict = None):
         """
-        Upload a Blender (.blend) file to blob storage.
-        
+        Start a storage multipart upload and register it as an upload session.
+
         Args:
-            blend_file: Uploaded blend file
             bucket: Target bucket name
             key: File key/name
-            
+            total_size: Size of the whole file in bytes
+            part_size: Requested part size, None for the service default
+            owner: Optional owner of the session
+            content_type: Content type of the stored object
+            metadata: Caller data handed back with the session status
+
         Returns:
-            dict: Success response with filename or error response
+            dict: Session status or error response
         """
-        print(blend_file)
         try:
-            # Ensure bucket exists before uploading
+            session_part_size = choose_part_size(total_size, part_size, self.upload_session_part_size)
+        except ValueError as e:
+            return {"error": str(e), "status_code": 400}
+        try:
             bucket_created = await self.ensure_bucket_exists(bucket)
             if not bucket_created:
                 return {"error": f"Failed to create bucket '{bucket}'"}
-            
-            contents = await blend_file.read()
-            self.client.put_object(Bucket=bucket, Key=key, Body=contents)
-            return {"filename": blend_file.filename}
+
+            upload_id = await self.storage.create_multipart_upload(bucket, key, content_type)
+            session = UploadSession(
+                bucket, key, upload_id, total_size, session_part_size,
+                owner=owner, content_type=content_type, metadata=metadata
+            )
+            self.data_class.upload_sessions.add(session)
+            print(f"Opened upload session {session.session_id} for '{key}': {total_size} bytes in {session.part_count} part(s)")
+
+            status = session.to_dict()
+            status["expires_in"] = self.upload_session_ttl
+            return status
         except Exception as e:
             return {"error": str(e)}
-        
-    async def retrieveBlendFileFromBlobStorage(self, bucket: str, key: str):
+
+    async def uploadSessionPart(self, session: UploadSession, part_number: int, body: bytearray, expected_sha256: str = None):
         """
-        Retrieve a Blender (.blend) file from blob storage.
-        
+        Upload one part of an upload session, replacing an earlier copy of it.
+
         Args:
-            bucket: Source bucket name
-            key: File key/name
-            
+            session: Upload session
+            part_number: Part number (1-based)
+            body: Part content, uploaded without being copied
+            expected_sha256: Optional hex SHA-256 the content must match
+
         Returns:
-            bytes: Blend file data or dict with error
+            dict: Stored part and session progress, or error response (with status_code)
         """
         try:
-            print(f"[INFO] Attempting to retrieve blend file from bucket: {bucket}, key: {key}")
-            # Ensure bucket exists before retrieving
-            bucket_created = await self.ensure_bucket_exists(bucket)
+            sha256 = await self.storage.run(lambda: hashlib.sha256(body).hexdigest())
+            if expected_sha256 and expected_sha256.lower() != sha256:
+                return {"error": f"SHA-256 mismatch for part {part_number}", "status_code": 422}
+
+            etag = await self.storage.upload_part(session.bucket, session.key, session.upload_id, part_number, body)
+            session.parts[part_number] = {"ETag": etag, "size": len(body), "sha256": sha256}
+            self.data_class.upload_sessions.touch(session)
+
+            return {
+                "offset": (part_number - 1) * session.part_size,
+                "size": len(body),
+                "sha256": sha256,
+                "received_bytes": session.received_bytes,
+                "missing_parts": len(session.missing_offsets())
+            }
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def completeUploadSession(self, session: UploadSession):
+        """
+        Complete the multipart upload of a session once every part is stored.
+
+        Args:
+            session: Upload session
+
+        Returns:
+            dict: bucket, key, size_bytes and metadata, or error response (with status_code)
+        """
+        missing = session.missing_offsets()
+        if missing:
+            return {"error": "Upload session has missing parts", "missing_offsets": missing, "status_code": 409}
+
+        # Taken out of the table first so no part can be uploaded while the parts are assembled
+        self.data_class.upload_sessions.remove(session.session_id)
+        try:
+            parts = [{"PartNumber": number, "ETag": session.parts[number]["ETag"]} for number in sorted(session.parts)]
+            await self.storage.complete_multipart_upload(session.bucket, session.key, session.upload_id, parts)
+        except Exception as e:
+            self.data_class.upload_sessions.add(session)
+            return {"error": str(e)}
+
+        print(f"Completed upload session {session.session_id}: '{session.key}', {session.total_size} bytes")
+        if self.blend_dedup_enabled and session.bucket == "blend-files":
+            self.scheduleBlendIndex(session.bucket, session.key)
+        return {
+            "message": "Upload completed successfully",
+            "bucket": session.bucket,
+            "key": session.key,
+            "size_bytes": session.total_size,
+            "parts": len(session.parts),
+            "metadata": session.metadata
+        }
+
+    async def abortUploadSession(self, session: UploadSession):
+        """
+        Abort the multipart upload of a session and forget the session.
+
+        Args:
+            session: Upload session
+
+        Returns:
+            dict: bucket, key and metadata of the aborted session or error response
+        """
+        self.data_class.upload_sessions.remove(session.session_id)
+        try:
+            await self.storage.abort_multipart_upload(session.bucket, session.key, session.upload_id)
+        except ClientError as e:
+            # Already aborted or completed in storage, nothing left to clean up
+            if e.response.get("Error", {}).get("Code") != "NoSuchUpload":
+                return {"error": str(e)}
+        except Exception as e:
+            return {"error": str(e)}
+
+        print(f"Aborted upload session {session.session_id}: '{session.key}'")
+        return {"message": "Upload aborted", "bucket": session.bucket, "key": session.key, "metadata": session.metadata}
+
+    async def expireUploadSessions(self):
+        """
+        Abort upload sessions idle for longer than the session TTL, drop deduplicated
+        uploads older than it, then abort the multipart uploads in storage that no
+        session knows about (left behind by a restart of this service) and that are
+        older than the TTL.
+
+        Returns:
+            int: Number of aborted multipart uploads
+        """
+        aborted = 0
+        for session in self.data_class.upload_sessions.expired(self.upload_session_ttl):
+            print(f"Upload session {session.session_id} expired")
+            result = await self.abortUploadSession(session)
+            if "error" not in result:
+                aborted += 1
+
+        # Chunks already sent for an abandoned deduplicated upload stay, other uploads can reuse them
+        deadline = time.time() - self.upload_session_ttl
+        for upload_id in [upload_id for upload_id, upload in self.data_class.chunked_uploads.items() if upload["created_at"] < deadline]:
+            print(f"Deduplicated upload {upload_id} expired")
+            self.data_class.chunked_uploads.pop(upload_id, None)
+
+        known_upload_ids = self.data_class.upload_sessions.upload_ids()
+        deadline = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=self.upload_session_ttl)
+        for bucket in self.upload_session_buckets | self.data_class.upload_sessions.buckets():
+            try:
+                uploads = await self.storage.list_multipart_uploads(bucket)
+            except Exception as e:
+                print(f"Warning: Could not list multipart uploads of '{bucket}': {str(e)}")
+                continue
+            for upload in uploads:
+                if upload["UploadId"] in known_upload_ids or upload["Initiated"] > deadline:
+                    continue
+                try:
+                    await self.storage.abort_multipart_upload(bucket, upload["Key"], upload["UploadId"])
+                    print(f"Aborted abandoned multipart upload of '{upload['Key']}' in '{bucket}'")
+                    aborted += 1
+                except Exception as e:
+                    print(f"Warning: Could not abort multipart upload of '{upload['Key']}': {str(e)}")
+        return aborted
+
+    async def runUploadSessionJanitor(self):
+        """
+        Run expireUploadSessions every upload_session_sweep_interval seconds.
+
+        Returns:
+            None
+        """
+        while True:
+            await asyncio.sleep(self.upload_session_sweep_interval)
+            try:
+                await self.expireUploadSessions()
+            except Exception as e:
+                print(f"Error expiring upload sessions: {str(e)}")
+
+    # =============================================================================
+    # DEDUPLICATED (CONTENT-DEFINED CHUNK) BLEND FILE OPERATIONS
+    # =============================================================================
+
+    async def createChunkedBlendUpload(self, bucket: str, key: str, chunks: list, owner: str = None, metadata: dict = None):
+        """
+        Register a deduplicated upload and find which of its chunks are not stored yet.
+
+        Args:
+            bucket: Target bucket of the assembled blend file
+            key: Target key of the assembled blend file
+            chunks: [{"hash", "size"}] in file order
+            owner: Optional owner every later call must present
+            metadata: Caller data handed back on completion
+
+        Returns:
+            dict: upload_id, missing chunk hashes and dedup stats, or error response
+        """
+        try:
+            missing = await self.blend_chunks.missing_chunks(chunk["hash"] for chunk in chunks)
+            upload_id = uuid.uuid4().hex
+            self.data_class.chunked_uploads[upload_id] = {
+                "bucket": bucket,
+                "key": key,
+                "chunks": chunks,
+                "new_hashes": missing,
+                "owner": owner,
+                "metadata": metadata or {},
+                "created_at": time.time()
+            }
+            stats = dedup_stats(chunks, missing)
+            print(f"Deduplicated upload {upload_id} for '{key}': {stats['new_chunks']} of {stats['chunk_count']} chunk(s) to send, {stats['bytes_saved']} bytes saved")
+            return {"upload_id": upload_id, "missing": missing, "stats": stats, "expires_in": self.upload_session_ttl}
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def completeChunkedBlendUpload(self, upload_id: str, upload: dict):
+        """
+        Assemble and store the blend file of a deduplicated upload and save its manifest.
+
+        Args:
+            upload_id: Deduplicated upload id
+            upload: The upload record
+
+        Returns:
+            dict: bucket, key, size_bytes, sha256, stats and metadata, or error response (with status_code)
+        """
+        try:
+            missing = await self.blend_chunks.missing_chunks(chunk["hash"] for chunk in upload["chunks"])
+        except Exception as e:
+            return {"error": str(e)}
+        if missing:
+            return {"error": "Chunks are missing", "missing": missing, "status_code": 409}
+
+        # Taken out of the table first so the upload is not assembled twice at the same time,
+        # put back if storing fails so the completion can be retried
+        self.data_class.chunked_uploads.pop(upload_id, None)
+        try:
+            bucket_created = await self.ensure_bucket_exists(upload["bucket"])
             if not bucket_created:
-                print(f"[ERROR] Failed to create or access bucket: {bucket}")
-                return {"error": f"Failed to create bucket '{bucket}'"}
-            
-            print(f"[INFO] Bucket '{bucket}' exists. Proceeding to get object with key '{key}'")
-            response = self.client.get_object(Bucket=bucket, Key=key)
-            data = response['Body'].read()
-            print(f"[INFO] Successfully retrieved blend file. Data type: {type(data)}")
-            return data
+                self.data_class.chunked_uploads[upload_id] = upload
+                return {"error": f"Failed to create bucket '{upload['bucket']}'"}
+
+            result = await self.blend_chunks.assemble_object(upload["bucket"], upload["key"], upload["chunks"])
+            # The manifest and stats describe the stored chunks, whose sizes assemble_object checked
+            stats = dedup_stats(result["chunks"], upload["new_hashes"])
+            await self.blend_chunks.save_manifest(
+                self.blend_chunks.build_manifest(upload["bucket"], upload["key"], result["chunks"], result["sha256"], stats)
+            )
+        except ValueError as e:
+            # The chunk list does not describe the stored chunks, a retry cannot succeed
+            return {"error": str(e), "status_code": 422}
         except Exception as e:
-            print(f"[ERROR] Exception occurred while retrieving blend file from bucket '{bucket}', key '{key}': {str(e)}")
+            self.data_class.chunked_uploads[upload_id] = upload
             return {"error": str(e)}
 
+        print(f"Assembled deduplicated upload {upload_id} into '{upload['key']}': {result['size_bytes']} bytes, dedup ratio {stats['dedup_ratio']}")
+        return {
+            "message": "Blend file stored successfully",
+            "bucket": upload["bucket"],
+            "key": upload["key"],
+            "size_bytes": result["size_bytes"],
+            "sha256": result["sha256"],
+            "stats": stats,
+            "metadata": upload["metadata"]
+        }
+
+    def scheduleBlendIndex(self, bucket: str, key: str):
+        """
+        Chunk a stored blend file in the background and save its manifest, so the next
+        version of it can be uploaded and distributed as a delta.
+
+        Args:
+            bucket: Bucket of the blend file
+            key: Key of the blend file
+        """
+        async def index():
+            try:
+                manifest = await self.blend_chunks.index_object(bucket, key)
+                stats = manifest["stats"]
+                print(f"Indexed blend file '{key}': {stats['chunk_count']} chunk(s), {stats['bytes_saved']} bytes already stored, dedup ratio {stats['dedup_ratio']}")
+            except Exception as e:
+                print(f"Error indexing blend file '{key}': {str(e)}")
+
+        asyncio.create_task(index())
+
     async def retrieveBlendFileMetadataFromBlobStorage(self, bucket: str, key: str):
         """
         Retrieve metadata for a Blender (.blend) file without downloading the file content.
@@ -920,7 +1942,7 @@ class HTTP_SERVER():
             print(f"[INFO] Bucket '{bucket}' exists. Proceeding to get object metadata with key '{key}'")
             
             # Get object metadata using head_object (doesn't download the file content)
-            response = self.client.head_object(Bucket=bucket, Key=key)
+            response = await self.storage.head_object(bucket, key)
             
             # Extract relevant metadata
             metadata = {
@@ -976,33 +1998,39 @@ class HTTP_SERVER():
             if not bucket_created:
                 return {"error": "Failed to create temp bucket"}
             
-            contents = await file.read()
-            self.client.put_object(Bucket="temp", Key=key, Body=contents)
+            await file.seek(0)
+            await self.storage.upload_fileobj(file.file, "temp", key)
             return {"filename": file.filename, "key": key}
         except Exception as e:
             return {"error": str(e)}
     
-    async def retrieveFileFromTempBucket(self, key: str):
+    async def uploadFilesToTempBucket(self, files: List[UploadFile], keys: List[str]):
         """
-        Retrieve any file from the temp bucket using the key.
+        Upload several files to the temp bucket concurrently.
+        
+        The uploads run on the storage thread pool so they overlap instead of running
+        one after the other.
         
         Args:
-            key: File key/name
+            files: Uploaded files
+            keys: File key/name for every file, in the same order
             
         Returns:
-            bytes: File data or dict with error
+            list: One {"filename", "key"} or {"key", "error"} dict per file
         """
-        try:
-            # Ensure temp bucket exists
-            bucket_created = await self.ensure_bucket_exists("temp")
-            if not bucket_created:
-                return {"error": "Failed to create temp bucket"}
-            
-            response = self.client.get_object(Bucket="temp", Key=key)
-            data = response['Body'].read()
-            return data
-        except Exception as e:
-            return {"error": str(e)}
+        bucket_created = await self.ensure_bucket_exists("temp")
+        if not bucket_created:
+            return [{"key": key, "error": "Failed to create temp bucket"} for key in keys]
+
+        async def upload(file: UploadFile, key: str):
+            try:
+                await file.seek(0)
+                await self.storage.upload_fileobj(file.file, "temp", key)
+                return {"filename": file.filename, "key": key}
+            except Exception as e:
+                return {"key": key, "error": str(e)}
+
+        return await asyncio.gather(*(upload(file, key) for file, key in zip(files, keys)))
     
     async def deleteFileFromTempBucket(self, key: str):
         """
@@ -1020,11 +2048,75 @@ class HTTP_SERVER():
             if not bucket_created:
                 return {"error": "Failed to create temp bucket"}
             
-            self.client.delete_object(Bucket="temp", Key=key)
+            await self.storage.delete_object("temp", key)
             return {"message": f"File '{key}' deleted successfully from temp bucket"}
         except Exception as e:
             return {"error": str(e)}
 
+    async def deleteKeysFromBlobStorage(self, bucket: str, keys: List[str]):
+        """
+        Delete many keys from a bucket with multi-object deletes.
+        
+        Args:
+            bucket: Source bucket name
+            keys: File keys/names to delete
+            
+        Returns:
+            dict: {"deleted": [key], "errors": [{"Key", "Code", "Message"}]} or error response
+        """
+        try:
+            bucket_created = await self.ensure_bucket_exists(bucket)
+            if not bucket_created:
+                return {"error": f"Failed to create bucket '{bucket}'"}
+
+            return await self.storage.delete_objects(bucket, keys)
+        except Exception as e:
+            print(f"[ERROR] Exception occurred while deleting {len(keys)} keys from bucket '{bucket}': {str(e)}")
+            return {"error": str(e)}
+
+    async def sweepTempBucket(self):
+        """
+        Delete the temp objects older than temp_max_age and record the size and
+        object count of the temp bucket.
+        
+        Returns:
+            dict: The recorded sample
+        """
+        objects = await self.storage.list_objects("temp", "")
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=self.temp_max_age)
+        expired = [obj["Key"] for obj in objects if obj["LastModified"] < cutoff]
+
+        deleted = set()
+        if expired:
+            result = await self.storage.delete_objects("temp", expired)
+            deleted = set(result["deleted"])
+            self.temp_deleted["janitor"] += len(deleted)
+            print(f"Deleted {len(deleted)} temp object(s) older than {self.temp_max_age}s, {len(result['errors'])} failed")
+
+        remaining = [obj for obj in objects if obj["Key"] not in deleted]
+        sample = {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "object_count": len(remaining),
+            "size_bytes": sum(obj.get("Size", 0) for obj in remaining),
+            "expired_deleted": len(deleted)
+        }
+        self.temp_metrics.append(sample)
+        return sample
+
+    async def runTempJanitor(self):
+        """
+        Run sweepTempBucket at startup and then every temp_sweep_interval seconds.
+        
+        Returns:
+            None
+        """
+        while True:
+            try:
+                await self.sweepTempBucket()
+            except Exception as e:
+                print(f"Error sweeping temp bucket: {str(e)}")
+            await asyncio.sleep(self.temp_sweep_interval)
+
     # =============================================================================
     # FRAMES ZIP STORAGE OPERATIONS
     # =============================================================================
@@ -1043,146 +2135,427 @@ class HTTP_SERVER():
             bucket_created = await self.ensure_bucket_exists("frames-zip")
             if not bucket_created:
                 return {"error": "Failed to create frames-zip bucket"}
-            contents = await file.read()
-            self.client.put_object(Bucket="frames-zip", Key=key, Body=contents, ContentType="application/zip")
+            await file.seek(0)
+            await self.storage.upload_fileobj(file.file, "frames-zip", key, extra_args={"ContentType": "application/zip"})
             return {"filename": file.filename, "key": key}
         except Exception as e:
             return {"error": str(e)}
 
-    async def retrieveFramesZipFromBlobStorage(self, key: str):
+    async def uploadVideoToBlobStorage(self, video: UploadFile, bucket: str, key: str):
         """
-        Retrieve a frames zip archive from the frames-zip bucket.
+        Upload a video file to blob storage.
 
         Args:
-            key: Storage key (expects .zip)
+            video: Uploaded video file
+            bucket: Target bucket name
+            key: File key/name
 
         Returns:
-            bytes or dict with error
+            dict: Success response with filename/key or error
         """
         try:
-            bucket_created = await self.ensure_bucket_exists("frames-zip")
+            bucket_created = await self.ensure_bucket_exists(bucket)
             if not bucket_created:
-                return {"error": "Failed to create frames-zip bucket"}
-            response = self.client.get_object(Bucket="frames-zip", Key=key)
-            return response['Body'].read()
+                return {"error": f"Failed to create bucket '{bucket}'"}
+            await video.seek(0)
+            await self.storage.upload_fileobj(video.file, bucket, key, extra_args={"ContentType": "video/mp4"})
+            return {"filename": video.filename, "key": key}
         except Exception as e:
             return {"error": str(e)}
-        
-    async def store_rendered_images_to_zip(self, bucket: str, prefix: str, is_paid: bool = True):
+
+    def select_frames_for_zip(self, objects: list, is_paid: bool = True):
         """
-        Fetch all images under 'bucket/prefix' and create a zip on-the-fly.
-        Upload that zip to the frames-zip bucket with key = prefix+'.zip'.
-        For unpaid users (is_paid=False), only 1/3rd of frames (evenly distributed) will be included.
+        Frames that go into the zip of a render: all of them for paid objects, 1/3rd
+        of them (evenly distributed) for unpaid ones.
+
+        Args:
+            objects: Listed frame objects in frame order
+            is_paid: Whether the blender object is paid for
+
+        Returns:
+            list: The selected objects
         """
-        print(f"Starting store_rendered_images_to_zip for bucket={bucket} prefix={prefix} is_paid={is_paid}")
-        import zipstream
-        import io
+        if is_paid:
+            print(f"Paid user: Including all {len(objects)} frames")
+            return objects
 
-        try:
-            zipStreamingObj = zipstream.ZipFile(mode="w", compression=zipstream.ZIP_DEFLATED)
-        except Exception as e:
-            raise Exception(f"Failed to initialize zip stream: {str(e)}")
+        total_frames = len(objects)
+        frames_to_return_count = max(1, int(total_frames * 0.3))  # At least 1 frame
+
+        if frames_to_return_count == 1:
+            # If only 1 frame, include the middle frame
+            available_frame_indices = [total_frames // 2]
+        else:
+            # Calculate step size to get evenly distributed frames
+            step_size = total_frames / frames_to_return_count
+            available_frame_indices = [min(int(i * step_size), total_frames - 1) for i in range(frames_to_return_count)]
+
+        print(f"Unpaid user: Including {len(available_frame_indices)} out of {total_frames} frames")
+        return [objects[index] for index in available_frame_indices]
 
+    async def prefetch_objects(self, bucket: str, objects: list):
+        """
+        Yield (object, content) in order while the next zip_prefetch objects are
+        already being fetched on the storage pool.
+        """
+        pending = collections.deque()
         try:
-            object_keys = await self.listObjectsWithPrefix(bucket, prefix)
-            if isinstance(object_keys, dict) and "error" in object_keys:
-                raise Exception(object_keys["error"])
-            if not object_keys:
-                raise Exception("No images found for the given prefix.")
-        except Exception as e:
-            raise Exception(f"Failed to list objects with prefix '{prefix}' in bucket '{bucket}': {str(e)}")
+            for obj in objects:
+                # IfMatch: a frame replaced since it was listed fails instead of going in unnoticed
+                conditions = {"IfMatch": obj["ETag"]} if obj.get("ETag") else {}
+                pending.append((obj, asyncio.create_task(self.storage.get_object_bytes(bucket, obj["Key"], **conditions))))
+                if len(pending) >= self.zip_prefetch:
+                    obj, task = pending.popleft()
+                    yield obj, await task
+            while pending:
+                obj, task = pending.popleft()
+                yield obj, await task
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def stream_frames_zip(self, bucket: str, objects: list, writer: ZipWriter = None):
+        """
+        Zip archive of frame objects as a stream of byte strings. Already compressed
+        formats (PNG, JPEG, ...) are STORED, anything else is DEFLATEd on the storage pool.
 
-        # Filter frames for unpaid users (1/3rd of total frames, evenly distributed)
-        frames_to_include = object_keys
-        if not is_paid:
-            total_frames = len(object_keys)
-            frames_to_return_count = max(1, int(total_frames * 0.3))  # At least 1 frame
-            
-            if frames_to_return_count == 1:
-                # If only 1 frame, include the middle frame
-                available_frame_indices = [total_frames // 2]
+        Args:
+            bucket: Bucket of the frames
+            objects: Listed frame objects ({"Key", "Size", "LastModified"}) in archive order
+            writer: ZipWriter to continue, a new archive by default
+        """
+        writer = writer or ZipWriter()
+        async for obj, content in self.prefetch_objects(bucket, objects):
+            name = obj["Key"].split("/")[-1]
+            yield writer.start_entry(name, len(content), obj.get("LastModified"))
+            if is_precompressed(name):
+                yield writer.write(content)
+                yield writer.end_entry()
             else:
-                # Calculate step size to get evenly distributed frames
-                step_size = total_frames / frames_to_return_count
-                available_frame_indices = []
-                
-                for i in range(frames_to_return_count):
-                    # Calculate index for this frame
-                    index = int(i * step_size)
-                    # Ensure we don't go out of bounds
-                    index = min(index, total_frames - 1)
-                    available_frame_indices.append(index)
-            
-            # Filter object_keys to only include selected frames
-            frames_to_include = [object_keys[idx] for idx in available_frame_indices]
-            print(f"Unpaid user: Including {len(frames_to_include)} out of {total_frames} frames (indices: {available_frame_indices})")
-        else:
-            print(f"Paid user: Including all {len(frames_to_include)} frames")
+                yield await self.storage.run(writer.write, content)
+                yield await self.storage.run(writer.end_entry)
+        yield writer.finish()
 
+    def zip_manifest_hash(self, objects: list, is_paid: bool) -> str:
+        """Hash of what a frames zip holds: the frame keys and ETags, in order, and the paid/unpaid selection."""
+        description = json.dumps({"is_paid": is_paid, "frames": [[obj["Key"], obj["ETag"]] for obj in objects]})
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    async def load_zip_manifest(self, zip_key: str):
+        """
+        Manifest stored next to a frames zip, None if there is none or the zip was
+        replaced without it (its ETag no longer matches).
+        """
         try:
-            for objs in frames_to_include:
-                try:
-                    response = self.client.get_object(Bucket=bucket, Key=objs)
-                    body_stream = response["Body"].iter_chunks(chunk_size=8192)
-                    zipStreamingObj.write_iter(objs.split("/")[-1], body_stream)
-                except Exception as e:
-                    raise Exception(f"Failed to retrieve or add object '{objs}' to zip: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Error during zip creation for prefix '{prefix}': {str(e)}")
+            manifest = json.loads(await self.storage.get_object_bytes("frames-zip", f"{zip_key}.manifest.json"))
+            head = await self.storage.head_object("frames-zip", zip_key)
+        except Exception:
+            return None
+        return manifest if head.get("ETag") == manifest.get("zip_etag") else None
 
-        print("storing the zip now...")
+    async def store_rendered_images_to_zip(self, bucket: str, prefix: str, is_paid: bool = True):
+        """
+        Zip all images under 'bucket/prefix' and upload the zip to the frames-zip
+        bucket with key = prefix + '/frames.zip'. For unpaid users (is_paid=False),
+        only 1/3rd of frames (evenly distributed) will be included.
+
+        The zip is stored with a manifest of its contents. When nothing changed the
+        stored zip is reused without reading a frame, and when frames were only
+        added it is extended (see build_frames_zip). Concurrent requests for the
+        same contents share one build, builds of different contents for the same
+        zip run one after the other.
+        """
+        print(f"Starting store_rendered_images_to_zip for bucket={bucket} prefix={prefix} is_paid={is_paid}")
 
         try:
-            # Inline generator->file-like wrapper
-            class _GenReader(io.RawIOBase):
-                def __init__(self, gen):
-                    self._iter = iter(gen)
-                    self._buffer = b""
-
-                def readable(self):
-                    return True
+            objects = await self.storage.list_objects(bucket, prefix)
+        except Exception as e:
+            raise Exception(f"Failed to list objects with prefix '{prefix}' in bucket '{bucket}': {str(e)}")
+        if not objects:
+            raise Exception("No images found for the given prefix.")
+
+        frames_to_include = self.select_frames_for_zip(objects, is_paid)
+        zip_key = f"{prefix.strip('/')}/frames.zip"
+        manifest_hash = self.zip_manifest_hash(frames_to_include, is_paid)
+
+        # One build per zip at a time: a build of other contents for the same zip (e.g.
+        # the paid and the unpaid selection) is waited for, as both write the same object
+        while True:
+            running = self.zip_builds.get(zip_key)
+            if running is None or running[1].done():
+                break
+            running_hash, build = running
+            if running_hash == manifest_hash:
+                return await asyncio.shield(build)
+            await asyncio.wait([build])
+
+        build = asyncio.create_task(self.build_frames_zip(bucket, zip_key, frames_to_include, manifest_hash))
+        self.zip_builds[zip_key] = (manifest_hash, build)
+
+        def forget_build(_):
+            if self.zip_builds.get(zip_key, (None, None))[1] is build:
+                del self.zip_builds[zip_key]
+
+        build.add_done_callback(forget_build)
+        return await asyncio.shield(build)
+
+    async def build_frames_zip(self, bucket: str, zip_key: str, objects: list, manifest_hash: str):
+        """
+        Bring frames-zip/zip_key up to date with the given frames:
+        - same manifest hash as the stored zip: nothing is read or written
+        - the stored zip holds a prefix of the frames: its entries are copied inside
+          storage (upload_part_copy) and only the new entries and a new central
+          directory are written after them
+        - otherwise the zip is built from scratch
 
-                def readinto(self, b):
-                    while not self._buffer:
-                        try:
-                            self._buffer = next(self._iter)
-                        except StopIteration:
-                            return 0  # EOF
-                    n = min(len(b), len(self._buffer))
-                    b[:n] = self._buffer[:n]
-                    self._buffer = self._buffer[n:]
-                    return n
+        Returns:
+            dict: bucket, key, frames, size_bytes, reused and appended_frames
+        """
+        previous = await self.load_zip_manifest(zip_key)
+        frames = [[obj["Key"], obj["ETag"]] for obj in objects]
+
+        if previous is not None and previous["manifest_hash"] == manifest_hash:
+            print(f"Reusing {zip_key}: no frame changed since it was built")
+            return {"bucket": "frames-zip", "key": zip_key, "frames": len(objects), "size_bytes": previous["size"], "reused": True, "appended_frames": 0}
+
+        writer = ZipWriter()
+        new_objects = objects
+        copy_source = None
+        copy_length = 0
+        if (previous is not None and len(previous["frames"]) < len(frames)
+                and frames[:len(previous["frames"])] == previous["frames"]
+                and previous["directory_offset"] >= MIN_PART_SIZE):
+            writer = ZipWriter(
+                offset=previous["directory_offset"],
+                entries=[ZipEntry.from_dict(entry) for entry in previous["entries"]]
+            )
+            new_objects = objects[len(previous["frames"]):]
+            copy_source = {"Bucket": "frames-zip", "Key": zip_key}
+            copy_length = previous["directory_offset"]
+            print(f"Extending {zip_key} with {len(new_objects)} new frame(s), keeping {len(previous['frames'])}")
 
-            stream_wrapper = io.BufferedReader(_GenReader(zipStreamingObj))
+        bucket_created = await self.ensure_bucket_exists("frames-zip")
+        if not bucket_created:
+            raise Exception("Failed to create or access frames-zip bucket")
 
-            # Ensure frames-zip bucket exists
-            bucket_created = await self.ensure_bucket_exists("frames-zip")
-            if not bucket_created:
-                raise Exception("Failed to create or access frames-zip bucket")
-
-            # Upload streaming zip to S3/MinIO
-            self.client.upload_fileobj(
-                Fileobj=stream_wrapper,
-                Bucket="frames-zip",
-                Key=f"{prefix.strip('/')}/frames.zip",
-                ExtraArgs={"ContentType": "application/zip"}
+        started = time.perf_counter()
+        try:
+            try:
+                # The copied prefix must still be the zip the manifest describes
+                result = await self.storage.upload_stream(
+                    "frames-zip", zip_key, self.stream_frames_zip(bucket, new_objects, writer),
+                    content_type="application/zip", copy_source=copy_source, copy_length=copy_length,
+                    copy_source_etag=previous["zip_etag"] if copy_source else None
+                )
+            except ClientError as ce:
+                if copy_source is None or ce.response.get("Error", {}).get("Code") not in ("PreconditionFailed", "412"):
+                    raise
+                print(f"{zip_key} was replaced while being extended, building it from scratch")
+                writer = ZipWriter()
+                new_objects = objects
+                copy_source = None
+                result = await self.storage.upload_stream(
+                    "frames-zip", zip_key, self.stream_frames_zip(bucket, new_objects, writer),
+                    content_type="application/zip"
+                )
+        except Exception as e:
+            raise Exception(f"Failed to upload zip file '{zip_key}': {str(e)}")
+
+        manifest = {
+            "manifest_hash": manifest_hash,
+            "frames": frames,
+            "entries": [entry.to_dict() for entry in writer.entries],
+            "directory_offset": writer.offset,
+            "size": result["size_bytes"],
+            "zip_etag": result["etag"]
+        }
+        try:
+            await self.storage.put_object(
+                "frames-zip", f"{zip_key}.manifest.json", json.dumps(manifest).encode(), ContentType="application/json"
             )
         except Exception as e:
-            raise Exception(f"Failed to upload zip file for prefix '{prefix}': {str(e)}")
+            # The zip itself is fine, the next request just rebuilds it
+            print(f"Warning: Could not store the manifest of {zip_key}: {str(e)}")
 
-        print(f"✅ Stored {prefix.strip('/')}.zip in frames-zip bucket")
-        
+        print(f"Stored {zip_key} in frames-zip bucket: {len(objects)} frames ({len(new_objects)} written), {result['size_bytes']} bytes in {time.perf_counter() - started:.2f}s")
         return {
             "bucket": "frames-zip",
-            "key": f"{prefix.strip('/')}/frames.zip",
+            "key": zip_key,
+            "frames": len(objects),
+            "size_bytes": result["size_bytes"],
+            "reused": False,
+            "appended_frames": len(new_objects) if copy_source else 0
         }
+
     # =============================================================================
     # SIGNED URL OPERATIONS
     # =============================================================================
     
+    def cache_frame_crc(self, bucket: str, obj: dict, crc: int):
+        self.zip_crc_cache[(bucket, obj["Key"], obj.get("ETag"))] = crc
+        self.zip_crc_cache.move_to_end((bucket, obj["Key"], obj.get("ETag")))
+        while len(self.zip_crc_cache) > self.zip_crc_cache_size:
+            self.zip_crc_cache.popitem(last=False)
+
+    async def stream_frames_zip_range(self, bucket: str, objects: list, layout: StoredArchiveLayout, start: int, end: int):
+        """
+        Bytes start..end (inclusive) of the STORED archive described by layout, as a
+        stream of byte strings. Only the frames overlapping the range are read, through
+        the prefetch window, and the next ones are only fetched as the client consumes
+        the response. The central directory needs the CRC-32 of every frame: frames
+        before the range come from the CRC cache, or are read once if not cached.
+
+        Args:
+            bucket: Bucket of the frames
+            objects: Frame objects, in the order of layout.entries
+            layout: Layout of the archive
+            start: First archive offset to send
+            end: Last archive offset to send
+        """
+        def clip(data: bytes, offset: int):
+            # The part of data (found at archive offset `offset`) that lies in the range
+            low = max(start - offset, 0)
+            high = min(end + 1 - offset, len(data))
+            if low >= high:
+                return None
+            return data if low == 0 and high == len(data) else data[low:high]
+
+        entries = layout.entries
+        overlapping = [
+            index for index, entry in enumerate(entries)
+            if entry.offset <= end and layout.entry_end(index) > start
+        ]
+        crc_known = set()
+
+        index_iterator = iter(overlapping)
+        async for obj, content in self.prefetch_objects(bucket, [objects[index] for index in overlapping]):
+            index = next(index_iterator)
+            entry = entries[index]
+            if len(content) != entry.size:
+                raise Exception(f"Frame '{obj['Key']}' changed size while the zip was streamed")
+            entry.crc = await self.storage.run(zlib.crc32, content)
+            crc_known.add(index)
+            self.cache_frame_crc(bucket, obj, entry.crc)
+
+            data_offset = layout.data_offset(entry)
+            for data, offset in (
+                (local_header(entry), entry.offset),
+                (content, data_offset),
+                (data_descriptor(entry), data_offset + entry.size),
+            ):
+                piece = clip(data, offset)
+                if piece:
+                    yield piece
+
+        if end < layout.directory_offset:
+            return
+
+        unknown = []
+        for index, (entry, obj) in enumerate(zip(entries, objects)):
+            if index in crc_known:
+                continue
+            crc = self.zip_crc_cache.get((bucket, obj["Key"], obj.get("ETag")))
+            if crc is None:
+                unknown.append(index)
+            else:
+                entry.crc = crc
+
+        if unknown:
+            print(f"Reading {len(unknown)} frames for their CRC-32 to resume a zip download")
+            index_iterator = iter(unknown)
+            async for obj, content in self.prefetch_objects(bucket, [objects[index] for index in unknown]):
+                entry = entries[next(index_iterator)]
+                entry.crc = await self.storage.run(zlib.crc32, content)
+                self.cache_frame_crc(bucket, obj, entry.crc)
+
+        piece = clip(central_directory(entries, layout.directory_offset), layout.directory_offset)
+        if piece:
+            yield piece
+
+    async def streamFramesZipFromBlobStorage(self, request: Request, bucket: str, prefix: str, is_paid: bool = True, headers: dict = None):
+        """
+        Serve the frames under a prefix as a ZIP archive built on the fly, honoring
+        the Range, If-Range and If-None-Match request headers.
+
+        Args:
+            request: Incoming request, for its conditional and range headers
+            bucket: Bucket of the frames
+            prefix: Prefix the frames are stored under
+            is_paid: Whether the blender object is paid for
+            headers: Extra response headers (e.g. Content-Disposition)
+
+        Returns:
+            StreamingResponse (200 or 206 Partial Content), 304 Not Modified,
+            416 Range Not Satisfiable, or a JSON error response (404 if no frames)
+        """
+        try:
+            objects = await self.storage.list_objects(bucket, prefix)
+        except Exception as e:
+            return JSONResponse(content={"error": f"Failed to list objects with prefix '{prefix}' in bucket '{bucket}': {str(e)}"}, status_code=404)
+        if not objects:
+            return JSONResponse(content={"error": "No images found for the given prefix."}, status_code=404)
+
+        frames = self.select_frames_for_zip(objects, is_paid)
+        layout = StoredArchiveLayout([
+            (obj["Key"].split("/")[-1], obj["Size"], obj.get("LastModified")) for obj in frames
+        ])
+        size = layout.size
+        etag = f'"{self.zip_manifest_hash(frames, is_paid)}"'
+
+        validators = {"ETag": etag}
+        last_modified = max((obj["LastModified"] for obj in frames if obj.get("LastModified")), default=None)
+        if last_modified is not None:
+            validators["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+            return Response(status_code=304, headers=validators)
+
+        # A single byte range is served, multiple ranges are answered with the whole archive.
+        # If-Range must match the ETag exactly, otherwise the frames changed: send all of it
+        start, end = 0, size - 1
+        partial = False
+        range_header = (request.headers.get("range") or "").strip()
+        if_range = (request.headers.get("if-range") or "").strip()
+        if range_header.startswith("bytes=") and "," not in range_header and (not if_range or if_range == etag):
+            first, _, last = range_header[len("bytes="):].strip().partition("-")
+            try:
+                if first:
+                    start = int(first)
+                    end = min(int(last), size - 1) if last else size - 1
+                else:
+                    start = max(size - int(last), 0) if int(last) > 0 else size
+                partial = True
+            except ValueError:
+                start, end = 0, size - 1
+            if partial and (start >= size or start > end):
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+        response_headers = {
+            "Content-Length": str(end - start + 1),
+            "Accept-Ranges": "bytes",
+            **validators,
+        }
+        if partial:
+            response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response_headers.update(headers or {})
+
+        print(f"Streaming {len(frames)} frames as a {size} byte zip, bytes {start}-{end}")
+        return StreamingResponse(
+            self.stream_frames_zip_range(bucket, frames, layout, start, end),
+            status_code=206 if partial else 200,
+            media_type="application/zip",
+            headers=response_headers
+        )
+
     async def generateSignedUrlForBlobStorage(self, bucket: str, key: str, expiration: int = 3600):
         """
         Generate a signed URL for accessing a file in blob storage.
+
+        The expiration is rounded up to its expiration class and the URL is cached by
+        (bucket, key, ETag, expiration class): while the object is unchanged and enough
+        of the URL's lifetime is left, the same URL is returned without a bucket check,
+        a HEAD or a new signature. URLs for objects that do not exist are not cached.
         
         Args:
             bucket: Source bucket name
@@ -1190,33 +2563,89 @@ class HTTP_SERVER():
             expiration: URL expiration time in seconds (default: 3600 = 1 hour)
             
         Returns:
-            str: Signed URL or dict with error
+            dict: {"signed_url", "expiration_seconds", "expires_at", "expires_in", "cached"}
+            with expiration_seconds the lifetime the URL was issued with, or dict with error
         """
         try:
             print(f"[INFO] Attempting to generate signed URL for bucket: {bucket}, key: {key}")
             print(f"[INFO] Expiration time: {expiration} seconds")
-            
-            # Ensure bucket exists before generating signed URL
-            bucket_created = await self.ensure_bucket_exists(bucket)
-            if not bucket_created:
-                print(f"[ERROR] Failed to create or access bucket: {bucket}")
-                return {"error": f"Failed to create bucket '{bucket}'"}
-            
+            lifetime = expiration_class(expiration)
+
+            etag = self.signed_urls.known_etag(bucket, key)
+            if etag is None:
+                # Ensure bucket exists before generating signed URL
+                bucket_created = await self.ensure_bucket_exists(bucket)
+                if not bucket_created:
+                    print(f"[ERROR] Failed to create or access bucket: {bucket}")
+                    return {"error": f"Failed to create bucket '{bucket}'"}
+                try:
+                    head = await self.storage.head_object(bucket, key)
+                    etag = head.get("ETag")
+                    if etag:
+                        self.signed_urls.remember_etag(bucket, key, etag)
+                except ClientError as ce:
+                    if not self.is_missing_object(ce):
+                        raise
+
+            if etag:
+                cached = self.signed_urls.get(bucket, key, etag, lifetime)
+                if cached is not None:
+                    signed_url, expires_at = cached
+                    print(f"[INFO] Reusing signed URL for key '{key}', {int(expires_at - time.time())} seconds left")
+                    return {"signed_url": signed_url, "expiration_seconds": lifetime, "expires_at": expires_at,
+                            "expires_in": int(expires_at - time.time()), "cached": True}
+
             print(f"[INFO] Bucket '{bucket}' exists. Proceeding to generate signed URL for key '{key}'")
             
-            # Generate presigned URL using boto3
+            # Generate presigned URL using boto3 (signed locally, no request is made)
+            expires_at = time.time() + lifetime
             signed_url = self.client.generate_presigned_url(
                 'get_object',
                 Params={'Bucket': bucket, 'Key': key},
-                ExpiresIn=expiration
+                ExpiresIn=lifetime
             )
+            if etag:
+                self.signed_urls.put(bucket, key, etag, lifetime, signed_url, expires_at)
             
             print(f"[INFO] Successfully generated signed URL. URL length: {len(signed_url)} characters")
-            return signed_url
+            return {"signed_url": signed_url, "expiration_seconds": lifetime, "expires_at": expires_at,
+                    "expires_in": lifetime, "cached": False}
         except Exception as e:
             print(f"[ERROR] Exception occurred while generating signed URL for bucket '{bucket}', key '{key}': {str(e)}")
             return {"error": str(e)}
 
+    async def generateUploadUrlForBlobStorage(self, bucket: str, key: str, expiration: int = 900, content_type: str = None):
+        """
+        Generate a presigned PUT URL for uploading a file straight to blob storage.
+        
+        Args:
+            bucket: Target bucket name
+            key: File key/name
+            expiration: URL expiration time in seconds (default: 900 = 15 minutes)
+            content_type: Content-Type the upload must be sent with (optional)
+            
+        Returns:
+            str: Presigned upload URL or dict with error
+        """
+        try:
+            bucket_created = await self.ensure_bucket_exists(bucket)
+            if not bucket_created:
+                return {"error": f"Failed to create bucket '{bucket}'"}
+
+            params = {'Bucket': bucket, 'Key': key}
+            if content_type:
+                params['ContentType'] = content_type
+
+            return self.presign_client.generate_presigned_url(
+                'put_object',
+                Params=params,
+                ExpiresIn=expiration,
+                HttpMethod='PUT'
+            )
+        except Exception as e:
+            print(f"[ERROR] Exception occurred while generating upload URL for bucket '{bucket}', key '{key}': {str(e)}")
+            return {"error": str(e)}
+
     # =============================================================================
     # DELETE OPERATIONS
     # =============================================================================
@@ -1242,14 +2671,7 @@ class HTTP_SERVER():
                 return {"error": f"Failed to create bucket '{bucket}'"}
             
             # List objects with the given prefix
-            paginator = self.client.get_paginator('list_objects_v2')
-            page_iterator = paginator.paginate(Bucket=bucket, Prefix=prefix)
-            
-            objects = []
-            for page in page_iterator:
-                if 'Contents' in page:
-                    for obj in page['Contents']:
-                        objects.append(obj['Key'])
+            objects = await self.storage.list_object_keys(bucket, prefix)
             
             print(f"[INFO] Found {len(objects)} objects with prefix '{prefix}'")
             return objects
@@ -1304,16 +2726,12 @@ class HTTP_SERVER():
                 
                 print(f"[INFO] Found {len(objects_to_delete)} objects to delete")
                 
-                # Delete all objects with this prefix
-                for obj_key in objects_to_delete:
-                    try:
-                        self.client.delete_object(Bucket=bucket, Key=obj_key)
-                        deleted_objects.append(obj_key)
-                        total_deleted += 1
-                        print(f"[INFO] Deleted object: {obj_key}")
-                    except Exception as e:
-                        print(f"[ERROR] Failed to delete object '{obj_key}': {str(e)}")
-                        # Continue with other objects even if one fails
+                # Delete all objects with this prefix, 1000 per storage call
+                result = await self.storage.delete_objects(bucket, objects_to_delete)
+                for error in result["errors"]:
+                    print(f"[ERROR] Failed to delete object '{error['Key']}': {error.get('Message')}")
+                deleted_objects.extend(result["deleted"])
+                total_deleted += len(result["deleted"])
                 
             else:
                 # It's a single file - try to delete it directly
@@ -1321,10 +2739,10 @@ class HTTP_SERVER():
                 
                 try:
                     # First check if the object exists
-                    self.client.head_object(Bucket=bucket, Key=key)
+                    await self.storage.head_object(bucket, key)
                     
                     # Delete the object
-                    self.client.delete_object(Bucket=bucket, Key=key)
+                    await self.storage.delete_object(bucket, key)
                     deleted_objects.append(key)
                     total_deleted = 1
                     print(f"[INFO] Successfully deleted file: {key}")
@@ -1346,15 +2764,12 @@ class HTTP_SERVER():
                     if objects_to_delete:
                         print(f"[INFO] Found {len(objects_to_delete)} objects with prefix '{folder_prefix}'. Deleting them.")
                         
-                        # Delete all objects with this prefix
-                        for obj_key in objects_to_delete:
-                            try:
-                                self.client.delete_object(Bucket=bucket, Key=obj_key)
-                                deleted_objects.append(obj_key)
-                                total_deleted += 1
-                                print(f"[INFO] Deleted object: {obj_key}")
-                            except Exception as e:
-                                print(f"[ERROR] Failed to delete object '{obj_key}': {str(e)}")
+                        # Delete all objects with this prefix, 1000 per storage call
+                        result = await self.storage.delete_objects(bucket, objects_to_delete)
+                        for error in result["errors"]:
+                            print(f"[ERROR] Failed to delete object '{error['Key']}': {error.get('Message')}")
+                        deleted_objects.extend(result["deleted"])
+                        total_deleted += len(result["deleted"])
                     else:
                         # No objects found, return error
                         return {"error": f"Object '{key}' not found in bucket '{bucket}'"}
@@ -1370,6 +2785,234 @@ class HTTP_SERVER():
             print(f"[ERROR] Exception occurred while deleting key '{key}' from bucket '{bucket}': {str(e)}")
             return {"error": str(e)}
 
+    # =============================================================================
+    # BATCH OBJECT OPERATIONS
+    # =============================================================================
+
+    @staticmethod
+    def is_missing_object(error: ClientError) -> bool:
+        code = error.response.get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey") or error.response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 404
+
+    async def headObjectsFromBlobStorage(self, bucket: str, keys: List[str], variant: str = ORIGINAL):
+        """
+        Metadata of several objects (or of their derivatives), looked up concurrently
+        on the storage pool.
+        
+        Args:
+            bucket: Bucket of the objects
+            keys: Full object keys
+            variant: ORIGINAL or a derivative variant
+            
+        Returns:
+            list: One metadata dict per key, in the same order
+        """
+        async def head(key):
+            metadata = {"key": key, "exists": False, "size_bytes": None, "etag": None,
+                        "content_type": None, "last_modified": None, "variant": variant}
+            try:
+                if variant == ORIGINAL:
+                    response = await self.storage.head_object(bucket, key)
+                else:
+                    try:
+                        response = await self.storage.head_object(self.frame_derivatives.bucket, self.frame_derivatives.key(key, variant))
+                    except ClientError as ce:
+                        if not self.is_missing_object(ce):
+                            raise
+                        # Not made yet: made on first retrieval, if the original exists
+                        await self.storage.head_object(bucket, key)
+                        metadata["exists"] = True
+                        return metadata
+            except ClientError as ce:
+                if self.is_missing_object(ce):
+                    return metadata
+                raise
+            last_modified = response.get("LastModified")
+            metadata.update({
+                "exists": True,
+                "size_bytes": response.get("ContentLength"),
+                "etag": (response.get("ETag") or "").strip('"'),
+                "content_type": response.get("ContentType"),
+                "last_modified": last_modified.isoformat() if last_modified else None
+            })
+            return metadata
+
+        return await asyncio.gather(*(head(key) for key in keys))
+
+    async def fetchImageForBatch(self, bucket: str, key: str, variant: str = ORIGINAL):
+        """
+        (header, get_object response) of one image of a batch response, the
+        derivative when asked for and one can be made, the original otherwise.
+        The body is left unread; the response is None when the image could not
+        be fetched.
+        """
+        header = {"key": key, "status": 200, "variant": ORIGINAL}
+        try:
+            response = None
+            if variant != ORIGINAL:
+                derived_key = await self.frame_derivatives.ensure(bucket, key, variant)
+                if derived_key is not None:
+                    response = await self.storage.get_object(self.frame_derivatives.bucket, derived_key)
+                    header["variant"] = variant
+            if response is None:
+                response = await self.storage.get_object(bucket, key)
+        except ClientError as ce:
+            header["status"] = 404 if self.is_missing_object(ce) else 500
+            return header, None
+        except Exception as e:
+            print(f"[ERROR] Failed to fetch '{key}' for a batch response: {str(e)}")
+            header["status"] = 500
+            return header, None
+
+        header.update({
+            "content_type": response.get("ContentType"),
+            "etag": (response.get("ETag") or "").strip('"')
+        })
+        return header, response
+
+    async def streamObjectsBatch(self, bucket: str, keys: List[str], variant: str = ORIGINAL):
+        """
+        Length-prefixed stream of several images: a JSON header line, then the
+        content, per key in order. The next batch_prefetch images are already
+        requested while one is sent, but only their responses are held: every body
+        is streamed chunk by chunk when its turn comes, so memory does not grow
+        with the size of the images.
+        """
+        pending = collections.deque()
+
+        async def send_part(index, task):
+            header, response = await task
+            header["index"] = index
+            header["size"] = response.get("ContentLength", 0) if response is not None else 0
+            yield (json.dumps(header) + "\n").encode("utf-8")
+            if response is None:
+                return
+            sent = 0
+            async for chunk in self.storage.iter_body(response["Body"]):
+                sent += len(chunk)
+                yield chunk
+            if sent != header["size"]:
+                # The length prefix can no longer be honoured, end the response instead
+                raise Exception(f"'{header['key']}' ended after {sent} of {header['size']} bytes")
+
+        try:
+            for index, key in enumerate(keys):
+                pending.append((index, asyncio.create_task(self.fetchImageForBatch(bucket, key, variant))))
+                if len(pending) >= self.batch_prefetch:
+                    async for piece in send_part(*pending.popleft()):
+                        yield piece
+            while pending:
+                async for piece in send_part(*pending.popleft()):
+                    yield piece
+        finally:
+            for _, task in pending:
+                task.cancel()
+            # Responses fetched for parts that were never sent still hold a connection
+            for _, task in pending:
+                if task.done() and not task.cancelled() and task.result()[1] is not None:
+                    task.result()[1]["Body"].close()
+
+    # =============================================================================
+    # STREAMING RETRIEVAL
+    # =============================================================================
+
+    async def streamObjectFromBlobStorage(self, request: Request, bucket: str, key: str, media_type: str, headers: dict = None):
+        """
+        Stream an object from blob storage in chunks, honoring the Range, If-Range,
+        If-None-Match and If-Modified-Since request headers.
+
+        The conditions are evaluated by the storage itself (get_object with Range,
+        IfMatch, IfNoneMatch, IfModifiedSince), so the common case is one call.
+
+        Args:
+            request: Incoming request, for its conditional and range headers
+            bucket: Source bucket name
+            key: File key/name
+            media_type: Content-Type of the response
+            headers: Extra response headers (e.g. Content-Disposition)
+
+        Returns:
+            StreamingResponse (200 or 206 Partial Content), 304 Not Modified,
+            416 Range Not Satisfiable, or a JSON error response (404 if not found)
+        """
+        bucket_created = await self.ensure_bucket_exists(bucket)
+        if not bucket_created:
+            return JSONResponse(content={"error": f"Failed to create bucket '{bucket}'"}, status_code=404)
+
+        conditions = {}
+        if_none_match = request.headers.get("if-none-match")
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_none_match:
+            conditions["IfNoneMatch"] = if_none_match
+        elif if_modified_since:
+            # If-Modified-Since is ignored when If-None-Match is present
+            try:
+                conditions["IfModifiedSince"] = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                pass
+
+        # A single byte range is forwarded, multiple ranges are answered with the whole object
+        range_conditions = {}
+        range_header = (request.headers.get("range") or "").strip()
+        if range_header.startswith("bytes=") and "," not in range_header:
+            range_conditions["Range"] = range_header
+            if_range = (request.headers.get("if-range") or "").strip()
+            if if_range.startswith('"'):
+                range_conditions["IfMatch"] = if_range
+            elif if_range.startswith("W/"):
+                # Weak validators never match If-Range, send the whole object
+                range_conditions = {}
+            elif if_range:
+                try:
+                    range_conditions["IfUnmodifiedSince"] = parsedate_to_datetime(if_range)
+                except (TypeError, ValueError):
+                    range_conditions = {}
+
+        try:
+            try:
+                response = await self.storage.get_object(bucket, key, **conditions, **range_conditions)
+            except ClientError as ce:
+                # If-Range did not match: the object changed, send all of it
+                if range_conditions and ce.response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 412:
+                    response = await self.storage.get_object(bucket, key, **conditions)
+                else:
+                    raise
+        except ClientError as ce:
+            metadata = ce.response.get("ResponseMetadata", {})
+            http_status = metadata.get("HTTPStatusCode")
+            code = ce.response.get("Error", {}).get("Code")
+            if http_status == 304:
+                upstream_headers = metadata.get("HTTPHeaders", {})
+                validators = {name: upstream_headers[name.lower()] for name in ("ETag", "Last-Modified") if name.lower() in upstream_headers}
+                return Response(status_code=304, headers=validators)
+            if http_status == 416 or code == "InvalidRange":
+                head = await self.storage.head_object(bucket, key)
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{head.get('ContentLength', 0)}"})
+            if http_status == 404 or code in ("404", "NoSuchKey"):
+                return JSONResponse(content={"error": str(ce)}, status_code=404)
+            return JSONResponse(content={"error": str(ce)}, status_code=500)
+        except Exception as e:
+            return JSONResponse(content={"error": str(e)}, status_code=500)
+
+        response_headers = {
+            "Content-Length": str(response["ContentLength"]),
+            "Accept-Ranges": "bytes",
+        }
+        if response.get("ETag"):
+            response_headers["ETag"] = response["ETag"]
+        if response.get("LastModified"):
+            response_headers["Last-Modified"] = format_datetime(response["LastModified"], usegmt=True)
+        if response.get("ContentRange"):
+            response_headers["Content-Range"] = response["ContentRange"]
+        response_headers.update(headers or {})
+
+        return StreamingResponse(
+            self.storage.iter_body(response["Body"]),
+            status_code=206 if response.get("ContentRange") else 200,
+            media_type=media_type,
+            headers=response_headers
+        )
+
     # =============================================================================
     # SERVER LIFECYCLE METHODS
     # =============================================================================
@@ -1400,6 +3043,10 @@ class Data():
         self.uploadedImages = {}
         self.imageMetadata = {}
         self.storageStats = {}
+        # Open resumable upload sessions, by session id
+        self.upload_sessions = UploadSessionTable()
+        # Open deduplicated blend uploads, by upload id
+        self.chunked_uploads = {}
 
     def get_value(self):
         """Get value from data storage (placeholder implementation)"""
@@ -1430,7 +3077,10 @@ class Service():
         Returns:
             None
         """
+        await self.httpServer.initialize_default_buckets()
         await self.httpServer.configure_routes()
+        asyncio.create_task(self.httpServer.runUploadSessionJanitor())
+        asyncio.create_task(self.httpServer.runTempJanitor())
         await self.httpServer.run_app()
 
 
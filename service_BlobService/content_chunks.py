@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional
+
+# Content-defined chunking. A chunk ends right after an anchor: a run of ANCHOR_RUN
+# bytes that all belong to ANCHOR_BYTES, a fixed pseudo-random half of the byte
+# values (0x00 and 0xFF, the usual padding, excluded). Boundaries depend only on the
+# bytes right before them, so an edit in the middle of a blend file changes the
+# chunks around the edit and leaves every other chunk, and its SHA-256, unchanged.
+# Anchors are found with bytes.translate and bytes.find, so chunking runs at C speed
+# instead of a per-byte rolling hash loop in Python.
+#
+# Clients that deduplicate before uploading must cut exactly the same chunks: byte b
+# is in ANCHOR_BYTES when the first byte of SHA-256(b"neuralperk-anchor-" + str(b))
+# is odd, and the sizes below apply.
+
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+# On uniform content an anchor run occurs about every 700 KiB past the minimum size, so chunks average about 1 MiB
+ANCHOR_RUN = 19
+
+ANCHOR_BYTES = frozenset(
+    byte for byte in range(1, 255)
+    if hashlib.sha256(b"neuralperk-anchor-" + str(byte).encode()).digest()[0] & 1
+)
+_ANCHOR_TABLE = bytes(1 if byte in ANCHOR_BYTES else 0 for byte in range(256))
+_ANCHOR = b"\x01" * ANCHOR_RUN
+
+
+def cut_points(data: bytes, final: bool) -> List[int]:
+    """
+    End offsets of the chunks of data. Without final, only chunks that cannot change
+    when more data follows are cut; the tail after the last cut is left for the next call.
+    """
+    marks = data.translate(_ANCHOR_TABLE)
+    cuts = []
+    start = 0
+    length = len(data)
+
+    while start < length:
+        if not final and length - start < MAX_CHUNK_SIZE:
+            break
+        end = min(length, start + MAX_CHUNK_SIZE)
+        if end - start <= MIN_CHUNK_SIZE:
+            cuts.append(end)
+            break
+
+        # The anchor run must end at or after the minimum chunk size
+        found = marks.find(_ANCHOR, start + MIN_CHUNK_SIZE - ANCHOR_RUN, end)
+        cut = found + ANCHOR_RUN if found >= 0 else end
+        cuts.append(cut)
+        start = cut
+
+    return cuts
+
+
+async def content_chunks(stream: AsyncIterable[bytes], storage, block_size: int = 4 * MAX_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Cut an async stream of bytes into content-defined chunks, boundaries computed on the storage pool."""
+    buffer = bytearray()
+
+    async def drain(final: bool):
+        data = bytes(buffer)
+        cuts = await storage.run(cut_points, data, final)
+        start = 0
+        for cut in cuts:
+            yield data[start:cut]
+            start = cut
+        del buffer[:start]
+
+    async for block in stream:
+        buffer += block
+        if len(buffer) >= block_size:
+            async for chunk in drain(False):
+                yield chunk
+
+    async for chunk in drain(True):
+        yield chunk
+
+
+def dedup_stats(chunks: List[dict], new_hashes: Iterable[str]) -> dict:
+    """Dedup ratio and bytes saved of an upload: chunks already stored were not sent or stored again."""
+    new_hashes = set(new_hashes)
+    total_bytes = sum(chunk["size"] for chunk in chunks)
+    new_bytes = sum({chunk["hash"]: chunk["size"] for chunk in chunks if chunk["hash"] in new_hashes}.values())
+    return {
+        "chunk_count": len(chunks),
+        "new_chunks": len(new_hashes),
+        "reused_chunks": len(chunks) - len(new_hashes),
+        "total_bytes": total_bytes,
+        "new_bytes": new_bytes,
+        "bytes_saved": total_bytes - new_bytes,
+        "dedup_ratio": round((total_bytes - new_bytes) / total_bytes, 4) if total_bytes else 0.0
+    }
+
+
+# =============================================================================
+# BLEND CHUNK STORE - CONTENT ADDRESSED CHUNKS AND MANIFESTS
+# =============================================================================
+
+class BlendChunkStore:
+    """
+    Content-defined chunks of blend files, stored once each under chunks/<sha256>,
+    and one manifest per blend file under manifests/<blendFileHash>.json listing its
+    chunks in order. The full blend file stays in its usual bucket and key, so every
+    existing download path keeps working; the chunks let uploads skip content the
+    server already has and let volunteers fetch only the chunks a new version changed.
+    """
+
+    def __init__(self, storage, bucket: str = "blend-chunks", check_concurrency: int = 16):
+        """
+        Args:
+            storage: AsyncStorage of the blob service
+            bucket (str): Bucket holding chunks and manifests
+            check_concurrency (int): Chunk existence checks sent at the same time
+        """
+        self.storage = storage
+        self.bucket = bucket
+        self.check_concurrency = check_concurrency
+        # Chunks are immutable, so a chunk seen once in storage is known to exist for good
+        self.known_chunks = set()
+
+    @staticmethod
+    def blend_file_hash(key: str) -> str:
+        """blendFileHash of a blend file, which the mongo service derives from its blend-files key (the path)."""
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def chunk_key(self, chunk_hash: str) -> str:
+        return f"chunks/{chunk_hash}"
+
+    def manifest_key(self, blend_file_hash: str) -> str:
+        return f"manifests/{blend_file_hash}.json"
+
+    # -------- Chunks -------- #
+
+    async def missing_chunks(self, chunk_hashes: Iterable[str]) -> List[str]:
+        """Hashes, in first-seen order, of the chunks not stored yet."""
+        unknown = [h for h in dict.fromkeys(chunk_hashes) if h not in self.known_chunks]
+        slots = asyncio.Semaphore(self.check_concurrency)
+
+        async def exists(chunk_hash: str) -> bool:
+            async with slots:
+                try:
+                    await self.storage.head_object(self.bucket, self.chunk_key(chunk_hash))
+                except Exception:
+                    return False
+            self.known_chunks.add(chunk_hash)
+            return True
+
+        found = await asyncio.gather(*(exists(chunk_hash) for chunk_hash in unknown))
+        return [chunk_hash for chunk_hash, present in zip(unknown, found) if not present]
+
+    async def put_chunk(self, chunk_hash: str, data: bytes) -> bool:
+        """Store a chunk after checking its hash. Returns False if it was stored already."""
+        digest = await self.storage.run(lambda: hashlib.sha256(data).hexdigest())
+        if digest != chunk_hash:
+            raise ValueError(f"Chunk content does not match its hash {chunk_hash}")
+        if not await self.missing_chunks([chunk_hash]):
+            return False
+        await self.storage.put_object(self.bucket, self.chunk_key(chunk_hash), data)
+        self.known_chunks.add(chunk_hash)
+        return True
+
+    async def get_chunk(self, chunk_hash: str) -> bytes:
+        return await self.storage.get_object_bytes(self.bucket, self.chunk_key(chunk_hash))
+
+    # -------- Manifests -------- #
+
+    async def save_manifest(self, manifest: dict):
+        await self.storage.put_object(
+            self.bucket, self.manifest_key(manifest["blend_file_hash"]),
+            json.dumps(manifest).encode(), ContentType="application/json"
+        )
+
+    async def load_manifest(self, blend_file_hash: str) -> Optional[dict]:
+        try:
+            return json.loads(await self.storage.get_object_bytes(self.bucket, self.manifest_key(blend_file_hash)))
+        except Exception:
+            return None
+
+    def build_manifest(self, bucket: str, key: str, chunks: List[dict], sha256: str, stats: dict) -> dict:
+        """Manifest of a stored blend file; chunks must hold the sizes of the stored chunks."""
+        return {
+            "blend_file_hash": self.blend_file_hash(key),
+            "bucket": bucket,
+            "key": key,
+            "size": sum(chunk["size"] for chunk in chunks),
+            "sha256": sha256,
+            "chunks": chunks,
+            "stats": stats,
+            "created_at": time.time()
+        }
+
+    # -------- Blend files -------- #
+
+    async def index_object(self, bucket: str, key: str) -> dict:
+        """
+        Chunk a stored blend file, store the chunks the server does not have yet and
+        save its manifest. Used for blend files uploaded whole.
+        """
+        response = await self.storage.get_object(bucket, key)
+        hasher = hashlib.sha256()
+        chunks = []
+        new_hashes = set()
+
+        async for chunk in content_chunks(self.storage.iter_body(response["Body"]), self.storage):
+            await self.storage.run(hasher.update, chunk)
+            chunk_hash = await self.storage.run(lambda: hashlib.sha256(chunk).hexdigest())
+            chunks.append({"hash": chunk_hash, "size": len(chunk)})
+            if chunk_hash not in new_hashes and await self.put_chunk(chunk_hash, chunk):
+                new_hashes.add(chunk_hash)
+
+        manifest = self.build_manifest(bucket, key, chunks, hasher.hexdigest(), dedup_stats(chunks, new_hashes))
+        await self.save_manifest(manifest)
+        return manifest
+
+    async def assemble_object(self, bucket: str, key: str, chunks: List[dict], prefetch: int = 4) -> dict:
+        """
+        Write the blend file of a list of chunks to bucket/key, reading up to
+        `prefetch` chunks ahead. The size of every chunk is checked against the
+        stored chunk, the upload is aborted on a mismatch.
+
+        Returns:
+            dict: {"size_bytes", "sha256", "parts", "chunks"} with "chunks" the
+            [{"hash", "size"}] of the stored chunks
+
+        Raises:
+            ValueError: If a chunk's size is not the size of the stored chunk
+        """
+        async def read_chunks() -> AsyncIterator[bytes]:
+            pending: Dict[int, asyncio.Task] = {}
+            try:
+                for index in range(len(chunks)):
+                    for ahead in range(index, min(len(chunks), index + prefetch)):
+                        if ahead not in pending:
+                            pending[ahead] = asyncio.create_task(self.get_chunk(chunks[ahead]["hash"]))
+                    data = await pending.pop(index)
+                    if len(data) != chunks[index]["size"]:
+                        raise ValueError(f"Chunk {index} ({chunks[index]['hash']}) is {len(data)} bytes, not {chunks[index]['size']}")
+                    yield data
+            finally:
+                for task in pending.values():
+                    task.cancel()
+
+        result = await self.storage.upload_stream(bucket, key, read_chunks(), content_type="application/octet-stream")
+        result["chunks"] = [{"hash": chunk["hash"], "size": chunk["size"]} for chunk in chunks]
+        return result
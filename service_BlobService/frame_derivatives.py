@@ -0,0 +1,184 @@
+import asyncio
+import functools
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+try:
+    from PIL import Image, features
+except ImportError:
+    # Without Pillow no derivative is made and the original frames are served instead
+    Image = None
+    features = None
+
+
+# Downscaled versions of rendered frames: the longest side is at most max_side pixels
+VARIANTS = {
+    "thumbnail": {"max_side": 320, "quality": 70},
+    "preview": {"max_side": 1280, "quality": 82},
+}
+ORIGINAL = "original"
+
+
+def derivatives_available() -> bool:
+    return Image is not None
+
+
+@functools.lru_cache(maxsize=1)
+def output_format() -> tuple:
+    """(Pillow format, extension, content type): WebP when Pillow was built with it, JPEG otherwise."""
+    if features is not None and features.check("webp"):
+        return "WEBP", "webp", "image/webp"
+    return "JPEG", "jpg", "image/jpeg"
+
+
+def render_derivatives(content: bytes, variants: dict = VARIANTS) -> Dict[str, bytes]:
+    """
+    Encoded downscaled versions of an encoded image, one per variant. The image is
+    decoded once and each variant is made from the next larger one. Blocking and
+    CPU bound, run it on the derivative pool. Raises if Pillow cannot decode the
+    format (e.g. EXR).
+    """
+    image_format, _, _ = output_format()
+    largest_side = max(settings["max_side"] for settings in variants.values())
+    rendered = {}
+    with Image.open(io.BytesIO(content)) as image:
+        # JPEG sources are decoded at a reduced scale straight away
+        image.draft("RGB", (largest_side, largest_side))
+        image.load()
+        if image.mode not in ("RGB", "RGBA") or (image.mode == "RGBA" and image_format == "JPEG"):
+            image = image.convert("RGB")
+
+        for variant, settings in sorted(variants.items(), key=lambda item: -item[1]["max_side"]):
+            side = settings["max_side"]
+            image.thumbnail((side, side), Image.LANCZOS, reducing_gap=3.0)
+            output = io.BytesIO()
+            if image_format == "WEBP":
+                image.save(output, image_format, quality=settings["quality"], method=4)
+            else:
+                image.save(output, image_format, quality=settings["quality"], optimize=True)
+            rendered[variant] = output.getvalue()
+    return rendered
+
+
+# =============================================================================
+# FRAME DERIVATIVES - THUMBNAILS AND PREVIEWS OF RENDERED FRAMES
+# =============================================================================
+
+class FrameDerivatives:
+    """
+    Thumbnails and web previews of rendered frames, stored in their own bucket
+    under the key of the frame (so deleting a customer/object prefix works the
+    same way there), e.g. rendered-frames/c/o/001.png has its thumbnail at
+    frame-previews/c/o/001.png.thumbnail.webp.
+
+    Derivatives are made in the background when a frame is stored (schedule), and
+    lazily on first request otherwise (ensure); concurrent requests for the same
+    missing derivative share one rendering. Image work runs on its own pool so it
+    never holds up storage calls.
+    """
+
+    def __init__(self, storage, bucket: str = "frame-previews", workers: int = None, queue_limit: int = 256):
+        """
+        Args:
+            storage: AsyncStorage
+            bucket (str): Bucket the derivatives are stored in
+            workers (int): Frames rendered at the same time (CPU count by default)
+            queue_limit (int): Frames waiting for background rendering before new ones are left to lazy rendering
+        """
+        self.storage = storage
+        self.bucket = bucket
+        self.workers = workers or os.cpu_count() or 4
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="frame-derivatives")
+        self.queue_limit = queue_limit
+        self.slots = asyncio.Semaphore(self.workers)
+        self.queued = 0
+        self.renders: Dict[tuple, asyncio.Task] = {}
+
+    def key(self, key: str, variant: str) -> str:
+        _, extension, _ = output_format()
+        return f"{key}.{variant}.{extension}"
+
+    def content_type(self) -> str:
+        return output_format()[2]
+
+    async def generate(self, bucket: str, key: str) -> Dict[str, str]:
+        """
+        Read a frame once and store every variant of it.
+
+        Returns:
+            dict: variant -> derivative key
+        """
+        async with self.slots:
+            content = await self.storage.get_object_bytes(bucket, key)
+            loop = asyncio.get_running_loop()
+            rendered = await loop.run_in_executor(self.executor, render_derivatives, content)
+
+        keys = {variant: self.key(key, variant) for variant in rendered}
+        await asyncio.gather(*(
+            self.storage.put_object(self.bucket, keys[variant], derived, ContentType=self.content_type())
+            for variant, derived in rendered.items()
+        ))
+        return keys
+
+    def schedule(self, bucket: str, key: str):
+        """Make the derivatives of a newly stored frame in the background."""
+        if not derivatives_available():
+            return
+        if self.queued >= self.queue_limit:
+            # Backlog is full: these are made on first request instead, once the
+            # ones of a frame stored before under the same key are gone
+            asyncio.create_task(self.discard(key))
+            return
+
+        async def run():
+            try:
+                await self._shared_render(bucket, key)
+            except Exception as e:
+                print(f"Warning: Could not make derivatives of '{key}': {str(e)}")
+            finally:
+                self.queued -= 1
+
+        self.queued += 1
+        asyncio.create_task(run())
+
+    async def _shared_render(self, bucket: str, key: str) -> Dict[str, str]:
+        render_key = (bucket, key)
+        render = self.renders.get(render_key)
+        if render is None:
+            render = asyncio.create_task(self.generate(bucket, key))
+            self.renders[render_key] = render
+            render.add_done_callback(lambda _: self.renders.pop(render_key, None))
+        return await asyncio.shield(render)
+
+    async def ensure(self, bucket: str, key: str, variant: str) -> Optional[str]:
+        """
+        Key of a derivative in self.bucket, rendered now if it does not exist yet.
+        None when derivatives cannot be made (no Pillow, undecodable format).
+        """
+        if not derivatives_available() or variant not in VARIANTS:
+            return None
+        derived_key = self.key(key, variant)
+        try:
+            await self.storage.head_object(self.bucket, derived_key)
+            return derived_key
+        except Exception:
+            pass
+
+        try:
+            keys = await self._shared_render(bucket, key)
+        except Exception as e:
+            print(f"Warning: Could not make derivatives of '{key}': {str(e)}")
+            return None
+        return keys.get(variant)
+
+    async def discard(self, key: str):
+        for variant in VARIANTS:
+            try:
+                await self.storage.delete_object(self.bucket, self.key(key, variant))
+            except Exception as e:
+                print(f"Warning: Could not delete {variant} of '{key}': {str(e)}")
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,109 @@
+import collections
+import time
+from typing import Dict, Optional, Set, Tuple
+
+
+# Requested expirations are rounded up to one of these lifetimes, so requests for
+# nearly the same expiration share one signed URL (longer ones are kept as asked)
+EXPIRATION_CLASSES = (300, 900, 3600, 6 * 3600, 24 * 3600, 7 * 24 * 3600)
+
+
+def expiration_class(expiration: int) -> int:
+    """Lifetime a signed URL requested for expiration seconds is issued with."""
+    for lifetime in EXPIRATION_CLASSES:
+        if expiration <= lifetime:
+            return lifetime
+    return expiration
+
+
+# =============================================================================
+# SIGNED URL CACHE - REUSE OF DOWNLOAD URLS WHILE THEY ARE FRESH
+# =============================================================================
+
+class SignedUrlCache:
+    """
+    Signed download URLs by (bucket, key, object ETag, expiration class), so a
+    client polling for the same object gets the same URL back instead of a new
+    signature (and a bucket check and HEAD) on every request.
+
+    A URL is handed out again while at least reuse_fraction of its lifetime is
+    left, which guarantees every caller that much time to use it. The ETag of an
+    object is trusted for etag_ttl seconds before it is looked up again; writes
+    made through this service invalidate the object right away (invalidate),
+    the ETag lookup catches the ones made directly against storage.
+    """
+
+    def __init__(self, max_entries: int = 10000, reuse_fraction: float = 0.5, etag_ttl: float = 30):
+        """
+        Args:
+            max_entries (int): URLs kept, the least recently used are dropped first
+            reuse_fraction (float): Share of its lifetime a URL must have left to be reused
+            etag_ttl (float): Seconds the known ETag of an object is trusted
+        """
+        self.max_entries = max(max_entries, 1)
+        self.reuse_fraction = min(max(reuse_fraction, 0.0), 1.0)
+        self.etag_ttl = etag_ttl
+        self.entries = collections.OrderedDict()  # (bucket, key, etag, lifetime) -> (url, expires_at)
+        self.entries_by_object: Dict[Tuple[str, str], Set[tuple]] = {}
+        self.etags: Dict[Tuple[str, str], Tuple[str, float]] = {}  # (bucket, key) -> (etag, looked up at)
+        self.stats = collections.Counter()  # "hits", "misses", "expired", "invalidated", "etag_lookups"
+
+    def known_etag(self, bucket: str, key: str) -> Optional[str]:
+        """ETag of the object if it was looked up less than etag_ttl seconds ago."""
+        known = self.etags.get((bucket, key))
+        if known is None or time.monotonic() - known[1] >= self.etag_ttl:
+            return None
+        return known[0]
+
+    def remember_etag(self, bucket: str, key: str, etag: str):
+        self.stats["etag_lookups"] += 1
+        known = self.etags.get((bucket, key))
+        if known is not None and known[0] != etag:
+            # Overwritten without going through this service
+            self.invalidate(bucket, key)
+        self.etags[(bucket, key)] = (etag, time.monotonic())
+
+    def get(self, bucket: str, key: str, etag: str, lifetime: int) -> Optional[Tuple[str, float]]:
+        """(url, expires_at) of a cached URL with enough lifetime left, None otherwise."""
+        entry_key = (bucket, key, etag, lifetime)
+        entry = self.entries.get(entry_key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        if entry[1] - time.time() < self.reuse_fraction * lifetime:
+            self._drop(entry_key)
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+        self.entries.move_to_end(entry_key)
+        self.stats["hits"] += 1
+        return entry
+
+    def put(self, bucket: str, key: str, etag: str, lifetime: int, url: str, expires_at: float):
+        entry_key = (bucket, key, etag, lifetime)
+        self.entries[entry_key] = (url, expires_at)
+        self.entries.move_to_end(entry_key)
+        self.entries_by_object.setdefault((bucket, key), set()).add(entry_key)
+        while len(self.entries) > self.max_entries:
+            self._drop(next(iter(self.entries)))
+
+    def invalidate(self, bucket: str, key: str):
+        """Forget the URLs and the ETag of an object that was written or deleted."""
+        self.etags.pop((bucket, key), None)
+        entry_keys = self.entries_by_object.pop((bucket, key), ())
+        for entry_key in entry_keys:
+            self.entries.pop(entry_key, None)
+        self.stats["invalidated"] += len(entry_keys)
+
+    def _drop(self, entry_key: tuple):
+        self.entries.pop(entry_key, None)
+        object_entries = self.entries_by_object.get(entry_key[:2])
+        if object_entries is not None:
+            object_entries.discard(entry_key)
+            if not object_entries:
+                del self.entries_by_object[entry_key[:2]]
+                self.etags.pop(entry_key[:2], None)
+
+    def summary(self) -> dict:
+        return {"entries": len(self.entries), **{name: self.stats[name] for name in
+                ("hits", "misses", "expired", "invalidated", "etag_lookups")}}
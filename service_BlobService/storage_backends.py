@@ -0,0 +1,814 @@
+import datetime
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import shutil
+import struct
+import threading
+import time
+import uuid
+from email.utils import format_datetime
+from typing import Iterator, List, Optional
+from urllib.parse import quote, unquote
+
+from botocore.exceptions import ClientError
+
+# S3 rejects multipart parts smaller than this, except the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+# =============================================================================
+# STORAGE BACKEND INTERFACE
+# =============================================================================
+
+class StorageBackend:
+    """
+    What the Blob Service needs from object storage: the subset of the boto3 S3
+    client API below, with the same arguments, responses and errors (botocore
+    ClientError with the S3 error code and HTTP status). AsyncStorage runs these
+    calls on its thread pool, so implementations are blocking and thread safe.
+
+    The boto3 S3 client is the S3 implementation as is (create_storage_backend("s3"));
+    LocalFilesystemBackend stores objects on local disk for single node
+    deployments and load tests without MinIO.
+
+        put_object, upload_fileobj, get_object (Range, IfMatch, IfNoneMatch,
+        IfModifiedSince, IfUnmodifiedSince; Body with read / close), head_object,
+        copy_object, delete_object, delete_objects, list_objects_v2,
+        create_multipart_upload, upload_part, upload_part_copy (CopySourceIfMatch),
+        complete_multipart_upload, abort_multipart_upload, list_multipart_uploads,
+        get_paginator("list_objects_v2" / "list_multipart_uploads"),
+        head_bucket, create_bucket, list_buckets, generate_presigned_url
+    """
+
+    OPERATIONS = (
+        "put_object", "upload_fileobj", "get_object", "head_object", "copy_object", "delete_object",
+        "delete_objects", "list_objects_v2", "create_multipart_upload", "upload_part", "upload_part_copy",
+        "complete_multipart_upload", "abort_multipart_upload", "list_multipart_uploads", "get_paginator",
+        "head_bucket", "create_bucket", "list_buckets", "generate_presigned_url",
+    )
+
+    @classmethod
+    def implemented_by(cls, backend) -> bool:
+        return all(callable(getattr(backend, operation, None)) for operation in cls.OPERATIONS)
+
+
+def create_storage_backend(kind: str, endpoint: str = None, access_key: str = None, secret_key: str = None,
+                           max_pool_connections: int = 32, root: str = None, public_url: str = None):
+    """
+    Storage backend for BLOB_STORAGE_BACKEND:
+
+        "s3":    boto3 client for an S3 compatible endpoint (MinIO)
+        "local": LocalFilesystemBackend under root; presigned URLs point at public_url
+                 and are signed with secret_key
+    """
+    if kind == "local":
+        return LocalFilesystemBackend(root, secret_key or "", public_url or "")
+    if kind != "s3":
+        raise ValueError(f"Unknown storage backend '{kind}', expected 's3' or 'local'")
+
+    import boto3
+    from botocore.client import Config
+
+    return boto3.client(
+        "s3",
+        endpoint_url=endpoint,
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        config=Config(signature_version="s3v4", max_pool_connections=max_pool_connections),
+        region_name="us-east-1"
+    )
+
+
+# =============================================================================
+# LOCAL FILESYSTEM BACKEND
+# =============================================================================
+
+# Object files end with their metadata: <data><metadata json><json length: 4 bytes><magic>
+_TRAILER = struct.Struct(">I4s")
+_MAGIC = b"NPK1"
+_COPY_CHUNK = 8 * 1024 * 1024
+_PAGE_SIZE = 1000
+# Longest file name used for a key component; longer ones are stored under their hash
+_MAX_NAME = 200
+
+
+def _client_error(code: str, message: str, status: int, operation: str, headers: dict = None) -> ClientError:
+    return ClientError(
+        {"Error": {"Code": code, "Message": message}, "ResponseMetadata": {"HTTPStatusCode": status, "HTTPHeaders": headers or {}}},
+        operation
+    )
+
+
+def _bare_etag(etag: str) -> str:
+    etag = etag.strip()
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    return etag.strip('"')
+
+
+def _copy_range(source, destination, offset: int, length: int):
+    """Copy length bytes from offset of one open file to the end of another, in the kernel where possible."""
+    try:
+        while length > 0:
+            sent = os.sendfile(destination.fileno(), source.fileno(), offset, min(length, 0x7FFFF000))
+            if sent == 0:
+                raise EOFError("Source object is shorter than its metadata says")
+            offset += sent
+            length -= sent
+    except (AttributeError, OSError):
+        # No file to file sendfile on this platform
+        source.seek(offset)
+        while length > 0:
+            chunk = source.read(min(length, _COPY_CHUNK))
+            if not chunk:
+                raise EOFError("Source object is shorter than its metadata says")
+            destination.write(chunk)
+            length -= len(chunk)
+
+
+class LocalObjectBody:
+    """get_object Body over a byte range of an open object file."""
+
+    def __init__(self, file, offset: int, length: int):
+        self._file = file
+        self._file.seek(offset)
+        self._remaining = length
+
+    def read(self, amt: int = None) -> bytes:
+        if self._remaining <= 0:
+            return b""
+        size = self._remaining if amt is None or amt < 0 else min(amt, self._remaining)
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def iter_chunks(self, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        self._file.close()
+
+
+class _Paginator:
+    def __init__(self, backend, operation: str):
+        self.backend = backend
+        self.operation = operation
+
+    def paginate(self, **kwargs):
+        if self.operation == "list_objects_v2":
+            # One walk of the prefix for every page
+            bucket, prefix = kwargs["Bucket"], kwargs.get("Prefix", "")
+            page_size = kwargs.get("PaginationConfig", {}).get("PageSize") or kwargs.get("MaxKeys") or _PAGE_SIZE
+            objects = self.backend._list(bucket, prefix, kwargs.get("StartAfter"))
+            page = list(itertools.islice(objects, page_size))
+            while True:
+                following = list(itertools.islice(objects, page_size))
+                yield self.backend._list_page(bucket, prefix, page, bool(following), page_size)
+                if not following:
+                    return
+                page = following
+        elif self.operation == "list_multipart_uploads":
+            yield self.backend.list_multipart_uploads(**kwargs)
+        else:
+            raise ValueError(f"No paginator for '{self.operation}'")
+
+
+class LocalFilesystemBackend(StorageBackend):
+    """
+    Objects stored as files on local disk, behind the S3 client API.
+
+    Layout: the "/"-separated components of a key are directories, so the objects
+    under a prefix share a directory and listing a prefix only reads that
+    directory tree, e.g. customer/object/001.png is stored at
+    <root>/<bucket>/d_customer/d_object/o_001.png. Components are percent-encoded
+    (d_ for directories, o_ for objects, so "a" and "a/b" can both exist);
+    components too long for a file name are stored as hd_/ho_<sha256>, with the
+    component in a .component file of the directory and the key in the object.
+    The object metadata (key, size, ETag, content type, user metadata) is stored
+    after the data in the same file. Every write goes to <bucket>/.tmp first and is moved in place with
+    os.replace, so readers see the old object or the new one, never a partial
+    file, and an open object keeps reading the version it opened. Copies and
+    multipart completion move bytes file to file with os.sendfile. Multipart
+    parts live in <bucket>/.uploads/<upload id>/ until completed or aborted.
+
+    Presigned URLs point at public_url + /api/blob-service/storage/<bucket>/<key>
+    and carry an HMAC-SHA256 signature, checked by verify_presigned_url.
+    """
+
+    def __init__(self, root: str, secret_key: str = "", public_url: str = "", fsync: bool = False):
+        """
+        Args:
+            root (str): Directory holding one directory per bucket
+            secret_key (str): Key presigned URLs are signed with
+            public_url (str): Base URL of the Blob Service as seen by presigned URL users
+            fsync (bool): fsync every object before it is moved in place
+        """
+        self.root = os.path.abspath(root or "blob-storage-data")
+        self.secret_key = secret_key.encode()
+        self.public_url = public_url.rstrip("/")
+        self.fsync = fsync
+        self._bucket_lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._migrate_hashed_layout()
+
+    # -------- Paths and object files -------- #
+
+    def _bucket_path(self, bucket: str, operation: str) -> str:
+        if not bucket or "/" in bucket or bucket.startswith("."):
+            raise _client_error("InvalidBucketName", f"Invalid bucket name '{bucket}'", 400, operation)
+        path = os.path.join(self.root, bucket)
+        if not os.path.isdir(path):
+            raise _client_error("NoSuchBucket", f"Bucket '{bucket}' does not exist", 404, operation)
+        return path
+
+    @staticmethod
+    def _entry_name(kind: str, component: str) -> str:
+        """File name of a key component: kind "d" for a directory, "o" for an object."""
+        name = f"{kind}_{quote(component, safe='')}"
+        if len(name) <= _MAX_NAME:
+            return name
+        return f"h{kind}_{hashlib.sha256(component.encode('utf-8')).hexdigest()}"
+
+    def _object_path(self, bucket: str, key: str, operation: str) -> str:
+        *directories, leaf = key.split("/")
+        return os.path.join(
+            self._bucket_path(bucket, operation),
+            *(self._entry_name("d", component) for component in directories),
+            self._entry_name("o", leaf)
+        )
+
+    def _make_directories(self, bucket_path: str, key: str):
+        """Create the directories of a key, recording the components stored under their hash."""
+        path = bucket_path
+        for component in key.split("/")[:-1]:
+            name = self._entry_name("d", component)
+            path = os.path.join(path, name)
+            os.makedirs(path, exist_ok=True)
+            if name.startswith("hd_") and not os.path.exists(os.path.join(path, ".component")):
+                with open(os.path.join(path, ".component"), "w", encoding="utf-8") as component_file:
+                    component_file.write(component)
+
+    def _remove_empty_directories(self, bucket_path: str, directory: str):
+        """Remove the directories of a deleted object that are left empty, deepest first."""
+        while directory != bucket_path and directory.startswith(bucket_path):
+            component_path = os.path.join(directory, ".component")
+            component = None
+            if os.path.basename(directory).startswith("hd_"):
+                try:
+                    with open(component_path, encoding="utf-8") as component_file:
+                        component = component_file.read()
+                    if os.listdir(directory) != [".component"]:
+                        return
+                    os.remove(component_path)
+                except OSError:
+                    return
+            try:
+                os.rmdir(directory)
+            except OSError:
+                if component is not None:
+                    # Written to in the meantime, keep its component
+                    with open(component_path, "w", encoding="utf-8") as component_file:
+                        component_file.write(component)
+                return
+            directory = os.path.dirname(directory)
+
+    def _migrate_hashed_layout(self):
+        """Move objects stored at <bucket>/<aa>/<bb>/<sha256 of key> (the earlier layout) to their key path."""
+        for bucket in os.scandir(self.root):
+            if not bucket.is_dir() or bucket.name.startswith("."):
+                continue
+            for shard in os.scandir(bucket.path):
+                if not shard.is_dir() or len(shard.name) != 2 or shard.name.strip("0123456789abcdef"):
+                    continue
+                for sub_shard in os.scandir(shard.path):
+                    for entry in os.scandir(sub_shard.path):
+                        try:
+                            with open(entry.path, "rb") as file:
+                                key = self._read_metadata(file)["key"]
+                        except (OSError, ValueError):
+                            continue
+                        self._make_directories(bucket.path, key)
+                        os.replace(entry.path, self._object_path(bucket.name, key, "Migrate"))
+                shutil.rmtree(shard.path, ignore_errors=True)
+
+    def _temp_path(self, bucket: str, operation: str) -> str:
+        return os.path.join(self._bucket_path(bucket, operation), ".tmp", uuid.uuid4().hex)
+
+    @staticmethod
+    def _read_metadata(file) -> dict:
+        file.seek(-_TRAILER.size, os.SEEK_END)
+        length, magic = _TRAILER.unpack(file.read(_TRAILER.size))
+        if magic != _MAGIC:
+            raise ValueError("Not an object file")
+        file.seek(-_TRAILER.size - length, os.SEEK_END)
+        return json.loads(file.read(length))
+
+    def _open_object(self, bucket: str, key: str, operation: str, missing_code: str = "NoSuchKey"):
+        path = self._object_path(bucket, key, operation)
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            raise _client_error(missing_code, f"Key '{key}' does not exist", 404, operation)
+        try:
+            return file, self._read_metadata(file)
+        except Exception:
+            file.close()
+            raise
+
+    def _commit(self, temp, temp_path: str, bucket: str, key: str, metadata: dict, operation: str):
+        """Append the metadata to a written temp file and move it in place."""
+        encoded = json.dumps(metadata, separators=(",", ":")).encode()
+        temp.write(encoded)
+        temp.write(_TRAILER.pack(len(encoded), _MAGIC))
+        temp.flush()
+        if self.fsync:
+            os.fsync(temp.fileno())
+        temp.close()
+        path = self._object_path(bucket, key, operation)
+        for attempt in range(3):
+            self._make_directories(self._bucket_path(bucket, operation), key)
+            try:
+                os.replace(temp_path, path)
+                return
+            except FileNotFoundError:
+                # A directory was removed by a delete emptying it at the same time
+                if attempt == 2:
+                    raise
+
+    def _write_object(self, bucket: str, key: str, chunks, operation: str, content_type: str = None,
+                      user_metadata: dict = None, etag: str = None) -> dict:
+        temp_path = self._temp_path(bucket, operation)
+        os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+        md5 = hashlib.md5()
+        size = 0
+        temp = open(temp_path, "wb")
+        try:
+            for chunk in chunks:
+                temp.write(chunk)
+                if etag is None:
+                    md5.update(chunk)
+                size += len(chunk)
+            metadata = self._new_metadata(key, size, etag or f'"{md5.hexdigest()}"', content_type, user_metadata)
+            self._commit(temp, temp_path, bucket, key, metadata, operation)
+            return metadata
+        except BaseException:
+            temp.close()
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def _new_metadata(key: str, size: int, etag: str, content_type: str = None, user_metadata: dict = None) -> dict:
+        return {
+            "key": key,
+            "size": size,
+            "etag": etag,
+            "content_type": content_type or "binary/octet-stream",
+            # Second precision, like the Last-Modified header conditions are compared with
+            "last_modified": int(time.time()),
+            "metadata": user_metadata or {},
+        }
+
+    @staticmethod
+    def _last_modified(metadata: dict) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(metadata["last_modified"], tz=datetime.timezone.utc)
+
+    @staticmethod
+    def _body_chunks(body) -> Iterator[bytes]:
+        if body is None:
+            return
+        if isinstance(body, str):
+            body = body.encode()
+        if isinstance(body, (bytes, bytearray, memoryview)):
+            yield body
+            return
+        while True:
+            chunk = body.read(_COPY_CHUNK)
+            if not chunk:
+                return
+            yield chunk
+
+    # -------- Objects -------- #
+
+    def put_object(self, Bucket: str, Key: str, Body=None, ContentType: str = None, Metadata: dict = None, **kwargs) -> dict:
+        metadata = self._write_object(Bucket, Key, self._body_chunks(Body), "PutObject", ContentType, Metadata)
+        return {"ETag": metadata["etag"]}
+
+    def upload_fileobj(self, Fileobj, Bucket: str, Key: str, ExtraArgs: dict = None, Callback=None, Config=None):
+        extra_args = ExtraArgs or {}
+        self._write_object(
+            Bucket, Key, self._body_chunks(Fileobj), "PutObject", extra_args.get("ContentType"), extra_args.get("Metadata")
+        )
+
+    def _check_conditions(self, metadata: dict, operation: str, IfMatch: str = None, IfNoneMatch: str = None,
+                          IfModifiedSince: datetime.datetime = None, IfUnmodifiedSince: datetime.datetime = None):
+        etag = _bare_etag(metadata["etag"])
+        last_modified = self._last_modified(metadata)
+        validators = {"etag": metadata["etag"], "last-modified": format_datetime(last_modified, usegmt=True)}
+
+        if IfMatch is not None:
+            if IfMatch.strip() != "*" and etag not in [_bare_etag(tag) for tag in IfMatch.split(",")]:
+                raise _client_error("PreconditionFailed", "At least one of the preconditions did not hold", 412, operation)
+        elif IfUnmodifiedSince is not None and last_modified > IfUnmodifiedSince:
+            raise _client_error("PreconditionFailed", "At least one of the preconditions did not hold", 412, operation)
+
+        if IfNoneMatch is not None:
+            if IfNoneMatch.strip() == "*" or etag in [_bare_etag(tag) for tag in IfNoneMatch.split(",")]:
+                raise _client_error("304", "Not Modified", 304, operation, validators)
+        elif IfModifiedSince is not None and last_modified <= IfModifiedSince:
+            raise _client_error("304", "Not Modified", 304, operation, validators)
+
+    @staticmethod
+    def _parse_range(range_header: str, size: int, operation: str):
+        """(start, end) of a single byte range, None to send the whole object."""
+        spec = range_header.strip()
+        if not spec.startswith("bytes=") or "," in spec:
+            return None
+        first, _, last = spec[len("bytes="):].strip().partition("-")
+        try:
+            if first:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+            else:
+                suffix = int(last)
+                if suffix == 0:
+                    raise _client_error("InvalidRange", "The requested range is not satisfiable", 416, operation)
+                start, end = max(size - suffix, 0), size - 1
+        except ValueError:
+            return None
+        if start >= size or start > end:
+            raise _client_error("InvalidRange", "The requested range is not satisfiable", 416, operation)
+        return start, end
+
+    def get_object(self, Bucket: str, Key: str, Range: str = None, IfMatch: str = None, IfNoneMatch: str = None,
+                   IfModifiedSince: datetime.datetime = None, IfUnmodifiedSince: datetime.datetime = None, **kwargs) -> dict:
+        file, metadata = self._open_object(Bucket, Key, "GetObject")
+        try:
+            self._check_conditions(metadata, "GetObject", IfMatch, IfNoneMatch, IfModifiedSince, IfUnmodifiedSince)
+            size = metadata["size"]
+            byte_range = self._parse_range(Range, size, "GetObject") if Range else None
+        except BaseException:
+            file.close()
+            raise
+
+        start, end = byte_range if byte_range else (0, size - 1)
+        response = {
+            "ContentLength": end - start + 1,
+            "ETag": metadata["etag"],
+            "LastModified": self._last_modified(metadata),
+            "ContentType": metadata["content_type"],
+            "Metadata": metadata["metadata"],
+            "AcceptRanges": "bytes",
+            "Body": LocalObjectBody(file, start, end - start + 1),
+        }
+        if byte_range:
+            response["ContentRange"] = f"bytes {start}-{end}/{size}"
+        return response
+
+    def head_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        file, metadata = self._open_object(Bucket, Key, "HeadObject", missing_code="404")
+        file.close()
+        return {
+            "ContentLength": metadata["size"],
+            "ETag": metadata["etag"],
+            "LastModified": self._last_modified(metadata),
+            "ContentType": metadata["content_type"],
+            "Metadata": metadata["metadata"],
+        }
+
+    def copy_object(self, Bucket: str, Key: str, CopySource: dict, MetadataDirective: str = "COPY",
+                    ContentType: str = None, Metadata: dict = None, **kwargs) -> dict:
+        source, metadata = self._open_object(CopySource["Bucket"], CopySource["Key"], "CopyObject")
+        try:
+            temp_path = self._temp_path(Bucket, "CopyObject")
+            os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+            temp = open(temp_path, "wb")
+            try:
+                _copy_range(source, temp, 0, metadata["size"])
+                replace = MetadataDirective == "REPLACE"
+                copied = self._new_metadata(
+                    Key, metadata["size"], metadata["etag"],
+                    ContentType if replace else metadata["content_type"],
+                    Metadata if replace else metadata["metadata"]
+                )
+                self._commit(temp, temp_path, Bucket, Key, copied, "CopyObject")
+            except BaseException:
+                temp.close()
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+                raise
+        finally:
+            source.close()
+        return {"CopyObjectResult": {"ETag": copied["etag"], "LastModified": self._last_modified(copied)}}
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        path = self._object_path(Bucket, Key, "DeleteObject")
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return {}
+        self._remove_empty_directories(self._bucket_path(Bucket, "DeleteObject"), os.path.dirname(path))
+        return {}
+
+    def delete_objects(self, Bucket: str, Delete: dict, **kwargs) -> dict:
+        deleted = []
+        errors = []
+        for obj in Delete.get("Objects", []):
+            try:
+                self.delete_object(Bucket, obj["Key"])
+                deleted.append({"Key": obj["Key"]})
+            except ClientError as e:
+                errors.append({"Key": obj["Key"], "Code": e.response["Error"]["Code"], "Message": str(e)})
+        response = {"Errors": errors} if errors else {}
+        if not Delete.get("Quiet"):
+            response["Deleted"] = deleted
+        return response
+
+    def _entry_label(self, entry) -> Optional[str]:
+        """
+        The part of the key an entry of a directory stands for: the component for
+        an object, the component and "/" for a directory. None for entries that
+        are not part of the key space (.tmp, .uploads, .component).
+        """
+        try:
+            if entry.name.startswith("o_"):
+                return unquote(entry.name[2:])
+            if entry.name.startswith("d_"):
+                return unquote(entry.name[2:]) + "/"
+            if entry.name.startswith("ho_"):
+                with open(entry.path, "rb") as file:
+                    return self._read_metadata(file)["key"].rsplit("/", 1)[-1]
+            if entry.name.startswith("hd_"):
+                with open(os.path.join(entry.path, ".component"), encoding="utf-8") as component_file:
+                    return component_file.read() + "/"
+        except (OSError, ValueError):
+            # Removed or replaced while listing
+            pass
+        return None
+
+    def _walk(self, directory: str, key_prefix: str, prefix: str, after: str) -> Iterator[dict]:
+        """
+        Metadata of the objects below a directory whose keys start with prefix and
+        come after `after`, in key order. Entries are visited sorted by their label,
+        which is key order, and subtrees that cannot hold a matching key are skipped.
+        """
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return
+        labelled = []
+        for entry in entries:
+            label = self._entry_label(entry)
+            if label is None:
+                continue
+            key = key_prefix + label
+            if label.endswith("/"):
+                if not (key.startswith(prefix) or prefix.startswith(key)):
+                    continue
+                # Every key below starts with `key`, so all are past `after` or none is
+                if after >= key and not after.startswith(key):
+                    continue
+            elif not key.startswith(prefix) or key <= after:
+                continue
+            labelled.append((label, entry))
+
+        for label, entry in sorted(labelled, key=lambda item: item[0]):
+            if label.endswith("/"):
+                yield from self._walk(entry.path, key_prefix + label, prefix, after)
+                continue
+            try:
+                with open(entry.path, "rb") as file:
+                    yield self._read_metadata(file)
+            except (OSError, ValueError):
+                continue
+
+    def _list(self, bucket: str, prefix: str = "", after: str = None) -> Iterator[dict]:
+        """Metadata of the objects under a prefix with a key past `after`, in key order, read as they are consumed."""
+        prefix = prefix or ""
+        # The directories named in full by the prefix are entered directly
+        directories = prefix.split("/")[:-1]
+        start = os.path.join(self._bucket_path(bucket, "ListObjectsV2"), *(self._entry_name("d", c) for c in directories))
+        return self._walk(start, "".join(f"{component}/" for component in directories), prefix, after or "")
+
+    def _list_page(self, bucket: str, prefix: str, page: List[dict], truncated: bool, max_keys: int) -> dict:
+        response = {
+            "Name": bucket,
+            "Prefix": prefix or "",
+            "KeyCount": len(page),
+            "MaxKeys": max_keys,
+            "IsTruncated": truncated,
+        }
+        if page:
+            response["Contents"] = [
+                {"Key": metadata["key"], "Size": metadata["size"], "ETag": metadata["etag"],
+                 "LastModified": self._last_modified(metadata)}
+                for metadata in page
+            ]
+        if truncated:
+            response["NextContinuationToken"] = page[-1]["key"]
+        return response
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = "", MaxKeys: int = _PAGE_SIZE, ContinuationToken: str = None,
+                        StartAfter: str = None, **kwargs) -> dict:
+        objects = self._list(Bucket, Prefix, ContinuationToken or StartAfter)
+        page = list(itertools.islice(objects, MaxKeys))
+        return self._list_page(Bucket, Prefix, page, next(objects, None) is not None, MaxKeys)
+
+    def get_paginator(self, operation_name: str) -> _Paginator:
+        return _Paginator(self, operation_name)
+
+    # -------- Multipart uploads -------- #
+
+    def _upload_path(self, bucket: str, upload_id: str, operation: str) -> str:
+        path = os.path.join(self._bucket_path(bucket, operation), ".uploads", os.path.basename(upload_id))
+        if not upload_id or not os.path.isdir(path):
+            raise _client_error("NoSuchUpload", f"Upload '{upload_id}' does not exist", 404, operation)
+        return path
+
+    def _write_part(self, upload_path: str, part_number: int, chunks) -> str:
+        if not 1 <= part_number <= 10000:
+            raise _client_error("InvalidArgument", "Part number must be between 1 and 10000", 400, "UploadPart")
+        temp_path = os.path.join(upload_path, f".part-{uuid.uuid4().hex}")
+        md5 = hashlib.md5()
+        with open(temp_path, "wb") as temp:
+            for chunk in chunks:
+                temp.write(chunk)
+                md5.update(chunk)
+        etag = f'"{md5.hexdigest()}"'
+        os.replace(temp_path, os.path.join(upload_path, f"part-{part_number:05d}"))
+        with open(os.path.join(upload_path, f"part-{part_number:05d}.etag"), "w") as etag_file:
+            etag_file.write(etag)
+        return etag
+
+    def create_multipart_upload(self, Bucket: str, Key: str, ContentType: str = None, Metadata: dict = None, **kwargs) -> dict:
+        upload_id = uuid.uuid4().hex
+        path = os.path.join(self._bucket_path(Bucket, "CreateMultipartUpload"), ".uploads", upload_id)
+        os.makedirs(path)
+        with open(os.path.join(path, "upload.json"), "w") as upload_file:
+            json.dump({"key": Key, "content_type": ContentType, "metadata": Metadata or {}, "initiated": time.time()}, upload_file)
+        return {"Bucket": Bucket, "Key": Key, "UploadId": upload_id}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body=None, **kwargs) -> dict:
+        upload_path = self._upload_path(Bucket, UploadId, "UploadPart")
+        return {"ETag": self._write_part(upload_path, PartNumber, self._body_chunks(Body))}
+
+    def upload_part_copy(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, CopySource: dict,
+                         CopySourceRange: str = None, CopySourceIfMatch: str = None, **kwargs) -> dict:
+        upload_path = self._upload_path(Bucket, UploadId, "UploadPartCopy")
+        source, metadata = self._open_object(CopySource["Bucket"], CopySource["Key"], "UploadPartCopy")
+        try:
+            if CopySourceIfMatch is not None:
+                self._check_conditions(metadata, "UploadPartCopy", IfMatch=CopySourceIfMatch)
+            start, end = 0, metadata["size"] - 1
+            if CopySourceRange:
+                start, _, end = CopySourceRange[len("bytes="):].partition("-")
+                start, end = int(start), int(end)
+                if end >= metadata["size"] or start > end:
+                    raise _client_error("InvalidRange", "The requested range is not satisfiable", 416, "UploadPartCopy")
+            # The part is hashed for its ETag, so it is read here rather than sendfile'd
+            body = LocalObjectBody(source, start, end - start + 1)
+            etag = self._write_part(upload_path, PartNumber, body.iter_chunks(_COPY_CHUNK))
+        finally:
+            source.close()
+        return {"CopyPartResult": {"ETag": etag, "LastModified": datetime.datetime.now(datetime.timezone.utc)}}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: dict, **kwargs) -> dict:
+        operation = "CompleteMultipartUpload"
+        upload_path = self._upload_path(Bucket, UploadId, operation)
+        with open(os.path.join(upload_path, "upload.json")) as upload_file:
+            upload = json.load(upload_file)
+
+        parts = MultipartUpload.get("Parts", [])
+        if not parts:
+            raise _client_error("MalformedXML", "No parts given", 400, operation)
+        part_numbers = [part["PartNumber"] for part in parts]
+        if part_numbers != sorted(set(part_numbers)):
+            raise _client_error("InvalidPartOrder", "Parts must be in ascending order", 400, operation)
+
+        part_paths = []
+        md5 = hashlib.md5()
+        for index, part in enumerate(parts):
+            part_path = os.path.join(upload_path, f"part-{part['PartNumber']:05d}")
+            try:
+                with open(f"{part_path}.etag") as etag_file:
+                    etag = etag_file.read()
+            except FileNotFoundError:
+                raise _client_error("InvalidPart", f"Part {part['PartNumber']} was not uploaded", 400, operation)
+            if _bare_etag(etag) != _bare_etag(part["ETag"]):
+                raise _client_error("InvalidPart", f"ETag of part {part['PartNumber']} does not match", 400, operation)
+            if index < len(parts) - 1 and os.path.getsize(part_path) < MIN_PART_SIZE:
+                raise _client_error("EntityTooSmall", f"Part {part['PartNumber']} is smaller than the minimum part size", 400, operation)
+            md5.update(bytes.fromhex(_bare_etag(etag)))
+            part_paths.append(part_path)
+
+        temp_path = self._temp_path(Bucket, operation)
+        os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+        temp = open(temp_path, "wb")
+        try:
+            size = 0
+            for part_path in part_paths:
+                part_size = os.path.getsize(part_path)
+                with open(part_path, "rb") as part_file:
+                    _copy_range(part_file, temp, 0, part_size)
+                size += part_size
+            metadata = self._new_metadata(
+                Key, size, f'"{md5.hexdigest()}-{len(parts)}"', upload["content_type"], upload["metadata"]
+            )
+            self._commit(temp, temp_path, Bucket, Key, metadata, operation)
+        except BaseException:
+            temp.close()
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        shutil.rmtree(upload_path, ignore_errors=True)
+        return {"Bucket": Bucket, "Key": Key, "ETag": metadata["etag"]}
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str, **kwargs) -> dict:
+        shutil.rmtree(self._upload_path(Bucket, UploadId, "AbortMultipartUpload"), ignore_errors=True)
+        return {}
+
+    def list_multipart_uploads(self, Bucket: str, **kwargs) -> dict:
+        uploads_path = os.path.join(self._bucket_path(Bucket, "ListMultipartUploads"), ".uploads")
+        uploads = []
+        if os.path.isdir(uploads_path):
+            for entry in os.scandir(uploads_path):
+                try:
+                    with open(os.path.join(entry.path, "upload.json")) as upload_file:
+                        upload = json.load(upload_file)
+                except (OSError, ValueError):
+                    continue
+                uploads.append({
+                    "Key": upload["key"],
+                    "UploadId": entry.name,
+                    "Initiated": datetime.datetime.fromtimestamp(upload["initiated"], tz=datetime.timezone.utc),
+                })
+        return {"Bucket": Bucket, "Uploads": uploads}
+
+    # -------- Buckets -------- #
+
+    def head_bucket(self, Bucket: str, **kwargs) -> dict:
+        try:
+            self._bucket_path(Bucket, "HeadBucket")
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "NoSuchBucket":
+                raise _client_error("404", "Not Found", 404, "HeadBucket")
+            raise
+        return {}
+
+    def create_bucket(self, Bucket: str, **kwargs) -> dict:
+        if not Bucket or "/" in Bucket or Bucket.startswith("."):
+            raise _client_error("InvalidBucketName", f"Invalid bucket name '{Bucket}'", 400, "CreateBucket")
+        with self._bucket_lock:
+            os.makedirs(os.path.join(self.root, Bucket), exist_ok=True)
+        return {"Location": f"/{Bucket}"}
+
+    def list_buckets(self, **kwargs) -> dict:
+        buckets = []
+        for entry in sorted(os.scandir(self.root), key=lambda entry: entry.name):
+            if entry.is_dir() and not entry.name.startswith("."):
+                buckets.append({
+                    "Name": entry.name,
+                    "CreationDate": datetime.datetime.fromtimestamp(entry.stat().st_ctime, tz=datetime.timezone.utc),
+                })
+        return {"Buckets": buckets}
+
+    # -------- Presigned URLs -------- #
+
+    def _signature(self, method: str, bucket: str, key: str, expires: int, content_type: str = "") -> str:
+        message = "\n".join((method, bucket, key, str(expires), content_type or "")).encode()
+        return hmac.new(self.secret_key, message, hashlib.sha256).hexdigest()
+
+    def generate_presigned_url(self, ClientMethod: str, Params: dict, ExpiresIn: int = 3600, HttpMethod: str = None) -> str:
+        method = HttpMethod or {"get_object": "GET", "put_object": "PUT", "head_object": "HEAD"}.get(ClientMethod, "GET")
+        bucket = Params["Bucket"]
+        key = Params["Key"]
+        expires = int(time.time()) + int(ExpiresIn)
+        content_type = Params.get("ContentType", "")
+        signature = self._signature(method, bucket, key, expires, content_type)
+        query = f"expires={expires}&signature={signature}"
+        if content_type:
+            query += f"&content-type={quote(content_type, safe='')}"
+        return f"{self.public_url}/api/blob-service/storage/{quote(bucket)}/{quote(key)}?{query}"
+
+    def verify_presigned_url(self, method: str, bucket: str, key: str, expires: str, signature: str, content_type: str = "") -> bool:
+        try:
+            expires = int(expires)
+        except (TypeError, ValueError):
+            return False
+        if expires < time.time():
+            return False
+        expected = self._signature(method, bucket, key, expires, content_type)
+        return hmac.compare_digest(expected, signature or "")
@@ -0,0 +1,128 @@
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from async_storage import MIN_PART_SIZE
+
+
+# S3 allows at most this many parts in one multipart upload
+MAX_PARTS = 10000
+# Largest part size a client may ask for; sessions for files too large for
+# MAX_PARTS parts of this size are refused
+MAX_SESSION_PART_SIZE = 64 * 1024 * 1024
+
+
+def choose_part_size(total_size: int, requested: Optional[int] = None, default: int = 8 * 1024 * 1024) -> int:
+    """
+    Part size for an upload session: the requested one, but at least 5 MiB and large enough for MAX_PARTS.
+
+    Raises:
+        ValueError: If the requested part size is above MAX_SESSION_PART_SIZE, or the file
+            needs larger parts than that
+    """
+    if requested is not None and requested > MAX_SESSION_PART_SIZE:
+        raise ValueError(f"part_size must be at most {MAX_SESSION_PART_SIZE} bytes")
+    part_size = max(requested or min(default, MAX_SESSION_PART_SIZE), MIN_PART_SIZE, -(-total_size // MAX_PARTS))
+    if part_size > MAX_SESSION_PART_SIZE:
+        raise ValueError(f"total_size must be at most {MAX_SESSION_PART_SIZE * MAX_PARTS} bytes")
+    return part_size
+
+
+# =============================================================================
+# UPLOAD SESSIONS - RESUMABLE MULTIPART UPLOADS
+# =============================================================================
+
+class UploadSession:
+    """
+    One resumable upload: a storage multipart upload of fixed-size parts that the
+    client sends in any order, in parallel, and again after a failure. Part
+    numbers follow from the byte offset (offset / part_size + 1).
+    """
+
+    __slots__ = (
+        "session_id", "bucket", "key", "upload_id", "owner", "total_size", "part_size",
+        "content_type", "metadata", "parts", "created_at", "last_activity"
+    )
+
+    def __init__(self, bucket: str, key: str, upload_id: str, total_size: int, part_size: int,
+                 owner: Optional[str] = None, content_type: Optional[str] = None, metadata: Optional[dict] = None):
+        now = time.time()
+        self.session_id = uuid.uuid4().hex
+        self.bucket = bucket
+        self.key = key
+        self.upload_id = upload_id
+        self.owner = owner
+        self.total_size = total_size
+        self.part_size = part_size
+        self.content_type = content_type
+        self.metadata = metadata or {}
+        self.parts: Dict[int, dict] = {} # part number -> {"ETag", "size", "sha256"}
+        self.created_at = now
+        self.last_activity = now
+
+    @property
+    def part_count(self) -> int:
+        return max(1, -(-self.total_size // self.part_size))
+
+    def part_for_offset(self, offset: int) -> Optional[Tuple[int, int]]:
+        """(part number, expected length) of the part starting at offset, None if no part starts there."""
+        if offset < 0 or offset % self.part_size != 0 or (offset >= self.total_size and self.total_size > 0):
+            return None
+        number = offset // self.part_size + 1
+        return number, min(self.part_size, self.total_size - offset)
+
+    def missing_offsets(self) -> List[int]:
+        return [(number - 1) * self.part_size for number in range(1, self.part_count + 1) if number not in self.parts]
+
+    @property
+    def received_bytes(self) -> int:
+        return sum(part["size"] for part in self.parts.values())
+
+    def to_dict(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "bucket": self.bucket,
+            "key": self.key,
+            "total_size": self.total_size,
+            "part_size": self.part_size,
+            "part_count": self.part_count,
+            "received_bytes": self.received_bytes,
+            "received_offsets": sorted((number - 1) * self.part_size for number in self.parts),
+            "missing_offsets": self.missing_offsets(),
+            "metadata": self.metadata,
+            "created_at": self.created_at,
+            "last_activity": self.last_activity,
+        }
+
+
+class UploadSessionTable:
+    """Open upload sessions of this blob service instance, keyed by session id."""
+
+    def __init__(self):
+        self.sessions: Dict[str, UploadSession] = {}
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def add(self, session: UploadSession):
+        self.sessions[session.session_id] = session
+
+    def get(self, session_id: str) -> Optional[UploadSession]:
+        return self.sessions.get(session_id)
+
+    def remove(self, session_id: str) -> Optional[UploadSession]:
+        return self.sessions.pop(session_id, None)
+
+    def touch(self, session: UploadSession):
+        session.last_activity = time.time()
+
+    def expired(self, ttl_seconds: float) -> List[UploadSession]:
+        """Sessions without any activity for ttl_seconds."""
+        deadline = time.time() - ttl_seconds
+        return [session for session in self.sessions.values() if session.last_activity < deadline]
+
+    def upload_ids(self) -> set:
+        return {session.upload_id for session in self.sessions.values()}
+
+    def buckets(self) -> set:
+        return {session.bucket for session in self.sessions.values()}
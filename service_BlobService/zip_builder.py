@@ -0,0 +1,258 @@
+import datetime
+import struct
+import zlib
+from typing import List, Optional
+
+# Entries written with size, offset or count past these limits need ZIP64 records
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_COUNT_LIMIT = 0xFFFF
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+# Formats that are compressed already: DEFLATE would cost CPU for about 0% size gain
+PRECOMPRESSED_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".webp", ".gif", ".mp4", ".mkv", ".mov", ".webm", ".zip", ".gz", ".7z"
+}
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_DATA_DESCRIPTOR = struct.Struct("<IIII")
+_DATA_DESCRIPTOR_ZIP64 = struct.Struct("<IIQQ")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_RECORD = struct.Struct("<IHHHHIIH")
+_END_RECORD_ZIP64 = struct.Struct("<IQHHIIQQQQ")
+_END_LOCATOR_ZIP64 = struct.Struct("<IIQI")
+
+# Bit 3: sizes and CRC follow the data in a data descriptor, bit 11: UTF-8 names
+_FLAGS = 0x08 | 0x800
+
+
+def is_precompressed(name: str) -> bool:
+    return any(name.lower().endswith(extension) for extension in PRECOMPRESSED_EXTENSIONS)
+
+
+def dos_datetime(moment: Optional[datetime.datetime]) -> tuple:
+    """(time, date) in MS-DOS format, as stored in zip headers."""
+    if moment is None or moment.year < 1980:
+        return 0, (0 << 9) | (1 << 5) | 1
+    return (
+        (moment.hour << 11) | (moment.minute << 5) | (moment.second // 2),
+        ((moment.year - 1980) << 9) | (moment.month << 5) | moment.day
+    )
+
+
+# =============================================================================
+# ZIP ENTRY AND STREAMING ZIP WRITER
+# =============================================================================
+
+class ZipEntry:
+    """One file of an archive, as recorded in the central directory."""
+
+    __slots__ = ("name", "method", "dos_time", "dos_date", "crc", "compressed_size", "size", "offset", "zip64")
+
+    def __init__(self, name: str, method: int, dos_time: int, dos_date: int, offset: int, zip64: bool,
+                 crc: int = 0, compressed_size: int = 0, size: int = 0):
+        self.name = name
+        self.method = method
+        self.dos_time = dos_time
+        self.dos_date = dos_date
+        self.offset = offset
+        self.zip64 = zip64
+        self.crc = crc
+        self.compressed_size = compressed_size
+        self.size = size
+
+    def to_dict(self) -> dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, values: dict) -> "ZipEntry":
+        return cls(**{slot: values[slot] for slot in cls.__slots__})
+
+
+class ZipWriter:
+    """
+    Writes a zip archive as a stream of byte strings, one entry after the other,
+    without seeking: sizes and CRC of every entry follow its data in a data
+    descriptor, so entries can be streamed straight from storage. Entries past
+    4 GiB, offsets past 4 GiB and more than 65535 entries use ZIP64 records.
+
+    Every method returns the bytes to append to the archive; nothing is buffered
+    here except what zlib holds back while deflating.
+    """
+
+    def __init__(self, offset: int = 0, entries: Optional[List[ZipEntry]] = None):
+        """
+        Args:
+            offset (int): Archive offset the next entry starts at
+            entries (list): Entries already written before offset (when extending an archive)
+        """
+        self.offset = offset
+        self.entries: List[ZipEntry] = list(entries or [])
+        self.current: Optional[ZipEntry] = None
+        self.compressor = None
+
+    def start_entry(self, name: str, size: int, modified: Optional[datetime.datetime] = None, compress: Optional[bool] = None) -> bytes:
+        """
+        Local header of a new entry.
+
+        Args:
+            name (str): Name inside the archive
+            size (int): Uncompressed size, decides whether the entry needs ZIP64 sizes
+            modified (datetime): Modification time stored in the archive
+            compress (bool): DEFLATE the entry; by default only formats that are not compressed already
+        """
+        if compress is None:
+            compress = not is_precompressed(name)
+        method = ZIP_DEFLATED if compress else ZIP_STORED
+        # Leaves room for the worst case DEFLATE expansion
+        zip64 = (size + (size >> 10) + 64 if compress else size) >= ZIP64_LIMIT
+        dos_time, dos_date = dos_datetime(modified)
+
+        self.current = ZipEntry(name, method, dos_time, dos_date, self.offset, zip64)
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, -15) if compress else None
+
+        header = local_header(self.current)
+        self.offset += len(header)
+        return header
+
+    def write(self, data) -> bytes:
+        """Entry data: returned as is for STORED entries, compressed for DEFLATE ones."""
+        entry = self.current
+        entry.crc = zlib.crc32(data, entry.crc)
+        entry.size += len(data)
+        if self.compressor is not None:
+            data = self.compressor.compress(data)
+        entry.compressed_size += len(data)
+        self.offset += len(data)
+        return data
+
+    def end_entry(self) -> bytes:
+        """Rest of the compressed data and the data descriptor of the current entry."""
+        entry = self.current
+        tail = b""
+        if self.compressor is not None:
+            tail = self.compressor.flush()
+            entry.compressed_size += len(tail)
+        if not entry.zip64 and max(entry.size, entry.compressed_size) >= ZIP64_LIMIT:
+            raise ValueError(f"Entry '{entry.name}' is larger than its announced size")
+
+        descriptor = data_descriptor(entry)
+        self.offset += len(tail) + len(descriptor)
+        self.entries.append(entry)
+        self.current = None
+        self.compressor = None
+        return tail + descriptor
+
+    def finish(self) -> bytes:
+        """Central directory and end records of every entry written."""
+        return central_directory(self.entries, self.offset)
+
+
+class StoredArchiveLayout:
+    """
+    Byte layout of an archive of STORED entries, written the same way as ZipWriter
+    does, computed from names and sizes alone. The offset of every record and the
+    total size are known before any data is read, so the archive can be served with
+    a Content-Length and any byte range of it rebuilt on demand. CRCs are filled in
+    on the entries once their data has been read; they never change a length.
+    """
+
+    def __init__(self, files: List[tuple]):
+        """
+        Args:
+            files (list): (name, size, modified datetime) of every entry, in archive order
+        """
+        self.entries: List[ZipEntry] = []
+        offset = 0
+        for name, size, modified in files:
+            dos_time, dos_date = dos_datetime(modified)
+            entry = ZipEntry(name, ZIP_STORED, dos_time, dos_date, offset, size >= ZIP64_LIMIT,
+                             compressed_size=size, size=size)
+            self.entries.append(entry)
+            offset = self.data_offset(entry) + size + len(data_descriptor(entry))
+
+        self.directory_offset = offset
+        self.size = offset + len(central_directory(self.entries, offset))
+
+    def data_offset(self, entry: ZipEntry) -> int:
+        return entry.offset + len(local_header(entry))
+
+    def entry_end(self, index: int) -> int:
+        """Offset right after the data descriptor of entry `index`."""
+        if index + 1 < len(self.entries):
+            return self.entries[index + 1].offset
+        return self.directory_offset
+
+
+# =============================================================================
+# ZIP RECORDS
+# =============================================================================
+
+def local_header(entry: ZipEntry) -> bytes:
+    name = entry.name.encode("utf-8")
+    if entry.zip64:
+        # Sizes are in the data descriptor, the extra field only marks the entry as ZIP64
+        extra = struct.pack("<HHQQ", 0x0001, 16, 0, 0)
+        sizes = ZIP64_LIMIT
+        version = 45
+    else:
+        extra = b""
+        sizes = 0
+        version = 20
+    return _LOCAL_HEADER.pack(
+        0x04034B50, version, _FLAGS, entry.method, entry.dos_time, entry.dos_date,
+        0, sizes, sizes, len(name), len(extra)
+    ) + name + extra
+
+
+def data_descriptor(entry: ZipEntry) -> bytes:
+    if entry.zip64:
+        return _DATA_DESCRIPTOR_ZIP64.pack(0x08074B50, entry.crc, entry.compressed_size, entry.size)
+    return _DATA_DESCRIPTOR.pack(0x08074B50, entry.crc, entry.compressed_size, entry.size)
+
+
+def central_header(entry: ZipEntry) -> bytes:
+    name = entry.name.encode("utf-8")
+    zip64_fields = []
+    size = entry.size
+    compressed_size = entry.compressed_size
+    offset = entry.offset
+    if size >= ZIP64_LIMIT:
+        zip64_fields.append(size)
+        size = ZIP64_LIMIT
+    if compressed_size >= ZIP64_LIMIT:
+        zip64_fields.append(compressed_size)
+        compressed_size = ZIP64_LIMIT
+    if offset >= ZIP64_LIMIT:
+        zip64_fields.append(offset)
+        offset = ZIP64_LIMIT
+
+    extra = b""
+    if zip64_fields:
+        extra = struct.pack(f"<HH{len(zip64_fields)}Q", 0x0001, 8 * len(zip64_fields), *zip64_fields)
+    version = 45 if zip64_fields or entry.zip64 else 20
+    return _CENTRAL_HEADER.pack(
+        0x02014B50, version, version, _FLAGS, entry.method, entry.dos_time, entry.dos_date,
+        entry.crc, compressed_size, size, len(name), len(extra), 0, 0, 0, 0, offset
+    ) + name + extra
+
+
+def central_directory(entries: List[ZipEntry], offset: int) -> bytes:
+    """Central directory starting at archive offset `offset`, followed by the end records."""
+    directory = b"".join(central_header(entry) for entry in entries)
+    return directory + end_records(len(entries), len(directory), offset)
+
+
+def end_records(count: int, directory_size: int, directory_offset: int) -> bytes:
+    records = b""
+    if count >= ZIP64_COUNT_LIMIT or directory_size >= ZIP64_LIMIT or directory_offset >= ZIP64_LIMIT:
+        end_offset = directory_offset + directory_size
+        records = _END_RECORD_ZIP64.pack(
+            0x06064B50, 44, 45, 45, 0, 0, count, count, directory_size, directory_offset
+        ) + _END_LOCATOR_ZIP64.pack(0x07064B50, 0, end_offset, 1)
+    return records + _END_RECORD.pack(
+        0x06054B50, 0, 0,
+        min(count, ZIP64_COUNT_LIMIT), min(count, ZIP64_COUNT_LIMIT),
+        min(directory_size, ZIP64_LIMIT), min(directory_offset, ZIP64_LIMIT), 0
+    )
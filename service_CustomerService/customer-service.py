@@ -2,6 +2,7 @@ import asyncio
 
 from fastapi import FastAPI, Response, Request, HTTPException, Depends, File, Form, UploadFile
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
@@ -23,11 +24,20 @@ import sys
 import os
 
 from dotenv import load_dotenv
+
+from multipart_stream import MultipartStreamReader
+
 load_dotenv()
 
 # Security scheme for token validation
 security = HTTPBearer(auto_error=False)
 
+# Headers passed through when streaming blob service responses, so clients can resume and revalidate
+BLOB_PROXY_REQUEST_HEADERS = ("range", "if-range", "if-none-match", "if-modified-since")
+BLOB_PROXY_RESPONSE_HEADERS = ("content-length", "content-range", "accept-ranges", "etag", "last-modified")
+# Frame sizes the blob service serves: full resolution, or downscaled WebP for galleries
+FRAME_VARIANTS = ("original", "thumbnail", "preview")
+
 class HTTP_SERVER():
     def __init__(self, httpServerHost, httpServerPort, httpServerPrivilegedIpAddress=["127.0.0.1"], data_class_instance=None):
         self.app = FastAPI()
@@ -80,6 +90,39 @@ class HTTP_SERVER():
         # HTTP client for making requests to MongoDB service and Auth service
         self.http_client = httpx.AsyncClient(timeout=30.0)
 
+    async def proxyBlobStream(self, path, params, request: Request, media_type, headers=None):
+        """
+        Stream a blob service response to the client. Range and conditional request
+        headers are forwarded and 206 / 304 / 416 answers are passed back with their
+        Content-Range, Content-Length, ETag and Last-Modified headers.
+        """
+        forwarded_headers = {name: request.headers[name] for name in BLOB_PROXY_REQUEST_HEADERS if name in request.headers}
+        upstream = await self.http_client.send(
+            self.http_client.build_request("GET", f"{self.blob_service_url}{path}", params=params, headers=forwarded_headers),
+            stream=True
+        )
+
+        if upstream.status_code not in (200, 206, 304, 416):
+            error_detail = (await upstream.aread()).decode(errors="replace")
+            await upstream.aclose()
+            print(f"Blob service returned error: {upstream.status_code} - {error_detail}")
+            raise HTTPException(status_code=upstream.status_code, detail=f"Blob service error: {error_detail}")
+
+        response_headers = {name: upstream.headers[name] for name in BLOB_PROXY_RESPONSE_HEADERS if name in upstream.headers}
+        response_headers.update(headers or {})
+
+        if upstream.status_code in (304, 416):
+            await upstream.aclose()
+            return Response(status_code=upstream.status_code, headers=response_headers)
+
+        return StreamingResponse(
+            upstream.aiter_raw(),
+            status_code=upstream.status_code,
+            media_type=media_type,
+            headers=response_headers,
+            background=BackgroundTask(upstream.aclose)
+        )
+
     def _format_file_size(self, size_bytes):
         """Format file size in human-readable format"""
         if size_bytes is None:
@@ -94,6 +137,43 @@ class HTTP_SERVER():
         else:
             return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
 
+    async def iterBlobBatchParts(self, upstream):
+        """
+        Read a length-prefixed blob service batch response (retrieve-images-batch):
+        every object is a JSON header line followed by exactly header["size"] bytes.
+
+        Yields:
+            ("start", header), then ("data", bytes) for the content as it arrives,
+            then ("end", header), for every object in order
+        """
+        buffer = bytearray()
+        header = None
+        remaining = 0
+        async for chunk in upstream.aiter_bytes():
+            buffer += chunk
+            while True:
+                if header is None:
+                    newline = buffer.find(b"\n")
+                    if newline < 0:
+                        break
+                    header = json.loads(bytes(buffer[:newline]))
+                    del buffer[:newline + 1]
+                    remaining = header.get("size", 0)
+                    yield "start", header
+                if remaining:
+                    if not buffer:
+                        break
+                    data = bytes(buffer[:remaining])
+                    del buffer[:len(data)]
+                    remaining -= len(data)
+                    yield "data", data
+                    if remaining:
+                        break
+                yield "end", header
+                header = None
+        if header is not None or buffer:
+            raise Exception("Blob service batch response ended in the middle of an object")
+
     async def authenticate_token(self, credentials: HTTPAuthorizationCredentials = Depends(security)):
         """
         Middleware function to authenticate the access token (customerId)
@@ -203,8 +283,7 @@ class HTTP_SERVER():
             
         @self.app.post("/api/customer-service/upload-blend-file")
         async def uploadBlendFile(
-            blend_file_name: str = Form(...),
-            blend_file: UploadFile = File(...),
+            request: Request,
             # customer_id: str = Form(...),
             access_token: str = Depends(self.authenticate_token),
             customer_id: str = Depends(self.getCustomerIdFromAuthorizationHeader)
@@ -219,12 +298,16 @@ class HTTP_SERVER():
             Authentication:
                 Requires valid Bearer token in Authorization header
                 
-            Parameters:
-                blend_file_name (str, Form): Name of the blend file (e.g., "chair_model.blend")
-                blend_file (UploadFile, File): The actual blend file to upload
+            Parameters (multipart/form-data, read from the request stream):
+                blend_file_name (str, Form): Name of the blend file (e.g., "chair_model.blend"),
+                    sent before blend_file; the uploaded file name is used when it is missing
+                blend_file (File): The actual blend file to upload
                 access_token (str): Bearer token for authentication (auto-extracted)
                 customer_id (str): Customer ID extracted from authorization header
                 
+            The file is forwarded to blob storage while it is being received, it is
+            never spooled to disk or held in memory here.
+                
             Process:
                 1. Creates empty blender object record in MongoDB
                 2. Uploads file to blob storage with path: customer_id/object_id/blend_file_name
@@ -251,10 +334,29 @@ class HTTP_SERVER():
                 HTTPException: 500 if upload or database operations fail
             """
             print(f"Upload blend file endpoint hit for customer: {customer_id}")
-            print(f"Blend file name: {blend_file_name}")
-            print(f"Blend file size: {blend_file.size} bytes")
             print(f"access token: {access_token}")
             print(f"customer id from authorization header: {customer_id}")
+
+            # Read the form fields up to the file part; the file itself is read further down,
+            # while it is forwarded
+            try:
+                form = MultipartStreamReader(request.headers.get("content-type"), request.stream())
+                blend_file_name = None
+                blend_file = None
+                while (part := await form.next_part()) is not None:
+                    if part.name == "blend_file":
+                        blend_file = part
+                        break
+                    if part.name == "blend_file_name":
+                        blend_file_name = (await part.read()).decode("utf-8", "replace").strip()
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            if blend_file is None:
+                raise HTTPException(status_code=400, detail="blend_file is required")
+            blend_file_name = blend_file_name or blend_file.filename
+            if not blend_file_name:
+                raise HTTPException(status_code=400, detail="blend_file_name is required")
+            print(f"Blend file name: {blend_file_name}")
             
             try:
                 # Step 1: Create empty blender object in MongoDB
@@ -290,13 +392,17 @@ class HTTP_SERVER():
                 else:
                     blob_key = f"{customer_id}/{object_id}/{blend_file_name}"
                 
+                # Forward the file part to the blob service as the raw request body, chunk by
+                # chunk as it is received from the client
                 blob_response = await self.http_client.post(
-                    f"{self.blob_service_url}/api/blob-service/store-blend",
-                    data={
+                    f"{self.blob_service_url}/api/blob-service/store-blend-stream",
+                    params={
                         "bucket": "blend-files",
                         "key": blob_key
                     },
-                    files={"blend_file": (blend_file_name, await blend_file.read(), "application/octet-stream")}
+                    content=blend_file.chunks(),
+                    headers={"Content-Type": "application/octet-stream"},
+                    timeout=httpx.Timeout(30.0, write=None, read=None)
                 )
                 
                 if blob_response.status_code != 200:
@@ -321,7 +427,9 @@ class HTTP_SERVER():
                     json={
                         "objectId": object_id,
                         "customerId": customer_id,
-                        "blendFilePath": blend_file_path
+                        "blendFilePath": blend_file_path,
+                        "blendFileContentHash": blob_result.get("sha256"),
+                        "blendFileSize": blob_result.get("size_bytes")
                     }
                 )
                 
@@ -335,7 +443,8 @@ class HTTP_SERVER():
                     "customer_id": customer_id,
                     "object_id": object_id,
                     "file_name": blend_file_name,
-                    "file_size_bytes": blend_file.size,
+                    "file_size_bytes": blob_result.get("size_bytes"),
+                    "file_sha256": blob_result.get("sha256"),
                     "upload_timestamp": datetime.now().isoformat(),
                     "status": "uploaded"
                 }, status_code=200)
@@ -349,6 +458,427 @@ class HTTP_SERVER():
                     detail=f"Failed to upload blend file: {str(e)}"
                 )
 
+        @self.app.post("/api/customer-service/blend-uploads")
+        async def createBlendUpload(
+            blend_file_name: str = Form(...),
+            file_size: int = Form(...),
+            part_size: int = Form(None),
+            access_token: str = Depends(self.authenticate_token),
+            customer_id: str = Depends(self.getCustomerIdFromAuthorizationHeader)
+        ):
+            """
+            Start Resumable Blend File Upload Endpoint
+
+            Opens a resumable upload for a large blend file. The client then PUTs the
+            file in parts of part_size bytes (at offsets 0, part_size, 2 * part_size, ...),
+            in any order and several at a time, asks for the upload status after a
+            dropped connection to re-send only the missing parts, and completes the
+            upload once every part is stored.
+
+            Parameters:
+                blend_file_name (str, Form): Name of the blend file (e.g., "chair_model.blend")
+                file_size (int, Form): Size of the whole file in bytes
+                part_size (int, Form): Optional part size, at least 5 MiB and at most 64 MiB
+                access_token (str): Bearer token for authentication (auto-extracted)
+                customer_id (str): Customer ID extracted from authorization header
+
+            Returns:
+                JSONResponse: upload_id, object_id, part_size, part_count and expires_in
+
+            Raises:
+                HTTPException: 401 if authentication fails
+                HTTPException: 500 if the object or the upload session cannot be created
+            """
+            print(f"Create blend upload endpoint hit for customer: {customer_id}, file: {blend_file_name}, size: {file_size} bytes")
+
+            try:
+                mongo_response = await self.http_client.post(
+                    f"{self.mongodb_service_url}/api/mongodb-service/blender-objects/add",
+                    json={
+                        "customerId": customer_id,
+                        "blendFileName": blend_file_name
+                    }
+                )
+                if mongo_response.status_code != 201:
+                    raise HTTPException(
+                        status_code=500,
+                        detail=f"Failed to create blender object: {mongo_response.text}"
+                    )
+                object_id = mongo_response.json()["objectId"]
+
+                if not blend_file_name.endswith('.blend'):
+                    blend_file_path = f"{customer_id}/{object_id}/{blend_file_name}.blend"
+                else:
+                    blend_file_path = f"{customer_id}/{object_id}/{blend_file_name}"
+
+                session_form = {
+                    "bucket": "blend-files",
+                    "key": blend_file_path,
+                    "total_size": str(file_size),
+                    "owner": customer_id,
+                    "metadata": json.dumps({"object_id": object_id, "blend_file_name": blend_file_name})
+                }
+                if part_size:
+                    session_form["part_size"] = str(part_size)
+                blob_response = await self.http_client.post(
+                    f"{self.blob_service_url}/api/blob-service/upload-sessions",
+                    data=session_form
+                )
+                if blob_response.status_code != 201:
+                    # Nothing was uploaded yet, so the object record is dropped again
+                    await self.http_client.delete(
+                        f"{self.mongodb_service_url}/api/mongodb-service/blender-objects/delete/{object_id}",
+                        params={"customer_id": customer_id}
+                    )
+                    raise HTTPException(
+                        status_code=400 if blob_response.status_code == 400 else 500,
+                        detail=f"Failed to start blend file upload: {blob_response.text}"
+                    )
+
+                session = blob_response.json()
+                return JSONResponse(content={
+                    "message": "Blend file upload started",
+                    "upload_id": session["session_id"],
+                    "object_id": object_id,
+                    "file_name": blend_file_name,
+                    "file_size_bytes": file_size,
+                    "part_size": session["part_size"],
+                    "part_count": session["part_count"],
+                    "expires_in": session.get("expires_in")
+                }, status_code=201)
+
+            except HTTPException:
+                raise
+            except Exception as e:
+                print(f"Error starting blend file upload: {str(e)}")
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Failed to start blend file upload: {str(e)}"
+                )
+
+        @self.app.put("/api/customer-service/blend-uploads/{upload_id}")
+        async def uploadBlendPart(
+            request: Request,
+            upload_id: str,
+            offset: int,
+            access_token: str = Depends(self.authenticate_token),
+            customer_id: str = Depends(self.getCustomerIdFromAuthorizationHeader)
+        ):
+            """
+            Upload Blend File Part Endpoint
+
+            Stores one part of a resumable upload, sent as the raw request body.
+            Re-sending a part replaces it. An optional X-Content-SHA256 header (hex
+            SHA-256 of the part) lets the server reject a corrupted part.
+
+            Parameters:
+                upload_id (str): Upload id returned when the upload was started
+                offset (int, query): Byte offset of the part, a multiple of part_size
+
+            Returns:
+                JSONResponse: offset, size and sha256 of the stored part, received_bytes and missing_parts
+            """
+            part_headers = {"Content-Type": "application/octet-stream"}
+            for header in ("content-length", "x-content-sha256"):
+                if header in request.headers:
+                    part_headers[header] = request.headers[header]
+
+            try:
+                # Streamed through as it arrives, the blob service checks the part size
+                blob_response = await self.http_client.put(
+                    f"{self.blob_service_url}/api/blob-service/upload-sessions/{upload_id}/parts",
+                    params={"offset": offset, "owner": customer_id},
+                    content=request.stream(),
+                    headers=part_headers,
+                    timeout=httpx.Timeout(30.0, write=None, read=None)
+                )
+            except Exception as e:
+                print(f"Error uploading blend file part: {str(e)}")
+                raise HTTPException(status_code=502, detail=f"Failed to upload blend file part: {str(e)}")
+
+            return JSONResponse(content=blob_response.json(), status_code=blob_response.status_code)
+
+        @self.app.get("/api/customer-service/blend-uploads/{upload_id}")
+        async def getBlendUploadStatus(
+            upload_id: str,
+            access_token: str = Depends(self.authenticate_token),
+            customer_id: str = Depends(self.getCustomerIdFromAuthorizationHeader)
+        ):
+            """
+            Blend File Upload Status Endpoint
+
+            Returns which parts of a resumable upload are stored and which offsets
+            still have to be sent, so an interrupted upload resumes where it stopped.
+
+            Returns:
+                JSONResponse: upload_id, object_id, part_size, received_bytes, received_offsets and missing_offsets
+            """
+            blob_response = await self.http_client.get(
+                f"{self.blob_service_url}/api/blob-service/upload-sessions/{upload_id}",
+                params={"owner": customer_id}
+            )
+            if blob_response.status_code != 200:
+                return JSONResponse(content=blob_response.json(), status_code=blob_response.status_code)
+
+            session = blob_response.json()
+            return JSONResponse(content={
+                "upload_id": upload_id,
+                "object_id": session["metadata"].get("object_id"),
+                "file_size_bytes": session["total_size"],
+                "part_size": session["part_size"],
+                "part_count": session["part_count"],
+                "received_bytes": session["received_bytes"],
+                "received_offsets": session["received_offsets"],
+                "missing_offsets": session["missing_offsets"]
+            }, status_code=200)
+
+        @self.app.post("/api/customer-service/blend-uploads/{upload_id}/complete")
+        async def completeBlendUpload(
+            upload_id: str,
+            access_token: str = Depends(self.authenticate_token),
+            customer_id: str = Depends(self.getCustomerIdFromAuthorizationHeader)
+        ):
+            """
+            Complete Blend File Upload Endpoint
+
+            Assembles the stored parts into the blend file and records its path and
+            size on the blender object. Answers 409 with the missing offsets while
+            parts are still missing.
+
+            Returns:
+                JSONResponse: Same shape as upload-blend-file
+            """
+            blob_response = await self.http_client.post(
+                f"{self.blob_service_url}/api/blob-service/upload-sessions/{upload_id}/complete",
+                data={"owner": customer_id},
+                timeout=httpx.Timeout(30.0, read=None)
+            )
+            if blob_response.status_code != 200:
+                return JSONResponse(content=blob_response.json(), status_code=blob_response.status_code)
+
+            blob_result = blob_response.json()
+            object_id = blob_result["metadata"].get("object_id")
+            update_response = await self.http_client.put(
+                f"{self.mongodb_service_url}/api/mongodb-service/blender-objects/update-blend-file",
+                json={
+                    "objectId": object_id,
+                    "customerId": customer_id,
+                    "blendFilePath": blob_result["key"],
+                    "blendFileSize": blob_result["size_bytes"]
+                }
+            )
+            if update_response.status_code != 200:
+                print(f"Warning: Failed to update blend file path: {update_response.text}")
+
+            return JSONResponse(content={
+                "message": "Blend file uploaded successfully",
+                "customer_id": customer_id,
+                "object_id": object_id,
+                "file_name": blob_result["metadata"].get("blend_file_name"),
+                "file_size_bytes": blob_result["size_bytes"],
+                "upload_timestamp": datetime.now().isoformat(),
+                "status": "uploaded"
+            }, status_code=200)
+
+        @self.app.delete("/api/customer-service/blend-uploads/{upload_id}")
+        async def abortBlendUpload(
+            upload_id: str,
+            access_token: str = Depends(self.authenticate_token),
+            customer_id: str = Depends(self.getCustomerIdFromAuthorizationHeader)
+        ):
+            """
+            Abort Blend File Upload Endpoint
+
+            Drops the parts stored so far and the blender object created for the upload.
+
+            Returns:
+                JSONResponse: Confirmation with the object_id of the dropped object
+            """
+            blob_response = await self.http_client.delete(
+                f"{self.blob_service_url}/api/blob-service/upload-sessions/{upload_id}",
+                params={"owner": customer_id}
+            )
+            if blob_response.status_code != 200:
+                return JSONResponse(content=blob_response.json(), status_code=blob_response.status_code)
+
+            object_id = blob_response.json()["metadata"].get("object_id")
+            if object_id:
+                await self.http_client.delete(
+                    f"{self.mongodb_service_url}/api/mongodb-service/blender-objects/delete/{object_id}",
+                    params={"customer_id": customer_id}
+                )
+
+            return JSONResponse(content={"message": "Blend file upload aborted", "object_id": object_id}, status_code=200)
+
+        @self.app.post("/api/customer-service/blend-chunk-uploads")
+        async def createChunkedBlendUpload(
+            request: Request,
+            access_token: str = Depends(self.authenticate_token),
+            customer_id: str = Depends(self.getCustomerIdFromAuthorizationHeader)
+        ):
+            """
+            Start Deduplicated Blend File Upload Endpoint
+
+            For re-uploads of a slightly changed blend file. The client cuts the file
+            into content-defined chunks (see service_BlobService/content_chunks.py),
+            sends the list of chunk hashes and sizes, PUTs only the chunks reported as
+            missing to blend-chunks/{hash} and then completes the upload.
+
+            Body (JSON):
+                {"blend_file_name": "chair_model.blend", "chunks": [{"hash": "<sha256>", "size": 1048576}, ...]}
+
+            Returns:
+                JSONResponse: upload_id, object_id, missing chunk hashes and dedup stats
+                (dedup_ratio, bytes_saved) of the upload
+            """
+            try:
+                body = await request.json()
+                blend_file_name = body["blend_file_name"]
+                chunks = body["chunks"]
+            except Exception:
+                raise HTTPException(status_code=400, detail="blend_file_name and chunks are required")
+
+            print(f"Create deduplicated blend upload endpoint hit for customer: {customer_id}, file: {blend_file_name}, {len(chunks)} chunk(s)")
+
+            try:
+                mongo_response = await self.http_client.post(
+                    f"{self.mongodb_service_url}/api/mongodb-service/blender-objects/add",
+                    json={
+                        "customerId": customer_id,
+                        "blendFileName": blend_file_name
+                    }
+                )
+                if mongo_response.status_code != 201:
+                    raise HTTPException(
+                        status_code=500,
+                        detail=f"Failed to create blender object: {mongo_response.text}"
+                    )
+                object_id = mongo_response.json()["objectId"]
+
+                if not blend_file_name.endswith('.blend'):
+                    blend_file_path = f"{customer_id}/{object_id}/{blend_file_name}.blend"
+                else:
+                    blend_file_path = f"{customer_id}/{object_id}/{blend_file_name}"
+
+                blob_response = await self.http_client.post(
+                    f"{self.blob_service_url}/api/blob-service/blend-chunk-uploads",
+                    json={
+                        "bucket": "blend-files",
+                        "key": blend_file_path,
+                        "chunks": chunks,
+                        "owner": customer_id,
+                        "metadata": {"object_id": object_id, "blend_file_name": blend_file_name}
+                    }
+                )
+                if blob_response.status_code != 201:
+                    await self.http_client.delete(
+                        f"{self.mongodb_service_url}/api/mongodb-service/blender-objects/delete/{object_id}",
+                        params={"customer_id": customer_id}
+                    )
+                    raise HTTPException(
+                        status_code=blob_response.status_code if blob_response.status_code == 400 else 500,
+                        detail=f"Failed to start blend file upload: {blob_response.text}"
+                    )
+
+                upload = blob_response.json()
+                return JSONResponse(content={
+                    "message": "Deduplicated blend file upload started",
+                    "upload_id": upload["upload_id"],
+                    "object_id": object_id,
+                    "file_name": blend_file_name,
+                    "missing": upload["missing"],
+                    "stats": upload["stats"],
+                    "expires_in": upload.get("expires_in")
+                }, status_code=201)
+
+            except HTTPException:
+                raise
+            except Exception as e:
+                print(f"Error starting deduplicated blend file upload: {str(e)}")
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Failed to start blend file upload: {str(e)}"
+                )
+
+        @self.app.put("/api/customer-service/blend-chunks/{chunk_hash}")
+        async def uploadBlendChunk(
+            request: Request,
+            chunk_hash: str,
+            access_token: str = Depends(self.authenticate_token),
+            customer_id: str = Depends(self.getCustomerIdFromAuthorizationHeader)
+        ):
+            """
+            Upload Blend File Chunk Endpoint
+
+            Stores one content-defined chunk sent as the raw request body. The blob
+            service rejects content that does not hash to chunk_hash.
+            """
+            chunk_headers = {"Content-Type": "application/octet-stream"}
+            if "content-length" in request.headers:
+                chunk_headers["Content-Length"] = request.headers["content-length"]
+
+            try:
+                blob_response = await self.http_client.put(
+                    f"{self.blob_service_url}/api/blob-service/blend-chunks/{chunk_hash}",
+                    content=request.stream(),
+                    headers=chunk_headers
+                )
+            except Exception as e:
+                print(f"Error uploading blend file chunk: {str(e)}")
+                raise HTTPException(status_code=502, detail=f"Failed to upload blend file chunk: {str(e)}")
+
+            return JSONResponse(content=blob_response.json(), status_code=blob_response.status_code)
+
+        @self.app.post("/api/customer-service/blend-chunk-uploads/{upload_id}/complete")
+        async def completeChunkedBlendUpload(
+            upload_id: str,
+            access_token: str = Depends(self.authenticate_token),
+            customer_id: str = Depends(self.getCustomerIdFromAuthorizationHeader)
+        ):
+            """
+            Complete Deduplicated Blend File Upload Endpoint
+
+            Assembles the blend file from its chunks and records it on the blender
+            object. Answers 409 with the chunk hashes still missing.
+
+            Returns:
+                JSONResponse: Same shape as upload-blend-file, plus the dedup stats
+            """
+            blob_response = await self.http_client.post(
+                f"{self.blob_service_url}/api/blob-service/blend-chunk-uploads/{upload_id}/complete",
+                data={"owner": customer_id},
+                timeout=httpx.Timeout(30.0, read=None)
+            )
+            if blob_response.status_code != 200:
+                return JSONResponse(content=blob_response.json(), status_code=blob_response.status_code)
+
+            blob_result = blob_response.json()
+            object_id = blob_result["metadata"].get("object_id")
+            update_response = await self.http_client.put(
+                f"{self.mongodb_service_url}/api/mongodb-service/blender-objects/update-blend-file",
+                json={
+                    "objectId": object_id,
+                    "customerId": customer_id,
+                    "blendFilePath": blob_result["key"],
+                    "blendFileContentHash": blob_result["sha256"],
+                    "blendFileSize": blob_result["size_bytes"]
+                }
+            )
+            if update_response.status_code != 200:
+                print(f"Warning: Failed to update blend file path: {update_response.text}")
+
+            return JSONResponse(content={
+                "message": "Blend file uploaded successfully",
+                "customer_id": customer_id,
+                "object_id": object_id,
+                "file_name": blob_result["metadata"].get("blend_file_name"),
+                "file_size_bytes": blob_result["size_bytes"],
+                "file_sha256": blob_result["sha256"],
+                "dedup": blob_result["stats"],
+                "upload_timestamp": datetime.now().isoformat(),
+                "status": "uploaded"
+            }, status_code=200)
+
         @self.app.post("/api/customer-service/start-workload")
         async def startWorkload(
             request: Request, 
@@ -654,6 +1184,7 @@ class HTTP_SERVER():
         @self.app.get("/api/customer-service/get-blend-file/{object_id}")
         async def getBlendFile(
             object_id: str,
+            request: Request,
             access_token: str = Depends(self.authenticate_token),
             customer_id: str = Depends(self.getCustomerIdFromAuthorizationHeader)
         ):
@@ -678,12 +1209,15 @@ class HTTP_SERVER():
                 3. Streams file content back to client with appropriate headers
                 
             Returns:
-                StreamingResponse: The blend file content with appropriate headers
+                StreamingResponse: The blend file content with appropriate headers.
+                Range, If-Range, If-None-Match and If-Modified-Since are honored, so
+                an interrupted download can be resumed (206 Partial Content)
                 
             Response Headers:
                 Content-Type: application/octet-stream
                 Content-Disposition: attachment; filename="blend_file_name.blend"
                 Content-Length: file size in bytes
+                ETag / Last-Modified / Accept-Ranges, Content-Range on partial responses
                 
             Raises:
                 HTTPException: 401 if authentication fails
@@ -741,91 +1275,20 @@ class HTTP_SERVER():
 
                 print(f"Retrieving from bucket: {bucket}, key: {key}")
 
-                # Step 2: Get file metadata (including content length) from blob service
-                print(f"Getting blend file metadata from blob service...")
-                try:
-                    metadata_response = await self.http_client.get(
-                        f"{self.blob_service_url}/api/blob-service/retrieve-blend-metadata",
-                        params={
-                            "bucket": bucket,
-                            "key": key
-                        },
-                        timeout=10.0
-                    )
-                    
-                    content_length = None
-                    if metadata_response.status_code == 200:
-                        metadata_json = metadata_response.json()
-                        content_length = metadata_json.get("size_bytes")
-                        print(f"Retrieved file metadata - Content length: {content_length} bytes")
-                    else:
-                        print(f"Warning: Could not retrieve metadata, status: {metadata_response.status_code}")
-                        
-                except Exception as e:
-                    print(f"Warning: Error retrieving metadata: {str(e)}")
-                    content_length = None
-
-                # Step 3: Proxy the response directly from blob service to client
-                print(f"Proxying blend file from blob service...")
-
-                # Create a streaming response that proxies the blob service
-                async def proxy_blend_file():
-                    try:
-                        async with httpx.AsyncClient() as proxy_client:
-                            async with proxy_client.stream(
-                                "GET",
-                                f"{self.blob_service_url}/api/blob-service/retrieve-blend",
-                                params={
-                                    "bucket": bucket,
-                                    "key": key
-                                },
-                                timeout=30.0
-                            ) as response:
-                                if response.status_code != 200:
-                                    # If blob service fails, we need to handle it differently
-                                    try:
-                                        error_content = await response.aread()
-                                        error_detail = error_content.decode(errors="replace")
-                                    except Exception:
-                                        error_detail = "Unknown error"
-                                    print(f"Blob service returned error: {response.status_code} - {error_detail}")
-                                    raise HTTPException(
-                                        status_code=response.status_code,
-                                        detail=f"Blob service error: {error_detail}"
-                                    )
-
-                                # Stream the response directly to the client
-                                async for chunk in response.aiter_bytes():
-                                    yield chunk
-
-                    except HTTPException:
-                        raise
-                    except Exception as e:
-                        print(f"Error in proxy stream: {str(e)}")
-                        raise HTTPException(
-                            status_code=500,
-                            detail=f"Failed to proxy blend file: {str(e)}"
-                        )
-
-                # Return streaming response with proper headers
+                # Step 2: Proxy the response directly from blob service to client, the blob
+                # service sends Content-Length and answers Range / conditional requests
                 file_name = os.path.basename(blend_file_path) if blend_file_path else "blendfile.blend"
                 print(f"Proxying blend file: {file_name}")
 
-                # Prepare response headers
-                response_headers = {
-                    "Content-Disposition": f"attachment; filename=\"{file_name}\"",
-                    "Cache-Control": "no-cache"
-                }
-                
-                # Add content length if available
-                if content_length is not None:
-                    response_headers["Content-Length"] = str(content_length)
-                    print(f"Added Content-Length header: {content_length} bytes")
-
-                return StreamingResponse(
-                    proxy_blend_file(),
+                return await self.proxyBlobStream(
+                    "/api/blob-service/retrieve-blend",
+                    {"bucket": bucket, "key": key},
+                    request,
                     media_type="application/octet-stream",
-                    headers=response_headers
+                    headers={
+                        "Content-Disposition": f"attachment; filename=\"{file_name}\"",
+                        "Cache-Control": "no-cache"
+                    }
                 )
             except HTTPException:
                 raise
@@ -951,6 +1414,10 @@ class HTTP_SERVER():
                 3. Generates signed URL from blob service
                 4. Returns the signed URL with expiration information
                 
+            The blob service hands out the same URL again while the video is unchanged
+            and enough of its lifetime is left, so this endpoint is cheap to poll;
+            "expiration" is the number of seconds the returned URL is still valid.
+                
             Returns:
                 JSONResponse: Signed URL and metadata for video access
                 
@@ -960,7 +1427,8 @@ class HTTP_SERVER():
                     "objectId": "object-uuid",
                     "customerId": "customer-uuid",
                     "signedUrl": "https://blob-storage.com/signed-url-with-token",
-                    "expiresIn": 3600,
+                    "expiration": 3600,
+                    "expiresAt": 1767225600,
                     "videoPath": "customer-uuid/object-uuid/rendered_video.mp4"
                 }
                 
@@ -1011,7 +1479,7 @@ class HTTP_SERVER():
                     params={
                         "bucket": "rendered-videos",
                         "key": rendered_video_path,
-                        "expiration": 3600  # 1 minute expiration
+                        "expiration": 3600  # 1 hour expiration
                     }
                 )
                 
@@ -1048,16 +1516,22 @@ class HTTP_SERVER():
                 proxy_url = f"{path_with_params}"
                 print(f"Created proxy URL: {proxy_url}")
                 
+                # The blob service reuses a signed URL while the video is unchanged, so repeated
+                # calls return the same URL with less time left; the UI may keep the response
+                # for a small part of that time before asking again
+                expires_in = int(blob_result.get("expires_in", 3600))
+                
                 # Return the proxy URL instead of direct blob service URL
                 return JSONResponse(content={
                     "message": "Signed URL generated successfully",
                     "objectId": object_id,
                     "customerId": customer_id,
                     "signedUrl": proxy_url,
-                    "expiration": 3600,
+                    "expiration": expires_in,
+                    "expiresAt": blob_result.get("expires_at"),
                     "videoPath": rendered_video_path,
                     "timestamp": datetime.now().isoformat()
-                }, status_code=200)
+                }, status_code=200, headers={"Cache-Control": f"private, max-age={max(0, min(60, expires_in // 4))}"})
                 
             except HTTPException:
                 raise
@@ -1170,7 +1644,8 @@ class HTTP_SERVER():
             access_token: str = Depends(self.authenticate_token),
             customer_id: str = Depends(self.getCustomerIdFromAuthorizationHeader),
             start_frame: int = 0,
-            pagination_size: int = 20
+            pagination_size: int = 20,
+            variant: str = "original"
         ):
             """
             Get Rendered Frames Endpoint with Pagination
@@ -1189,6 +1664,8 @@ class HTTP_SERVER():
                 customer_id (str): Customer ID extracted from authorization header
                 start_frame (int, optional): Starting frame index for pagination (default: 0)
                 pagination_size (int, optional): Number of frames to return (default: 20)
+                variant (str, optional): "original" full resolution frames (default), or
+                    "thumbnail" (320 px) / "preview" (1280 px) WebP versions for galleries
                 
             Process:
                 1. Checks payment status for the object
@@ -1210,6 +1687,7 @@ class HTTP_SERVER():
                 X-Start-Frame: Starting frame index
                 X-Pagination-Size: Requested pagination size
                 X-Has-More-Frames: Whether more frames are available
+                X-Frame-Variant: Requested frame variant
                 
             Example Response:
                 JSON metadata:
@@ -1234,7 +1712,10 @@ class HTTP_SERVER():
                 HTTPException: 500 if internal server error occurs
             """
             print(f"Get rendered frames endpoint hit for customer: {customer_id}, object: {object_id}")
-            print(f"Pagination parameters - start_frame: {start_frame}, pagination_size: {pagination_size}")
+            print(f"Pagination parameters - start_frame: {start_frame}, pagination_size: {pagination_size}, variant: {variant}")
+
+            if variant not in FRAME_VARIANTS:
+                raise HTTPException(status_code=400, detail=f"Unknown variant '{variant}', expected one of {list(FRAME_VARIANTS)}")
             
             try:
                 # Step 1: Check if the object is paid for
@@ -1328,43 +1809,38 @@ class HTTP_SERVER():
                     print(f"Customer has not paid - returning {len(frames_to_return)} frames from available frames, starting from frame {start_frame}")
                     print(f"Returned frame indices: {paginated_available_indices}")
                 
-                # Step 4: Get metadata for each frame (including content length)
+                # Step 4: Get metadata of every frame (including content length) with one
+                # batch request. A thumbnail or preview not made yet has no size until it is sent
                 print("Retrieving metadata for rendered frames...")
+                frames_to_return = [
+                    frame for frame in frames_to_return
+                    if frame.get("frameNumber") is not None and frame.get("imageFilePath")
+                ]
+                frame_keys = [frame["imageFilePath"] for frame in frames_to_return]
+                content_lengths = {}
+                if frame_keys:
+                    try:
+                        metadata_response = await self.http_client.post(
+                            f"{self.blob_service_url}/api/blob-service/objects-metadata",
+                            data={"bucket": "rendered-frames", "keys": frame_keys, "variant": variant},
+                            timeout=10.0
+                        )
+                        if metadata_response.status_code == 200:
+                            content_lengths = {obj["key"]: obj["size_bytes"] for obj in metadata_response.json()["objects"]}
+                        else:
+                            print(f"Warning: Could not retrieve frame metadata, status: {metadata_response.status_code}")
+                    except Exception as e:
+                        print(f"Warning: Error retrieving frame metadata: {str(e)}")
+
                 frames_metadata = []
                 for frame in frames_to_return:
-                    frame_number = frame.get("frameNumber")
-                    image_file_path = frame.get("imageFilePath")
-                    
-                    if frame_number is not None and image_file_path:
-                        # Get image metadata from blob service
-                        try:
-                            metadata_response = await self.http_client.get(
-                                f"{self.blob_service_url}/api/blob-service/retrieve-blend-metadata",
-                                params={
-                                    "bucket": "rendered-frames",
-                                    "key": image_file_path
-                                },
-                                timeout=5.0
-                            )
-                            
-                            content_length = None
-                            if metadata_response.status_code == 200:
-                                metadata_json = metadata_response.json()
-                                content_length = metadata_json.get("size_bytes")
-                                print(f"Retrieved metadata for frame {frame_number} - Content length: {content_length} bytes")
-                            else:
-                                print(f"Warning: Could not retrieve metadata for frame {frame_number}, status: {metadata_response.status_code}")
-                                
-                        except Exception as e:
-                            print(f"Warning: Error retrieving metadata for frame {frame_number}: {str(e)}")
-                            content_length = None
-                        
-                        frames_metadata.append({
-                            "frameNumber": frame_number,
-                            "imageFilePath": image_file_path,
-                            "contentLength": content_length,
-                            "contentLengthHuman": self._format_file_size(content_length) if content_length else None
-                        })
+                    content_length = content_lengths.get(frame["imageFilePath"])
+                    frames_metadata.append({
+                        "frameNumber": frame["frameNumber"],
+                        "imageFilePath": frame["imageFilePath"],
+                        "contentLength": content_length,
+                        "contentLengthHuman": self._format_file_size(content_length) if content_length else None
+                    })
                 
                 # Step 5: Create streaming response with images
                 async def stream_frames_with_images():
@@ -1382,6 +1858,7 @@ class HTTP_SERVER():
                             "isPreview": not is_paid,
                             "startFrame": start_frame,
                             "paginationSize": pagination_size,
+                            "variant": variant,
                             "hasMoreFrames": (start_frame + len(frames_metadata)) < total_frames if is_paid else len(frames_metadata) == pagination_size
                         }
                         
@@ -1389,46 +1866,45 @@ class HTTP_SERVER():
                         metadata_json = json.dumps(metadata_response) + "\n"
                         yield metadata_json.encode('utf-8')
                         
-                        # Then stream each image
-                        for frame in frames_to_return:
-                            frame_number = frame.get("frameNumber")
-                            image_file_path = frame.get("imageFilePath")
-                            
-                            if frame_number is not None and image_file_path:
-                                print(f"Streaming image for frame {frame_number}: {image_file_path}")
-                                
-                                # Get image from blob storage
-                                async with httpx.AsyncClient() as proxy_client:
-                                    try:
-                                        async with proxy_client.stream(
-                                            "GET",
-                                            f"{self.blob_service_url}/api/blob-service/retrieve-image",
-                                            params={
-                                                "bucket": "rendered-frames",
-                                                "key": image_file_path,
-                                                "type": "png"
-                                            }
-                                        ) as response:
-                                            if response.status_code == 200:
-                                                # Send frame separator
-                                                frame_header = f"---FRAME_{frame_number}---\n"
-                                                yield frame_header.encode('utf-8')
-                                                
-                                                # Stream the image data
-                                                async for chunk in response.aiter_bytes():
-                                                    yield chunk
-                                                
-                                                # Send frame end separator
-                                                frame_footer = f"---END_FRAME_{frame_number}---\n"
-                                                yield frame_footer.encode('utf-8')
-                                            else:
-                                                print(f"Failed to retrieve image for frame {frame_number}: {response.status_code}")
-                                                error_msg = f"---ERROR_FRAME_{frame_number}: Failed to retrieve image---\n"
-                                                yield error_msg.encode('utf-8')
-                                    except Exception as e:
-                                        print(f"Error streaming image for frame {frame_number}: {str(e)}")
-                                        error_msg = f"---ERROR_FRAME_{frame_number}: {str(e)}---\n"
-                                        yield error_msg.encode('utf-8')
+                        # Then stream every image, all fetched with one batch request
+                        if not frame_keys:
+                            return
+                        frame_numbers = [frame["frameNumber"] for frame in frames_to_return]
+                        print(f"Streaming {len(frame_keys)} images for frames {frame_numbers[0]} to {frame_numbers[-1]}")
+                        try:
+                            async with self.http_client.stream(
+                                "POST",
+                                f"{self.blob_service_url}/api/blob-service/retrieve-images-batch",
+                                data={"bucket": "rendered-frames", "keys": frame_keys, "variant": variant},
+                                timeout=None
+                            ) as response:
+                                if response.status_code != 200:
+                                    error_detail = (await response.aread()).decode(errors="replace")
+                                    print(f"Failed to retrieve images: {response.status_code} - {error_detail}")
+                                    for frame_number in frame_numbers:
+                                        yield f"---ERROR_FRAME_{frame_number}: Failed to retrieve image---\n".encode('utf-8')
+                                    return
+
+                                async for event, value in self.iterBlobBatchParts(response):
+                                    if event == "data":
+                                        # Stream the image data
+                                        yield value
+                                        continue
+                                    frame_number = frame_numbers[value["index"]]
+                                    if value["status"] != 200:
+                                        if event == "start":
+                                            print(f"Failed to retrieve image for frame {frame_number}: {value['status']}")
+                                            yield f"---ERROR_FRAME_{frame_number}: Failed to retrieve image---\n".encode('utf-8')
+                                    elif event == "start":
+                                        # Send frame separator
+                                        yield f"---FRAME_{frame_number}---\n".encode('utf-8')
+                                    else:
+                                        # Send frame end separator
+                                        yield f"---END_FRAME_{frame_number}---\n".encode('utf-8')
+                        except Exception as e:
+                            print(f"Error streaming images: {str(e)}")
+                            error_msg = f"---ERROR_FRAMES: {str(e)}---\n"
+                            yield error_msg.encode('utf-8')
                         
                     except Exception as e:
                         print(f"Error in stream_frames_with_images: {str(e)}")
@@ -1449,6 +1925,7 @@ class HTTP_SERVER():
                         "X-Frames-Returned": str(len(frames_to_return)),
                         "X-Start-Frame": str(start_frame),
                         "X-Pagination-Size": str(pagination_size),
+                        "X-Frame-Variant": variant,
                         "X-Has-More-Frames": str((start_frame + len(frames_to_return)) < total_frames if is_paid else len(frames_to_return) == pagination_size)
                     }
                 )
@@ -1635,17 +2112,22 @@ class HTTP_SERVER():
                     print(f"[ZIP_FRAMES] Warning: returned key {returned_key} differs from expected {zip_key}; using returned key.")
                     zip_key = returned_key
                 
-                # Get zip file size
-                zip_size_bytes = None
-                zip_size_human = None
-                exists_response = await self.http_client.get(
+                # Get zip file size, reported by the blob service along with whether the
+                # stored zip was reused or extended instead of rebuilt
+                zip_size_bytes = create_json.get("size_bytes")
+                zip_size_human = self._format_file_size(zip_size_bytes) if zip_size_bytes is not None else None
+                if create_json.get("reused"):
+                    print("[ZIP_FRAMES] Reusing the stored zip, no frame changed")
+                elif create_json.get("appended_frames"):
+                    print(f"[ZIP_FRAMES] Stored zip extended with {create_json['appended_frames']} new frame(s)")
+                exists_response = None if zip_size_bytes is not None else await self.http_client.get(
                     f"{self.blob_service_url}/api/blob-service/object-exists",
                     params={
                         "bucket": "frames-zip",
                         "key": zip_key
                     }
                 )
-                if exists_response.status_code == 200:
+                if exists_response is not None and exists_response.status_code == 200:
                     exists_json = exists_response.json()
                     if exists_json.get("exists"):
                         zip_size_bytes = exists_json.get("size_bytes")
@@ -1694,12 +2176,13 @@ class HTTP_SERVER():
                     "zipKey": zip_key,
                     "bucket": "frames-zip",
                     "signed_url": proxy_path,
-                    "expiresIn": secs,
+                    "expiresIn": int(signed_json.get("expires_in", secs)),
                     "totalFrames": total_frames,
                     "framesInZip": frames_in_zip,
                     "paymentStatus": "paid" if is_paid else "unpaid",
                     "zipSizeBytes": zip_size_bytes,
-                    "zipSizeHuman": zip_size_human
+                    "zipSizeHuman": zip_size_human,
+                    "zipReused": bool(create_json.get("reused"))
                 }, status_code=200)
             except HTTPException:
                 raise
@@ -1707,6 +2190,79 @@ class HTTP_SERVER():
                 print(f"[ZIP_FRAMES][ERROR] {str(e)}")
                 raise HTTPException(status_code=500, detail=f"Failed to prepare frames zip: {str(e)}")
 
+        @self.app.get("/api/customer-service/download-rendered-frames-zip/{object_id}")
+        async def downloadRenderedFramesZip(
+            object_id: str,
+            request: Request,
+            access_token: str = Depends(self.authenticate_token),
+            customer_id: str = Depends(self.getCustomerIdFromAuthorizationHeader),
+        ):
+            """
+            Download Rendered Frames Zip Endpoint
+
+            Streams a ZIP archive of the rendered frames of an object, assembled by the
+            blob service from the frame objects while it is downloaded. Nothing is
+            built or stored up front, so the download starts right away, unlike
+            create-and-retrieve-zip-file-of-rendered-frames.
+
+            Authentication:
+                Requires valid Bearer token in Authorization header
+
+            Parameters:
+                object_id (str): The unique identifier of the blender object
+                access_token (str): Bearer token for authentication (auto-extracted)
+                customer_id (str): Customer ID extracted from authorization header
+
+            Process:
+                1. Validates the blender object belongs to the customer
+                2. Checks the payment status (unpaid objects get 1/3rd of the frames)
+                3. Proxies the streamed archive from the blob service
+
+            Returns:
+                StreamingResponse: The zip archive, with Content-Length known up front.
+                The ETag identifies the frames included; Range with If-Range resumes an
+                interrupted download (206 Partial Content)
+
+            Raises:
+                HTTPException: 401 if authentication fails
+                HTTPException: 404 if object not found or no frames rendered yet
+                HTTPException: 500 if streaming the archive fails
+            """
+            print(f"[ZIP_STREAM] Request received for customer_id={customer_id} object_id={object_id}")
+            try:
+                mongo_response = await self.http_client.get(
+                    f"{self.mongodb_service_url}/api/mongodb-service/blender-objects/get-by-object-id/{object_id}",
+                    params={"customer_id": customer_id}
+                )
+                if mongo_response.status_code != 200:
+                    raise HTTPException(status_code=mongo_response.status_code, detail=f"MongoDB service error: {mongo_response.text}")
+                blender_object = mongo_response.json().get("blenderObject")
+                if not blender_object:
+                    raise HTTPException(status_code=404, detail="Blender object not found")
+                if not blender_object.get("renderedImages"):
+                    raise HTTPException(status_code=404, detail="No rendered frames available for this object yet")
+
+                payment_response = await self.http_client.get(
+                    f"{self.mongodb_service_url}/api/mongodb-service/blender-objects/check-plan/{object_id}"
+                )
+                if payment_response.status_code != 200:
+                    raise HTTPException(status_code=404, detail=f"Object not found: {payment_response.text}")
+                is_paid = payment_response.json().get("isPaid", False)
+                print(f"[ZIP_STREAM] Payment status: {'paid' if is_paid else 'unpaid'}")
+
+                return await self.proxyBlobStream(
+                    "/api/blob-service/stream-frames-zip",
+                    {"bucket": "rendered-frames", "prefix": f"{customer_id}/{object_id}", "is_paid": str(is_paid).lower()},
+                    request,
+                    media_type="application/zip",
+                    headers={"Content-Disposition": f"attachment; filename=\"{object_id}-frames.zip\""}
+                )
+            except HTTPException:
+                raise
+            except Exception as e:
+                print(f"[ZIP_STREAM][ERROR] {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Failed to stream frames zip: {str(e)}")
+
         @self.app.get("/api/customer-service/get-zip-from-signed-url/{zip_path:path}")
         async def getZipFromSignedUrl(
             zip_path: str,
@@ -1813,7 +2369,8 @@ class HTTP_SERVER():
             buckets_to_clean = [
                 "blend-files",
                 "rendered-videos", 
-                "rendered-frames"
+                "rendered-frames",
+                "frame-previews"
             ]
             
             deletion_results = {}
@@ -0,0 +1,125 @@
+import collections
+from typing import AsyncIterable, AsyncIterator, Optional
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart before 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+
+# ---------------- Streaming multipart/form-data ---------------- #
+
+class MultipartPart:
+    """One part of a multipart body: its headers, then its content read as it arrives."""
+
+    def __init__(self, reader: "MultipartStreamReader", headers: dict):
+        self.reader = reader
+        self.headers = headers
+        _, options = parse_options_header(headers.get("content-disposition", ""))
+        self.name = options.get(b"name", b"").decode("utf-8", "replace")
+        filename = options.get(b"filename")
+        self.filename = filename.decode("utf-8", "replace") if filename is not None else None
+        self.content_type = headers.get("content-type")
+        self.finished = False
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """Content of the part, chunk by chunk as the request body is received."""
+        while not self.finished:
+            event, data = await self.reader.next_event()
+            if event == "data":
+                yield data
+            elif event in ("end", "eof"):
+                self.finished = True
+
+    async def read(self, max_size: int = 64 * 1024) -> bytes:
+        """Whole content of a small part, e.g. a form field."""
+        content = bytearray()
+        async for chunk in self.chunks():
+            content += chunk
+            if len(content) > max_size:
+                raise ValueError(f"Form field '{self.name}' is longer than {max_size} bytes")
+        return bytes(content)
+
+
+class MultipartStreamReader:
+    """
+    Parses a multipart/form-data request body while it is being received, so a
+    file part can be forwarded chunk by chunk instead of being spooled to disk
+    first (as UploadFile does) and read back.
+
+        reader = MultipartStreamReader(request.headers["content-type"], request.stream())
+        while (part := await reader.next_part()) is not None:
+            if part.filename is None:
+                value = (await part.read()).decode()
+            else:
+                async for chunk in part.chunks():
+                    ...
+    """
+
+    def __init__(self, content_type: str, body: AsyncIterable[bytes]):
+        """
+        Args:
+            content_type (str): Content-Type header of the request, with the boundary
+            body (AsyncIterable[bytes]): Request body, e.g. request.stream()
+
+        Raises:
+            ValueError: If the content type is not multipart/form-data with a boundary
+        """
+        media_type, options = parse_options_header(content_type or "")
+        boundary = options.get(b"boundary")
+        if media_type != b"multipart/form-data" or not boundary:
+            raise ValueError("Expected a multipart/form-data body")
+
+        self.body = body.__aiter__()
+        self.events = collections.deque()
+        self.headers = {}
+        self.header_field = bytearray()
+        self.header_value = bytearray()
+        self.body_finished = False
+        self.part: Optional[MultipartPart] = None
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": lambda data, start, end: self.header_field.extend(data[start:end]),
+            "on_header_value": lambda data, start, end: self.header_value.extend(data[start:end]),
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": lambda: self.events.append(("headers", dict(self.headers))),
+            "on_part_data": lambda data, start, end: self.events.append(("data", bytes(data[start:end]))),
+            "on_part_end": lambda: self.events.append(("end", None)),
+        })
+
+    def _on_part_begin(self):
+        self.headers = {}
+
+    def _on_header_end(self):
+        self.headers[self.header_field.decode("latin-1").lower()] = self.header_value.decode("latin-1")
+        self.header_field.clear()
+        self.header_value.clear()
+
+    async def next_event(self):
+        """Next parser event, feeding the parser from the body when it has none left."""
+        while not self.events:
+            if self.body_finished:
+                return "eof", None
+            try:
+                chunk = await self.body.__anext__()
+            except StopAsyncIteration:
+                self.body_finished = True
+                self.parser.finalize()
+                continue
+            if chunk:
+                self.parser.write(chunk)
+        return self.events.popleft()
+
+    async def next_part(self) -> Optional[MultipartPart]:
+        """The next part, once its headers are received; the rest of the current part is skipped. None at the end."""
+        if self.part is not None and not self.part.finished:
+            async for _ in self.part.chunks():
+                pass
+        while True:
+            event, data = await self.next_event()
+            if event == "eof":
+                self.part = None
+                return None
+            if event == "headers":
+                self.part = MultipartPart(self, data)
+                return self.part
@@ -298,6 +298,7 @@ class HTTP_SERVER():
         async def update_blend_file_path(request: Request):
             """Update the blend file path for a blender object
             Required fields: objectId, customerId, blendFilePath
+            Optional fields: blendFileContentHash (SHA-256 of the content), blendFileSize
             Returns: Success message with updated object details including calculated blendFileHash
             """
             try:
@@ -318,14 +319,18 @@ class HTTP_SERVER():
                 blend_file_hash = self.calculate_file_hash(body["blendFilePath"])
                 
                 # Update the blend file path and hash
+                update_fields = {
+                    "blendFilePath": body["blendFilePath"],
+                    "blendFileHash": blend_file_hash
+                }
+                # Computed by the blob service while the upload was streamed
+                for field in ("blendFileContentHash", "blendFileSize"):
+                    if body.get(field) is not None:
+                        update_fields[field] = body[field]
+
                 result = self.blender_objects_collection.update_one(
                     {"objectId": body["objectId"], "customerId": body["customerId"]},
-                    {
-                        "$set": {
-                            "blendFilePath": body["blendFilePath"],
-                            "blendFileHash": blend_file_hash
-                        }
-                    }
+                    {"$set": update_fields}
                 )
                 
                 if result.matched_count == 0:
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Offline checks for VideoAssembler: synthetic frames made with ffmpeg's test
+source are added out of order, and the joined mp4 must hold the expected number
+of frames, also when a segment fails to encode. A finish with a frame that never
+arrived is refused unless missing frames are allowed.
+Needs nothing but an ffmpeg executable.
+
+    python service_SessionSupervisorService/Testing/video-assembler-check.py
+    python service_SessionSupervisorService/Testing/video-assembler-check.py --ffmpeg /usr/local/bin/ffmpeg
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from video_assembler import VideoAssembler
+
+FRAMES = 60
+SEGMENT_FRAMES = 12
+FPS = 24
+
+
+def make_frames(ffmpeg, directory, count):
+    """PNG bytes of count distinct test-pattern frames, by frame number (from 1)."""
+    subprocess.run(
+        [ffmpeg, "-hide_banner", "-loglevel", "error", "-f", "lavfi", "-i", f"testsrc=size=320x240:rate={FPS}",
+         "-frames:v", str(count), os.path.join(directory, "source_%04d.png")],
+        check=True
+    )
+    frames = {}
+    for number in range(1, count + 1):
+        with open(os.path.join(directory, f"source_{number:04d}.png"), "rb") as frame_file:
+            frames[number] = frame_file.read()
+    return frames
+
+
+def count_video_frames(ffmpeg, path):
+    """Frames ffmpeg decodes from a video."""
+    result = subprocess.run([ffmpeg, "-hide_banner", "-i", path, "-map", "0:v", "-f", "null", "-"],
+                            capture_output=True, text=True, check=True)
+    return int(re.findall(r"frame=\s*(\d+)", result.stderr)[-1])
+
+
+async def assemble(ffmpeg, work_dir, frames, seed, allow_missing=False):
+    """
+    Add the frames in a random order, as volunteers return them, and join the video.
+    The last frames are still being added when finish is called, as when a batch is
+    stored concurrently.
+    """
+    assembler = VideoAssembler(work_dir, 1, FRAMES, fps=FPS, segment_frames=SEGMENT_FRAMES, ffmpeg=ffmpeg)
+    order = list(frames)
+    random.Random(seed).shuffle(order)
+    try:
+        for number in order[:-4]:
+            await assembler.add_frame(number, frames[number], "png")
+            await asyncio.sleep(0)
+        last_adds = [asyncio.create_task(assembler.add_frame(number, frames[number], "png")) for number in order[-4:]]
+        await asyncio.sleep(0)
+        video_path = await assembler.finish(os.path.join(os.path.dirname(work_dir), f"{os.path.basename(work_dir)}.mp4"),
+                                            allow_missing=allow_missing)
+        await asyncio.gather(*last_adds)
+        return video_path, assembler.encoded_frames
+    finally:
+        await assembler.cleanup()
+
+
+# =============================================================================
+# CHECKS
+# =============================================================================
+
+async def check_all_frames(ffmpeg, directory, frames):
+    video_path, encoded = await assemble(ffmpeg, os.path.join(directory, "all"), frames, seed=1)
+    assert encoded == FRAMES, f"{encoded} frames encoded"
+    assert count_video_frames(ffmpeg, video_path) == FRAMES
+
+
+async def check_missing_frame(ffmpeg, directory, frames):
+    # Frame 30 never arrives: the finish is refused
+    partial = {number: data for number, data in frames.items() if number != 30}
+    try:
+        await assemble(ffmpeg, os.path.join(directory, "refused"), partial, seed=2)
+        raise AssertionError("finish accepted a missing frame")
+    except ValueError:
+        pass
+    # Unless missing frames are allowed: frames 25-29 become a short segment, the video skips 30
+    video_path, encoded = await assemble(ffmpeg, os.path.join(directory, "missing"), partial, seed=2, allow_missing=True)
+    assert encoded == FRAMES - 1, f"{encoded} frames encoded"
+    assert count_video_frames(ffmpeg, video_path) == FRAMES - 1
+
+
+async def check_failed_segment(ffmpeg, directory, frames):
+    # An empty first frame makes ffmpeg fail the segment of frames 13-24; the rest is kept
+    broken = dict(frames)
+    broken[SEGMENT_FRAMES + 1] = b""
+    video_path, encoded = await assemble(ffmpeg, os.path.join(directory, "failed"), broken, seed=3)
+    assert encoded == FRAMES - SEGMENT_FRAMES, f"{encoded} frames encoded"
+    assert count_video_frames(ffmpeg, video_path) == FRAMES - SEGMENT_FRAMES
+
+
+async def check_no_frames(ffmpeg, directory, frames):
+    video_path, encoded = await assemble(ffmpeg, os.path.join(directory, "empty"), {}, seed=4, allow_missing=True)
+    assert video_path is None and encoded == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the VideoAssembler checks")
+    parser.add_argument("--ffmpeg", default=os.getenv("FFMPEG_PATH", "ffmpeg"))
+    args = parser.parse_args()
+    if not VideoAssembler.available(args.ffmpeg):
+        print(f"ffmpeg not found: {args.ffmpeg}")
+        sys.exit(2)
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        frames = make_frames(args.ffmpeg, directory, FRAMES)
+        for check in (check_all_frames, check_missing_frame, check_failed_segment, check_no_frames):
+            started = time.perf_counter()
+            try:
+                asyncio.run(check(args.ffmpeg, directory, frames))
+                print(f"  {check.__name__:<22} ok    {time.perf_counter() - started:6.2f}s")
+            except Exception:
+                failures += 1
+                print(f"  {check.__name__:<22} FAILED")
+                traceback.print_exc()
+
+    print("All checks passed" if not failures else f"{failures} check(s) failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
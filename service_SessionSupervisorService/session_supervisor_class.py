@@ -19,10 +19,13 @@ import uvicorn
 
 import uuid
 import json
+import zlib
 import datetime
 
 import requests
 
+from video_assembler import VideoAssembler
+
 load_dotenv()
 
 # ---------------- Message Queue ---------------- #
@@ -75,9 +78,10 @@ class MessageQueue:
 
         await queue.bind(exchange, routing_key=routing_key)
 
-    async def publish_message(self, exchange_name, routing_key, message_body, headers=None):
+    async def publish_message(self, exchange_name, routing_key, message_body, headers=None, reply_to=None, correlation_id=None):
         """
         Publish message to exchange with routing key.
+        reply_to / correlation_id are set for RPC style messages that expect a reply.
         """
         if exchange_name not in self.exchanges:
             raise Exception(f"Exchange '{exchange_name}' not declared!")
@@ -85,11 +89,23 @@ class MessageQueue:
         message = Message(
             body=message_body.encode() if isinstance(message_body, str) else message_body,
             headers=headers or {},
-            delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            reply_to=reply_to,
+            correlation_id=correlation_id,
         )
 
         await self.exchanges[exchange_name].publish(message, routing_key=routing_key)
 
+    async def declare_reply_queue(self, callback):
+        """
+        Declare an exclusive, server named queue for RPC replies and start consuming it.
+        Returns the queue name to use as reply_to.
+        """
+        queue = await self.channel.declare_queue(exclusive=True, auto_delete=True)
+        self.queues[queue.name] = queue
+        await queue.consume(callback, no_ack=True)
+        return queue.name
+
     async def consume(self, queue_name, callback, no_ack=False):
         """
         Consume messages from a queue.
@@ -105,6 +121,19 @@ class MessageQueue:
 
 
 
+# ------------------ User Commands -------------------------- #
+
+USER_COMMANDS_EXCHANGE = "USER_COMMANDS"
+
+def user_command_routing_key(user_id, shard_count):
+    """
+    Routing key on the USER_COMMANDS exchange for the shard that owns the user (sid).
+    Must match the function of the same name in the User Service.
+    """
+    shard = zlib.crc32(str(user_id).encode()) % max(shard_count, 1)
+    return f"USER_COMMANDS_{shard}"
+
+
 # ------------------ Session Supervisor Class -------------------------- #
 
 class sessionSupervisorClass:
@@ -208,7 +237,27 @@ class sessionSupervisorClass:
         else:
             self.blob_service_url = self.blob_service_url
 
+        # Commands to users go straight to the User Service over the USER_COMMANDS exchange ("mq")
+        # or through its HTTP API ("http")
+        self.user_command_transport = os.getenv("USER_COMMAND_TRANSPORT", "mq").strip().lower()
+        self.user_command_shards = int(os.getenv("USER_COMMAND_SHARDS", "1"))
+        self.user_command_ack_timeout = float(os.getenv("USER_COMMAND_ACK_TIMEOUT", "30"))
+        self.user_command_reply_queue = None
+        self.pending_user_command_replies = {} # correlation id -> Future resolved with the user's response
+
         self.remaining_frame_list = []
+        # Frames stored in the rendered-frames bucket; the workload is complete when
+        # every frame of the range is in here
+        self.stored_frames = set()
+        # Frames being downloaded, stored and added to the video, awaited before the video is finished
+        self.frame_stores = set()
+
+        # Wasted render metrics: frames that were assigned to a user that disconnected
+        # and had to be given to someone else. Users that reconnect within the User
+        # Service grace window are never reported as disconnected and cost nothing here.
+        self.user_disconnections = 0
+        self.frames_reassigned_after_disconnect = 0
+
         self.first_frame = None
         self.last_frame = None
         
@@ -216,6 +265,21 @@ class sessionSupervisorClass:
 
         self.completed = False
 
+        # The video is encoded in segments while frames arrive and joined on completion
+        # (VIDEO_ASSEMBLY=false leaves the video to the customer), see VideoAssembler
+        self.video_assembly_enabled = os.getenv("VIDEO_ASSEMBLY", "true").strip().lower() == "true"
+        self.video_fps = int(os.getenv("VIDEO_FPS", "24"))
+        self.video_segment_frames = int(os.getenv("VIDEO_SEGMENT_FRAMES", "48"))
+        self.video_encoders = int(os.getenv("VIDEO_ENCODERS", "2"))
+        self.ffmpeg_path = os.getenv("FFMPEG_PATH", "ffmpeg").strip()
+        self.video_assembler = None
+
+        # Frames collected from the temp bucket are deleted in batches of TEMP_DELETE_BATCH_SIZE
+        # (and the rest when the session ends) instead of one delete-temp call per frame
+        self.temp_delete_batch_size = int(os.getenv("TEMP_DELETE_BATCH_SIZE", "100"))
+        self.pending_temp_deletions = []
+        self.temp_deletion_flushes = set()  # batch deletes running in the background
+
         self.workload_completed_callback = workload_completed_callback
 
 
@@ -249,7 +313,22 @@ class sessionSupervisorClass:
 
         await self.mq_client.declare_exchange("USER_MANAGER_EXCHANGE", exchange_type=ExchangeType.DIRECT)
 
-        
+        await self.mq_client.declare_exchange(USER_COMMANDS_EXCHANGE, exchange_type=ExchangeType.DIRECT)
+        self.user_command_reply_queue = await self.mq_client.declare_reply_queue(self.callbackUserCommandReplies)
+
+    async def callbackUserCommandReplies(self, message):
+        """
+        Resolve the pending acknowledged command matching the reply's correlation id.
+        """
+        future = self.pending_user_command_replies.pop(message.correlation_id, None)
+        if future is None or future.done():
+            return
+
+        try:
+            future.set_result(json.loads(message.body.decode()))
+        except Exception as e:
+            future.set_exception(e)
+
     async def callbackUserManagerMessages(self, message):
         """
         Handle incoming messages from the User Manager service.
@@ -274,6 +353,7 @@ class sessionSupervisorClass:
         Supported Topics:
             - "new-users": New users assigned to this session
             - "user-frame-rendered": A user completed rendering a frame
+            - "user-frames-rendered": A user completed rendering a batch of frames
             - "user-rendering-completed": A user completed all assigned frames
             - "user-disconnected": A user disconnected from the session
             
@@ -350,6 +430,18 @@ class sessionSupervisorClass:
                 )
                 
                 print(f"Frame processing result: {result}")
+
+            elif payload["topic"] == "user-frames-rendered":
+                # Handle a batch of rendered frames from the user service
+                frame_data = payload["data"]
+                user_id = frame_data["user-id"]
+                frames = frame_data["frames"]
+
+                print(f"Received frames rendered event: user={user_id}, frames={[frame['frame-number'] for frame in frames]}")
+
+                results = await self.user_frames_rendered(user_id, frames)
+
+                print(f"Frames processing results: {results}")
                 
             elif payload["topic"] == "user-rendering-completed":
                 # Handle user rendering completed event
@@ -390,7 +482,7 @@ class sessionSupervisorClass:
                 frameNumber = int(data["frame-number"])
                 blendFileHash = data["blend-file-hash"]
                 
-                response = self.sendMessageToUser_withAcknowledgment(user_id, "retrieve-frame", {"frame-number": frameNumber, "blend-file-hash": blendFileHash})
+                response = await self.sendMessageToUser_withAcknowledgment(user_id, "retrieve-frame", {"frame-number": frameNumber, "blend-file-hash": blendFileHash})
                 
                 if response == True:
                     print(f"User Acknowledged that it has the frame with it and hence would be sending it back to the server")
@@ -426,6 +518,9 @@ class sessionSupervisorClass:
                 - total-frames (int): Total number of frames to render
                 - completed-frames (int): Number of frames already completed
                 - completion-percentage (float): Percentage of work completed (0-100)
+                - user-disconnections (int): Users that disconnected during the session
+                - frames-reassigned-after-disconnect (int): Frames that had to be rendered again
+                  because the user holding them disconnected
                 
         Example:
             status = await supervisor.get_workload_status()
@@ -441,6 +536,8 @@ class sessionSupervisorClass:
             "total-frames" : self.total_frames,
             "completed-frames" : completed_frames,
             "completion-percentage" : completion_percentage,
+            "user-disconnections" : self.user_disconnections,
+            "frames-reassigned-after-disconnect" : self.frames_reassigned_after_disconnect,
         }
     
 
@@ -674,6 +771,15 @@ class sessionSupervisorClass:
             
             print(f"Frame range determined: {first_frame} to {last_frame}")
             print(f"Total frames to render: {len(self.remaining_frame_list)}")
+
+            if self.video_assembly_enabled and VideoAssembler.available(self.ffmpeg_path):
+                self.video_assembler = VideoAssembler(
+                    f"temp_video_segments/{self.session_id}", first_frame, last_frame,
+                    fps=self.video_fps, segment_frames=self.video_segment_frames,
+                    max_encoders=self.video_encoders, ffmpeg=self.ffmpeg_path
+                )
+            elif self.video_assembly_enabled:
+                print(f"Warning: {self.ffmpeg_path} not found, no video will be assembled for this session")
             
             
             return {
@@ -718,9 +824,27 @@ class sessionSupervisorClass:
                     payload={"frame_list": [1, 2, 3], "blend_file_hash": "abc123"}
                 )
         """
-        await self.http_client.post(f"{self.user_service_url}/api/user-service/user/send-msg-to-user", json={"user_id": user_id, "data": payload, "topic": topic})
+        if self.user_command_transport == "mq":
+            await self.publishUserCommand(user_id, topic, payload)
+        else:
+            await self.http_client.post(f"{self.user_service_url}/api/user-service/user/send-msg-to-user", json={"user_id": user_id, "data": payload, "topic": topic})
         print(f"Message sent to user {user_id}: {payload}")
 
+    async def publishUserCommand(self, user_id, topic, payload, reply_to=None, correlation_id=None):
+        """
+        Publish a command for a user on the USER_COMMANDS exchange.
+
+        The routing key is the user's shard, so the command is consumed directly by the
+        User Service instance holding the user's socket, without an HTTP hop.
+        """
+        await self.mq_client.publish_message(
+            USER_COMMANDS_EXCHANGE,
+            user_command_routing_key(user_id, self.user_command_shards),
+            json.dumps({"user_id": user_id, "topic": topic, "data": payload, "supervisor_id": self.session_id}),
+            reply_to=reply_to,
+            correlation_id=correlation_id,
+        )
+
     async def sendMessageToUser_withAcknowledgment(self, user_id, topic, payload):
         """
             Sends a message to a specific user and waits for an acknowledgment.
@@ -731,11 +855,11 @@ class sessionSupervisorClass:
                 user_id (str or int): The unique identifier of the user to whom the message will be sent.
                 topic (str): The topic or channel under which the message should be sent.
                 payload (dict): The actual message data to be delivered to the user.
+            With the "mq" transport the command is published with a reply queue and the
+            User Service publishes the user's response back to it.
             Returns:
-                response: The HTTP response object returned by the user service, which may contain acknowledgment details.
-            Raises:
-                httpx.HTTPError: If the HTTP request fails due to network issues or server errors.
-                Exception: For any other unexpected errors during the message sending process.
+                response: The response returned by the user, or None if the user is not connected,
+                    did not answer within USER_COMMAND_ACK_TIMEOUT seconds or the request failed.
             Example:
                 response = await sendMessageToUser_withAcknowledgment(
                     user_id="12345",
@@ -743,8 +867,90 @@ class sessionSupervisorClass:
                     payload={"title": "Welcome", "body": "Hello, user!"}
                 )  
         """
-        response = await self.http_client.post(f"{self.user_service_url}/api/user-service/user/send-msg-to-user-with-acknowledgment", json={"user_id": user_id, "data": payload, "topic": topic})
-        return response
+        if self.user_command_transport != "mq":
+            try:
+                response = await self.http_client.post(f"{self.user_service_url}/api/user-service/user/send-msg-to-user-with-acknowledgement", json={"user_id": user_id, "data": payload, "topic": topic})
+                response.raise_for_status()
+                return response.json()
+            except Exception as e:
+                print(f"Error sending acknowledged message to user {user_id}: {e}")
+                return None
+
+        correlation_id = str(uuid.uuid4())
+        future = asyncio.get_running_loop().create_future()
+        self.pending_user_command_replies[correlation_id] = future
+        try:
+            await self.publishUserCommand(user_id, topic, payload, reply_to=self.user_command_reply_queue, correlation_id=correlation_id)
+            reply = await asyncio.wait_for(future, timeout=self.user_command_ack_timeout)
+        except asyncio.TimeoutError:
+            print(f"Timed out waiting for user {user_id} to acknowledge {topic}")
+            return None
+        except Exception as e:
+            print(f"Error sending acknowledged message to user {user_id}: {e}")
+            return None
+        finally:
+            self.pending_user_command_replies.pop(correlation_id, None)
+
+        if "error" in reply:
+            print(f"User {user_id} could not acknowledge {topic}: {reply['error']}")
+            return None
+        return reply.get("response")
+
+    async def sendMessagesToUsers(self, messages):
+        """
+        Send a batch of messages to users with a single request to the User Service.
+
+        The User Service emits all the messages concurrently and returns the
+        delivery result for every user, so starting or stopping a large session
+        costs one round-trip instead of one per user.
+        With the "mq" transport every message is published on the USER_COMMANDS
+        exchange instead and "delivered" only means the broker accepted it.
+
+        Args:
+            messages (list): List of dicts with "user_id", "topic" and "data" keys
+
+        Returns:
+            list: Per-user delivery results ({"user_id", "topic", "delivered", "error"?}),
+                or an empty list if the request to the User Service failed
+
+        Example:
+            await supervisor.sendMessagesToUsers([
+                {"user_id": "user-1", "topic": "stop-work", "data": {}},
+                {"user_id": "user-2", "topic": "stop-work", "data": {}},
+            ])
+        """
+        if not messages:
+            return []
+
+        if self.user_command_transport == "mq":
+            # Commands are handed to the broker, delivery to the socket is done by the User Service
+            results = await asyncio.gather(
+                *(self.publishUserCommand(message["user_id"], message["topic"], message.get("data", {})) for message in messages),
+                return_exceptions=True,
+            )
+            failed = [message["user_id"] for message, result in zip(messages, results) if isinstance(result, Exception)]
+            if failed:
+                print(f"Publishing commands failed for users: {failed}")
+            return [
+                {"user_id": message["user_id"], "topic": message["topic"], "delivered": not isinstance(result, Exception)}
+                for message, result in zip(messages, results)
+            ]
+
+        try:
+            messages = [dict(message, supervisor_id=self.session_id) for message in messages]
+            response = await self.http_client.post(f"{self.user_service_url}/api/user-service/user/send-msg-to-users", json={"messages": messages})
+            response.raise_for_status()
+            results = response.json().get("results", [])
+        except Exception as e:
+            print(f"Error sending messages to users: {e}")
+            return []
+
+        failed = [result["user_id"] for result in results if not result.get("delivered")]
+        print(f"Messages sent to {len(results) - len(failed)} users, failed for {len(failed)} users")
+        if failed:
+            print(f"Message delivery failed for users: {failed}")
+
+        return results
 
     async def sendUserStopWork(self, user_list):
         """
@@ -760,11 +966,8 @@ class sessionSupervisorClass:
         Example:
             await supervisor.sendUserStopWork(["user-1", "user-2", "user-3"])
         """
-        for user_id in user_list:
-            topic = "stop-work"
-            payload = {
-            }
-            await self.sendMessageToUser(user_id,topic, payload)
+        messages = [{"user_id": user_id, "topic": "stop-work", "data": {}} for user_id in user_list]
+        await self.sendMessagesToUsers(messages)
 
     async def sendUserStartRendering(self, user_id, frame_list):
         """
@@ -960,6 +1163,10 @@ class sessionSupervisorClass:
         Example:
             await supervisor.workload_completed()
         """
+        # Only the first call completes the workload
+        if self.completed:
+            return
+
         self.completed = True
         self.workload_status = "completed"
 
@@ -968,8 +1175,14 @@ class sessionSupervisorClass:
         # Session Supervisor Service will mark the blender object state as
         # 'video-ready' when the workload completes.
 
-        # Release users and invoke completion callback
+        # Release users, finish the video and invoke completion callback
         await self.remove_users(self.user_list)
+        # Frames still being stored (e.g. duplicates of a reassigned frame) reach the video first
+        in_flight = [task for task in self.frame_stores if task is not asyncio.current_task()]
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        await self.publishRenderedVideo()
+        await self.finishTempDeletions()
         try:
             if callable(self.workload_completed_callback):
                 # keep legacy synchronous callback behavior but guard exceptions
@@ -979,6 +1192,107 @@ class sessionSupervisorClass:
 
         print("Workload Completed")
 
+    async def publishRenderedVideo(self):
+        """
+        Finish the video assembled while the frames were rendered, store it in the
+        rendered-videos bucket and record its path on the blender object.
+
+        Only the frames after the last full segment are encoded at this point, the
+        segments are joined without re-encoding. The video is not made if frames
+        never reached the assembler. Failures are logged, the frames stay available
+        either way.
+
+        Returns:
+            str: Key of the video in the rendered-videos bucket, None if no video was made
+        """
+        if self.video_assembler is None:
+            return None
+
+        video_key = f"{self.customer_id}/{self.object_id}/rendered_video.mp4"
+        try:
+            started = datetime.datetime.now()
+            video_path = await self.video_assembler.finish()
+            if video_path is None:
+                print("No frames were received, no video to publish")
+                return None
+            print(f"Video assembled in {(datetime.datetime.now() - started).total_seconds():.1f}s after the last frame")
+
+            with open(video_path, "rb") as video_file:
+                upload_response = await self.http_client.post(
+                    f"{self.blob_service_url}/api/blob-service/store-video",
+                    data={"bucket": "rendered-videos", "key": video_key},
+                    files={"video": ("rendered_video.mp4", video_file, "video/mp4")},
+                    timeout=None
+                )
+            if upload_response.status_code != 200:
+                raise Exception(f"Failed to store the video. Status: {upload_response.status_code}, Response: {upload_response.text}")
+
+            mongo_response = await self.http_client.put(
+                f"{self.mongodb_service_url}/api/mongodb-service/blender-objects/update-video-file",
+                json={"objectId": self.object_id, "customerId": self.customer_id, "renderedVideoPath": video_key}
+            )
+            if mongo_response.status_code != 200:
+                print(f"Warning: Failed to record the video path in MongoDB. Status: {mongo_response.status_code}, Response: {mongo_response.text}")
+
+            print(f"Rendered video stored at {video_key}")
+            return video_key
+        except Exception as e:
+            print(f"Error publishing the rendered video: {e}")
+            return None
+        finally:
+            await self.video_assembler.cleanup()
+            self.video_assembler = None
+
+    def queueTempDeletion(self, key: str):
+        """
+        Queue a frame collected from the temp bucket for deletion; a full batch is
+        deleted right away with one delete-temp-batch call.
+        
+        Args:
+            key (str): Key of the frame in the temp bucket
+        """
+        self.pending_temp_deletions.append(key)
+        if len(self.pending_temp_deletions) >= self.temp_delete_batch_size:
+            # Referenced until done so the task is not garbage collected mid-flight
+            flush = asyncio.create_task(self.flushTempDeletions())
+            self.temp_deletion_flushes.add(flush)
+            flush.add_done_callback(self.temp_deletion_flushes.discard)
+
+    async def finishTempDeletions(self):
+        """
+        Wait for the batch deletes running in the background and delete the frames
+        still queued, when the session ends.
+        """
+        if self.temp_deletion_flushes:
+            await asyncio.gather(*list(self.temp_deletion_flushes), return_exceptions=True)
+        await self.flushTempDeletions()
+
+    async def flushTempDeletions(self):
+        """
+        Delete every queued temp frame with one batch request to the Blob Service.
+        Frames that cannot be deleted are left to the Blob Service temp janitor,
+        which deletes temp objects past their maximum age.
+        
+        Returns:
+            int: Number of frames deleted
+        """
+        keys, self.pending_temp_deletions = self.pending_temp_deletions, []
+        if not keys:
+            return 0
+        try:
+            response = await self.http_client.post(
+                f"{self.blob_service_url}/api/blob-service/delete-temp-batch",
+                data={"keys": keys}
+            )
+            if response.status_code != 200:
+                raise Exception(f"Status: {response.status_code}, Response: {response.text}")
+            deleted = len(response.json().get("deleted", []))
+            print(f"Deleted {deleted} of {len(keys)} frames from temp bucket")
+            return deleted
+        except Exception as e:
+            print(f"Warning: Failed to delete {len(keys)} frames from temp bucket: {e}")
+            return 0
+
     async def distributeWorkload(self):
         """
         Distribute rendering frames among available users.
@@ -1016,6 +1330,7 @@ class sessionSupervisorClass:
         
         # Distribute frames to users
         frame_index = 0
+        messages = []
         for i, user_id in enumerate(self.user_list):
             # Calculate how many frames this user gets
             user_frame_count = frames_per_user
@@ -1030,14 +1345,48 @@ class sessionSupervisorClass:
             for frame_number in user_frames:
                 self.frameNumberMappedToUser[frame_number] = user_id
             
-            # Send frames to user
-            await self.sendUserStartRendering(user_id, user_frames)
+            # Queue the start-rendering message, all users are messaged in one batch below
+            messages.append({
+                "user_id": user_id,
+                "topic": "start-rendering",
+                "data": {
+                    "blend_file_hash": self.blendFileHash,
+                    "frame_list": user_frames,
+                },
+            })
             
             print(f"Assigned {len(user_frames)} frames to user {user_id}:")
         
+        await self.sendMessagesToUsers(messages)
+
         print("Workload distribution completed")
         # print(f"Frame mapping: {self.frameNumberMappedToUser}")
 
+    async def user_frames_rendered(self, user_id: str, frames: list):
+        """
+        Process a batch of frames rendered by a user.
+        
+        Every frame goes through user_frame_rendered; the frames are processed
+        concurrently so a batch costs about as long as its slowest frame.
+        
+        Args:
+            user_id (str): ID of the user who rendered the frames
+            frames (list): Frame records with "frame-number", "image-extension"
+                           and "image-binary-path" keys
+            
+        Returns:
+            list: Processing result of every frame, see user_frame_rendered
+        """
+        return await asyncio.gather(*(
+            self.user_frame_rendered(
+                user_id=user_id,
+                frame_number=int(frame["frame-number"]),
+                image_binary_path=frame["image-binary-path"],
+                image_extension=frame["image-extension"]
+            )
+            for frame in frames
+        ))
+
     async def user_frame_rendered(self, user_id: str, frame_number: int, image_binary_path: str, image_extension: str):
         """
         Process a completed frame rendered by a user.
@@ -1046,10 +1395,15 @@ class sessionSupervisorClass:
         a frame. It performs the following steps:
         1. Removes the frame from the tracking dictionary
         2. Downloads the rendered image from the temporary blob storage
-        3. Deletes the temporary image file
+        3. Queues the temporary image file for deletion, see queueTempDeletion
         4. Stores the image in the final location in blob storage
         5. Updates MongoDB with frame information
-        6. Checks if all frames are completed
+        6. Checks if all frames are completed, counting stored frames: the frames
+           of a batch are processed concurrently, so a frame leaving the mapping
+           in step 1 does not mean it is stored yet
+
+        A frame that fails to be stored is mapped back to the user, so it is asked
+        for again (check_and_retrieve_all_user_frames) instead of being lost.
         
         Args:
             user_id (str): ID of the user who rendered the frame
@@ -1059,6 +1413,7 @@ class sessionSupervisorClass:
             
         Returns:
             dict: Processing result containing status, frame info, and progress
+                (status "duplicate" for a frame that was already stored)
             
         Example:
             result = await supervisor.user_frame_rendered(
@@ -1081,7 +1436,17 @@ class sessionSupervisorClass:
             # Step 2: Remove frame from the remaining frame list
             print("Remaining Frame List Before Removal:")
             print(self.remaining_frame_list)
+            if frame_number not in self.remaining_frame_list:
+                # Rendered twice (e.g. reassigned after a disconnect): this copy is not needed
+                self.queueTempDeletion(image_binary_path)
+                print(f"Frame {frame_number} was already stored, dropping the copy from user {user_id}")
+                return {
+                    "status": "duplicate",
+                    "frame_number": frame_number,
+                    "remaining_frames": len(self.frameNumberMappedToUser)
+                }
             self.remaining_frame_list.remove(frame_number)
+            self.frame_stores.add(asyncio.current_task())
             print("Remaining Frame List After Removal:")
             print(self.remaining_frame_list)
             
@@ -1101,17 +1466,8 @@ class sessionSupervisorClass:
                 image_data = download_response.content
                 print(f"Downloaded image data: {len(image_data)} bytes")
                 
-                # Step 3: Delete image from temp bucket
-                print(f"Deleting image from temp bucket: {image_binary_path}")
-                delete_response = await client.delete(
-                    f"{self.blob_service_url}/api/blob-service/delete-temp",
-                    params={"key": image_binary_path}
-                )
-                
-                if delete_response.status_code not in [200, 204]:
-                    print(f"Warning: Failed to delete temp image. Status: {delete_response.status_code}")
-                else:
-                    print("Successfully deleted image from temp bucket")
+                # Step 3: Delete image from temp bucket (batched)
+                self.queueTempDeletion(image_binary_path)
                 
                 # Step 4: Store image in correct location
                 # Format: customer_id/object_id/frame_number.png
@@ -1137,6 +1493,12 @@ class sessionSupervisorClass:
                     raise Exception(f"Failed to upload image to final location. Status: {upload_response.status_code}")
                 
                 print(f"Successfully stored frame {frame_number} at {final_image_path}")
+
+                if self.video_assembler is not None:
+                    try:
+                        await self.video_assembler.add_frame(frame_number, image_data, image_extension)
+                    except Exception as e:
+                        print(f"Warning: Could not add frame {frame_number} to the video: {e}")
                 
                 # Step 5: Store frame information in MongoDB
                 print(f"Storing frame {frame_number} information in MongoDB")
@@ -1165,13 +1527,14 @@ class sessionSupervisorClass:
                     print(f"Successfully stored frame {frame_number} information in MongoDB")
                 
                 # Step 6: Check if all frames are completed
-                remaining_frames = len(self.frameNumberMappedToUser)
-                total_original_frames = len(self.remaining_frame_list) if self.remaining_frame_list else 0
-                completed_frames = total_original_frames - remaining_frames
+                self.stored_frames.add(frame_number)
+                total_original_frames = self.total_frames or 0
+                completed_frames = len(self.stored_frames)
+                remaining_frames = total_original_frames - completed_frames
                 
                 print(f"Progress: {completed_frames}/{total_original_frames} frames completed")
                 
-                if remaining_frames == 0:
+                if total_original_frames and remaining_frames <= 0:
                     print("🎉 All frames have been rendered!")
                     await self.workload_completed()
                 
@@ -1185,11 +1548,18 @@ class sessionSupervisorClass:
                 
         except Exception as e:
             print(f"Error processing rendered frame {frame_number}: {e}")
+            if frame_number not in self.stored_frames and frame_number not in self.remaining_frame_list:
+                # Not stored: the frame is still owed by the user
+                self.remaining_frame_list.append(frame_number)
+                self.remaining_frame_list.sort()
+                self.frameNumberMappedToUser[frame_number] = user_id
             return {
                 "status": "error",
                 "frame_number": frame_number,
                 "error": str(e)
             }
+        finally:
+            self.frame_stores.discard(asyncio.current_task())
 
     async def check_and_retrieve_all_user_frames(self, user_id: str):
         """
@@ -1350,6 +1720,11 @@ class sessionSupervisorClass:
             await supervisor.handle_user_disconnection("user-123")
         """
         try:
+            lost_frames = [frame for frame, uid in self.frameNumberMappedToUser.items() if uid == user_id]
+            self.user_disconnections += 1
+            self.frames_reassigned_after_disconnect += len(lost_frames)
+            print(f"[handle_user_disconnection] {len(lost_frames)} frames of user {user_id} will be rendered again")
+
             if user_id in self.user_list:
                 self.user_list.remove(user_id)
                 self.number_of_users -= 1
@@ -1479,10 +1854,19 @@ class sessionSupervisorClass:
         2. Releasing users back to the User Manager
         3. Removing user demands from the User Manager
         4. Closing message queue connections
+        5. Removing the local frames and segments of the video
+        6. Deleting the frames collected from the temp bucket
         
         This method is called by both the destructor and the explicit cleanup method.
         """
         try:
+            # A stopped workload leaves no video: drop the frames and segments kept for it
+            if self.video_assembler is not None:
+                await self.video_assembler.cleanup()
+                self.video_assembler = None
+
+            # Frames already collected from the temp bucket are not needed anymore
+            await self.finishTempDeletions()
 
             # Send stop work message to users
             print("Sending stop work message to users")
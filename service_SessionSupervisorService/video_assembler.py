@@ -0,0 +1,206 @@
+import asyncio
+import os
+import shutil
+from typing import Dict, List, Optional, Set, Tuple
+
+
+# ---------------- Incremental Video Assembly ---------------- #
+
+class VideoAssembler:
+    """
+    Builds the rendered video of a session while it is still rendering.
+
+    Frames are written to a local work directory as they complete. As soon as a
+    contiguous run of segment_frames frames (counted from the first frame not in a
+    segment yet) is available, that run is encoded into its own segment with the
+    local ffmpeg, and its frame files are removed. When the workload completes only
+    the last, partial run is left to encode, and the segments are joined with the
+    concat demuxer without re-encoding, so the final video is ready seconds after
+    the last frame.
+
+    Every segment is encoded with the same settings and starts on a key frame,
+    which is what lets them be concatenated by copying their streams.
+    """
+
+    def __init__(self, work_dir: str, first_frame: int, last_frame: int, fps: int = 24, segment_frames: int = 48,
+                 max_encoders: int = 2, ffmpeg: str = "ffmpeg", crf: int = 18, preset: str = "veryfast"):
+        """
+        Args:
+            work_dir (str): Local directory for frames and segments, removed by cleanup()
+            first_frame (int): First frame of the scene
+            last_frame (int): Last frame of the scene
+            fps (int): Frame rate of the video
+            segment_frames (int): Frames per segment (the last one may be shorter)
+            max_encoders (int): Segments encoded at the same time
+            ffmpeg (str): ffmpeg executable
+            crf (int): x264 quality, lower is better
+            preset (str): x264 speed preset
+        """
+        self.work_dir = work_dir
+        self.first_frame = first_frame
+        self.last_frame = last_frame
+        self.fps = fps
+        self.segment_frames = max(segment_frames, 1)
+        self.ffmpeg = ffmpeg
+        self.crf = crf
+        self.preset = preset
+        self.encoders = asyncio.Semaphore(max(max_encoders, 1))
+
+        self.frame_files: Dict[int, str] = {}    # frame number -> extension, for frames not in a segment yet
+        self.next_frame = first_frame             # first frame not in a segment yet
+        self.segments: List[Tuple[int, int, asyncio.Task]] = []  # (first frame, frame count, encode task) in frame order
+        self.frame_writes: Set[asyncio.Task] = set()  # frames being written, finish() waits for them
+        self.encoded_frames = 0
+
+        os.makedirs(self.work_dir, exist_ok=True)
+
+    @staticmethod
+    def available(ffmpeg: str = "ffmpeg") -> bool:
+        return shutil.which(ffmpeg) is not None
+
+    def _frame_path(self, frame_number: int, extension: str) -> str:
+        return os.path.join(self.work_dir, f"frame_{frame_number:08d}.{extension}")
+
+    async def add_frame(self, frame_number: int, data: bytes, extension: str):
+        """Keep a completed frame and start encoding every segment it completes."""
+        if not self.first_frame <= frame_number <= self.last_frame or frame_number < self.next_frame:
+            return
+        write = asyncio.create_task(self._keep_frame(frame_number, data, extension))
+        self.frame_writes.add(write)
+        write.add_done_callback(self.frame_writes.discard)
+        await write
+
+    async def _keep_frame(self, frame_number: int, data: bytes, extension: str):
+        await asyncio.to_thread(self._write_file, self._frame_path(frame_number, extension), data)
+        self.frame_files[frame_number] = extension
+        self._start_ready_segments()
+
+    @staticmethod
+    def _write_file(path: str, data: bytes):
+        with open(path, "wb") as frame_file:
+            frame_file.write(data)
+
+    def _start_ready_segments(self, final: bool = False):
+        """
+        Start encoding the runs of frames starting at next_frame that are complete.
+        With final, a shorter run at the end is encoded too, and frames that never
+        arrived are skipped instead of waited for.
+        """
+        while self.next_frame <= self.last_frame:
+            end = min(self.next_frame + self.segment_frames - 1, self.last_frame)
+            run_end = self.next_frame - 1
+            while run_end < end and run_end + 1 in self.frame_files:
+                run_end += 1
+
+            if run_end < self.next_frame:
+                if not final:
+                    return
+                # A frame that never arrived: leave it out of the video
+                self.next_frame += 1
+                continue
+            if run_end < end and not final:
+                return
+            # Frames of one image2 input must share an extension
+            extension = self.frame_files[self.next_frame]
+            while any(self.frame_files[frame] != extension for frame in range(self.next_frame, run_end + 1)):
+                run_end -= 1
+
+            start = self.next_frame
+            count = run_end - start + 1
+            self.next_frame = run_end + 1
+            self.segments.append((start, count, asyncio.create_task(self._encode_segment(start, count, extension))))
+
+    async def _run_ffmpeg(self, *args: str):
+        process = await asyncio.create_subprocess_exec(
+            self.ffmpeg, "-hide_banner", "-loglevel", "error", "-y", *args,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            process.kill()
+            raise
+        if process.returncode != 0:
+            raise Exception(f"ffmpeg failed with return code {process.returncode}: {stderr.decode(errors='replace').strip()}")
+
+    async def _encode_segment(self, start: int, count: int, extension: str) -> str:
+        segment_path = os.path.join(self.work_dir, f"segment_{start:08d}.mp4")
+        async with self.encoders:
+            await self._run_ffmpeg(
+                "-framerate", str(self.fps), "-start_number", str(start),
+                "-i", os.path.join(self.work_dir, f"frame_%08d.{extension}"),
+                "-frames:v", str(count),
+                # x264 needs even dimensions
+                "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+                "-c:v", "libx264", "-preset", self.preset, "-crf", str(self.crf), "-pix_fmt", "yuv420p",
+                "-r", str(self.fps), "-video_track_timescale", str(self.fps * 1000),
+                segment_path
+            )
+
+        for frame_number in range(start, start + count):
+            self.frame_files.pop(frame_number, None)
+            try:
+                os.remove(self._frame_path(frame_number, extension))
+            except OSError:
+                pass
+        self.encoded_frames += count
+        print(f"Encoded video segment of frames {start}-{start + count - 1}")
+        return segment_path
+
+    def missing_frames(self) -> List[int]:
+        """Frames of the scene that were never added (frames already in a segment are not missing)."""
+        return [frame for frame in range(self.next_frame, self.last_frame + 1) if frame not in self.frame_files]
+
+    async def finish(self, output_path: Optional[str] = None, allow_missing: bool = False) -> Optional[str]:
+        """
+        Wait for the frames still being written, encode what is left, wait for
+        every segment and join them into the final video without re-encoding. A
+        segment that failed to encode (e.g. a frame ffmpeg cannot read) is left
+        out, the video has a gap there instead of being lost.
+
+        Args:
+            output_path (str): Where to write the mp4, in the work directory by default
+            allow_missing (bool): Join the video even if frames were never added
+
+        Returns:
+            str: Path of the final mp4, None if no segment could be encoded
+
+        Raises:
+            ValueError: If frames were never added and allow_missing is False
+        """
+        if self.frame_writes:
+            await asyncio.gather(*list(self.frame_writes), return_exceptions=True)
+        missing = self.missing_frames()
+        if missing and not allow_missing:
+            raise ValueError(f"{len(missing)} frames were never added to the video, e.g. {missing[:10]}")
+        self._start_ready_segments(final=True)
+        results = await asyncio.gather(*(task for _, _, task in self.segments), return_exceptions=True)
+        segment_paths = []
+        for (start, count, _), result in zip(self.segments, results):
+            if isinstance(result, BaseException):
+                print(f"Warning: Video segment of frames {start}-{start + count - 1} failed, left out of the video: {result}")
+            else:
+                segment_paths.append(result)
+        if not segment_paths:
+            return None
+
+        output_path = output_path or os.path.join(self.work_dir, "rendered_video.mp4")
+        list_path = os.path.join(self.work_dir, "segments.txt")
+        with open(list_path, "w") as segment_list:
+            for segment_path in segment_paths:
+                segment_list.write(f"file '{os.path.abspath(segment_path)}'\n")
+
+        await self._run_ffmpeg(
+            "-f", "concat", "-safe", "0", "-i", list_path,
+            "-c", "copy", "-movflags", "+faststart",
+            output_path
+        )
+        return output_path
+
+    async def cleanup(self):
+        """Stop encoding and remove the work directory."""
+        tasks = [task for _, _, task in self.segments] + list(self.frame_writes)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.to_thread(shutil.rmtree, self.work_dir, True)
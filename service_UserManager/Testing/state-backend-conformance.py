@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Conformance checks for the User Manager state backends: the demand, assignment
+and release paths run against the in-memory backend and the Redis backend (its
+Lua scripts executed by fakeredis, or a real Redis with --redis-url), and every
+result and the resulting state must be the same for both.
+
+    pip install "fakeredis[lua]"
+    python service_UserManager/Testing/state-backend-conformance.py
+    python service_UserManager/Testing/state-backend-conformance.py --redis-url redis://localhost:6379/15
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import traceback
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from user_manager_state import InMemoryUserManagerState, RedisUserManagerState
+
+
+class BackendPair:
+    """Runs every call on both backends and checks they answer and end up alike."""
+
+    def __init__(self, memory, redis):
+        self.memory = memory
+        self.redis = redis
+        self.calls = 0
+
+    async def state(self, backend):
+        overview = await backend.overview()
+        return {
+            "users": sorted(await backend.get_users()),  # a Redis SET has no order
+            "idle_users": await backend.get_idle_users(),
+            "overview": overview,
+        }
+
+    async def call(self, method, *args):
+        self.calls += 1
+        expected = await getattr(self.memory, method)(*args)
+        result = await getattr(self.redis, method)(*args)
+        if method == "get_users":
+            expected, result = sorted(expected), sorted(result)
+        assert result == expected, f"{method}{args}: redis returned {result!r}, memory returned {expected!r}"
+
+        expected_state, state = await self.state(self.memory), await self.state(self.redis)
+        assert state == expected_state, f"state after {method}{args}:\n  redis  {state}\n  memory {expected_state}"
+        return result
+
+
+# =============================================================================
+# CHECKS
+# =============================================================================
+
+async def check_users(pair):
+    for user_id in ("u1", "u2", "u3"):
+        await pair.call("add_user", user_id)
+    await pair.call("add_user", "u1")  # reconnect of an idle user keeps its place
+    assert await pair.call("get_idle_users") == ["u1", "u2", "u3"]
+    assert await pair.call("remove_user", "u2") == (None, None)
+    assert await pair.call("remove_user", "missing") == (None, None)
+    assert await pair.call("get_users") == ["u1", "u3"]
+
+
+async def check_demand_queue(pair):
+    await pair.call("register_supervisor", "s1", "route-1")
+    await pair.call("register_supervisor", "s2", "route-2")
+    assert await pair.call("add_demand", "s1", 2) is True
+    assert await pair.call("add_demand", "s1", 5) is False  # one queued demand per supervisor
+    assert await pair.call("set_demand", "s1", 3) == 2
+    assert await pair.call("set_demand", "s2", 1) is None  # queued as a new demand
+    assert await pair.call("remove_demand", "s2") is True
+    assert await pair.call("remove_demand", "s2") is False
+    assert await pair.call("distribute_next") is None  # no idle user
+
+
+async def check_assignment(pair):
+    await pair.call("register_supervisor", "s1", "route-1")
+    for user_id in ("u1", "u2", "u3", "u4"):
+        await pair.call("add_user", user_id)
+    await pair.call("add_demand", "s1", 3)
+    await pair.call("add_demand", "s-gone", 1)
+    assert await pair.call("distribute_next") == ("s1", "route-1", ["u1", "u2", "u3"])
+    assert await pair.call("get_supervisor_for_user", "u2") == ("s1", "route-1")
+    # Demands of supervisors that are not registered are dropped without assigning users
+    assert await pair.call("distribute_next") == ("s-gone", None, [])
+    assert await pair.call("distribute_next") is None
+    await pair.call("add_user", "u1")  # an assigned user does not go back to idle on reconnect
+    assert await pair.call("get_idle_users") == ["u4"]
+
+    # A demand for more users than are idle takes what there is
+    await pair.call("add_demand", "s1", 5)
+    assert await pair.call("distribute_next") == ("s1", "route-1", ["u4"])
+    assert await pair.call("remove_user", "u3") == ("s1", "route-1")
+
+
+async def check_release(pair):
+    await pair.call("register_supervisor", "s1", "route-1")
+    for user_id in ("u1", "u2", "u3"):
+        await pair.call("add_user", user_id)
+    await pair.call("add_demand", "s1", 3)
+    await pair.call("distribute_next")
+    await pair.call("remove_user", "u2")
+    await pair.call("release_users", ["u3", "u1", "u2", "unknown"])
+    assert await pair.call("get_idle_users") == ["u3", "u1"]
+    assert await pair.call("get_supervisor_for_user", "u1") == (None, None)
+    await pair.call("release_users", ["u1"])  # releasing an idle user keeps its place
+    assert await pair.call("get_idle_users") == ["u3", "u1"]
+    await pair.call("release_users", [])
+    await pair.call("remove_supervisor", "s1")
+    await pair.call("remove_supervisor", "s1")
+
+
+async def check_random_operations(pair, operations=2000, seed=0):
+    rng = random.Random(seed)
+    users = [f"user-{index}" for index in range(12)]
+    supervisors = [f"supervisor-{index}" for index in range(4)]
+    for _ in range(operations):
+        choice = rng.random()
+        if choice < 0.25:
+            await pair.call("add_user", rng.choice(users))
+        elif choice < 0.35:
+            await pair.call("remove_user", rng.choice(users))
+        elif choice < 0.45:
+            await pair.call("release_users", rng.sample(users, rng.randint(0, 4)))
+        elif choice < 0.52:
+            await pair.call("register_supervisor", rng.choice(supervisors), f"route-{rng.randint(0, 3)}")
+        elif choice < 0.55:
+            await pair.call("remove_supervisor", rng.choice(supervisors))
+        elif choice < 0.67:
+            await pair.call("add_demand", rng.choice(supervisors), rng.randint(1, 5))
+        elif choice < 0.73:
+            await pair.call("set_demand", rng.choice(supervisors), rng.randint(1, 5))
+        elif choice < 0.77:
+            await pair.call("remove_demand", rng.choice(supervisors))
+        elif choice < 0.95:
+            await pair.call("distribute_next")
+        else:
+            await pair.call("get_supervisor_for_user", rng.choice(users))
+
+
+async def run_checks(connect_redis, operations, seed):
+    failures = 0
+    random_operations = lambda pair: check_random_operations(pair, operations, seed)
+    random_operations.__name__ = check_random_operations.__name__
+    for check in (check_users, check_demand_queue, check_assignment, check_release, random_operations):
+        redis_state = RedisUserManagerState(key_prefix=f"conformance-{uuid.uuid4().hex[:8]}", client=connect_redis())
+        await redis_state.connect()
+        pair = BackendPair(InMemoryUserManagerState(), redis_state)
+        started = time.perf_counter()
+        try:
+            await check(pair)
+            print(f"  {check.__name__:<26} ok    {pair.calls:5d} calls {time.perf_counter() - started:6.2f}s")
+        except Exception:
+            failures += 1
+            print(f"  {check.__name__:<26} FAILED")
+            traceback.print_exc()
+        finally:
+            keys = [key async for key in redis_state.client.scan_iter(f"{redis_state.key_prefix}:*")]
+            if keys:
+                await redis_state.client.delete(*keys)
+            await redis_state.close()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the User Manager state backend conformance checks")
+    parser.add_argument("--redis-url", default=None, help="Check against this Redis instead of fakeredis")
+    parser.add_argument("--operations", type=int, default=2000, help="Random operations run on both backends")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.redis_url:
+        import redis.asyncio as redis
+        connect_redis = lambda: redis.from_url(args.redis_url, decode_responses=True)
+    else:
+        import fakeredis
+        server = fakeredis.FakeServer()
+        connect_redis = lambda: fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+
+    failures = asyncio.run(run_checks(connect_redis, args.operations, args.seed))
+    print("All checks passed" if not failures else f"{failures} check(s) failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,8 @@ import uvicorn
 import uuid
 import json
 
+from user_manager_state import create_user_manager_state
+
 load_dotenv()
 
 # ---------------- Message Queue ---------------- #
@@ -232,16 +234,10 @@ class HTTP_SERVER():
 
         self.mq_client = MessageQueue()
 
-
-        self.user_demand_queue = []
-
-        self.activeSessions = []
-        self.users = []
-        print("All Users : ", self.users)
-        self.idle_users = []
-
-        self.userToSupervisorIdMapping = {} # This is Mapping from the user id to the Session supervisor ID itself
-        self.supervisorToRoutingKeyMapping = {} # This is Mapping from the session supervisor Id to the routing key itself
+        # Users, idle users, the user -> supervisor mapping, the supervisor -> routing key
+        # mapping and the demand queue all live in the state backend so that several
+        # User Manager replicas can share them (see user_manager_state.py)
+        self.state = create_user_manager_state()
 
         self.distributingUsers = False
 
@@ -272,6 +268,7 @@ class HTTP_SERVER():
             
             Supported topics:
                 - user-frame-rendered: User has rendered a frame
+                - user-frames-rendered: User has rendered a batch of frames
                 - user-rendering-completed: User has completed rendering
                 - new-user: New user has connected
                 - user-disconnected: User has disconnected
@@ -288,29 +285,28 @@ class HTTP_SERVER():
                 print("Payload Need to contain the topic and data fields. It is mandatory")
                 return
 
-            if topic == "user-frame-rendered":
-                print("user Frame Rendered Event Received")
+            if topic in ("user-frame-rendered", "user-frames-rendered"):
+                print(f"{topic} Event Received")
                 user_id = data["user-id"]
-                supervisor_id = self.userToSupervisorIdMapping[user_id]
-                supervisor_routing_key = self.supervisorToRoutingKeyMapping[supervisor_id]
+                supervisor_id, supervisor_routing_key = await self.state.get_supervisor_for_user(user_id)
+                if supervisor_routing_key is None:
+                    print(f"User {user_id} not found in userToSupervisorIdMapping")
+                    return
 
                 await self.mq_client.publish_message("SESSION_SUPERVISOR_EXCHANGE", supervisor_routing_key, json.dumps(payload))
             elif topic == "user-rendering-completed":
                 print("user Rendering Completed Event Received")
                 user_id = data["user-id"]
-                if user_id in self.userToSupervisorIdMapping:
-                    supervisor_id = self.userToSupervisorIdMapping[user_id]
-                    supervisor_routing_key = self.supervisorToRoutingKeyMapping[supervisor_id]
-                    await self.mq_client.publish_message("SESSION_SUPERVISOR_EXCHANGE", supervisor_routing_key, payload)
+                supervisor_id, supervisor_routing_key = await self.state.get_supervisor_for_user(user_id)
+                if supervisor_routing_key is not None:
+                    await self.mq_client.publish_message("SESSION_SUPERVISOR_EXCHANGE", supervisor_routing_key, json.dumps(payload))
                 else:
                     print(f"User {user_id} not found in userToSupervisorIdMapping")
                     print("Check the Logs for better understanding of what is the reason for this")
             elif topic == "new-user":
                 print("New User Event Received")
-                print("Current Connected Users: ", self.users)
                 user_id = data["user_id"]
-                self.users.append(user_id)
-                self.idle_users.append(user_id)
+                await self.state.add_user(user_id)
                 await self.distributeUsers()
             elif topic == "user-disconnected":
                 print("User Disconnected Event Received")
@@ -323,26 +319,20 @@ class HTTP_SERVER():
                 }
 
 
-                print("Sending User Disconnected Event to Session Supervisor")
-                if user_id in self.userToSupervisorIdMapping.keys():
-                    supervisor_id = self.userToSupervisorIdMapping[user_id]
-                    supervisor_routing_key = self.supervisorToRoutingKeyMapping[supervisor_id]
-
+                # Removes the user from the connected/idle users and from the supervisor mapping
+                supervisor_id, supervisor_routing_key = await self.state.remove_user(user_id)
+                if supervisor_routing_key is not None:
+                    print("Sending User Disconnected Event to Session Supervisor")
                     await self.mq_client.publish_message("SESSION_SUPERVISOR_EXCHANGE", supervisor_routing_key, json.dumps(payload))
-                    
-                self.users.remove(user_id)
-                if user_id in self.idle_users:
-                    print("User was In Idle User List")
-                    self.idle_users.remove(user_id)
-                # Remove user from supervisor mapping when disconnected
-                if user_id in self.userToSupervisorIdMapping:
-                    del self.userToSupervisorIdMapping[user_id]
+
                 await self.distributeUsers()
             elif topic == "user-error-sending-frame":
                 print("User Error Sending Frame Event Received")
                 user_id = data["user-id"]
-                supervisor_id = self.userToSupervisorIdMapping[user_id]
-                supervisor_routing_key = self.supervisorToRoutingKeyMapping[supervisor_id]
+                supervisor_id, supervisor_routing_key = await self.state.get_supervisor_for_user(user_id)
+                if supervisor_routing_key is None:
+                    print(f"User {user_id} not found in userToSupervisorIdMapping")
+                    return
                 
                 payload = {
                     "topic": "user-error-sending-frame",
@@ -414,48 +404,30 @@ class HTTP_SERVER():
             if payload["topic"] == "more-users":
                 print("More Users Event Received")
                 user_count = data["user_count"]
-                if supervisor_id not in [ele["session_supervisor_id"] for ele in self.user_demand_queue]:
-                    self.user_demand_queue.append({
-                        "user_count": user_count,
-                        "session_supervisor_id": supervisor_id
-                    })
+                await self.state.add_demand(supervisor_id, user_count)
                 await self.distributeUsers()
             elif payload["topic"] == "update-user-count":
                 print("Update User Count Event Received")
                 user_count = data["user_count"]
-                # Find and update existing demand for this supervisor
-                for demand in self.user_demand_queue:
-                    if demand["session_supervisor_id"] == supervisor_id:
-                        old_count = demand["user_count"]
-                        demand["user_count"] = user_count
-                        print(f"Updated user count for supervisor {supervisor_id}: {old_count} -> {user_count}")
-                        break
+                # Update the existing demand for this supervisor, or create a new one
+                old_count = await self.state.set_demand(supervisor_id, user_count)
+                if old_count is not None:
+                    print(f"Updated user count for supervisor {supervisor_id}: {old_count} -> {user_count}")
                 else:
-                    # If no existing demand found, create a new one
-                    self.user_demand_queue.append({
-                        "user_count": user_count,
-                        "session_supervisor_id": supervisor_id
-                    })
                     print(f"Created new demand for supervisor {supervisor_id}: {user_count} users")
                 await self.distributeUsers()
             elif payload["topic"] == "users-released":
                 print("Users Released Event Received")
                 user_list = data["user_list"]
-                for user_id in user_list:
-                    self.idle_users.append(user_id)
-                    # Remove user from supervisor mapping when released
-                    if user_id in self.userToSupervisorIdMapping:
-                        del self.userToSupervisorIdMapping[user_id]
+                # Moves the users back to the idle pool and removes their supervisor mapping
+                await self.state.release_users(user_list)
                 await self.distributeUsers()
             elif payload["topic"] == "remove-users-demand-completely":
                 print("Remove Users Demand Event Received")
                 supervisor_id = data["session_supervisor_id"]
                 
-                for demand in self.user_demand_queue:
-                    if demand["session_supervisor_id"] == supervisor_id:
-                        self.user_demand_queue.remove(demand)
-                        print(f"Removed demand for supervisor {supervisor_id}")
-                        break
+                if await self.state.remove_demand(supervisor_id):
+                    print(f"Removed demand for supervisor {supervisor_id}")
             else:
                 print("Unknown Event Type")
                 print("Received Event: ", payload)
@@ -476,6 +448,8 @@ class HTTP_SERVER():
         Raises:
             Exception: If message queue setup fails
         """
+        await self.state.connect()
+
         await self.mq_client.connect()
 
         await self.mq_client.declare_exchange("USER_MANAGER_EXCHANGE", exchange_type=ExchangeType.DIRECT)
@@ -492,22 +466,16 @@ class HTTP_SERVER():
         await self.mq_client.declare_exchange("SESSION_SUPERVISOR_EXCHANGE", exchange_type=ExchangeType.DIRECT)
 
 
-    async def sendUserToSessionSupervisor(self, user_list, session_supervisor_id):
+    async def sendUserToSessionSupervisor(self, user_list, session_supervisor_id, supervisor_routing_key):
         """
         Send a list of users to a specific session supervisor.
         
         Args:
             user_list (list): List of user IDs to send to the supervisor
             session_supervisor_id (str): ID of the target session supervisor
-        
-        Raises:
-            Exception: If session supervisor ID not found in routing mapping
+            supervisor_routing_key (str): Routing key of the target session supervisor
         """
         try:
-            if session_supervisor_id not in self.supervisorToRoutingKeyMapping:
-                print(f"Error: session_supervisor_id={session_supervisor_id} not found in supervisorToRoutingKeyMapping. Cannot send users.")
-                return
-
             print(f"Sending users {user_list} to session supervisor {session_supervisor_id}")
 
             payload = {
@@ -522,7 +490,7 @@ class HTTP_SERVER():
 
             await self.mq_client.publish_message(
                 "SESSION_SUPERVISOR_EXCHANGE",
-                self.supervisorToRoutingKeyMapping[session_supervisor_id],
+                supervisor_routing_key,
                 json.dumps(payload)
             )
         except Exception as e:
@@ -549,57 +517,29 @@ class HTTP_SERVER():
             the distributingUsers flag.
         """
         print("Distributing Users is being Called !!!")
-
-        print(self.users)
         
         if getattr(self, "distributingUsers", False):
             print("distributeUsers called while already distributing. Exiting early.")
             return
 
-        if len(self.user_demand_queue) == 0 or len(self.idle_users) == 0:
-            print(f"No distribution needed: user_demand_queue={len(self.user_demand_queue)}, idle_users={len(self.idle_users)}")
-            return
-
         self.distributingUsers = True
         try:
-            while len(self.user_demand_queue) > 0 and len(self.idle_users) > 0:
-                user_demand_record = self.user_demand_queue.pop(0)
-                user_count = user_demand_record["user_count"]
-                session_supervisor_id = user_demand_record["session_supervisor_id"]
+            while True:
+                # Pops the head of the demand queue and assigns idle users to it atomically,
+                # so concurrent User Manager replicas never hand out the same user twice
+                assignment = await self.state.distribute_next()
+                if assignment is None:
+                    print("No distribution needed: no pending demand or no idle users")
+                    break
 
-                print(f"Processing demand: session_supervisor_id={session_supervisor_id}, user_count={user_count}, idle_users_available={len(self.idle_users)}")
+                session_supervisor_id, supervisor_routing_key, users_to_send = assignment
 
-                # The following line is the source of the error in your logs:
-                # Exception in distributeUsers: '07149475-6561-403d-9722-7f22141ae93d'
-                # This means that session_supervisor_id is not present in self.supervisorToRoutingKeyMapping
-                # So, when sendUserToSessionSupervisor is called, it tries to access a key that does not exist.
-                # This can happen if the session supervisor has not registered or the mapping was not set up.
-
-                if session_supervisor_id not in self.supervisorToRoutingKeyMapping:
+                if supervisor_routing_key is None:
                     print(f"Error: session_supervisor_id={session_supervisor_id} not found in supervisorToRoutingKeyMapping. Skipping this demand.")
                     continue
 
-                if user_count <= len(self.idle_users):
-                    users_to_send = self.idle_users[:user_count]
-                    print(f"Assigning users {users_to_send} to session_supervisor_id={session_supervisor_id}")
-                    
-                    # Update userToSupervisorIdMapping for all users being sent
-                    for user_id in users_to_send:
-                        self.userToSupervisorIdMapping[user_id] = session_supervisor_id
-                    
-                    await self.sendUserToSessionSupervisor(users_to_send, session_supervisor_id)
-                    # print(f"Idle users after sending users to session supervisor: {self.idle_users}")
-                    self.idle_users = self.idle_users[user_count:]
-                    # print(f"Idle users after sending users to session supervisor: {self.idle_users}")
-                else:
-                    print(f"Not enough idle users. Assigning all idle users {self.idle_users} to session_supervisor_id={session_supervisor_id}")
-                    
-                    # Update userToSupervisorIdMapping for all remaining idle users
-                    for user_id in self.idle_users:
-                        self.userToSupervisorIdMapping[user_id] = session_supervisor_id
-                    
-                    await self.sendUserToSessionSupervisor(self.idle_users, session_supervisor_id)
-                    self.idle_users = []
+                print(f"Assigning users {users_to_send} to session_supervisor_id={session_supervisor_id}")
+                await self.sendUserToSessionSupervisor(users_to_send, session_supervisor_id, supervisor_routing_key)
         except Exception as e:
             print(f"Exception in distributeUsers: {e}")
         finally:
@@ -612,13 +552,7 @@ class HTTP_SERVER():
     # ----------------------------
 
     async def getUserManagerOverview(self):
-        return {
-            "userToSupervisorIdMapping": self.userToSupervisorIdMapping,
-            "supervisorToRoutingKeyMapping": self.supervisorToRoutingKeyMapping,
-            "user_demand_queue": self.user_demand_queue,
-            "activeSessions": self.activeSessions,
-            "idle_users": self.idle_users,
-        }
+        return await self.state.overview()
 
     # ----------------------------
     # API Calls Section
@@ -666,8 +600,7 @@ class HTTP_SERVER():
             - Sets up routing key mapping for message queue communication
             - Enables the supervisor to receive user assignments
             """
-            self.activeSessions.append(session_supervisor_id)
-            self.supervisorToRoutingKeyMapping[session_supervisor_id] = f"SESSION_SUPERVISOR_{session_supervisor_id}"
+            await self.state.register_supervisor(session_supervisor_id, f"SESSION_SUPERVISOR_{session_supervisor_id}")
 
         @self.app.delete("/api/user-manager/session-supervisor/cleanup-session")
         async def cleanupSession(
@@ -688,15 +621,7 @@ class HTTP_SERVER():
             Args:
             session_supervisor_id (str): Unique identifier for the session supervisor to be cleaned up.
             """
-            try:
-                self.activeSessions.remove(session_supervisor_id)
-            except ValueError:
-                pass
-            
-            try:
-                self.supervisorToRoutingKeyMapping.pop(session_supervisor_id)
-            except KeyError:
-                pass
+            await self.state.remove_supervisor(session_supervisor_id)
             
             print(f"Cleaned up session supervisor {session_supervisor_id} from User Manager")
             return JSONResponse(content={"message": "Session supervisor cleaned up successfully"}, status_code=200)
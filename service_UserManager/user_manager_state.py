@@ -0,0 +1,465 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+
+# ---------------- User Manager State Backends ---------------- #
+
+class UserManagerState:
+    """
+    Interface for the allocation state held by the User Manager.
+
+    The User Manager keeps track of connected users, idle users, which supervisor
+    each user is assigned to, the routing key of every registered supervisor and
+    the FIFO queue of user demands. Every transition that touches more than one
+    of these structures is exposed as a single method so that backends can make
+    it atomic (a Lua script in Redis, a plain method call in memory).
+    """
+
+    async def connect(self):
+        """Open any connection the backend needs. No-op by default."""
+        return
+
+    async def close(self):
+        """Release backend resources. No-op by default."""
+        return
+
+    # -------- Users -------- #
+
+    async def add_user(self, user_id: str):
+        """Register a connected user and append it to the idle pool."""
+        raise NotImplementedError
+
+    async def remove_user(self, user_id: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Forget a disconnected user.
+
+        Returns:
+            tuple: (supervisor_id, routing_key) the user was assigned to, or (None, None)
+        """
+        raise NotImplementedError
+
+    async def release_users(self, user_list: List[str]):
+        """Drop the supervisor assignment of the given users and return them to the idle pool."""
+        raise NotImplementedError
+
+    async def get_supervisor_for_user(self, user_id: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Returns:
+            tuple: (supervisor_id, routing_key) for the user, or (None, None)
+        """
+        raise NotImplementedError
+
+    async def get_users(self) -> List[str]:
+        raise NotImplementedError
+
+    async def get_idle_users(self) -> List[str]:
+        raise NotImplementedError
+
+    # -------- Supervisors -------- #
+
+    async def register_supervisor(self, supervisor_id: str, routing_key: str):
+        raise NotImplementedError
+
+    async def remove_supervisor(self, supervisor_id: str):
+        raise NotImplementedError
+
+    # -------- Demand Queue -------- #
+
+    async def add_demand(self, supervisor_id: str, user_count: int) -> bool:
+        """
+        Queue a demand for a supervisor unless one is already queued.
+
+        Returns:
+            bool: True if a new demand was queued
+        """
+        raise NotImplementedError
+
+    async def set_demand(self, supervisor_id: str, user_count: int) -> Optional[int]:
+        """
+        Update the queued demand of a supervisor, queueing a new one if none exists.
+
+        Returns:
+            int | None: The previous user count, or None if a new demand was created
+        """
+        raise NotImplementedError
+
+    async def remove_demand(self, supervisor_id: str) -> bool:
+        raise NotImplementedError
+
+    async def distribute_next(self) -> Optional[Tuple[str, Optional[str], List[str]]]:
+        """
+        Pop the head of the demand queue and assign idle users to it in one step.
+
+        Returns:
+            tuple | None: (supervisor_id, routing_key, assigned_users) or None when
+                          there is no demand or no idle user. routing_key is None
+                          when the supervisor is not registered; such demands are
+                          dropped without assigning users.
+        """
+        raise NotImplementedError
+
+    # -------- Admin Panel -------- #
+
+    async def overview(self) -> Dict:
+        raise NotImplementedError
+
+
+class InMemoryUserManagerState(UserManagerState):
+    """
+    Process-local state backend. This is the original behaviour of the User
+    Manager: everything is lost on restart and only one instance can run.
+    """
+
+    def __init__(self):
+        self.users = []
+        self.idle_users = []
+        self.activeSessions = []
+        self.user_demand_queue = []
+        self.userToSupervisorIdMapping = {}  # user id -> session supervisor id
+        self.supervisorToRoutingKeyMapping = {}  # session supervisor id -> routing key
+
+    async def add_user(self, user_id):
+        if user_id not in self.users:
+            self.users.append(user_id)
+        if user_id not in self.idle_users and user_id not in self.userToSupervisorIdMapping:
+            self.idle_users.append(user_id)
+
+    async def remove_user(self, user_id):
+        if user_id in self.users:
+            self.users.remove(user_id)
+        if user_id in self.idle_users:
+            self.idle_users.remove(user_id)
+        supervisor_id = self.userToSupervisorIdMapping.pop(user_id, None)
+        return supervisor_id, self.supervisorToRoutingKeyMapping.get(supervisor_id)
+
+    async def release_users(self, user_list):
+        for user_id in user_list:
+            self.userToSupervisorIdMapping.pop(user_id, None)
+            if user_id in self.users and user_id not in self.idle_users:
+                self.idle_users.append(user_id)
+
+    async def get_supervisor_for_user(self, user_id):
+        supervisor_id = self.userToSupervisorIdMapping.get(user_id)
+        return supervisor_id, self.supervisorToRoutingKeyMapping.get(supervisor_id)
+
+    async def get_users(self):
+        return list(self.users)
+
+    async def get_idle_users(self):
+        return list(self.idle_users)
+
+    async def register_supervisor(self, supervisor_id, routing_key):
+        if supervisor_id not in self.activeSessions:
+            self.activeSessions.append(supervisor_id)
+        self.supervisorToRoutingKeyMapping[supervisor_id] = routing_key
+
+    async def remove_supervisor(self, supervisor_id):
+        if supervisor_id in self.activeSessions:
+            self.activeSessions.remove(supervisor_id)
+        self.supervisorToRoutingKeyMapping.pop(supervisor_id, None)
+
+    async def add_demand(self, supervisor_id, user_count):
+        if supervisor_id in [ele["session_supervisor_id"] for ele in self.user_demand_queue]:
+            return False
+        self.user_demand_queue.append({"user_count": user_count, "session_supervisor_id": supervisor_id})
+        return True
+
+    async def set_demand(self, supervisor_id, user_count):
+        for demand in self.user_demand_queue:
+            if demand["session_supervisor_id"] == supervisor_id:
+                old_count = demand["user_count"]
+                demand["user_count"] = user_count
+                return old_count
+        self.user_demand_queue.append({"user_count": user_count, "session_supervisor_id": supervisor_id})
+        return None
+
+    async def remove_demand(self, supervisor_id):
+        for demand in self.user_demand_queue:
+            if demand["session_supervisor_id"] == supervisor_id:
+                self.user_demand_queue.remove(demand)
+                return True
+        return False
+
+    async def distribute_next(self):
+        if len(self.user_demand_queue) == 0 or len(self.idle_users) == 0:
+            return None
+
+        demand = self.user_demand_queue.pop(0)
+        supervisor_id = demand["session_supervisor_id"]
+        routing_key = self.supervisorToRoutingKeyMapping.get(supervisor_id)
+        if routing_key is None:
+            return supervisor_id, None, []
+
+        users_to_send = self.idle_users[:demand["user_count"]]
+        self.idle_users = self.idle_users[demand["user_count"]:]
+        for user_id in users_to_send:
+            self.userToSupervisorIdMapping[user_id] = supervisor_id
+        return supervisor_id, routing_key, users_to_send
+
+    async def overview(self):
+        return {
+            "userToSupervisorIdMapping": dict(self.userToSupervisorIdMapping),
+            "supervisorToRoutingKeyMapping": dict(self.supervisorToRoutingKeyMapping),
+            "user_demand_queue": [dict(demand) for demand in self.user_demand_queue],
+            "activeSessions": list(self.activeSessions),
+            "idle_users": list(self.idle_users),
+        }
+
+
+class RedisUserManagerState(UserManagerState):
+    """
+    Redis backed state shared by every User Manager replica.
+
+    All multi-key transitions run as Lua scripts so they are atomic across
+    replicas (LPOS needs Redis 6.0.6 or later). A restarted instance has nothing to rebuild: it reconnects and
+    carries on with the state already in Redis.
+
+    Keys (all under `key_prefix`):
+        users               SET   connected user ids
+        idle-users          LIST  idle user ids, FIFO
+        user-supervisor     HASH  user id -> session supervisor id
+        supervisor-routing  HASH  session supervisor id -> routing key
+        active-sessions     LIST  registered session supervisor ids
+        demand-queue        LIST  session supervisor ids, FIFO
+        demand-counts       HASH  session supervisor id -> requested user count
+    """
+
+    # An id already in a list keeps its place there, like in the in-memory backend
+    ADD_USER_SCRIPT = """
+    redis.call('SADD', KEYS[1], ARGV[1])
+    if redis.call('HEXISTS', KEYS[3], ARGV[1]) == 0 and not redis.call('LPOS', KEYS[2], ARGV[1]) then
+        redis.call('RPUSH', KEYS[2], ARGV[1])
+    end
+    return 1
+    """
+
+    REMOVE_USER_SCRIPT = """
+    redis.call('SREM', KEYS[1], ARGV[1])
+    redis.call('LREM', KEYS[2], 0, ARGV[1])
+    local supervisor = redis.call('HGET', KEYS[3], ARGV[1])
+    if not supervisor then
+        return {false, false}
+    end
+    redis.call('HDEL', KEYS[3], ARGV[1])
+    return {supervisor, redis.call('HGET', KEYS[4], supervisor)}
+    """
+
+    RELEASE_USERS_SCRIPT = """
+    for _, user in ipairs(ARGV) do
+        redis.call('HDEL', KEYS[3], user)
+        if redis.call('SISMEMBER', KEYS[1], user) == 1 and not redis.call('LPOS', KEYS[2], user) then
+            redis.call('RPUSH', KEYS[2], user)
+        end
+    end
+    return #ARGV
+    """
+
+    REGISTER_SUPERVISOR_SCRIPT = """
+    if not redis.call('LPOS', KEYS[1], ARGV[1]) then
+        redis.call('RPUSH', KEYS[1], ARGV[1])
+    end
+    redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+    return 1
+    """
+
+    ADD_DEMAND_SCRIPT = """
+    if redis.call('HEXISTS', KEYS[2], ARGV[1]) == 1 then
+        return 0
+    end
+    redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+    redis.call('RPUSH', KEYS[1], ARGV[1])
+    return 1
+    """
+
+    SET_DEMAND_SCRIPT = """
+    local old = redis.call('HGET', KEYS[2], ARGV[1])
+    redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+    if not old then
+        redis.call('RPUSH', KEYS[1], ARGV[1])
+    end
+    return old
+    """
+
+    REMOVE_DEMAND_SCRIPT = """
+    redis.call('LREM', KEYS[1], 0, ARGV[1])
+    return redis.call('HDEL', KEYS[2], ARGV[1])
+    """
+
+    DISTRIBUTE_NEXT_SCRIPT = """
+    if redis.call('LLEN', KEYS[1]) == 0 or redis.call('LLEN', KEYS[3]) == 0 then
+        return false
+    end
+    local supervisor = redis.call('LPOP', KEYS[1])
+    local count = tonumber(redis.call('HGET', KEYS[2], supervisor) or '0')
+    redis.call('HDEL', KEYS[2], supervisor)
+    local routing = redis.call('HGET', KEYS[5], supervisor)
+    if not routing then
+        return {supervisor, false}
+    end
+    local result = {supervisor, routing}
+    for i = 1, count do
+        local user = redis.call('LPOP', KEYS[3])
+        if not user then
+            break
+        end
+        redis.call('HSET', KEYS[4], user, supervisor)
+        table.insert(result, user)
+    end
+    return result
+    """
+
+    def __init__(self, redis_url="redis://localhost:6379/0", key_prefix="user-manager", client=None):
+        """
+        Args:
+            redis_url (str): Redis connection URL
+            key_prefix (str): Prefix for every key written by this backend
+            client (redis.asyncio.Redis, optional): Pre-built client, e.g. a fakeredis
+                                                    instance for local testing
+        """
+        self.redis_url = redis_url
+        self.key_prefix = key_prefix
+        self.client = client
+
+        self.users_key = f"{key_prefix}:users"
+        self.idle_users_key = f"{key_prefix}:idle-users"
+        self.user_supervisor_key = f"{key_prefix}:user-supervisor"
+        self.supervisor_routing_key = f"{key_prefix}:supervisor-routing"
+        self.active_sessions_key = f"{key_prefix}:active-sessions"
+        self.demand_queue_key = f"{key_prefix}:demand-queue"
+        self.demand_counts_key = f"{key_prefix}:demand-counts"
+
+        self.scripts = {}
+
+    async def connect(self):
+        if self.client is None:
+            import redis.asyncio as redis
+            self.client = redis.from_url(self.redis_url, decode_responses=True)
+
+        for name in ("ADD_USER", "REMOVE_USER", "RELEASE_USERS", "REGISTER_SUPERVISOR", "ADD_DEMAND", "SET_DEMAND", "REMOVE_DEMAND", "DISTRIBUTE_NEXT"):
+            self.scripts[name] = self.client.register_script(getattr(self, f"{name}_SCRIPT"))
+
+        await self.client.ping()
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+
+    async def add_user(self, user_id):
+        await self.scripts["ADD_USER"](
+            keys=[self.users_key, self.idle_users_key, self.user_supervisor_key],
+            args=[user_id]
+        )
+
+    async def remove_user(self, user_id):
+        supervisor_id, routing_key = await self.scripts["REMOVE_USER"](
+            keys=[self.users_key, self.idle_users_key, self.user_supervisor_key, self.supervisor_routing_key],
+            args=[user_id]
+        )
+        return supervisor_id or None, routing_key or None
+
+    async def release_users(self, user_list):
+        if not user_list:
+            return
+        await self.scripts["RELEASE_USERS"](
+            keys=[self.users_key, self.idle_users_key, self.user_supervisor_key],
+            args=list(user_list)
+        )
+
+    async def get_supervisor_for_user(self, user_id):
+        supervisor_id = await self.client.hget(self.user_supervisor_key, user_id)
+        if supervisor_id is None:
+            return None, None
+        return supervisor_id, await self.client.hget(self.supervisor_routing_key, supervisor_id)
+
+    async def get_users(self):
+        return list(await self.client.smembers(self.users_key))
+
+    async def get_idle_users(self):
+        return await self.client.lrange(self.idle_users_key, 0, -1)
+
+    async def register_supervisor(self, supervisor_id, routing_key):
+        await self.scripts["REGISTER_SUPERVISOR"](
+            keys=[self.active_sessions_key, self.supervisor_routing_key],
+            args=[supervisor_id, routing_key]
+        )
+
+    async def remove_supervisor(self, supervisor_id):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.lrem(self.active_sessions_key, 0, supervisor_id)
+            pipe.hdel(self.supervisor_routing_key, supervisor_id)
+            await pipe.execute()
+
+    async def add_demand(self, supervisor_id, user_count):
+        added = await self.scripts["ADD_DEMAND"](
+            keys=[self.demand_queue_key, self.demand_counts_key],
+            args=[supervisor_id, user_count]
+        )
+        return bool(added)
+
+    async def set_demand(self, supervisor_id, user_count):
+        old_count = await self.scripts["SET_DEMAND"](
+            keys=[self.demand_queue_key, self.demand_counts_key],
+            args=[supervisor_id, user_count]
+        )
+        return int(old_count) if old_count is not None else None
+
+    async def remove_demand(self, supervisor_id):
+        removed = await self.scripts["REMOVE_DEMAND"](
+            keys=[self.demand_queue_key, self.demand_counts_key],
+            args=[supervisor_id]
+        )
+        return bool(removed)
+
+    async def distribute_next(self):
+        result = await self.scripts["DISTRIBUTE_NEXT"](
+            keys=[
+                self.demand_queue_key,
+                self.demand_counts_key,
+                self.idle_users_key,
+                self.user_supervisor_key,
+                self.supervisor_routing_key,
+            ]
+        )
+        if not result:
+            return None
+        supervisor_id, routing_key = result[0], result[1] or None
+        return supervisor_id, routing_key, list(result[2:])
+
+    async def overview(self):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hgetall(self.user_supervisor_key)
+            pipe.hgetall(self.supervisor_routing_key)
+            pipe.lrange(self.demand_queue_key, 0, -1)
+            pipe.hgetall(self.demand_counts_key)
+            pipe.lrange(self.active_sessions_key, 0, -1)
+            pipe.lrange(self.idle_users_key, 0, -1)
+            user_mapping, routing_mapping, demand_queue, demand_counts, active_sessions, idle_users = await pipe.execute()
+
+        return {
+            "userToSupervisorIdMapping": user_mapping,
+            "supervisorToRoutingKeyMapping": routing_mapping,
+            "user_demand_queue": [
+                {"user_count": int(demand_counts.get(supervisor_id, 0)), "session_supervisor_id": supervisor_id}
+                for supervisor_id in demand_queue
+            ],
+            "activeSessions": active_sessions,
+            "idle_users": idle_users,
+        }
+
+
+def create_user_manager_state():
+    """
+    Build the state backend selected by the environment.
+
+    Environment:
+        USER_MANAGER_STATE_BACKEND: "memory" (default) or "redis"
+        REDIS_URL: Redis connection URL, defaults to redis://localhost:6379/0
+        USER_MANAGER_REDIS_PREFIX: Key prefix, defaults to "user-manager"
+    """
+    backend = os.getenv("USER_MANAGER_STATE_BACKEND", "memory").strip().lower()
+    if backend == "redis":
+        return RedisUserManagerState(
+            redis_url=os.getenv("REDIS_URL", "redis://localhost:6379/0").strip(),
+            key_prefix=os.getenv("USER_MANAGER_REDIS_PREFIX", "user-manager").strip()
+        )
+    return InMemoryUserManagerState()
@@ -4,6 +4,13 @@ import socketio
 # Create a Socket.IO async client
 sio = socketio.AsyncClient()
 
+# Identity given by the server, presented again on reconnect to resume the same work
+identity = {"user_id": None, "resume_token": None}
+
+def connection_auth():
+    # Evaluated on every (re)connection attempt
+    return {"resume_token": identity["resume_token"]} if identity["resume_token"] else {}
+
 # ---------------- Event Handlers ---------------- #
 @sio.event
 async def connect():
@@ -13,6 +20,11 @@ async def connect():
     sid = await sio.call("get-sid")
     print(f"🔌 Server returned sid: {sid}")
 
+@sio.on("user-identity")
+async def user_identity(data):
+    identity.update(data)
+    print(f"🪪 User id: {data['user_id']}")
+
 @sio.event
 async def disconnect():
     print("❌ Disconnected from server")
@@ -21,7 +33,7 @@ async def disconnect():
 async def main():
     try:
         # Connect to your running server (adjust port if needed)
-        await sio.connect("http://127.0.0.1:8500", transports=["websocket"])
+        await sio.connect("http://127.0.0.1:8500", transports=["websocket"], auth=connection_auth)
         # Keep the event loop running to listen for events
         await sio.wait()
     except Exception as e:
@@ -0,0 +1,132 @@
+"""
+Compares the memory held per socket by the User Service:
+
+    before : the ASGI environ stored per sid (what the connect handler used to keep)
+    after  : a ConnectionRecord in the ConnectionTable (with its secondary indexes)
+
+The environ is rebuilt the way python-socketio builds it for an ASGI connection,
+with the headers a browser worker typically sends.
+
+Usage:
+    python connection-memory-benchmark.py [connections]
+"""
+
+import os
+import sys
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from connection_table import ConnectionRecord, ConnectionTable
+
+
+HEADERS = [
+    (b"host", b"api.renderperk.studio"),
+    (b"user-agent", b"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"),
+    (b"accept", b"*/*"),
+    (b"accept-language", b"en-US,en;q=0.9"),
+    (b"accept-encoding", b"gzip, deflate, br"),
+    (b"origin", b"https://renderperk.studio"),
+    (b"sec-websocket-version", b"13"),
+    (b"sec-websocket-extensions", b"permessage-deflate; client_max_window_bits"),
+    (b"connection", b"Upgrade"),
+    (b"upgrade", b"websocket"),
+    (b"pragma", b"no-cache"),
+    (b"cache-control", b"no-cache"),
+]
+
+
+def simulated_environ(index):
+    """Approximation of the environ python-socketio passes to the connect handler."""
+    client_ip = f"10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}"
+    headers = [(name, bytes(value)) for name, value in HEADERS]
+    headers.append((b"sec-websocket-key", uuid.uuid4().hex.encode()))
+    headers.append((b"x-forwarded-for", client_ip.encode()))
+    headers.append((b"x-real-ip", client_ip.encode()))
+    query_string = f"EIO=4&transport=websocket&t={uuid.uuid4().hex[:8]}"
+
+    scope = {
+        "type": "websocket",
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1",
+        "scheme": "ws",
+        "server": ("0.0.0.0", 8500),
+        "client": (client_ip, 40000 + index % 20000),
+        "root_path": "",
+        "path": "/socket.io/",
+        "raw_path": b"/socket.io/",
+        "query_string": query_string.encode(),
+        "headers": headers,
+        "subprotocols": [],
+        "state": {},
+        "extensions": {"websocket.http.response": {}},
+    }
+
+    environ = {
+        "wsgi.input": None,
+        "wsgi.version": (1, 0),
+        "wsgi.async": True,
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": "/socket.io/",
+        "QUERY_STRING": query_string,
+        "RAW_URI": f"/socket.io/?{query_string}",
+        "SCRIPT_NAME": "",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "REMOTE_ADDR": client_ip,
+        "REMOTE_PORT": "0",
+        "SERVER_NAME": "asgi",
+        "SERVER_PORT": "0",
+        "asgi.receive": None,
+        "asgi.send": None,
+        "asgi.scope": scope,
+    }
+    for name, value in headers:
+        key = name.decode().upper().replace("-", "_")
+        if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            key = f"HTTP_{key}"
+        environ[key] = value.decode()
+    return environ
+
+
+def measure(build, connections):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    holder = build(connections)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del holder
+    return size
+
+
+def build_environ_dict(connections):
+    connected_users = {}
+    for index in range(connections):
+        connected_users[uuid.uuid4().hex[:20]] = simulated_environ(index)
+    return connected_users
+
+
+def build_connection_table(connections):
+    connected_users = ConnectionTable()
+    for index in range(connections):
+        environ = simulated_environ(index)
+        connected_users.add(ConnectionRecord(uuid.uuid4().hex[:20], client_ip=environ["REMOTE_ADDR"], capability="cpu"))
+    return connected_users
+
+
+def main():
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    environ_size = measure(build_environ_dict, connections)
+    table_size = measure(build_connection_table, connections)
+
+    print(f"connections: {connections}")
+    print(f"environ dict     : {environ_size / 2**20:8.1f} MiB  ({environ_size / connections:7.0f} B per socket)")
+    print(f"connection table : {table_size / 2**20:8.1f} MiB  ({table_size / connections:7.0f} B per socket)")
+    print(f"reduction        : {environ_size / max(table_size, 1):8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Simulates a session of volunteers downloading one blend file through the peer
+distribution coordinator of the User Service, without sockets or storage.
+
+Users join in waves. Every round each downloading user asks for its chunk
+sources, fetches up to --chunks-per-round chunks from the first source that
+actually holds the chunk (a peer still downloading it is waited for, at most
+--patience rounds, before falling back to the origin) and reports what it got.
+
+Prints the bytes served by the origin against the naive "everybody downloads
+the whole file" baseline, for a few session sizes:
+
+    python service_UserService/Testing/peer-distribution-simulation.py --file-mib 2048
+"""
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from blend_distribution import ORIGIN, BlendManifest, PeerDistributionCoordinator
+
+
+def simulate(user_count, file_bytes, chunk_size, chunks_per_round, users_per_wave, patience, seed):
+    random.seed(seed)
+    chunk_count = -(-file_bytes // chunk_size)
+    manifest = BlendManifest("simulated-hash", file_bytes, chunk_size, [f"chunk-{index}" for index in range(chunk_count)])
+
+    connected = set()
+    coordinator = PeerDistributionCoordinator(is_available=lambda user_id: user_id in connected)
+    coordinator.set_manifest(manifest)
+    holders = coordinator.holders[manifest.blend_file_hash]
+
+    waiting = [f"user-{index}" for index in range(user_count)]
+    downloading = []
+    waited = {}
+    rounds = 0
+
+    while waiting or downloading:
+        rounds += 1
+        for _ in range(min(users_per_wave, len(waiting))):
+            user_id = waiting.pop(0)
+            connected.add(user_id)
+            downloading.append(user_id)
+
+        random.shuffle(downloading)
+        for user_id in list(downloading):
+            plan = coordinator.plan(manifest.blend_file_hash, user_id, limit=chunks_per_round)
+            received = []
+            for chunk in plan:
+                source = next(
+                    (peer for peer in chunk["sources"] if peer != ORIGIN and chunk["index"] in holders.get(peer, ())),
+                    None
+                )
+                if source is None:
+                    key = (user_id, chunk["index"])
+                    waited[key] = waited.get(key, 0) + 1
+                    # Listed peers are still downloading this chunk themselves
+                    if len(chunk["sources"]) > 1 and waited[key] <= patience:
+                        continue
+                    source = ORIGIN
+                received.append((chunk["index"], source))
+
+            if coordinator.report(manifest.blend_file_hash, user_id, received):
+                downloading.remove(user_id)
+
+    return coordinator.overview(manifest.blend_file_hash), rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peer assisted blend file distribution simulation")
+    parser.add_argument("--file-mib", type=int, default=2048)
+    parser.add_argument("--chunk-mib", type=int, default=16)
+    parser.add_argument("--chunks-per-round", type=int, default=4)
+    parser.add_argument("--users-per-wave", type=int, default=10)
+    parser.add_argument("--patience", type=int, default=3)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 10, 50, 100, 250])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    file_bytes = args.file_mib * 1024 * 1024
+    chunk_size = args.chunk_mib * 1024 * 1024
+
+    print(f"{'users':>6} {'rounds':>7} {'origin GiB':>11} {'peer GiB':>9} {'naive GiB':>10} {'origin/file':>12}")
+    for user_count in args.users:
+        overview, rounds = simulate(
+            user_count, file_bytes, chunk_size, args.chunks_per_round, args.users_per_wave, args.patience, args.seed
+        )
+        assert overview["completed-users"] == user_count
+        print(
+            f"{user_count:>6} {rounds:>7} "
+            f"{overview['origin-bytes'] / 1024 ** 3:>11.2f} "
+            f"{overview['peer-bytes'] / 1024 ** 3:>9.2f} "
+            f"{user_count * file_bytes / 1024 ** 3:>10.2f} "
+            f"{overview['origin-bytes'] / file_bytes:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
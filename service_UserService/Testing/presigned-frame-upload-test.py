@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test script for the direct (presigned) frame upload flow of the User Service:
+
+    1. POST /api/user-service/user/request-frame-upload   -> presigned PUT URL
+    2. PUT the frame bytes straight to blob storage
+    3. POST /api/user-service/user/frame-uploaded         -> user-frame-rendered event
+
+Needs the User Service and the Blob Service running. Storage can be the MinIO
+container or any S3-compatible stand-in, e.g.:
+
+    moto_server -p 9100
+    BLOB_STORAGE_ENDPOINT=http://127.0.0.1:9100 python service_BlobService/blob-service.py
+"""
+
+import asyncio
+import os
+import uuid
+
+import httpx
+
+USER_SERVICE_URL = os.getenv("USER_SERVICE", "http://127.0.0.1:8500")
+BLOB_SERVICE_URL = os.getenv("BLOB_SERVICE", "http://127.0.0.1:13000")
+
+
+async def request_upload(client, user_id, frame_number):
+    response = await client.post(
+        f"{USER_SERVICE_URL}/api/user-service/user/request-frame-upload",
+        data={"userId": user_id, "frameNumber": str(frame_number), "imageExtension": "png"},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def confirm_upload(client, user_id, frame_number, key):
+    return await client.post(
+        f"{USER_SERVICE_URL}/api/user-service/user/frame-uploaded",
+        data={"userId": user_id, "frameNumber": str(frame_number), "imageExtension": "png", "key": key},
+    )
+
+
+async def main():
+    user_id = f"test-user-{uuid.uuid4()}"
+    frame_bytes = os.urandom(256 * 1024)
+
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        # Confirming before uploading must fail
+        upload = await request_upload(client, user_id, 1)
+        response = await confirm_upload(client, user_id, 1, upload["key"])
+        assert response.status_code == 404, response.text
+        print("✅ Confirmation without upload rejected")
+
+        # Upload straight to storage, then confirm
+        put = await client.put(upload["upload_url"], content=frame_bytes, headers=upload["headers"])
+        assert put.status_code in (200, 204), put.text
+        print(f"✅ Uploaded {len(frame_bytes)} bytes to {upload['key']}")
+
+        response = await confirm_upload(client, user_id, 1, upload["key"])
+        assert response.status_code == 200, response.text
+        print("✅ Upload confirmed")
+
+        stored = await client.get(f"{BLOB_SERVICE_URL}/api/blob-service/object-exists", params={"bucket": "temp", "key": upload["key"]})
+        assert stored.json()["size_bytes"] == len(frame_bytes), stored.text
+        print("✅ Stored object has the uploaded size")
+
+        # A volunteer cannot confirm a key issued to somebody else
+        response = await confirm_upload(client, f"other-{user_id}", 1, upload["key"])
+        assert response.status_code == 403, response.text
+        print("✅ Foreign key rejected")
+
+        await client.delete(f"{BLOB_SERVICE_URL}/api/blob-service/delete-temp", params={"key": upload["key"]})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,277 @@
+import hashlib
+import heapq
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+ORIGIN = "origin"
+
+
+# ---------------- Blend File Manifest ---------------- #
+
+class BlendManifest:
+    """Fixed size chunks of a blend file with the SHA-256 of every chunk."""
+
+    __slots__ = ("blend_file_hash", "size", "chunk_size", "chunk_hashes")
+
+    def __init__(self, blend_file_hash: str, size: int, chunk_size: int, chunk_hashes: List[str]):
+        self.blend_file_hash = blend_file_hash
+        self.size = size
+        self.chunk_size = chunk_size
+        self.chunk_hashes = chunk_hashes
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self.chunk_hashes)
+
+    def chunk_range(self, index: int) -> Tuple[int, int]:
+        """Returns (offset, length) of a chunk."""
+        offset = index * self.chunk_size
+        return offset, min(self.chunk_size, self.size - offset)
+
+
+def build_manifest(path: str, blend_file_hash: str, chunk_size: int) -> BlendManifest:
+    """Hash a local blend file chunk by chunk. Blocking, run it in a thread."""
+    chunk_hashes = []
+    size = 0
+    with open(path, "rb") as blend_file:
+        while True:
+            chunk = blend_file.read(chunk_size)
+            if not chunk:
+                break
+            chunk_hashes.append(hashlib.sha256(chunk).hexdigest())
+            size += len(chunk)
+    return BlendManifest(blend_file_hash, size, chunk_size, chunk_hashes)
+
+
+# ---------------- Blend File Delta ---------------- #
+
+def plan_blend_delta(chunks: List[dict], base_chunks: List[dict]) -> dict:
+    """
+    How to rebuild a blend file from a version the user already holds, given the
+    content-defined chunk lists ([{"hash", "size"}] in file order) of both files
+    from the blob service manifests.
+
+    Every byte range of the new file is either copied from the base file
+    ({"offset", "size", "base-offset"}, neighbouring copies merged) or fetched
+    as a chunk ({"offset", "size", "chunk-hash"}).
+    """
+    base_offsets = {}
+    offset = 0
+    for chunk in base_chunks:
+        base_offsets.setdefault(chunk["hash"], offset)
+        offset += chunk["size"]
+
+    operations = []
+    fetch_bytes = 0
+    reused_bytes = 0
+    offset = 0
+    for chunk in chunks:
+        base_offset = base_offsets.get(chunk["hash"])
+        if base_offset is None:
+            operations.append({"offset": offset, "size": chunk["size"], "chunk-hash": chunk["hash"]})
+            fetch_bytes += chunk["size"]
+        else:
+            previous = operations[-1] if operations else None
+            if (previous is not None and "base-offset" in previous
+                    and previous["base-offset"] + previous["size"] == base_offset):
+                previous["size"] += chunk["size"]
+            else:
+                operations.append({"offset": offset, "size": chunk["size"], "base-offset": base_offset})
+            reused_bytes += chunk["size"]
+        offset += chunk["size"]
+
+    return {"operations": operations, "fetch-bytes": fetch_bytes, "reused-bytes": reused_bytes, "size": offset}
+
+
+# ---------------- Peer Distribution Coordinator ---------------- #
+
+class PeerDistributionCoordinator:
+    """
+    Tracks which connected users hold which chunks of a blend file and hands every
+    new downloader a list of sources per chunk: peers first, the origin
+    (get-blend-file with a Range header) last as fallback.
+
+    A chunk nobody holds yet is given to the first asker from the origin; later
+    askers get that user as a (pending) peer source instead, so the origin serves
+    every chunk roughly once per session instead of once per user. Users report
+    the chunks they received and verified, which turns them into sources too.
+
+    The coordinator never moves bytes itself, peers connect to each other with the
+    peer-signal relay of the User Service.
+    """
+
+    def __init__(self, max_peer_sources: int = 3, max_uploads_per_peer: int = 4, pending_timeout: float = 120.0,
+                 is_available: Optional[Callable[[str], bool]] = None):
+        """
+        Args:
+            max_peer_sources (int): Peers listed per chunk before the origin
+            max_uploads_per_peer (int): Chunks a peer is handed out for at once as first source
+            pending_timeout (float): Seconds a user still downloading a chunk is listed as its source
+            is_available (callable): Whether a user can serve chunks right now, e.g. its socket is connected
+        """
+        self.max_peer_sources = max_peer_sources
+        self.max_uploads_per_peer = max_uploads_per_peer
+        self.pending_timeout = pending_timeout
+        self.is_available = is_available or (lambda user_id: True)
+
+        self.manifests: Dict[str, BlendManifest] = {}
+        self.holders: Dict[str, Dict[str, Set[int]]] = {} # hash -> user id -> chunk indexes held
+        self.chunk_holders: Dict[str, List[Set[str]]] = {} # hash -> chunk index -> user ids holding it
+        self.pending: Dict[str, Dict[int, Dict[str, float]]] = {} # hash -> chunk -> user id -> assigned at
+        self.assignments: Dict[Tuple[str, str, int], str] = {} # (hash, downloader, chunk) -> first source peer
+        self.uploads: Dict[str, int] = {} # peer user id -> chunks it is first source for
+        self.metrics: Dict[str, Dict[str, int]] = {}
+
+    def get_manifest(self, blend_file_hash: str) -> Optional[BlendManifest]:
+        return self.manifests.get(blend_file_hash)
+
+    def set_manifest(self, manifest: BlendManifest):
+        self.manifests[manifest.blend_file_hash] = manifest
+        self.holders.setdefault(manifest.blend_file_hash, {})
+        self.chunk_holders.setdefault(manifest.blend_file_hash, [set() for _ in range(manifest.chunk_count)])
+        self.pending.setdefault(manifest.blend_file_hash, {})
+        self.metrics.setdefault(manifest.blend_file_hash, {
+            "origin-chunks": 0,
+            "peer-chunks": 0,
+            "origin-bytes": 0,
+            "peer-bytes": 0,
+            "completed-users": 0,
+        })
+
+    def _peers_for_chunk(self, blend_file_hash: str, index: int, user_id: str) -> List[str]:
+        holders = [
+            peer for peer in self.chunk_holders[blend_file_hash][index]
+            if peer != user_id and self.is_available(peer)
+        ]
+        if holders:
+            # Least loaded first, peers over their upload budget only as later options
+            return heapq.nsmallest(
+                self.max_peer_sources, holders,
+                key=lambda peer: (self.uploads.get(peer, 0) >= self.max_uploads_per_peer, self.uploads.get(peer, 0))
+            )
+
+        now = time.time()
+        downloading = self.pending[blend_file_hash].get(index, {})
+        return [
+            peer for peer, assigned_at in downloading.items()
+            if peer != user_id and now - assigned_at < self.pending_timeout and self.is_available(peer)
+        ][:self.max_peer_sources]
+
+    def plan(self, blend_file_hash: str, user_id: str, limit: Optional[int] = None) -> List[dict]:
+        """
+        Sources for the chunks the user does not hold yet, all of them or the next `limit`.
+
+        Returns:
+            list: {"index", "offset", "length", "sha256", "sources"} per chunk, where
+                  sources are peer user ids followed by "origin"
+        """
+        manifest = self.manifests[blend_file_hash]
+        held = self.holders[blend_file_hash].get(user_id, set())
+        now = time.time()
+
+        plan = []
+        for index, chunk_hash in enumerate(manifest.chunk_hashes):
+            if index in held:
+                continue
+            if limit is not None and len(plan) >= limit:
+                break
+
+            peers = self._peers_for_chunk(blend_file_hash, index, user_id)
+
+            previous_peer = self.assignments.pop((blend_file_hash, user_id, index), None)
+            if previous_peer is not None:
+                self.uploads[previous_peer] = max(self.uploads.get(previous_peer, 1) - 1, 0)
+            if peers:
+                self.assignments[(blend_file_hash, user_id, index)] = peers[0]
+                self.uploads[peers[0]] = self.uploads.get(peers[0], 0) + 1
+            else:
+                # Fetching it from the origin, later askers are pointed at this user
+                self.pending[blend_file_hash].setdefault(index, {})[user_id] = now
+
+            offset, length = manifest.chunk_range(index)
+            plan.append({
+                "index": index,
+                "offset": offset,
+                "length": length,
+                "sha256": chunk_hash,
+                "sources": peers + [ORIGIN],
+            })
+        return plan
+
+    def report(self, blend_file_hash: str, user_id: str, chunks: List[Tuple[int, str]]) -> bool:
+        """
+        Record chunks a user received and verified against the manifest hash.
+
+        Args:
+            chunks (list): (chunk index, source) pairs, source is a peer user id or "origin"
+
+        Returns:
+            bool: True if the user now holds the whole file
+        """
+        manifest = self.manifests[blend_file_hash]
+        held = self.holders[blend_file_hash].setdefault(user_id, set())
+        was_complete = len(held) == manifest.chunk_count
+        metrics = self.metrics[blend_file_hash]
+
+        for index, source in chunks:
+            if not 0 <= index < manifest.chunk_count or index in held:
+                continue
+            held.add(index)
+            self.chunk_holders[blend_file_hash][index].add(user_id)
+            self.pending[blend_file_hash].get(index, {}).pop(user_id, None)
+
+            peer = self.assignments.pop((blend_file_hash, user_id, index), None)
+            if peer is not None:
+                self.uploads[peer] = max(self.uploads.get(peer, 1) - 1, 0)
+
+            _, length = manifest.chunk_range(index)
+            if source == ORIGIN:
+                metrics["origin-chunks"] += 1
+                metrics["origin-bytes"] += length
+            else:
+                metrics["peer-chunks"] += 1
+                metrics["peer-bytes"] += length
+
+        complete = len(held) == manifest.chunk_count
+        if complete and not was_complete:
+            metrics["completed-users"] += 1
+        return complete
+
+    def mark_complete(self, blend_file_hash: str, user_id: str):
+        """Register a user that downloaded the whole file from the origin in one go."""
+        manifest = self.manifests[blend_file_hash]
+        held = self.holders[blend_file_hash].setdefault(user_id, set())
+        missing = [(index, ORIGIN) for index in range(manifest.chunk_count) if index not in held]
+        self.report(blend_file_hash, user_id, missing)
+
+    def remove_user(self, user_id: str):
+        """Forget a user that left: it is neither a source nor a downloader anymore."""
+        for blend_file_hash, holders in self.holders.items():
+            for index in holders.pop(user_id, ()):
+                self.chunk_holders[blend_file_hash][index].discard(user_id)
+        for chunks in self.pending.values():
+            for downloading in chunks.values():
+                downloading.pop(user_id, None)
+        for key, peer in list(self.assignments.items()):
+            if key[1] == user_id:
+                del self.assignments[key]
+                self.uploads[peer] = max(self.uploads.get(peer, 1) - 1, 0)
+            elif peer == user_id:
+                del self.assignments[key]
+        self.uploads.pop(user_id, None)
+
+    def overview(self, blend_file_hash: str) -> dict:
+        manifest = self.manifests.get(blend_file_hash)
+        if manifest is None:
+            return {}
+        holders = self.holders[blend_file_hash]
+        return {
+            "blend_file_hash": blend_file_hash,
+            "size": manifest.size,
+            "chunk_size": manifest.chunk_size,
+            "chunk_count": manifest.chunk_count,
+            "complete_holders": sum(1 for chunks in holders.values() if len(chunks) == manifest.chunk_count),
+            "partial_holders": sum(1 for chunks in holders.values() if 0 < len(chunks) < manifest.chunk_count),
+            **self.metrics[blend_file_hash],
+        }
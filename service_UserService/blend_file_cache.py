@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+
+# ---------------- Single Flight ---------------- #
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: while a call is in flight, every
+    other caller for that key awaits its result instead of starting its own.
+
+    Nothing is cached once the call finished, the next caller starts a new one.
+    """
+
+    def __init__(self):
+        self.in_flight: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, call: Callable[[], Awaitable]):
+        future = self.in_flight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            result = await call()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting for it
+            future.exception()
+            raise
+        finally:
+            del self.in_flight[key]
+
+
+# ---------------- Blend File Cache ---------------- #
+
+class CachedBlendFile:
+    __slots__ = ("blend_file_hash", "path", "size", "file_name")
+
+    def __init__(self, blend_file_hash: str, path: str, size: int, file_name: str):
+        self.blend_file_hash = blend_file_hash
+        self.path = path
+        self.size = size
+        self.file_name = file_name
+
+    @property
+    def etag(self) -> str:
+        # The blend file hash is the SHA-256 of the blend file's storage key, not of its
+        # content. It still identifies one content: every upload stores the file under a
+        # new key (customer/<new object id>/name) and a key is never written again.
+        return f'"{self.blend_file_hash}"'
+
+
+class BlendFileCache:
+    """
+    Disk backed LRU cache of blend files, keyed by blend file hash.
+
+    When a session starts every assigned user downloads the same blend file at
+    once; the first request fills the cache (concurrent ones wait for it) and
+    every request is then served from local disk.
+
+    Layout in `directory`: <hash>.blend with the content and <hash>.json with the
+    original file name. Entries are rebuilt from the directory on startup, least
+    recently used first.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, CachedBlendFile]" = OrderedDict()
+        self.total_bytes = 0
+        self.fills = SingleFlight()
+
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            self._load_existing_entries()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _content_path(self, blend_file_hash: str) -> str:
+        return os.path.join(self.directory, f"{blend_file_hash}.blend")
+
+    def _metadata_path(self, blend_file_hash: str) -> str:
+        return os.path.join(self.directory, f"{blend_file_hash}.json")
+
+    def _load_existing_entries(self):
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".blend"):
+                continue
+            blend_file_hash = name[:-len(".blend")]
+            path = self._content_path(blend_file_hash)
+            try:
+                with open(self._metadata_path(blend_file_hash)) as metadata_file:
+                    file_name = json.load(metadata_file)["file_name"]
+                stat = os.stat(path)
+            except (OSError, ValueError, KeyError):
+                # Left behind by an interrupted fill
+                self._remove_files(blend_file_hash)
+                continue
+            found.append((stat.st_atime, CachedBlendFile(blend_file_hash, path, stat.st_size, file_name)))
+
+        for _, entry in sorted(found, key=lambda item: item[0]):
+            self.entries[entry.blend_file_hash] = entry
+            self.total_bytes += entry.size
+        self._evict()
+
+    def _remove_files(self, blend_file_hash: str):
+        for path in (self._content_path(blend_file_hash), self._metadata_path(blend_file_hash)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self, keep: Optional[str] = None):
+        # Files being served stay readable after unlink, so evicting them is safe
+        while self.total_bytes > self.max_bytes and self.entries:
+            blend_file_hash, entry = next(iter(self.entries.items()))
+            if blend_file_hash == keep:
+                if len(self.entries) == 1:
+                    break
+                self.entries.move_to_end(blend_file_hash)
+                continue
+            del self.entries[blend_file_hash]
+            self.total_bytes -= entry.size
+            self._remove_files(blend_file_hash)
+            print(f"Evicted blend file {blend_file_hash} from cache ({entry.size} bytes)")
+
+    def get(self, blend_file_hash: str) -> Optional[CachedBlendFile]:
+        entry = self.entries.get(blend_file_hash)
+        if entry is not None:
+            self.entries.move_to_end(blend_file_hash)
+        return entry
+
+    async def get_or_fill(self, blend_file_hash: str, file_name: str, download: Callable[[str], Awaitable[None]]) -> CachedBlendFile:
+        """
+        Returns the cached blend file, downloading it first if needed. Concurrent
+        calls for the same hash share a single download.
+
+        Args:
+            blend_file_hash (str): Hash of the blend file
+            file_name (str): Name the file is served with
+            download (callable): Coroutine function writing the content to the given path
+        """
+        entry = self.get(blend_file_hash)
+        if entry is not None:
+            return entry
+
+        async def fill():
+            entry = self.get(blend_file_hash)
+            if entry is not None:
+                return entry
+
+            path = self._content_path(blend_file_hash)
+            partial_path = f"{path}.partial"
+            try:
+                await download(partial_path)
+                with open(self._metadata_path(blend_file_hash), "w") as metadata_file:
+                    json.dump({"file_name": file_name}, metadata_file)
+                os.replace(partial_path, path)
+            except BaseException:
+                try:
+                    os.remove(partial_path)
+                except FileNotFoundError:
+                    pass
+                raise
+
+            entry = CachedBlendFile(blend_file_hash, path, os.path.getsize(path), file_name)
+            self.entries[blend_file_hash] = entry
+            self.total_bytes += entry.size
+            self._evict(keep=blend_file_hash)
+            return entry
+
+        return await self.fills.do(blend_file_hash, fill)
@@ -0,0 +1,418 @@
+import heapq
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+# ---------------- Connected User Registry Backends ---------------- #
+
+class ConnectedUserRegistry:
+    """
+    Interface for the registry of users connected to the User Service.
+
+    Users are keyed by their stable user id (not the Socket.IO sid, which changes
+    on every reconnect). A user is either connected, with the worker and sid
+    holding its socket, or suspended: its socket dropped and it is inside the
+    reconnect grace window, so the User Manager and the session supervisor still
+    consider it assigned. Commands sent to a suspended user are queued and
+    replayed when it resumes.
+
+    With a single worker the registry is the process memory. When the User Service
+    runs as several worker processes behind nginx the registry has to be shared so
+    connected-users-count, targeted messaging and resumption see every worker.
+    """
+
+    def __init__(self, worker_id: str = "0"):
+        self.worker_id = worker_id
+
+    async def connect(self):
+        """Open any connection the backend needs. No-op by default."""
+        return
+
+    async def close(self):
+        """Release backend resources. No-op by default."""
+        return
+
+    # -------- Connections -------- #
+
+    async def add(self, user_id: str, sid: str) -> Optional[str]:
+        """
+        Register the user as connected to this worker through `sid`.
+
+        Returns:
+            str: The sid previously holding the user if it was still connected, else None
+        """
+        raise NotImplementedError
+
+    async def suspend(self, user_id: str, sid: str) -> bool:
+        """
+        Move the user to the suspended state if `sid` is still the socket holding it.
+
+        Returns:
+            bool: False if the user has already reconnected through another sid
+        """
+        raise NotImplementedError
+
+    async def expire(self, user_id: str) -> bool:
+        """
+        Forget a suspended user whose grace window ran out.
+
+        Returns:
+            bool: True if this call removed the user (it had not resumed meanwhile)
+        """
+        raise NotImplementedError
+
+    async def remove(self, user_id: str, sid: str) -> bool:
+        """Forget the user if `sid` is still the socket holding it."""
+        raise NotImplementedError
+
+    async def contains(self, user_id: str) -> bool:
+        """True if the user is connected or suspended."""
+        raise NotImplementedError
+
+    async def is_suspended(self, user_id: str) -> bool:
+        raise NotImplementedError
+
+    async def get_connection(self, user_id: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Returns:
+            tuple: (worker_id, sid) holding the user, or (None, None) if it is not connected
+        """
+        raise NotImplementedError
+
+    async def get_sid(self, user_id: str) -> Optional[str]:
+        return (await self.get_connection(user_id))[1]
+
+    async def count(self) -> int:
+        """Number of connected (not suspended) users."""
+        raise NotImplementedError
+
+    async def purge_worker(self, worker_id: Optional[str] = None) -> List[str]:
+        """
+        Remove every user, connected or suspended, held by a worker (this worker by default).
+
+        Called when a worker starts, so the users of a crashed worker do not stay
+        registered forever.
+
+        Returns:
+            list: The removed user ids
+        """
+        raise NotImplementedError
+
+    # -------- Resume tokens -------- #
+
+    async def save_resume_token(self, token: str, user_id: str, ttl: int):
+        """Store the secret token a client presents on connect to get its user id back."""
+        raise NotImplementedError
+
+    async def resolve_resume_token(self, token: str) -> Optional[str]:
+        raise NotImplementedError
+
+    # -------- Commands queued while suspended -------- #
+
+    async def queue_command(self, user_id: str, command: str, ttl: int):
+        raise NotImplementedError
+
+    async def pop_commands(self, user_id: str) -> List[str]:
+        """Returns and clears the commands queued for the user, oldest first."""
+        raise NotImplementedError
+
+
+class InMemoryConnectedUserRegistry(ConnectedUserRegistry):
+    """Process-local registry, only correct when a single worker is running."""
+
+    def __init__(self, worker_id: str = "0"):
+        super().__init__(worker_id)
+        self.connected: Dict[str, Tuple[str, str]] = {} # user id -> (worker id, sid)
+        self.suspended: Dict[str, str] = {} # user id -> worker id
+        self.resume_tokens: Dict[str, Tuple[str, float]] = {} # token -> (user id, expires at)
+        self.resume_token_expiry: List[Tuple[float, str]] = [] # heap of (expires at, token)
+        self.pending_commands: Dict[str, List[str]] = {}
+
+    async def add(self, user_id: str, sid: str) -> Optional[str]:
+        self.suspended.pop(user_id, None)
+        previous = self.connected.get(user_id)
+        self.connected[user_id] = (self.worker_id, sid)
+        if previous and previous[1] != sid:
+            return previous[1]
+        return None
+
+    async def suspend(self, user_id: str, sid: str) -> bool:
+        if self.connected.get(user_id) != (self.worker_id, sid):
+            return False
+        del self.connected[user_id]
+        self.suspended[user_id] = self.worker_id
+        return True
+
+    async def expire(self, user_id: str) -> bool:
+        if user_id in self.connected or user_id not in self.suspended:
+            return False
+        del self.suspended[user_id]
+        self.pending_commands.pop(user_id, None)
+        return True
+
+    async def remove(self, user_id: str, sid: str) -> bool:
+        if self.connected.get(user_id) != (self.worker_id, sid):
+            return False
+        del self.connected[user_id]
+        self.pending_commands.pop(user_id, None)
+        return True
+
+    async def contains(self, user_id: str) -> bool:
+        return user_id in self.connected or user_id in self.suspended
+
+    async def is_suspended(self, user_id: str) -> bool:
+        return user_id in self.suspended
+
+    async def get_connection(self, user_id: str) -> Tuple[Optional[str], Optional[str]]:
+        return self.connected.get(user_id, (None, None))
+
+    async def count(self) -> int:
+        return len(self.connected)
+
+    async def purge_worker(self, worker_id: Optional[str] = None) -> List[str]:
+        worker_id = worker_id or self.worker_id
+        stale = [user_id for user_id, (owner, _) in self.connected.items() if owner == worker_id]
+        stale += [user_id for user_id, owner in self.suspended.items() if owner == worker_id]
+        for user_id in stale:
+            self.connected.pop(user_id, None)
+            self.suspended.pop(user_id, None)
+            self.pending_commands.pop(user_id, None)
+        return stale
+
+    async def save_resume_token(self, token: str, user_id: str, ttl: int):
+        now = time.time()
+        # Drop expired tokens so the dict does not grow with every volunteer ever seen,
+        # only the heap entries that are due are looked at
+        while self.resume_token_expiry and self.resume_token_expiry[0][0] < now:
+            expires_at, expired = heapq.heappop(self.resume_token_expiry)
+            entry = self.resume_tokens.get(expired)
+            # A token saved again since has a later expiry and another heap entry
+            if entry is not None and entry[1] == expires_at:
+                del self.resume_tokens[expired]
+        self.resume_tokens[token] = (user_id, now + ttl)
+        heapq.heappush(self.resume_token_expiry, (now + ttl, token))
+
+    async def resolve_resume_token(self, token: str) -> Optional[str]:
+        entry = self.resume_tokens.get(token)
+        if entry is None:
+            return None
+        if entry[1] < time.time():
+            del self.resume_tokens[token]
+            return None
+        return entry[0]
+
+    async def queue_command(self, user_id: str, command: str, ttl: int):
+        self.pending_commands.setdefault(user_id, []).append(command)
+
+    async def pop_commands(self, user_id: str) -> List[str]:
+        return self.pending_commands.pop(user_id, [])
+
+
+class RedisConnectedUserRegistry(ConnectedUserRegistry):
+    """
+    Redis backed registry shared by every User Service worker.
+
+    State transitions compare the sid holding the user before changing it, in a
+    Lua script, so a late disconnect of an old socket never clobbers the new one.
+
+    Keys (all under `key_prefix`):
+        connected-users             HASH    user id -> "<worker id>|<sid>"
+        suspended-users             HASH    user id -> worker id
+        resume-token:<token>        STRING  user id, expires after the token TTL
+        pending-commands:<user id>  LIST    commands queued while suspended
+    """
+
+    ADD_SCRIPT = """
+    redis.call('HDEL', KEYS[2], ARGV[1])
+    local previous = redis.call('HGET', KEYS[1], ARGV[1])
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+    if previous and previous ~= ARGV[2] then
+        return previous
+    end
+    return false
+    """
+
+    SUSPEND_SCRIPT = """
+    if redis.call('HGET', KEYS[1], ARGV[1]) ~= ARGV[2] then
+        return 0
+    end
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+    return 1
+    """
+
+    EXPIRE_SCRIPT = """
+    if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 1 then
+        return 0
+    end
+    if redis.call('HDEL', KEYS[2], ARGV[1]) == 0 then
+        return 0
+    end
+    redis.call('DEL', KEYS[3])
+    return 1
+    """
+
+    REMOVE_SCRIPT = """
+    if redis.call('HGET', KEYS[1], ARGV[1]) ~= ARGV[2] then
+        return 0
+    end
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    redis.call('DEL', KEYS[2])
+    return 1
+    """
+
+    PURGE_WORKER_SCRIPT = """
+    local removed = {}
+    local prefix = ARGV[1] .. '|'
+    local entries = redis.call('HGETALL', KEYS[1])
+    for i = 1, #entries, 2 do
+        if string.sub(entries[i + 1], 1, #prefix) == prefix then
+            redis.call('HDEL', KEYS[1], entries[i])
+            table.insert(removed, entries[i])
+        end
+    end
+    entries = redis.call('HGETALL', KEYS[2])
+    for i = 1, #entries, 2 do
+        if entries[i + 1] == ARGV[1] then
+            redis.call('HDEL', KEYS[2], entries[i])
+            table.insert(removed, entries[i])
+        end
+    end
+    return removed
+    """
+
+    def __init__(self, worker_id: str = "0", redis_url="redis://localhost:6379/0", key_prefix="user-service", client=None):
+        """
+        Args:
+            worker_id (str): Id of this worker, stored against every user it holds
+            redis_url (str): Redis connection URL
+            key_prefix (str): Prefix for every key written by this backend
+            client (redis.asyncio.Redis, optional): Pre-built client
+        """
+        super().__init__(worker_id)
+        self.redis_url = redis_url
+        self.key_prefix = key_prefix
+        self.client = client
+        self.connected_users_key = f"{key_prefix}:connected-users"
+        self.suspended_users_key = f"{key_prefix}:suspended-users"
+        self.scripts = {}
+
+    def resume_token_key(self, token: str) -> str:
+        return f"{self.key_prefix}:resume-token:{token}"
+
+    def pending_commands_key(self, user_id: str) -> str:
+        return f"{self.key_prefix}:pending-commands:{user_id}"
+
+    def connection_value(self, sid: str) -> str:
+        return f"{self.worker_id}|{sid}"
+
+    async def connect(self):
+        if self.client is None:
+            import redis.asyncio as redis
+            self.client = redis.from_url(self.redis_url, decode_responses=True)
+        self.scripts = {
+            "add": self.client.register_script(self.ADD_SCRIPT),
+            "suspend": self.client.register_script(self.SUSPEND_SCRIPT),
+            "expire": self.client.register_script(self.EXPIRE_SCRIPT),
+            "remove": self.client.register_script(self.REMOVE_SCRIPT),
+            "purge_worker": self.client.register_script(self.PURGE_WORKER_SCRIPT),
+        }
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+
+    async def add(self, user_id: str, sid: str) -> Optional[str]:
+        previous = await self.scripts["add"](
+            keys=[self.connected_users_key, self.suspended_users_key],
+            args=[user_id, self.connection_value(sid)]
+        )
+        if not previous:
+            return None
+        return previous.split("|", 1)[1]
+
+    async def suspend(self, user_id: str, sid: str) -> bool:
+        return bool(await self.scripts["suspend"](
+            keys=[self.connected_users_key, self.suspended_users_key],
+            args=[user_id, self.connection_value(sid), self.worker_id]
+        ))
+
+    async def expire(self, user_id: str) -> bool:
+        return bool(await self.scripts["expire"](
+            keys=[self.connected_users_key, self.suspended_users_key, self.pending_commands_key(user_id)],
+            args=[user_id]
+        ))
+
+    async def remove(self, user_id: str, sid: str) -> bool:
+        return bool(await self.scripts["remove"](
+            keys=[self.connected_users_key, self.pending_commands_key(user_id)],
+            args=[user_id, self.connection_value(sid)]
+        ))
+
+    async def contains(self, user_id: str) -> bool:
+        pipe = self.client.pipeline()
+        pipe.hexists(self.connected_users_key, user_id)
+        pipe.hexists(self.suspended_users_key, user_id)
+        connected, suspended = await pipe.execute()
+        return bool(connected or suspended)
+
+    async def is_suspended(self, user_id: str) -> bool:
+        return bool(await self.client.hexists(self.suspended_users_key, user_id))
+
+    async def get_connection(self, user_id: str) -> Tuple[Optional[str], Optional[str]]:
+        value = await self.client.hget(self.connected_users_key, user_id)
+        if not value:
+            return None, None
+        worker_id, sid = value.split("|", 1)
+        return worker_id, sid
+
+    async def count(self) -> int:
+        return await self.client.hlen(self.connected_users_key)
+
+    async def purge_worker(self, worker_id: Optional[str] = None) -> List[str]:
+        removed = await self.scripts["purge_worker"](
+            keys=[self.connected_users_key, self.suspended_users_key],
+            args=[worker_id or self.worker_id]
+        )
+        if removed:
+            await self.client.delete(*[self.pending_commands_key(user_id) for user_id in removed])
+        return list(removed)
+
+    async def save_resume_token(self, token: str, user_id: str, ttl: int):
+        await self.client.set(self.resume_token_key(token), user_id, ex=ttl)
+
+    async def resolve_resume_token(self, token: str) -> Optional[str]:
+        return await self.client.get(self.resume_token_key(token))
+
+    async def queue_command(self, user_id: str, command: str, ttl: int):
+        pipe = self.client.pipeline()
+        pipe.rpush(self.pending_commands_key(user_id), command)
+        pipe.expire(self.pending_commands_key(user_id), ttl)
+        await pipe.execute()
+
+    async def pop_commands(self, user_id: str) -> List[str]:
+        pipe = self.client.pipeline()
+        pipe.lrange(self.pending_commands_key(user_id), 0, -1)
+        pipe.delete(self.pending_commands_key(user_id))
+        commands, _ = await pipe.execute()
+        return commands
+
+
+def create_connected_user_registry(worker_id: str = "0"):
+    """
+    Build the registry backend selected by the environment.
+
+    Environment:
+        USER_SERVICE_REGISTRY_BACKEND: "memory" (default) or "redis"
+        REDIS_URL: Redis connection URL, defaults to redis://localhost:6379/0
+        USER_SERVICE_REDIS_PREFIX: Key prefix, defaults to "user-service"
+    """
+    backend = os.getenv("USER_SERVICE_REGISTRY_BACKEND", "memory").strip().lower()
+    if backend == "redis":
+        return RedisConnectedUserRegistry(
+            worker_id=worker_id,
+            redis_url=os.getenv("REDIS_URL", "redis://localhost:6379/0").strip(),
+            key_prefix=os.getenv("USER_SERVICE_REDIS_PREFIX", "user-service").strip()
+        )
+    return InMemoryConnectedUserRegistry(worker_id)
@@ -0,0 +1,131 @@
+import sys
+import time
+from typing import Dict, Iterator, Optional, Set
+
+
+# ---------------- Connection Records ---------------- #
+
+class ConnectionRecord:
+    """
+    What the User Service keeps about one socket it holds.
+
+    Slotted so a record is a few hundred bytes instead of the full ASGI environ
+    (headers, scope, transport objects) that used to be stored per sid.
+    """
+
+    __slots__ = ("sid", "user_id", "client_ip", "connected_at", "capability", "last_seen", "supervisor_id")
+
+    def __init__(self, sid: str, user_id: Optional[str] = None, client_ip: str = "Unknown", capability: Optional[str] = None):
+        now = time.time()
+        self.sid = sid
+        self.user_id = user_id or sid
+        self.client_ip = client_ip
+        self.connected_at = now
+        # Few distinct values repeated across every volunteer, interned so they are stored once;
+        # it comes from the client's auth payload, anything but a string is ignored
+        self.capability = sys.intern(capability) if isinstance(capability, str) and capability else None
+        self.last_seen = now
+        self.supervisor_id = None
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class ConnectionTable:
+    """
+    The sockets held by this worker, keyed by sid, with secondary indexes by
+    user id, client IP and the session supervisor the user is working for.
+
+    Always go through the methods below to change user_id or supervisor_id so
+    the indexes stay in sync with the records.
+    """
+
+    def __init__(self):
+        self.records: Dict[str, ConnectionRecord] = {}
+        self.sid_by_user: Dict[str, str] = {}
+        self.sids_by_ip: Dict[str, Set[str]] = {}
+        self.sids_by_supervisor: Dict[str, Set[str]] = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, sid):
+        return sid in self.records
+
+    def __iter__(self) -> Iterator[ConnectionRecord]:
+        return iter(self.records.values())
+
+    def get(self, sid: str) -> Optional[ConnectionRecord]:
+        return self.records.get(sid)
+
+    def add(self, record: ConnectionRecord):
+        if record.sid in self.records:
+            self.remove(record.sid)
+
+        self.records[record.sid] = record
+        self.sid_by_user[record.user_id] = record.sid
+        self.sids_by_ip.setdefault(record.client_ip, set()).add(record.sid)
+        if record.supervisor_id:
+            self.sids_by_supervisor.setdefault(record.supervisor_id, set()).add(record.sid)
+
+    def remove(self, sid: str) -> Optional[ConnectionRecord]:
+        record = self.records.pop(sid, None)
+        if record is None:
+            return None
+
+        if self.sid_by_user.get(record.user_id) == sid:
+            del self.sid_by_user[record.user_id]
+        self._discard(self.sids_by_ip, record.client_ip, sid)
+        if record.supervisor_id:
+            self._discard(self.sids_by_supervisor, record.supervisor_id, sid)
+        return record
+
+    def touch(self, sid: str):
+        """Mark the socket as seen now (any event received from it)."""
+        record = self.records.get(sid)
+        if record is not None:
+            record.last_seen = time.time()
+
+    def touch_user(self, user_id: str):
+        sid = self.sid_by_user.get(user_id)
+        if sid is not None:
+            self.touch(sid)
+
+    def set_user_id(self, sid: str, user_id: str):
+        record = self.records.get(sid)
+        if record is None:
+            return
+        if self.sid_by_user.get(record.user_id) == sid:
+            del self.sid_by_user[record.user_id]
+        record.user_id = user_id
+        self.sid_by_user[user_id] = sid
+
+    def set_supervisor(self, sid: str, supervisor_id: Optional[str]):
+        """Assign the socket to a session supervisor, or clear the assignment with None."""
+        record = self.records.get(sid)
+        if record is None or record.supervisor_id == supervisor_id:
+            return
+        if record.supervisor_id:
+            self._discard(self.sids_by_supervisor, record.supervisor_id, sid)
+        record.supervisor_id = supervisor_id
+        if supervisor_id:
+            self.sids_by_supervisor.setdefault(supervisor_id, set()).add(sid)
+
+    def get_by_user(self, user_id: str) -> Optional[ConnectionRecord]:
+        sid = self.sid_by_user.get(user_id)
+        return self.records.get(sid) if sid else None
+
+    def get_by_ip(self, client_ip: str):
+        return [self.records[sid] for sid in self.sids_by_ip.get(client_ip, ())]
+
+    def get_by_supervisor(self, supervisor_id: str):
+        return [self.records[sid] for sid in self.sids_by_supervisor.get(supervisor_id, ())]
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, sid: str):
+        sids = index.get(key)
+        if sids is None:
+            return
+        sids.discard(sid)
+        if not sids:
+            del index[key]
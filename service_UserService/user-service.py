@@ -1,6 +1,6 @@
 import asyncio
 import os
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 import aio_pika
 from aio_pika import ExchangeType, Message
@@ -9,8 +9,9 @@ from fastapi import FastAPI
 from fastapi import Request
 from fastapi import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse, Response
 from fastapi import UploadFile, Form, File
+from starlette.background import BackgroundTask
 import httpx
 from pydantic import BaseModel
 import socketio
@@ -18,6 +19,15 @@ import uvicorn
 
 import uuid
 import json
+import socket
+import zlib
+import secrets
+import tempfile
+
+from connected_user_registry import create_connected_user_registry
+from connection_table import ConnectionRecord, ConnectionTable
+from blend_file_cache import BlendFileCache, SingleFlight
+from blend_distribution import PeerDistributionCoordinator, build_manifest, plan_blend_delta
 
 load_dotenv()
 
@@ -86,6 +96,17 @@ class MessageQueue:
 
         await self.exchanges[exchange_name].publish(message, routing_key=routing_key)
 
+    async def publish_to_queue(self, queue_name, message_body, correlation_id=None):
+        """
+        Publish a message straight to a queue through the default exchange (used for RPC replies).
+        """
+        message = Message(
+            body=message_body.encode() if isinstance(message_body, str) else message_body,
+            correlation_id=correlation_id,
+        )
+
+        await self.channel.default_exchange.publish(message, routing_key=queue_name)
+
     async def consume(self, queue_name, callback, no_ack=False):
         """
         Consume messages from a queue.
@@ -101,25 +122,78 @@ class MessageQueue:
 
 
 
+# ---------------- User Commands ---------------- #
+
+USER_COMMANDS_EXCHANGE = "USER_COMMANDS"
+
+def user_command_routing_key(user_id, shard_count):
+    """
+    Routing key on the USER_COMMANDS exchange for the shard that owns the user (sid).
+    Must match the function of the same name in the session supervisor.
+    """
+    shard = zlib.crc32(str(user_id).encode()) % max(shard_count, 1)
+    return f"USER_COMMANDS_{shard}"
+
+
+# ---------------- Blob Proxy ---------------- #
+
+# Headers passed through when streaming blob service responses, so clients can resume and revalidate
+BLOB_PROXY_REQUEST_HEADERS = ("range", "if-range", "if-none-match", "if-modified-since")
+BLOB_PROXY_RESPONSE_HEADERS = ("content-length", "content-range", "accept-ranges", "etag", "last-modified")
+
+
 # ---------------- Shared Data ---------------- #
 class Data:
     def __init__(self):
-        self.connected_users: Dict[str, Any] = {}
+        self.connected_users = ConnectionTable() # Sockets held by this worker only
+
+        # Several user-service workers can run behind nginx, the registry is shared
+        # between them (see connected_user_registry.py). A worker purges the users
+        # registered under its id when it starts and stops, so the id must be its own:
+        # by default the host name and port, which no other running worker shares
+        port = os.getenv("USER_SERVICE_PORT", "8500").strip()
+        self.worker_id = os.getenv("USER_SERVICE_WORKER_ID", "").strip() or f"{socket.gethostname()}-{port}"
+        self.user_registry = create_connected_user_registry(self.worker_id)
         # You can attach more shared objects herele
         self.donna_agent_instance = None  # attach your donna agent here
 
         self.mq_client = MessageQueue()
     
     async def initialization(self):
+        await self.user_registry.connect()
+
         await self.mq_client.connect()
 
 
         # This Configs are just for Development and Tetsing purposes
 
         await self.mq_client.declare_exchange("USER_MANAGER_EXCHANGE", exchange_type=ExchangeType.DIRECT)
+
+        # Users left behind by a previous run of this worker are not connected anymore
+        await self.purge_worker_users()
+
+        # Commands from the session supervisors (start-rendering, stop-work, retrieve-frame, ...)
+        # USER_COMMAND_SHARDS is the total number of shards, USER_SERVICE_COMMAND_SHARDS the
+        # comma separated shards this instance owns (all of them by default)
+        await self.mq_client.declare_exchange(USER_COMMANDS_EXCHANGE, exchange_type=ExchangeType.DIRECT)
+        shard_count = int(os.getenv("USER_COMMAND_SHARDS", "1"))
+        owned_shards = os.getenv("USER_SERVICE_COMMAND_SHARDS", "").strip()
+        self.command_shards = [int(shard) for shard in owned_shards.split(",")] if owned_shards else list(range(shard_count))
+        self.command_queue_name = f"USER_SERVICE_COMMANDS_{'_'.join(str(shard) for shard in self.command_shards)}"
+
+        await self.mq_client.declare_queue(self.command_queue_name)
+        for shard in self.command_shards:
+            await self.mq_client.bind_queue(self.command_queue_name, USER_COMMANDS_EXCHANGE, routing_key=f"USER_COMMANDS_{shard}")
+
         # await self.mq_client.declare_queue("USER_SERVICE")
         # await self.mq_client.bind_queue("USER_SERVICE", "USER_MANAGER_EXCHANGE", routing_key="USER_SERVICE")
 
+    async def purge_worker_users(self):
+        """Forget the users registered by this worker and tell the User Manager they are gone."""
+        for user_id in await self.user_registry.purge_worker():
+            payload = {"topic": "user-disconnected", "data": {"user_id": user_id}}
+            await self.mq_client.publish_message("USER_MANAGER_EXCHANGE", "USER_SERVICE", json.dumps(payload))
+
 
 # ---------------- Unified Service ---------------- #
 class Service:
@@ -144,8 +218,14 @@ class Service:
         )
 
         # Socket.IO server
+        # With several workers, SOCKETIO_MESSAGE_QUEUE (a redis:// URL) lets any worker emit
+        # to a sid held by another one
+        socketio_message_queue = os.getenv("SOCKETIO_MESSAGE_QUEUE", "").strip()
+        client_manager = socketio.AsyncRedisManager(socketio_message_queue) if socketio_message_queue else None
+
         self.sio = socketio.AsyncServer(
             async_mode="asgi",
+            client_manager=client_manager,
             cors_allowed_origins="*",
             ping_timeout=60,
             ping_interval=25,
@@ -175,19 +255,408 @@ class Service:
 
         self.user_manager_exchange_name = "USER_MANAGER_EXCHANGE"
 
+        # Blend files: concurrent lookups for the same hash share one MongoDB / blob service
+        # round-trip, and hot files are served from a local disk LRU cache
+        # (BLEND_FILE_CACHE_MAX_BYTES=0 disables it)
+        self.blend_lookups = SingleFlight()
+        self.blend_file_cache = BlendFileCache(
+            directory=os.getenv("BLEND_FILE_CACHE_DIR", "").strip() or os.path.join(tempfile.gettempdir(), "user-service-blend-cache", self.data_class.worker_id),
+            max_bytes=int(os.getenv("BLEND_FILE_CACHE_MAX_BYTES", str(10 * 1024 ** 3)))
+        )
+
+        # Peer assisted blend file distribution: users ask for chunk sources, fetch chunks from
+        # peers that already hold them (falling back to get-blend-file with a Range header)
+        # and report what they received, so the origin serves a file about once per session
+        self.blend_chunk_size = int(os.getenv("BLEND_CHUNK_SIZE", str(16 * 1024 * 1024)))
+        self.blend_manifest_builds = SingleFlight()
+        self.blend_distribution = PeerDistributionCoordinator(
+            max_peer_sources=int(os.getenv("BLEND_PEER_SOURCES", "3")),
+            max_uploads_per_peer=int(os.getenv("BLEND_PEER_MAX_UPLOADS", "4")),
+            is_available=lambda user_id: self.data_class.connected_users.get_by_user(user_id) is not None
+        )
+
+        # Blend file deltas: a user holding an earlier version of a blend file copies the
+        # unchanged content-defined chunks from it and fetches only the changed ones.
+        # Chunk manifests never change, so they are kept (BLEND_DELTA_MANIFEST_CACHE of them)
+        self.blend_content_manifests = {}
+        self.blend_content_manifest_lookups = SingleFlight()
+        self.blend_content_manifest_cache_size = int(os.getenv("BLEND_DELTA_MANIFEST_CACHE", "64"))
+        self.blend_delta_metrics = {
+            "delta-requests": 0,
+            "fetch-bytes": 0,
+            "reused-bytes": 0,
+        }
+
+        # Lifetime of the presigned URLs volunteers upload rendered frames to
+        self.frame_upload_url_expiration = int(os.getenv("FRAME_UPLOAD_URL_EXPIRATION", "900"))
+        # Largest frames-rendered batch accepted, in frames and in bytes of images
+        self.frames_batch_max_frames = int(os.getenv("FRAMES_BATCH_MAX_FRAMES", "64"))
+        self.frames_batch_max_bytes = int(os.getenv("FRAMES_BATCH_MAX_BYTES", str(256 * 1024 * 1024)))
+
+        # Volunteers get a stable user id and a resume token on connect (user-identity event).
+        # When a socket drops, the user stays assigned for USER_RESUME_GRACE_SECONDS before the
+        # User Manager is told it disconnected, so a reconnect with the token keeps its work.
+        self.resume_grace_seconds = int(os.getenv("USER_RESUME_GRACE_SECONDS", "30"))
+        self.resume_token_ttl = int(os.getenv("USER_RESUME_TOKEN_TTL", str(24 * 60 * 60)))
+        self.grace_timers = {} # user id -> (expiry task, connection record of the dropped socket)
+        self.resumption_metrics = {
+            "new-users": 0,
+            "suspended-users": 0,
+            "resumed-users": 0,
+            "expired-users": 0,
+            "replayed-commands": 0,
+        }
+
         print("Service Initialized")
 
 
         
 
     # -------- Utility Functions -------- #
-    async def send_message_to_user(self, sid, topic, message):
-        await self.sio.emit(topic, message, to=sid)
+    async def send_message_to_user(self, user_id, topic, message):
+        """
+        Emit an event to a user by its stable user id, on whichever worker holds its socket.
+
+        Returns:
+            str: "delivered", "queued" if the user is inside its reconnect grace window
+                 (the event is replayed when it resumes) or "not-connected"
+        """
+        sid = await self.data_class.user_registry.get_sid(user_id)
+        if sid is not None:
+            await self.sio.emit(topic, message, to=sid)
+            return "delivered"
+
+        if await self.data_class.user_registry.is_suspended(user_id):
+            command = json.dumps({"topic": topic, "data": message})
+            await self.data_class.user_registry.queue_command(user_id, command, self.resume_grace_seconds * 2)
+            return "queued"
+
+        return "not-connected"
     
-    async def send_message_to_user_with_acknowledgement(self, sid, topic, message):
+    async def send_message_to_user_with_acknowledgement(self, user_id, topic, message):
+        sid = await self.data_class.user_registry.get_sid(user_id)
+        if sid is None:
+            raise Exception("User not connected")
         response = await self.sio.call(topic, message, to=sid)
         return response
 
+    async def publish_user_disconnected(self, user_id):
+        payload = {
+            "topic": "user-disconnected",
+            "data":{
+                "user_id": user_id
+            }
+        }
+
+        await self.data_class.mq_client.publish_message(self.user_manager_exchange_name, "USER_SERVICE" , json.dumps(payload))
+
+    async def publish_frames_rendered(self, user_id, frames):
+        """
+        Publish one user-frames-rendered event for a batch of frames stored in the temp bucket.
+
+        Args:
+            user_id (str): User that rendered the frames
+            frames (list): {"frame-number", "image-extension", "image-binary-path"} per frame
+        """
+        payload = {
+            "topic": "user-frames-rendered",
+            "data": {
+                "user-id": user_id,
+                "frames": frames
+            }
+        }
+
+        await self.data_class.mq_client.publish_message(self.user_manager_exchange_name, "USER_SERVICE", json.dumps(payload))
+
+    async def expire_suspended_user(self, user_id):
+        """
+        End of the reconnect grace window of a user whose socket dropped. If it has not
+        resumed, the User Manager (and through it the supervisor) is told it disconnected.
+        """
+        try:
+            await asyncio.sleep(self.resume_grace_seconds)
+        except asyncio.CancelledError:
+            return
+
+        self.grace_timers.pop(user_id, None)
+        if await self.data_class.user_registry.expire(user_id):
+            self.resumption_metrics["expired-users"] += 1
+            self.blend_distribution.remove_user(user_id)
+            await self.publish_user_disconnected(user_id)
+            print(f"❌ User {user_id} did not resume within {self.resume_grace_seconds}s")
+
+    async def lookup_blend_file(self, blend_file_hash):
+        """
+        Resolve a blend file hash to its path in the blend-files bucket (MongoDB service)
+        and its size (blob service metadata).
+
+        Returns:
+            tuple: (blend_file_path, content_length), content_length is None if unknown
+        """
+        # Step 1: Query MongoDB service for blend file path
+        try:
+            blend_file_data = await self.http_client.get(
+                f"{self.mongodb_service_url}/api/mongodb-service/blender-objects/find-by-hash/{blend_file_hash}",
+                timeout=10.0
+            )
+        except Exception as e:
+            print(f"Error contacting MongoDB service: {str(e)}")
+            raise HTTPException(
+                status_code=502,
+                detail=f"Failed to contact MongoDB service: {str(e)}"
+            )
+
+        if blend_file_data.status_code != 200:
+            try:
+                error_detail = blend_file_data.json().get("detail", blend_file_data.text)
+            except Exception:
+                error_detail = blend_file_data.text
+            print(f"MongoDB service returned error: {blend_file_data.status_code} - {error_detail}")
+            raise HTTPException(
+                status_code=blend_file_data.status_code,
+                detail=f"MongoDB service error: {error_detail}"
+            )
+
+        try:
+            blend_file_json = blend_file_data.json()
+        except Exception as e:
+            print(f"Failed to parse MongoDB response JSON: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail="Failed to parse MongoDB service response"
+            )
+
+        blend_file_path = blend_file_json.get("blendFilePath")
+        if not blend_file_path:
+            print("blendFilePath not found in MongoDB response")
+            raise HTTPException(
+                status_code=404,
+                detail="Blend file not found for the given hash"
+            )
+
+        bucket = "blend-files"
+        key = blend_file_path
+
+        # Step 2: Get file metadata (including content length) from blob service
+        print(f"Getting blend file metadata from blob service...")
+        try:
+            metadata_response = await self.http_client.get(
+                f"{self.blob_service_url}/api/blob-service/retrieve-blend-metadata",
+                params={
+                    "bucket": bucket,
+                    "key": key
+                },
+                timeout=10.0
+            )
+            
+            content_length = None
+            if metadata_response.status_code == 200:
+                metadata_json = metadata_response.json()
+                content_length = metadata_json.get("size_bytes")
+                print(f"Retrieved file metadata - Content length: {content_length} bytes")
+            else:
+                print(f"Warning: Could not retrieve metadata, status: {metadata_response.status_code}")
+                
+        except Exception as e:
+            print(f"Warning: Error retrieving metadata: {str(e)}")
+            content_length = None
+
+        return blend_file_path, content_length
+
+    async def download_blend_file(self, blend_file_path, destination_path):
+        """Stream a blend file from the blob service into a local file."""
+        async with httpx.AsyncClient() as download_client:
+            async with download_client.stream(
+                "GET",
+                f"{self.blob_service_url}/api/blob-service/retrieve-blend",
+                params={"bucket": "blend-files", "key": blend_file_path},
+                timeout=30.0
+            ) as response:
+                if response.status_code != 200:
+                    raise Exception(f"Blob service returned {response.status_code} for {blend_file_path}")
+
+                with open(destination_path, "wb") as destination:
+                    async for chunk in response.aiter_bytes(1024 * 1024):
+                        await asyncio.to_thread(destination.write, chunk)
+
+    async def get_blend_manifest(self, blend_file_hash):
+        """
+        Chunk manifest of a blend file for peer distribution, hashed from the local blend
+        file cache (filled first if needed). Concurrent calls share a single build.
+        """
+        manifest = self.blend_distribution.get_manifest(blend_file_hash)
+        if manifest is not None:
+            return manifest
+        if not self.blend_file_cache.enabled:
+            raise Exception("Peer distribution needs the blend file cache (BLEND_FILE_CACHE_MAX_BYTES > 0)")
+
+        async def build():
+            cached = self.blend_file_cache.get(blend_file_hash)
+            if cached is None:
+                blend_file_path, _ = await self.blend_lookups.do(
+                    blend_file_hash, lambda: self.lookup_blend_file(blend_file_hash)
+                )
+                file_name = os.path.basename(blend_file_path) if blend_file_path else "blendfile.blend"
+                cached = await self.blend_file_cache.get_or_fill(
+                    blend_file_hash, file_name, lambda path: self.download_blend_file(blend_file_path, path)
+                )
+            manifest = await asyncio.to_thread(build_manifest, cached.path, blend_file_hash, self.blend_chunk_size)
+            self.blend_distribution.set_manifest(manifest)
+            return manifest
+
+        return await self.blend_manifest_builds.do(blend_file_hash, build)
+
+    async def get_content_manifest(self, blend_file_hash):
+        """
+        Content-defined chunk manifest of a blend file from the blob service, None if it
+        has none (yet). Concurrent calls share a single request.
+        """
+        manifest = self.blend_content_manifests.get(blend_file_hash)
+        if manifest is not None:
+            return manifest
+
+        async def fetch():
+            response = await self.http_client.get(f"{self.blob_service_url}/api/blob-service/blend-manifests/{blend_file_hash}")
+            if response.status_code == 404:
+                return None
+            if response.status_code != 200:
+                raise Exception(f"Blob service error: {response.status_code} - {response.text}")
+            manifest = response.json()
+            if len(self.blend_content_manifests) >= self.blend_content_manifest_cache_size:
+                self.blend_content_manifests.pop(next(iter(self.blend_content_manifests)))
+            self.blend_content_manifests[blend_file_hash] = manifest
+            return manifest
+
+        return await self.blend_content_manifest_lookups.do(blend_file_hash, fetch)
+
+    async def proxy_blob_stream(self, path, params, request: Request, media_type, headers=None):
+        """
+        Stream a blob service response to the client. Range and conditional request
+        headers are forwarded and 206 / 304 / 416 answers are passed back with their
+        Content-Range, Content-Length, ETag and Last-Modified headers.
+        """
+        forwarded_headers = {name: request.headers[name] for name in BLOB_PROXY_REQUEST_HEADERS if name in request.headers}
+        upstream = await self.http_client.send(
+            self.http_client.build_request(
+                "GET", f"{self.blob_service_url}{path}", params=params, headers=forwarded_headers, timeout=30.0
+            ),
+            stream=True
+        )
+
+        if upstream.status_code not in (200, 206, 304, 416):
+            error_detail = (await upstream.aread()).decode(errors="replace")
+            await upstream.aclose()
+            print(f"Blob service returned error: {upstream.status_code} - {error_detail}")
+            raise HTTPException(status_code=upstream.status_code, detail=f"Blob service error: {error_detail}")
+
+        response_headers = {name: upstream.headers[name] for name in BLOB_PROXY_RESPONSE_HEADERS if name in upstream.headers}
+        response_headers.update(headers or {})
+
+        if upstream.status_code in (304, 416):
+            await upstream.aclose()
+            return Response(status_code=upstream.status_code, headers=response_headers)
+
+        return StreamingResponse(
+            upstream.aiter_raw(),
+            status_code=upstream.status_code,
+            media_type=media_type,
+            headers=response_headers,
+            background=BackgroundTask(upstream.aclose)
+        )
+
+    def cached_blend_file_response(self, cached, request: Request):
+        """
+        Serve a cached blend file from disk. The blend file hash (of its storage key,
+        which is never rewritten) is the ETag, so a client can revalidate with
+        If-None-Match or resume an interrupted download with Range / If-Range;
+        FileResponse answers ranges with 206 Partial Content.
+        """
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or cached.etag in [tag.strip() for tag in if_none_match.split(",")]):
+            return Response(status_code=304, headers={"ETag": cached.etag})
+
+        return FileResponse(
+            cached.path,
+            media_type="application/octet-stream",
+            filename=cached.file_name,
+            headers={
+                "ETag": cached.etag,
+                "Accept-Ranges": "bytes",
+                "Cache-Control": "private, max-age=0, must-revalidate"
+            }
+        )
+
+    def track_user_command(self, user_id, topic, supervisor_id=None):
+        """
+        Keep the supervisor index of the connection table in sync with the commands
+        sent to the user. Only sockets held by this worker are tracked.
+        """
+        record = self.data_class.connected_users.get_by_user(user_id)
+        if record is None:
+            return
+        if topic in ("start-rendering", "retrieve-frame", "retrieve-frames-from-frame-list") and supervisor_id:
+            self.data_class.connected_users.set_supervisor(record.sid, supervisor_id)
+        elif topic == "stop-work":
+            self.data_class.connected_users.set_supervisor(record.sid, None)
+
+    async def callback_user_commands(self, message):
+        """
+        Handle a command published by a session supervisor on the USER_COMMANDS exchange.
+
+        Body: {"user_id": ..., "topic": ..., "data": {...}, "supervisor_id": ...}. When the message has a reply_to
+        queue the command is sent as a Socket.IO call and the user's response is published
+        back to that queue with the same correlation id, otherwise it is a plain emit.
+        """
+        async with message.process():
+            try:
+                command = json.loads(message.body.decode())
+                user_id = command["user_id"]
+                topic = command["topic"]
+                data = command.get("data", {})
+            except Exception as e:
+                print(f"Invalid user command received: {e}")
+                return
+
+            self.track_user_command(user_id, topic, command.get("supervisor_id"))
+
+            if not message.reply_to:
+                try:
+                    if await self.send_message_to_user(user_id, topic, data) == "not-connected":
+                        print(f"Command {topic} dropped, user {user_id} not connected")
+                except Exception as e:
+                    print(f"Error sending command {topic} to user {user_id}: {e}")
+                return
+
+            reply = {"user_id": user_id, "topic": topic}
+            try:
+                reply["response"] = await self.send_message_to_user_with_acknowledgement(user_id, topic, data)
+            except Exception as e:
+                reply["error"] = str(e)
+
+            await self.data_class.mq_client.publish_to_queue(message.reply_to, json.dumps(reply), correlation_id=message.correlation_id)
+
+    async def send_messages_to_users(self, messages):
+        """
+        Emit a batch of messages concurrently and report the delivery result per user.
+
+        Each message is a dict with "user_id", "topic", "data" and optionally the
+        "supervisor_id" sending it. Messages for a user inside its reconnect grace window
+        are queued and count as delivered, messages for unknown users are reported as
+        not delivered.
+        """
+        async def deliver(message):
+            user_id = message.get("user_id")
+            self.track_user_command(user_id, message.get("topic"), message.get("supervisor_id"))
+            try:
+                status = await self.send_message_to_user(user_id, message["topic"], message.get("data", {}))
+                if status == "not-connected":
+                    return {"user_id": user_id, "topic": message["topic"], "delivered": False, "error": "User not connected"}
+                return {"user_id": user_id, "topic": message["topic"], "delivered": True, "status": status}
+            except Exception as e:
+                return {"user_id": user_id, "topic": message.get("topic"), "delivered": False, "error": str(e)}
+
+        return await asyncio.gather(*(deliver(message) for message in messages))
+
     # -------- Configure Routes -------- #
     async def configure_http_routes(self):
         @self.app.get("/api/user-service/")
@@ -200,9 +669,33 @@ class Service:
             user_id = data["user_id"]
             topic = data["topic"]
             message = data["data"]
-            await self.send_message_to_user(user_id, topic, message)
+            status = await self.send_message_to_user(user_id, topic, message)
+            if status == "not-connected":
+                return {"status": 404, "message": "User not connected"}
             return {"status": 200, "message": "Message sent to user"}
 
+        @self.app.post("/api/user-service/user/send-msg-to-users")
+        async def send_msg_to_users(request: Request):
+            """
+            Send many messages in one request instead of one request per user.
+
+            Body: {"messages": [{"user_id": ..., "topic": ..., "data": {...}}, ...]}
+            """
+            data = await request.json()
+            messages = data.get("messages", [])
+            if not isinstance(messages, list):
+                raise HTTPException(status_code=400, detail="messages must be a list")
+
+            results = await self.send_messages_to_users(messages)
+            delivered_count = sum(1 for result in results if result["delivered"])
+
+            return {
+                "status": 200,
+                "delivered": delivered_count,
+                "failed": len(results) - delivered_count,
+                "results": results,
+            }
+
         @self.app.post("/api/user-service/user/send-msg-to-user-with-acknowledgement")
         async def send_msg_to_user_with_acknowledgement(request: Request):
             data = await request.json()
@@ -215,139 +708,45 @@ class Service:
             return user_response
 
         @self.app.get("/api/user-service/user/get-blend-file/{blend_file_hash}")
-        async def get_blend_file(blend_file_hash: str):
+        async def get_blend_file(blend_file_hash: str, request: Request):
             try:
-                # Step 1: Query MongoDB service for blend file path
-                try:
-                    blend_file_data = await self.http_client.get(
-                        f"{self.mongodb_service_url}/api/mongodb-service/blender-objects/find-by-hash/{blend_file_hash}",
-                        timeout=10.0
-                    )
-                except Exception as e:
-                    print(f"Error contacting MongoDB service: {str(e)}")
-                    raise HTTPException(
-                        status_code=502,
-                        detail=f"Failed to contact MongoDB service: {str(e)}"
-                    )
+                # A hot blend file is served from the local cache without any lookup
+                cached = self.blend_file_cache.get(blend_file_hash) if self.blend_file_cache.enabled else None
+                if cached is not None:
+                    return self.cached_blend_file_response(cached, request)
+
+                # Step 1 and 2: blend file path and size, shared by concurrent requests for this hash
+                blend_file_path, content_length = await self.blend_lookups.do(
+                    blend_file_hash, lambda: self.lookup_blend_file(blend_file_hash)
+                )
+                file_name = os.path.basename(blend_file_path) if blend_file_path else "blendfile.blend"
 
-                if blend_file_data.status_code != 200:
+                if self.blend_file_cache.enabled:
                     try:
-                        error_detail = blend_file_data.json().get("detail", blend_file_data.text)
-                    except Exception:
-                        error_detail = blend_file_data.text
-                    print(f"MongoDB service returned error: {blend_file_data.status_code} - {error_detail}")
-                    raise HTTPException(
-                        status_code=blend_file_data.status_code,
-                        detail=f"MongoDB service error: {error_detail}"
-                    )
-
-                try:
-                    blend_file_json = blend_file_data.json()
-                except Exception as e:
-                    print(f"Failed to parse MongoDB response JSON: {str(e)}")
-                    raise HTTPException(
-                        status_code=500,
-                        detail="Failed to parse MongoDB service response"
-                    )
-
-                blend_file_path = blend_file_json.get("blendFilePath")
-                if not blend_file_path:
-                    print("blendFilePath not found in MongoDB response")
-                    raise HTTPException(
-                        status_code=404,
-                        detail="Blend file not found for the given hash"
-                    )
+                        cached = await self.blend_file_cache.get_or_fill(
+                            blend_file_hash, file_name, lambda path: self.download_blend_file(blend_file_path, path)
+                        )
+                        return self.cached_blend_file_response(cached, request)
+                    except Exception as e:
+                        print(f"Warning: Could not cache blend file {blend_file_hash}, proxying it instead: {str(e)}")
 
                 bucket = "blend-files"
                 key = blend_file_path
 
                 print(f"Retrieving from bucket: {bucket}, key: {key}")
 
-                # Step 2: Get file metadata (including content length) from blob service
-                print(f"Getting blend file metadata from blob service...")
-                try:
-                    metadata_response = await self.http_client.get(
-                        f"{self.blob_service_url}/api/blob-service/retrieve-blend-metadata",
-                        params={
-                            "bucket": bucket,
-                            "key": key
-                        },
-                        timeout=10.0
-                    )
-                    
-                    content_length = None
-                    if metadata_response.status_code == 200:
-                        metadata_json = metadata_response.json()
-                        content_length = metadata_json.get("size_bytes")
-                        print(f"Retrieved file metadata - Content length: {content_length} bytes")
-                    else:
-                        print(f"Warning: Could not retrieve metadata, status: {metadata_response.status_code}")
-                        
-                except Exception as e:
-                    print(f"Warning: Error retrieving metadata: {str(e)}")
-                    content_length = None
-
-                # Step 2: Proxy the response directly from blob service to client
-                print(f"Proxying blend file from blob service...")
-
-                # Create a streaming response that proxies the blob service
-                async def proxy_blend_file():
-                    try:
-                        async with httpx.AsyncClient() as proxy_client:
-                            async with proxy_client.stream(
-                                "GET",
-                                f"{self.blob_service_url}/api/blob-service/retrieve-blend",
-                                params={
-                                    "bucket": bucket,
-                                    "key": key
-                                },
-                                timeout=30.0
-                            ) as response:
-                                if response.status_code != 200:
-                                    # If blob service fails, we need to handle it differently
-                                    try:
-                                        error_content = await response.aread()
-                                        error_detail = error_content.decode(errors="replace")
-                                    except Exception:
-                                        error_detail = "Unknown error"
-                                    print(f"Blob service returned error: {response.status_code} - {error_detail}")
-                                    raise HTTPException(
-                                        status_code=response.status_code,
-                                        detail=f"Blob service error: {error_detail}"
-                                    )
-
-                                # Stream the response directly to the client
-                                async for chunk in response.aiter_bytes():
-                                    yield chunk
-
-                    except HTTPException:
-                        raise
-                    except Exception as e:
-                        print(f"Error in proxy stream: {str(e)}")
-                        raise HTTPException(
-                            status_code=500,
-                            detail=f"Failed to proxy blend file: {str(e)}"
-                        )
-
-                # Return streaming response with proper headers
-                file_name = os.path.basename(blend_file_path) if blend_file_path else "blendfile.blend"
+                # Step 2: Proxy the response directly from blob service to client, passing
+                # Range / conditional headers through so downloads can resume
                 print(f"Proxying blend file: {file_name}")
-
-                # Prepare response headers
-                response_headers = {
-                    "Content-Disposition": f"attachment; filename=\"{file_name}\"",
-                    "Cache-Control": "no-cache"
-                }
-                
-                # Add content length if available
-                if content_length is not None:
-                    response_headers["Content-Length"] = str(content_length)
-                    print(f"Added Content-Length header: {content_length} bytes")
-
-                return StreamingResponse(
-                    proxy_blend_file(),
+                return await self.proxy_blob_stream(
+                    "/api/blob-service/retrieve-blend",
+                    {"bucket": bucket, "key": key},
+                    request,
                     media_type="application/octet-stream",
-                    headers=response_headers
+                    headers={
+                        "Content-Disposition": f"attachment; filename=\"{file_name}\"",
+                        "Cache-Control": "no-cache"
+                    }
                 )
             except HTTPException:
                 raise
@@ -358,6 +757,17 @@ class Service:
                     detail=f"Internal server error: {str(e)}"
                 )
 
+        @self.app.get("/api/user-service/user/get-blend-chunk/{chunk_hash}")
+        async def get_blend_chunk(chunk_hash: str, request: Request):
+            # One content-defined chunk of a blend file, for users rebuilding a new version from a delta
+            return await self.proxy_blob_stream(
+                f"/api/blob-service/blend-chunks/{chunk_hash}",
+                {},
+                request,
+                media_type="application/octet-stream",
+                headers={"Cache-Control": "public, max-age=31536000, immutable"}
+            )
+
         @self.app.post("/api/user-service/user/frame-rendered")
         async def frame_rendered(
             userId: str = Form(...),
@@ -365,6 +775,7 @@ class Service:
             imageBinary: UploadFile = File(...),
             imageExtension: str = Form(...)
         ):
+            self.data_class.connected_users.touch_user(userId)
             try:
                 random_id = str(uuid.uuid4())
                 # Try to upload the image to the blob service
@@ -425,11 +836,225 @@ class Service:
                     status_code=500
                 )
         
+        @self.app.post("/api/user-service/user/request-frame-upload")
+        async def request_frame_upload(
+            userId: str = Form(...),
+            frameNumber: str = Form(...),
+            imageExtension: str = Form(...)
+        ):
+            """
+            First step of the direct upload flow: returns a presigned PUT URL the volunteer
+            uploads the frame to, straight into blob storage. The upload is then confirmed
+            with frame-uploaded.
+            """
+            self.data_class.connected_users.touch_user(userId)
+            key = f"{userId}/{frameNumber}_{uuid.uuid4()}.{imageExtension}"
+            try:
+                response = await self.http_client.post(
+                    f"{self.blob_service_url}/api/blob-service/generate-upload-url",
+                    data={"bucket": "temp", "key": key, "expiration": self.frame_upload_url_expiration}
+                )
+            except Exception as e:
+                print(f"Error requesting upload URL from blob service: {e}")
+                return JSONResponse(content={"error": f"Failed to get upload URL: {str(e)}"}, status_code=500)
+
+            if response.status_code != 200:
+                print(f"Blob service returned error: {response.status_code} - {response.text}")
+                return JSONResponse(content={"error": f"Blob service error: {response.text}"}, status_code=response.status_code)
+
+            upload = response.json()
+            return JSONResponse(content={
+                "upload_url": upload["upload_url"],
+                "method": upload["method"],
+                "headers": upload["headers"],
+                "key": key,
+                "expiration_seconds": upload["expiration_seconds"],
+            }, status_code=200)
+
+        @self.app.post("/api/user-service/user/frame-uploaded")
+        async def frame_uploaded(
+            userId: str = Form(...),
+            frameNumber: str = Form(...),
+            imageExtension: str = Form(...),
+            key: str = Form(...)
+        ):
+            """
+            Second step of the direct upload flow: the volunteer confirms the frame it PUT
+            to the presigned URL. The object is checked in blob storage and the usual
+            user-frame-rendered event is published.
+            """
+            self.data_class.connected_users.touch_user(userId)
+            # A volunteer can only confirm keys issued for its own user id
+            if not key.startswith(f"{userId}/"):
+                return JSONResponse(content={"error": "Key does not belong to this user"}, status_code=403)
+
+            try:
+                response = await self.http_client.get(
+                    f"{self.blob_service_url}/api/blob-service/object-exists",
+                    params={"bucket": "temp", "key": key}
+                )
+                exists = response.status_code == 200 and response.json().get("exists")
+            except Exception as e:
+                print(f"Error checking uploaded frame in blob service: {e}")
+                return JSONResponse(content={"error": f"Failed to check uploaded frame: {str(e)}"}, status_code=500)
+
+            if not exists:
+                return JSONResponse(content={"error": "Frame not found in storage, upload it before confirming"}, status_code=404)
+
+            new_payload = {
+                "topic": "user-frame-rendered",
+                "data": {
+                    "user-id": userId,
+                    "frame-number": frameNumber,
+                    "image-extension": imageExtension,
+                    "image-binary-path": key
+                }
+            }
+
+            try:
+                await self.data_class.mq_client.publish_message(self.user_manager_exchange_name, "USER_SERVICE", json.dumps(new_payload))
+            except Exception as e:
+                print(f"Error publishing message to MQ: {e}")
+                return JSONResponse(
+                    content={"error": f"Failed to publish message to user manager: {str(e)}"},
+                    status_code=500
+                )
+
+            return JSONResponse(content={"message": "Rendered Image Recevied Successfully"}, status_code=200)
+
+        @self.app.post("/api/user-service/user/frames-rendered")
+        async def frames_rendered(
+            userId: str = Form(...),
+            frameNumbers: List[str] = Form(...),
+            imageExtensions: List[str] = Form(...),
+            images: List[UploadFile] = File(...)
+        ):
+            """
+            Batch variant of frame-rendered for volunteers finishing frames every second or two.
+
+            frameNumbers, imageExtensions and images are repeated form fields in the same
+            order (a single imageExtensions value applies to every frame). All frames are
+            stored with one blob service request and announced with a single
+            user-frames-rendered event. The images are streamed to the blob service from
+            their spooled uploads; a batch is at most FRAMES_BATCH_MAX_FRAMES frames and
+            FRAMES_BATCH_MAX_BYTES bytes.
+            """
+            self.data_class.connected_users.touch_user(userId)
+            if len(imageExtensions) == 1:
+                imageExtensions = imageExtensions * len(images)
+            if not (len(frameNumbers) == len(imageExtensions) == len(images)):
+                return JSONResponse(content={"error": "frameNumbers, imageExtensions and images must have the same length"}, status_code=400)
+            if len(images) > self.frames_batch_max_frames:
+                return JSONResponse(content={"error": f"A batch is at most {self.frames_batch_max_frames} frames"}, status_code=400)
+            if sum(image.size or 0 for image in images) > self.frames_batch_max_bytes:
+                return JSONResponse(content={"error": f"A batch is at most {self.frames_batch_max_bytes} bytes"}, status_code=400)
+
+            keys = [f"{userId}/{frameNumber}_{uuid.uuid4()}.{imageExtension}" for frameNumber, imageExtension in zip(frameNumbers, imageExtensions)]
+            try:
+                # httpx reads each spooled file in chunks while sending, no image is held in memory
+                for image in images:
+                    await image.seek(0)
+                files = [("files", (image.filename, image.file, "application/octet-stream")) for image in images]
+                response = await self.http_client.post(
+                    f"{self.blob_service_url}/api/blob-service/store-temp-batch",
+                    data={"keys": keys},
+                    files=files
+                )
+            except Exception as e:
+                print(f"Error uploading batch to blob service: {e}")
+                return JSONResponse(content={"error": f"Failed to upload images to blob service: {str(e)}"}, status_code=500)
+
+            if response.status_code != 200:
+                print(f"Blob service returned error: {response.status_code} - {response.text}")
+                return JSONResponse(content={"error": f"Blob service error: {response.text}"}, status_code=response.status_code)
+
+            stored_keys = {result["key"] for result in response.json()["results"] if "error" not in result}
+            frames = [
+                {"frame-number": frameNumber, "image-extension": imageExtension, "image-binary-path": key}
+                for frameNumber, imageExtension, key in zip(frameNumbers, imageExtensions, keys)
+                if key in stored_keys
+            ]
+            failed_frames = [frameNumber for frameNumber, key in zip(frameNumbers, keys) if key not in stored_keys]
+
+            if frames:
+                try:
+                    await self.publish_frames_rendered(userId, frames)
+                except Exception as e:
+                    print(f"Error publishing message to MQ: {e}")
+                    return JSONResponse(content={"error": f"Failed to publish message to user manager: {str(e)}"}, status_code=500)
+
+            return JSONResponse(content={
+                "message": f"Received {len(frames)} of {len(frameNumbers)} rendered frames",
+                "stored_frames": [frame["frame-number"] for frame in frames],
+                "failed_frames": failed_frames,
+            }, status_code=200)
+
+        @self.app.post("/api/user-service/user/frames-uploaded")
+        async def frames_uploaded(request: Request):
+            """
+            Batch variant of frame-uploaded for frames PUT to presigned URLs.
+
+            Body: {"userId": ..., "frames": [{"frameNumber": ..., "imageExtension": ..., "key": ...}, ...]}
+            Confirmed frames are announced with a single user-frames-rendered event.
+            """
+            try:
+                data = await request.json()
+            except ValueError:
+                return JSONResponse(content={"error": "Body must be JSON"}, status_code=400)
+            userId = data.get("userId") if isinstance(data, dict) else None
+            frames_in = data.get("frames") if isinstance(data, dict) else None
+            if not isinstance(userId, str) or not userId:
+                return JSONResponse(content={"error": "userId must be a non-empty string"}, status_code=400)
+            if not isinstance(frames_in, list):
+                return JSONResponse(content={"error": "frames must be a list"}, status_code=400)
+            for frame in frames_in:
+                if not isinstance(frame, dict) or not all(field in frame for field in ("frameNumber", "imageExtension", "key")):
+                    return JSONResponse(content={"error": "Each frame needs frameNumber, imageExtension and key"}, status_code=400)
+                if not isinstance(frame["key"], str) or not isinstance(frame["imageExtension"], str):
+                    return JSONResponse(content={"error": "Frame key and imageExtension must be strings"}, status_code=400)
+            self.data_class.connected_users.touch_user(userId)
+
+            async def confirm(frame):
+                key = frame["key"]
+                if not key.startswith(f"{userId}/"):
+                    return False
+                response = await self.http_client.get(
+                    f"{self.blob_service_url}/api/blob-service/object-exists",
+                    params={"bucket": "temp", "key": key}
+                )
+                return response.status_code == 200 and bool(response.json().get("exists"))
+
+            try:
+                confirmed = await asyncio.gather(*(confirm(frame) for frame in frames_in))
+            except Exception as e:
+                print(f"Error checking uploaded frames in blob service: {e}")
+                return JSONResponse(content={"error": f"Failed to check uploaded frames: {str(e)}"}, status_code=500)
+
+            frames = [
+                {"frame-number": frame["frameNumber"], "image-extension": frame["imageExtension"], "image-binary-path": frame["key"]}
+                for frame, ok in zip(frames_in, confirmed) if ok
+            ]
+            failed_frames = [frame["frameNumber"] for frame, ok in zip(frames_in, confirmed) if not ok]
+
+            if frames:
+                try:
+                    await self.publish_frames_rendered(userId, frames)
+                except Exception as e:
+                    print(f"Error publishing message to MQ: {e}")
+                    return JSONResponse(content={"error": f"Failed to publish message to user manager: {str(e)}"}, status_code=500)
+
+            return JSONResponse(content={
+                "message": f"Confirmed {len(frames)} of {len(frames_in)} uploaded frames",
+                "stored_frames": [frame["frame-number"] for frame in frames],
+                "failed_frames": failed_frames,
+            }, status_code=200)
+
         @self.app.post("/api/user-service/user/rendering-completed")
         async def rendering_completed(
             userId: str = Form(...)
         ):
             print(f"Rendering completed event received for user: {userId}")
+            self.data_class.connected_users.touch_user(userId)
             try:
                 new_payload = {
                     "topic": "user-rendering-completed",
@@ -459,15 +1084,50 @@ class Service:
             """
             API endpoint to get the total number of connected users.
             """
-            total_connected_users = len(self.data_class.connected_users)
+            total_connected_users = await self.data_class.user_registry.count()
             return {"total_connected_users": total_connected_users}
 
+        @self.app.get("/api/user-service/metrics/resumption")
+        async def get_resumption_metrics():
+            """
+            Reconnect grace window counters of this worker. Every resumed user is a
+            user whose in-flight frames were not thrown away and re-rendered.
+            """
+            return {
+                **self.resumption_metrics,
+                "currently-suspended-users": len(self.grace_timers),
+                "resume-grace-seconds": self.resume_grace_seconds,
+            }
+
+        @self.app.get("/api/user-service/metrics/blend-distribution/{blend_file_hash}")
+        async def get_blend_distribution_metrics(blend_file_hash: str):
+            """
+            Holders of a blend file on this worker and how many of its chunks came from
+            the origin versus from peers.
+            """
+            overview = self.blend_distribution.overview(blend_file_hash)
+            if not overview:
+                raise HTTPException(status_code=404, detail="No peer distribution for this blend file")
+            return overview
+
+        @self.app.get("/api/user-service/metrics/blend-delta")
+        async def get_blend_delta_metrics():
+            """
+            Blend file deltas planned by this worker: bytes users fetched as changed
+            chunks versus bytes they copied from the version they already held.
+            """
+            total = self.blend_delta_metrics["fetch-bytes"] + self.blend_delta_metrics["reused-bytes"]
+            return {
+                **self.blend_delta_metrics,
+                "reuse-ratio": round(self.blend_delta_metrics["reused-bytes"] / total, 4) if total else 0.0,
+            }
+
         # Add more FastAPI routes here as needed...
 
     # -------- Configure Socket.IO -------- #
     async def configure_socketio_routes(self):
         @self.sio.event
-        async def connect(sid, environ):
+        async def connect(sid, environ, auth=None):
             # Try to extract the real client IP address, considering possible proxy headers
             client_ip = None
 
@@ -487,32 +1147,82 @@ class Service:
             else:
                 client_ip = 'Unknown'
 
-            self.data_class.connected_users[sid] = environ
+            # The client presents the resume token it got in its last user-identity event
+            # (auth={"resume_token": ...}) to get its user id, and its work, back
+            capability = auth.get("capability") if isinstance(auth, dict) else None
+            resume_token = auth.get("resume_token") if isinstance(auth, dict) else None
+            if not isinstance(resume_token, str):
+                resume_token = None
+
+            user_id = await self.data_class.user_registry.resolve_resume_token(resume_token) if resume_token else None
+            resumed = user_id is not None and await self.data_class.user_registry.contains(user_id)
+            if user_id is None:
+                user_id = str(uuid.uuid4())
+                resume_token = secrets.token_urlsafe(32)
+            await self.data_class.user_registry.save_resume_token(resume_token, user_id, self.resume_token_ttl)
+
+            # Only what we use is kept per socket, not the whole environ
+            record = ConnectionRecord(sid, user_id=user_id, client_ip=client_ip, capability=capability)
+            grace_timer = self.grace_timers.pop(user_id, None)
+            if grace_timer is not None:
+                expiry_task, dropped_record = grace_timer
+                expiry_task.cancel()
+                record.supervisor_id = dropped_record.supervisor_id
+            self.data_class.connected_users.add(record)
+            previous_sid = await self.data_class.user_registry.add(user_id, sid)
+
+            await self.sio.emit("user-identity", {"user_id": user_id, "resume_token": resume_token}, to=sid)
+
+            if previous_sid is not None:
+                # The old socket of this user is dead but was not detected yet
+                await self.sio.disconnect(previous_sid)
+
+            if resumed:
+                self.resumption_metrics["resumed-users"] += 1
+                pending_commands = await self.data_class.user_registry.pop_commands(user_id)
+                for command in pending_commands:
+                    command = json.loads(command)
+                    await self.sio.emit(command["topic"], command["data"], to=sid)
+                self.resumption_metrics["replayed-commands"] += len(pending_commands)
+                print(f"🔁 Client resumed: {sid} as user {user_id} from IP: {client_ip}, replayed {len(pending_commands)} commands")
+                return
+
+            self.resumption_metrics["new-users"] += 1
             payload = {
                 "topic": "new-user",
                 "data":{
-                    "user_id": sid
+                    "user_id": user_id
                 }
             }
 
             await self.data_class.mq_client.publish_message(self.user_manager_exchange_name, "USER_SERVICE", json.dumps(payload))
-            print(f"🔌 Client connected: {sid} from IP: {client_ip}")
+            print(f"🔌 Client connected: {sid} as user {user_id} from IP: {client_ip}")
 
         @self.sio.event
         async def disconnect(sid):
-            self.data_class.connected_users.pop(sid, None)
-            payload = {
-                "topic": "user-disconnected",
-                "data":{
-                    "user_id": sid
-                }
-            }
+            record = self.data_class.connected_users.remove(sid)
+            if record is None:
+                return
+            user_id = record.user_id
+
+            # Keep the user assigned for the grace window, it may come back with its resume token
+            if self.resume_grace_seconds > 0:
+                if await self.data_class.user_registry.suspend(user_id, sid):
+                    self.resumption_metrics["suspended-users"] += 1
+                    self.grace_timers[user_id] = (asyncio.create_task(self.expire_suspended_user(user_id)), record)
+                    print(f"⏸️ Client disconnected: {sid}, user {user_id} can resume for {self.resume_grace_seconds}s")
+                return
 
-            await self.data_class.mq_client.publish_message(self.user_manager_exchange_name, "USER_SERVICE" , json.dumps(payload))
+            self.blend_distribution.remove_user(user_id)
+            if await self.data_class.user_registry.remove(user_id, sid):
+                await self.publish_user_disconnected(user_id)
             print(f"❌ Client disconnected: {sid}")
 
         @self.sio.on("error-sending-frame")
         async def error_sending_frame(sid, data):
+            self.data_class.connected_users.touch(sid)
+            record = self.data_class.connected_users.get(sid)
+            user_id = record.user_id if record else sid
             print(f"⚠️ Error sending frame from user {sid}: {data}")
             frameNumber = data.get("frame-number", "unknown")
             blendFileHash = data.get("blend-file-hash", "unknown")
@@ -523,7 +1233,7 @@ class Service:
             payload = {
                 "topic": "user-error-sending-frame",
                 "data":{
-                    "user-id": sid,
+                    "user-id": user_id,
                     "frame-number": frameNumber,
                     "blend-file-hash": blendFileHash
                 }
@@ -531,9 +1241,140 @@ class Service:
 
             await self.data_class.mq_client.publish_message(self.user_manager_exchange_name, "USER_SERVICE", json.dumps(payload))
 
+        @self.sio.on("get-blend-file-sources")
+        async def get_blend_file_sources(sid, data):
+            """
+            Chunk manifest of a blend file with the sources of every chunk the user still
+            needs: peer user ids first, "origin" (get-blend-file with a Range header) last.
+            Every chunk must be checked against its sha256 before it is used or reported.
+            """
+            self.data_class.connected_users.touch(sid)
+            record = self.data_class.connected_users.get(sid)
+            blend_file_hash = data.get("blend-file-hash") if isinstance(data, dict) else None
+            if record is None or not blend_file_hash:
+                return {"error": "blend-file-hash is required"}
+            max_chunks = data.get("max-chunks")
+            if max_chunks is not None:
+                try:
+                    max_chunks = int(max_chunks)
+                except (TypeError, ValueError):
+                    max_chunks = 0
+                if max_chunks <= 0 or isinstance(data["max-chunks"], (bool, float)):
+                    return {"error": "max-chunks must be a positive integer"}
+
+            try:
+                manifest = await self.get_blend_manifest(blend_file_hash)
+            except Exception as e:
+                print(f"Could not build the manifest of blend file {blend_file_hash}: {str(e)}")
+                return {"error": str(e)}
+
+            return {
+                "blend-file-hash": blend_file_hash,
+                "size": manifest.size,
+                "chunk-size": manifest.chunk_size,
+                "origin-url": f"/api/user-service/user/get-blend-file/{blend_file_hash}",
+                "chunks": self.blend_distribution.plan(blend_file_hash, record.user_id, limit=max_chunks)
+            }
+
+        @self.sio.on("blend-chunks-received")
+        async def blend_chunks_received(sid, data):
+            # data: {"blend-file-hash", "chunks": [{"index", "source"}]} for verified chunks
+            self.data_class.connected_users.touch(sid)
+            record = self.data_class.connected_users.get(sid)
+            blend_file_hash = data.get("blend-file-hash") if isinstance(data, dict) else None
+            if record is None or self.blend_distribution.get_manifest(blend_file_hash) is None:
+                return {"error": "Unknown blend file, ask for its sources first"}
+
+            chunks = []
+            reported = data.get("chunks")
+            for chunk in reported if isinstance(reported, list) else []:
+                if not isinstance(chunk, dict):
+                    continue
+                # Invalid indices are skipped so the valid ones are still recorded and acked
+                try:
+                    chunks.append((int(chunk["index"]), str(chunk.get("source", "origin"))))
+                except (KeyError, TypeError, ValueError):
+                    continue
+            complete = self.blend_distribution.report(blend_file_hash, record.user_id, chunks)
+            return {"complete": complete}
+
+        @self.sio.on("blend-file-downloaded")
+        async def blend_file_downloaded(sid, data):
+            # A user that downloaded the whole file from get-blend-file becomes a source of every chunk
+            self.data_class.connected_users.touch(sid)
+            record = self.data_class.connected_users.get(sid)
+            blend_file_hash = data.get("blend-file-hash") if isinstance(data, dict) else None
+            if record is None or not blend_file_hash:
+                return {"error": "blend-file-hash is required"}
+
+            try:
+                await self.get_blend_manifest(blend_file_hash)
+            except Exception as e:
+                return {"error": str(e)}
+            self.blend_distribution.mark_complete(blend_file_hash, record.user_id)
+            return {"complete": True}
+
+        @self.sio.on("get-blend-file-delta")
+        async def get_blend_file_delta(sid, data):
+            """
+            How to build a blend file from an earlier version the user holds: byte ranges
+            to copy from the base file and content-defined chunks to fetch from
+            get-blend-chunk. The result must be checked against "sha256" before use;
+            "status": "unavailable" means the whole file has to be downloaded instead.
+            """
+            self.data_class.connected_users.touch(sid)
+            blend_file_hash = data.get("blend-file-hash") if isinstance(data, dict) else None
+            base_blend_file_hash = data.get("base-blend-file-hash") if isinstance(data, dict) else None
+            if not blend_file_hash or not base_blend_file_hash:
+                return {"error": "blend-file-hash and base-blend-file-hash are required"}
+
+            try:
+                manifest, base_manifest = await asyncio.gather(
+                    self.get_content_manifest(blend_file_hash),
+                    self.get_content_manifest(base_blend_file_hash)
+                )
+            except Exception as e:
+                print(f"Could not get the chunk manifests for a delta of blend file {blend_file_hash}: {str(e)}")
+                return {"error": str(e)}
+            if manifest is None or base_manifest is None:
+                return {"status": "unavailable"}
+
+            delta = plan_blend_delta(manifest["chunks"], base_manifest["chunks"])
+            self.blend_delta_metrics["delta-requests"] += 1
+            self.blend_delta_metrics["fetch-bytes"] += delta["fetch-bytes"]
+            self.blend_delta_metrics["reused-bytes"] += delta["reused-bytes"]
+
+            return {
+                "status": "ok",
+                "blend-file-hash": blend_file_hash,
+                "base-blend-file-hash": base_blend_file_hash,
+                "sha256": manifest["sha256"],
+                "base-sha256": base_manifest["sha256"],
+                "chunk-url": "/api/user-service/user/get-blend-chunk/{chunk-hash}",
+                **delta
+            }
+
+        @self.sio.on("peer-signal")
+        async def peer_signal(sid, data):
+            """
+            Relay a connection setup message (e.g. a WebRTC offer, answer or ICE candidate)
+            to another user, so peers can open a direct channel to exchange chunks.
+            """
+            self.data_class.connected_users.touch(sid)
+            record = self.data_class.connected_users.get(sid)
+            to_user_id = data.get("to") if isinstance(data, dict) else None
+            if record is None or not to_user_id:
+                return {"status": "not-connected"}
+
+            status = await self.send_message_to_user(to_user_id, "peer-signal", {"from": record.user_id, "signal": data.get("signal")})
+            return {"status": status}
+
         @self.sio.on("get-sid")
         async def get_sid(sid):
-            return sid
+            # Returns the stable user id, which is what the client sends as userId on uploads
+            self.data_class.connected_users.touch(sid)
+            record = self.data_class.connected_users.get(sid)
+            return record.user_id if record else sid
 
     # -------- Start Server -------- #
     async def start_server(self):
@@ -541,6 +1382,8 @@ class Service:
             await self.configure_http_routes()
             await self.configure_socketio_routes()
 
+            await self.data_class.mq_client.consume(self.data_class.command_queue_name, self.callback_user_commands)
+
             config = uvicorn.Config(
                 app=self.asgi_app,
                 host=self.host,
@@ -561,6 +1404,13 @@ class Service:
         if self.server:
             print("🛑 Stopping server...")
             self.server.should_exit = True
+        for expiry_task, _ in self.grace_timers.values():
+            expiry_task.cancel()
+        # The sockets of this worker are gone with it
+        try:
+            await self.data_class.purge_worker_users()
+        except Exception as e:
+            print(f"❌ Error purging the users of worker {self.data_class.worker_id}: {e}")
 
 
 # ---------------- Entrypoint ---------------- #
@@ -568,8 +1418,13 @@ async def start_service():
     try:
         data_class = Data()
         await data_class.initialization()
-        service = Service(host="0.0.0.0", httpServerPrivilegedIpAddress=["127.0.0.1"], port=8500, data_class_instance=data_class)
-        await service.start_server()
+        # Every worker listens on its own port (8500, 8501, ...) behind the nginx user_service upstream
+        port = int(os.getenv("USER_SERVICE_PORT", "8500"))
+        service = Service(host="0.0.0.0", httpServerPrivilegedIpAddress=["127.0.0.1"], port=port, data_class_instance=data_class)
+        try:
+            await service.start_server()
+        finally:
+            await service.stop_server()
     except KeyboardInterrupt:
         print("\n🛑 Server stopped by user")
     except Exception as e: